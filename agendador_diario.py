@@ -6,8 +6,6 @@ Desenvolvido em Português Brasileiro
 """
 
 import asyncio
-import schedule
-import time
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any
@@ -25,10 +23,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+from core.agendador_async import AgendadorAsync
+from core.historico_jsonl import historico_execucoes as historico_jsonl
+
 # Importa RPAs 1 e 2 (que rodam diariamente)
 try:
-    from rpa_coleta_indices import executar_coleta_indices
-    from rpa_analise_planilhas import executar_analise_planilhas
+    import rpa_coleta_indices  # noqa: F401
+    import rpa_analise_planilhas  # noqa: F401
+    from core.daemon_rpa import executar_rpa
+
+    # Executam no daemon aquecido quando ele está no ar, senão a frio
+    async def executar_coleta_indices(planilha_id, credenciais_google=None):
+        return await executar_rpa(
+            "coleta_indices", planilha_id=planilha_id, credenciais_google=credenciais_google
+        )
+
+    async def executar_analise_planilhas(planilha_calculo_id, planilha_apoio_id, credenciais_google=None):
+        return await executar_rpa(
+            "analise_planilhas",
+            planilha_calculo_id=planilha_calculo_id,
+            planilha_apoio_id=planilha_apoio_id,
+            credenciais_google=credenciais_google
+        )
 except ImportError:
     logger.warning("RPAs não encontrados - usando simulação")
     
@@ -65,6 +81,7 @@ class AgendadorRPA:
         self.historico_execucoes = []
         self.pasta_logs = "logs"
         self._criar_pasta_logs()
+        self.agendador = AgendadorAsync(fuso=self.configuracoes["timezone"])
         
     def _criar_pasta_logs(self):
         """Cria pasta de logs se não existir"""
@@ -78,6 +95,9 @@ class AgendadorRPA:
             "planilha_apoio_id": os.getenv("PLANILHA_APOIO_ID", "1f723KXu5_KooZNHiYIB3EettKb-hUsOzDYMg7LNC_hk"),
             "credenciais_google": "./credentials/google_service_account.json",
             "horario_execucao": "08:00",  # 8h da manhã
+            # Cron (minuto hora dia mês dia-da-semana); o padrão equivale a horario_execucao
+            "cron_execucao": os.getenv("RPA_CRON_DIARIO", "0 8 * * *"),
+            "jitter_segundos": int(os.getenv("RPA_JITTER_AGENDADOR_SEGUNDOS", "120")),
             "timezone": "America/Sao_Paulo",
             "webhook_notificacao": os.getenv("WEBHOOK_NOTIFICACAO", None)
         }
@@ -90,11 +110,10 @@ class AgendadorRPA:
         }
         
         self.historico_execucoes.append(execucao)
+        self.historico_execucoes = self.historico_execucoes[-30:]  # Últimas 30 em memória
         
-        # Salva em arquivo JSON para dashboard
-        arquivo_historico = f"{self.pasta_logs}/historico_execucoes.json"
-        with open(arquivo_historico, 'w', encoding='utf-8') as f:
-            json.dump(self.historico_execucoes[-30:], f, indent=2, ensure_ascii=False)  # Últimas 30
+        # Acrescenta ao histórico JSONL lido pelo dashboard
+        historico_jsonl.anexar(execucao)
     
     async def executar_rpas_diarios(self):
         """
@@ -199,14 +218,13 @@ class AgendadorRPA:
             api_url = "http://localhost:5000"
             
             async with aiohttp.ClientSession() as session:
-                # Dispara workflow dos RPAs 3 e 4 via API
+                # Dispara apenas os RPAs 3 e 4 sobre a fila e os índices que
+                # os RPAs 1 e 2 acabaram de persistir (sem executá-los de novo)
                 payload = {
-                    "planilha_calculo_id": self.configuracoes["planilha_calculo_id"],
-                    "planilha_apoio_id": self.configuracoes["planilha_apoio_id"],
-                    "processar_todos": True
+                    "titulos": [str(item.get("numero_titulo")) for item in fila_processamento]
                 }
                 
-                async with session.post(f"{api_url}/workflow/reparcelamento", json=payload) as response:
+                async with session.post(f"{api_url}/workflow/processar-fila", json=payload) as response:
                     if response.status == 200:
                         resultado = await response.json()
                         resultado_execucao["rpas_34_disparados"] = True
@@ -236,18 +254,21 @@ class AgendadorRPA:
     def configurar_agendamento(self):
         """
         Configura agendamento diário dos RPAs
+        
+        Lock distribuído evita execução dupla com mais de uma instância do
+        agendador; execução perdida (host fora do ar no horário) é
+        recuperada ao iniciar.
         """
-        horario = self.configuracoes["horario_execucao"]
+        cron = self.configuracoes["cron_execucao"]
         
-        # Agenda execução diária
-        schedule.every().day.at(horario).do(
-            lambda: asyncio.run(self.executar_rpas_diarios())
+        self.agendador.adicionar(
+            "rpas_diarios",
+            cron,
+            self.executar_rpas_diarios,
+            jitter_segundos=self.configuracoes["jitter_segundos"]
         )
         
-        logger.info(f"⏰ Agendamento configurado para {horario} todos os dias")
-        
-        # Permite execução manual para teste
-        schedule.every().monday.at("09:00").tag("teste_semanal")
+        logger.info(f"⏰ Agendamento configurado: '{cron}' ({self.configuracoes['timezone']})")
     
     def executar_agora(self):
         """Executa RPAs imediatamente (para teste)"""
@@ -256,14 +277,14 @@ class AgendadorRPA:
     
     def iniciar_agendador(self):
         """
-        Inicia o loop do agendador
+        Inicia o loop do agendador (uma única event loop para todas as execuções)
         """
         logger.info("🚀 Agendador RPA iniciado")
-        logger.info(f"📅 Próxima execução: {schedule.next_run()}")
         
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Verifica a cada minuto
+        try:
+            asyncio.run(self.agendador.iniciar())
+        except KeyboardInterrupt:
+            logger.info("⏹️ Agendador encerrado")
 
 def main():
     """
@@ -6,21 +6,32 @@ Desenvolvido em Português Brasileiro
 """
 
 import asyncio
+import hashlib
+import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 import uvicorn
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import structlog
 
-# Importa os 4 RPAs refatorados
-from rpa_coleta_indices.rpa_coleta_indices import executar_coleta_indices
-from rpa_analise_planilhas.rpa_analise_planilhas import executar_analise_planilhas
-from rpa_sienge.rpa_sienge import executar_processamento_sienge
-from rpa_sicredi.rpa_sicredi import executar_processamento_sicredi
+# Os 4 RPAs rodam no daemon aquecido (core/daemon_rpa) ou, sem ele, a frio
+from core.daemon_rpa import executar_rpa
+from rpa_sienge.validacao_lote import pre_filtrar_contratos
+from rpa_sicredi.retorno_cnab import conciliar_retornos
+from core.fila_processamento import carregar_fila_processamento, carregar_indices_coletados, atualizar_status_fila
+from core.executor_jobs import executor_jobs
+from core.escritor_lote import escritor_lote
+from core.armazenamento_execucoes import armazenamento_execucoes, STATUS_FINAIS
+from core.memoizacao_estagios import (
+    memoizacao_estagios, identidade_arquivo, ESTAGIO_COLETA, ESTAGIO_ANALISE, ESTAGIO_SIENGE, ESTAGIO_SICREDI
+)
+from workflows.execucao_paralela import (
+    executar_pipeline, vazao_por_hora, CONCORRENCIA_PADRAO, CONSUMIDORES_PADRAO, TAMANHO_LOTE_PADRAO
+)
 
 # Configuração de logs
 logger = structlog.get_logger()
@@ -43,6 +54,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def recuperar_execucoes():
+    """Marca com erro execuções que ficaram em andamento antes do reinício"""
+    await armazenamento_execucoes.recuperar_interrompidas()
+
+@app.on_event("shutdown")
+async def encerrar_workers():
+    """Encerra os processos de jobs RPA junto com a API"""
+    executor_jobs.encerrar()
+
+    # Grava o buffer de auditoria ainda pendente (RPA_WORKERS=0 roda jobs aqui)
+    if escritor_lote:
+        await escritor_lote.encerrar()
+
 # ============================================================================
 # MODELOS PYDANTIC
 # ============================================================================
@@ -53,6 +78,21 @@ class ParametrosWorkflow(BaseModel):
     planilha_apoio_id: str = Field(..., description="ID da planilha Base de apoio")
     processar_todos: bool = Field(False, description="Se True, processa todos os contratos identificados")
     credenciais_google: Optional[str] = Field(None, description="Caminho para credenciais Google Sheets")
+    relatorios_carteira: Optional[List[str]] = Field(None, description="Relatórios Saldo Devedor Presente da carteira para pré-validação em lote")
+    concorrencia_sienge: int = Field(CONCORRENCIA_PADRAO, ge=1, description="Contratos processados em paralelo no Sienge")
+    concorrencia_sicredi: int = Field(CONSUMIDORES_PADRAO, ge=1, description="Lotes de remessa enviados em paralelo ao Sicredi")
+    tamanho_lote_remessa: int = Field(TAMANHO_LOTE_PADRAO, ge=1, description="Máximo de contratos por remessa/upload no pipeline")
+    usar_cache: bool = Field(True, description="Reaproveita estágios já concluídos hoje (coleta, análise, Sienge, Sicredi)")
+
+class ParametrosProcessarFila(BaseModel):
+    """Parâmetros para processar a fila persistida (apenas RPAs 3 e 4)"""
+    titulos: Optional[List[str]] = Field(None, description="Números de título a processar (padrão: toda a fila pendente)")
+    reprocessar_erros: bool = Field(False, description="Se True, inclui contratos da fila com status 'erro'")
+    relatorios_carteira: Optional[List[str]] = Field(None, description="Relatórios Saldo Devedor Presente da carteira para pré-validação em lote")
+    concorrencia_sienge: int = Field(CONCORRENCIA_PADRAO, ge=1, description="Contratos processados em paralelo no Sienge")
+    concorrencia_sicredi: int = Field(CONSUMIDORES_PADRAO, ge=1, description="Lotes de remessa enviados em paralelo ao Sicredi")
+    tamanho_lote_remessa: int = Field(TAMANHO_LOTE_PADRAO, ge=1, description="Máximo de contratos por remessa/upload no pipeline")
+    usar_cache: bool = Field(True, description="Reaproveita estágios já concluídos hoje (coleta, análise, Sienge, Sicredi)")
 
 class ParametrosColetaIndices(BaseModel):
     """Parâmetros para RPA Coleta de Índices"""
@@ -77,6 +117,11 @@ class ParametrosSicredi(BaseModel):
     credenciais_sicredi: Dict[str, str] = Field(..., description="Credenciais Sicredi (url, usuario, senha)")
     dados_processamento: Optional[Dict[str, Any]] = Field(None, description="Dados do processamento anterior")
 
+class ParametrosRetornoSicredi(BaseModel):
+    """Parâmetros para conciliação de retorno Sicredi"""
+    arquivos_retorno: List[str] = Field(..., description="Arquivos de retorno CNAB240/CNAB400 baixados do WebBank")
+    titulos_esperados: Optional[List[str]] = Field(None, description="Títulos enviados nas remessas (ex.: manifesto do ciclo)")
+
 class RespostaAPI(BaseModel):
     """Resposta padrão da API"""
     sucesso: bool
@@ -86,10 +131,23 @@ class RespostaAPI(BaseModel):
     timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
 
 # ============================================================================
-# STORAGE SIMPLES PARA EXECUÇÕES EM ANDAMENTO
+# ARMAZENAMENTO DAS EXECUÇÕES (MongoDB/JSON + eventos)
 # ============================================================================
 
-execucoes_ativas: Dict[str, Dict[str, Any]] = {}
+# Execuções em andamento e últimas concluídas (as demais ficam no armazenamento)
+execucoes_ativas: Dict[str, Dict[str, Any]] = armazenamento_execucoes.execucoes
+
+# Intervalo do comentário keep-alive no stream de eventos (segundos)
+INTERVALO_KEEPALIVE_EVENTOS = 15
+
+# Submissões idênticas sem Idempotency-Key dentro da janela reaproveitam a execução
+JANELA_COALESCENCIA_SEGUNDOS = int(os.getenv("RPA_JANELA_COALESCENCIA_SEGUNDOS", "600"))
+
+# Execuções simultâneas que podem escrever na mesma planilha
+LIMITE_EXECUCOES_POR_PLANILHA = int(os.getenv("RPA_LIMITE_EXECUCOES_POR_PLANILHA", "1"))
+
+# Checagem + registro da execução sem intercalar submissões concorrentes
+_lock_admissao = asyncio.Lock()
 
 def gerar_id_execucao() -> str:
     """Gera ID único para execução"""
@@ -97,11 +155,113 @@ def gerar_id_execucao() -> str:
 
 def salvar_execucao(execucao_id: str, dados: Dict[str, Any]):
     """Salva dados da execução"""
-    execucoes_ativas[execucao_id] = dados
+    armazenamento_execucoes.registrar(execucao_id, dados)
 
 def obter_execucao(execucao_id: str) -> Optional[Dict[str, Any]]:
-    """Obtém dados da execução"""
-    return execucoes_ativas.get(execucao_id)
+    """Obtém dados da execução (em memória)"""
+    return armazenamento_execucoes.obter(execucao_id)
+
+def atualizar_execucao(execucao_id: str, dados: Dict[str, Any]):
+    """Aplica o estado enviado pelo worker do job (persiste e publica eventos)"""
+    armazenamento_execucoes.atualizar(execucao_id, dados)
+
+def _hash_parametros(tipo: str, parametros: BaseModel) -> str:
+    """Identidade da submissão: tipo de workflow + parâmetros (sem credenciais)"""
+    dados = {k: v for k, v in parametros.dict().items() if not k.startswith("credenciais")}
+    conteudo = json.dumps({"tipo": tipo, "parametros": dados}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+async def _execucao_equivalente(
+    tipo: str,
+    parametros: BaseModel,
+    chave_idempotencia: Optional[str]
+) -> Optional[tuple]:
+    """
+    Execução à qual a submissão deve ser anexada, se houver
+
+    Com Idempotency-Key: a execução com a mesma chave (enquanto estiver
+    armazenada); chave reutilizada com outros parâmetros é rejeitada (422).
+    Sem chave: execução com os mesmos parâmetros em andamento ou concluída
+    com sucesso dentro de JANELA_COALESCENCIA_SEGUNDOS.
+    """
+    hash_parametros = _hash_parametros(tipo, parametros)
+
+    if chave_idempotencia:
+        existente = await armazenamento_execucoes.buscar_por_chave_idempotencia(f"{tipo}:{chave_idempotencia}")
+        if existente and existente[1].get("hash_parametros") != hash_parametros:
+            raise HTTPException(status_code=422, detail="Idempotency-Key já usada com parâmetros diferentes")
+        return existente
+
+    desde = (datetime.now() - timedelta(seconds=JANELA_COALESCENCIA_SEGUNDOS)).isoformat()
+    for execucao_id, dados in armazenamento_execucoes.em_andamento().items():
+        if dados.get("hash_parametros") == hash_parametros:
+            return execucao_id, dados
+    recente = await armazenamento_execucoes.buscar_por_chave_idempotencia(f"auto:{hash_parametros}", desde=desde)
+    # Nova tentativa após falha não é coalescida
+    return recente if recente and recente[1].get("status") != "erro" else None
+
+def _verificar_limite_planilhas(planilhas: List[str]):
+    """Recusa (409) se as planilhas já estão no limite de execuções simultâneas"""
+    for planilha in planilhas:
+        em_uso = [
+            execucao_id for execucao_id, dados in armazenamento_execucoes.em_andamento().items()
+            if planilha in dados.get("planilhas", [])
+        ]
+        if len(em_uso) >= LIMITE_EXECUCOES_POR_PLANILHA:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Planilha {planilha} em uso pelas execuções {', '.join(em_uso)} "
+                       f"(limite {LIMITE_EXECUCOES_POR_PLANILHA})"
+            )
+
+def _identificacao_submissao(tipo: str, parametros: BaseModel, chave_idempotencia: Optional[str]) -> Dict[str, Any]:
+    """Campos gravados na execução para coalescer submissões futuras"""
+    hash_parametros = _hash_parametros(tipo, parametros)
+    return {
+        "tipo": tipo,
+        "hash_parametros": hash_parametros,
+        "chave_idempotencia": f"{tipo}:{chave_idempotencia}" if chave_idempotencia else f"auto:{hash_parametros}",
+        "requisicoes_anexadas": 0
+    }
+
+def _resposta_anexada(execucao_id: str, dados: Dict[str, Any]) -> RespostaAPI:
+    """Resposta para submissão idêntica: mesmo execucao_id da execução existente"""
+    # Campo da API: os estados enviados pelo worker não o sobrescrevem
+    armazenamento_execucoes.anexar_requisicao(execucao_id)
+    logger.info(f"Submissão idêntica anexada à execução {execucao_id}")
+    return RespostaAPI(
+        sucesso=True,
+        mensagem="Submissão idêntica - anexada à execução existente",
+        dados={
+            "execucao_id": execucao_id,
+            "status": dados.get("status"),
+            "anexada": True,
+            "endpoint_status": f"/workflow/status/{execucao_id}"
+        }
+    )
+
+def _remessas_carne_individual(processamentos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Remessas de contratos retomados de checkpoint que já tinham carnê individual
+
+    Contratos já finalizados no ciclo (retomado_de_checkpoint) foram enviados
+    pela execução que os finalizou e não entram de novo.
+    """
+    remessas = []
+    for processamento in processamentos:
+        if processamento.get("retomado_de_checkpoint"):
+            continue
+        carne = processamento.get("carne_gerado", {})
+        if carne.get("sucesso") and carne.get("tipo") != "remessa_lote" and carne.get("arquivo_gerado"):
+            contrato = processamento.get("contrato_processado", {})
+            remessas.append({
+                "chave_grupo": contrato.get("numero_titulo", ""),
+                "arquivo_remessa": carne["arquivo_gerado"],
+                "titulos": [{"numero_titulo": contrato.get("numero_titulo", ""),
+                             "cliente": contrato.get("cliente", "")}],
+                "quantidade_titulos": 1
+            })
+    return remessas
 
 # ============================================================================
 # ENDPOINTS PRINCIPAIS
@@ -135,6 +295,7 @@ async def health_check():
         dados={
             "status": "healthy",
             "memoria_execucoes": len(execucoes_ativas),
+            "workers": executor_jobs.estatisticas(),
             "timestamp_verificacao": datetime.now().isoformat()
         }
     )
@@ -146,27 +307,41 @@ async def health_check():
 @app.post("/workflow/reparcelamento", response_model=RespostaAPI)
 async def executar_workflow_reparcelamento(
     parametros: ParametrosWorkflow,
-    background_tasks: BackgroundTasks
+    chave_idempotencia: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Executa workflow completo de reparcelamento (4 RPAs em sequência)
+    
+    Submissões idênticas (mesma Idempotency-Key ou mesmos parâmetros em
+    andamento) recebem o execucao_id da execução existente.
     """
     try:
-        execucao_id = gerar_id_execucao()
-        
-        # Salva execução como iniciada
-        salvar_execucao(execucao_id, {
-            "status": "iniciado",
-            "etapa_atual": "preparando",
-            "inicio": datetime.now().isoformat(),
-            "parametros": parametros.dict()
-        })
-        
-        # Executa workflow em background
-        background_tasks.add_task(
-            executar_workflow_background,
+        async with _lock_admissao:
+            existente = await _execucao_equivalente("reparcelamento", parametros, chave_idempotencia)
+            if existente:
+                return _resposta_anexada(*existente)
+            
+            planilhas = [parametros.planilha_calculo_id, parametros.planilha_apoio_id]
+            _verificar_limite_planilhas(planilhas)
+            
+            execucao_id = gerar_id_execucao()
+            
+            # Salva execução como iniciada
+            salvar_execucao(execucao_id, {
+                "status": "iniciado",
+                "etapa_atual": "preparando",
+                "inicio": datetime.now().isoformat(),
+                "parametros": parametros.dict(),
+                "planilhas": planilhas,
+                **_identificacao_submissao("reparcelamento", parametros, chave_idempotencia)
+            })
+        
+        # Executa workflow em processo worker (fora do uvicorn)
+        await executor_jobs.submeter(
             execucao_id,
-            parametros
+            "api_rpa:executar_workflow_background",
+            parametros,
+            ao_atualizar=atualizar_execucao
         )
         
         return RespostaAPI(
@@ -179,16 +354,87 @@ async def executar_workflow_reparcelamento(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao iniciar workflow: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
+@app.post("/workflow/processar-fila", response_model=RespostaAPI)
+async def executar_workflow_processar_fila(
+    parametros: ParametrosProcessarFila,
+    chave_idempotencia: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Executa apenas os RPAs 3 e 4 sobre a fila e os índices já persistidos pelos RPAs 1 e 2
+    """
+    try:
+        async with _lock_admissao:
+            existente = await _execucao_equivalente("processar_fila", parametros, chave_idempotencia)
+            if existente:
+                return _resposta_anexada(*existente)
+            
+            fila = await carregar_fila_processamento(parametros.titulos, parametros.reprocessar_erros)
+            if not fila["contratos"]:
+                return RespostaAPI(
+                    sucesso=False,
+                    mensagem="Nenhum contrato pendente na fila de processamento",
+                    dados=fila
+                )
+            
+            indices = await carregar_indices_coletados()
+            if not indices:
+                return RespostaAPI(
+                    sucesso=False,
+                    mensagem="Nenhum índice coletado encontrado - execute o RPA Coleta de Índices",
+                    erro="Índices econômicos indisponíveis"
+                )
+            
+            execucao_id = gerar_id_execucao()
+            salvar_execucao(execucao_id, {
+                "status": "iniciado",
+                "etapa_atual": "preparando",
+                "inicio": datetime.now().isoformat(),
+                "parametros": parametros.dict(),
+                "origem_fila": fila["origem"],
+                "timestamp_fila": fila["timestamp_fila"],
+                "timestamp_indices": indices.get("timestamp"),
+                **_identificacao_submissao("processar_fila", parametros, chave_idempotencia)
+            })
+        
+        await executor_jobs.submeter(
+            execucao_id,
+            "api_rpa:executar_fila_background",
+            fila["contratos"],
+            indices,
+            parametros,
+            ao_atualizar=atualizar_execucao
+        )
+        
+        return RespostaAPI(
+            sucesso=True,
+            mensagem=f"Processamento da fila iniciado - {len(fila['contratos'])} contratos",
+            dados={
+                "execucao_id": execucao_id,
+                "status": "em_execucao",
+                "total_contratos": len(fila["contratos"]),
+                "titulos_nao_encontrados": fila["titulos_nao_encontrados"],
+                "endpoint_status": f"/workflow/status/{execucao_id}"
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao iniciar processamento da fila: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
 @app.get("/workflow/status/{execucao_id}", response_model=RespostaAPI)
 async def obter_status_workflow(execucao_id: str):
     """
     Obtém status de execução do workflow
     """
-    execucao = obter_execucao(execucao_id)
+    execucao = await armazenamento_execucoes.buscar(execucao_id)
     
     if not execucao:
         raise HTTPException(status_code=404, detail="Execução não encontrada")
@@ -199,6 +445,269 @@ async def obter_status_workflow(execucao_id: str):
         dados=execucao
     )
 
+@app.get("/workflow/eventos")
+@app.get("/workflow/eventos/{execucao_id}")
+async def eventos_workflow(execucao_id: Optional[str] = None):
+    """
+    Stream SSE com eventos de status, etapa e progresso por contrato
+
+    Com execucao_id, começa pelo estado atual e termina quando a execução
+    conclui; sem execucao_id, acompanha todas as execuções até o cliente
+    desconectar.
+    """
+    estado_inicial = None
+    if execucao_id:
+        estado_inicial = await armazenamento_execucoes.buscar(execucao_id)
+        if estado_inicial is None:
+            raise HTTPException(status_code=404, detail="Execução não encontrada")
+
+    fila = armazenamento_execucoes.assinar(execucao_id)
+
+    def formatar(evento: Dict[str, Any]) -> str:
+        return f"event: {evento['evento']}\ndata: {json.dumps(evento, ensure_ascii=False, default=str)}\n\n"
+
+    async def gerar():
+        try:
+            if estado_inicial is not None:
+                yield formatar({"evento": "estado", "execucao_id": execucao_id, "dados": estado_inicial,
+                                "timestamp": datetime.now().isoformat()})
+                if estado_inicial.get("status") in STATUS_FINAIS:
+                    return
+
+            while True:
+                try:
+                    evento = await asyncio.wait_for(fila.get(), timeout=INTERVALO_KEEPALIVE_EVENTOS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield formatar(evento)
+                if execucao_id and evento["evento"] == "status" and evento["dados"].get("status") in STATUS_FINAIS:
+                    return
+        finally:
+            armazenamento_execucoes.cancelar_assinatura(fila)
+
+    return StreamingResponse(
+        gerar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _executar_rpas_sienge_sicredi(
+    execucao_id: str,
+    contratos_reajuste: List[Dict[str, Any]],
+    indices_economicos: Dict[str, Any],
+    parametros: Any,
+    limite: Optional[int] = None
+):
+    """
+    Executa RPAs 3 e 4 (Sienge -> Sicredi em pipeline) sobre contratos já identificados
+    
+    Usado pelo workflow completo e pelo consumo da fila persistida.
+    parametros precisa de relatorios_carteira, concorrencia_sienge,
+    concorrencia_sicredi, tamanho_lote_remessa e usar_cache.
+
+    Com usar_cache, contratos já reparcelados hoje reaproveitam o resultado
+    do Sienge e títulos/remessas já confirmados no Sicredi não são reenviados.
+    
+    Returns:
+        (contratos processados no Sienge, status por título para a fila)
+    """
+    execucao = obter_execucao(execucao_id)
+    status_titulos: Dict[str, Dict[str, Any]] = {}
+    
+    # Pré-validação em lote: descarta inadimplentes antes de abrir o navegador
+    # (leitura dos relatórios Excel em thread para não travar o event loop da API)
+    if parametros.relatorios_carteira:
+        execucao["etapa_atual"] = "validacao_lote"
+        contratos_reajuste, inadimplentes, _ = await asyncio.to_thread(
+            pre_filtrar_contratos, contratos_reajuste, parametros.relatorios_carteira
+        )
+        execucao["contratos_inadimplentes_lote"] = [
+            {
+                "numero_titulo": c.get("numero_titulo"),
+                "cliente": c.get("cliente"),
+                "motivo": c["validacao_lote"]["motivo"]
+            }
+            for c in inadimplentes
+        ]
+        for c in inadimplentes:
+            status_titulos[str(c.get("numero_titulo"))] = {"status": "erro", "erro": c["validacao_lote"]["motivo"]}
+        logger.info(f"[{execucao_id}] Validação em lote: {len(inadimplentes)} inadimplentes descartados, "
+                    f"{len(contratos_reajuste)} contratos seguem para o Sienge")
+    
+    # ETAPAS 3 e 4 em pipeline: cada contrato reparcelado no Sienge entra em uma
+    # fila limitada; consumidores geram a remessa do lote e enviam ao Sicredi
+    # enquanto o Sienge segue com os próximos contratos
+    execucao["etapa_atual"] = "rpa_sienge_sicredi"
+    contratos_processados = []
+    execucao["manifestos_remessas"] = []
+    execucao["resultados_sicredi"] = []
+    
+    limite = min(limite or len(contratos_reajuste), len(contratos_reajuste))
+    
+    # Obtém credenciais das variáveis de ambiente
+    credenciais_sienge = {
+        "url": os.getenv("SIENGE_URL", ""),
+        "usuario": os.getenv("SIENGE_USERNAME", ""),
+        "senha": os.getenv("SIENGE_PASSWORD", "")
+    }
+    credenciais_sicredi = {
+        "url": os.getenv("SICREDI_URL", ""),
+        "usuario": os.getenv("SICREDI_USERNAME", ""),
+        "senha": os.getenv("SICREDI_PASSWORD", "")
+    }
+    
+    memoizacao = execucao.setdefault("memoizacao", {})
+    memoizacao.update({"sienge_reaproveitados": 0, "sicredi_reaproveitados": 0})
+
+    # Publicado como evento "contrato" no stream /workflow/eventos
+    progresso = execucao["progresso_contratos"] = {"total": limite, "processados": 0, "com_erro": 0, "ultimo_titulo": None}
+
+    async def processar_sienge(contrato: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        numero_titulo = str(contrato.get("numero_titulo"))
+
+        # Carnê fica para a remessa do lote (consumidor)
+        resultado_sienge, reaproveitado = await memoizacao_estagios.executar(
+            ESTAGIO_SIENGE,
+            {"numero_titulo": numero_titulo, "indices_economicos": indices_economicos, "gerar_carne": False},
+            lambda: executar_rpa(
+                "processamento_sienge",
+                contrato=contrato,
+                indices_economicos=indices_economicos,
+                credenciais_sienge=credenciais_sienge,
+                gerar_carne=False
+            ),
+            usar_cache=parametros.usar_cache
+        )
+        progresso["ultimo_titulo"] = numero_titulo
+        if not resultado_sienge.sucesso:
+            progresso["com_erro"] += 1
+            status_titulos[numero_titulo] = {
+                "status": "erro", "erro": resultado_sienge.erro or resultado_sienge.mensagem
+            }
+            return None
+
+        # "processado" só depois do upload do lote confirmado no Sicredi
+        contratos_processados.append(resultado_sienge.dados)
+        progresso["processados"] += 1
+        logger.info(f"[{execucao_id}] Sienge concluído{' (memoizado)' if reaproveitado else ''}: "
+                    f"{numero_titulo} ({len(contratos_processados)}/{limite})")
+
+        if reaproveitado:
+            memoizacao["sienge_reaproveitados"] += 1
+            # Já confirmado no Sicredi em execução anterior: não gera nova remessa
+            if await memoizacao_estagios.obter(ESTAGIO_SICREDI, {"numero_titulo": numero_titulo}):
+                memoizacao["sicredi_reaproveitados"] += 1
+                status_titulos[numero_titulo] = {"status": "processado"}
+                return None
+        return resultado_sienge.dados
+    
+    def marcar_lote(processamentos: List[Dict[str, Any]], erro: Optional[str] = None):
+        for processamento in processamentos:
+            numero_titulo = str(processamento.get("contrato_processado", {}).get("numero_titulo"))
+            status_titulos[numero_titulo] = {"status": "erro", "erro": erro} if erro else {"status": "processado"}
+
+    async def enviar_lote_sicredi(processamentos: List[Dict[str, Any]]) -> bool:
+        # Já finalizados no ciclo: nada a gerar nem enviar
+        marcar_lote([p for p in processamentos if p.get("retomado_de_checkpoint")])
+        processamentos = [p for p in processamentos if not p.get("retomado_de_checkpoint")]
+        if not processamentos:
+            return True
+
+        remessas = []
+        pendentes_lote = [p for p in processamentos if p.get("carne_gerado", {}).get("pendente_lote")]
+        if pendentes_lote:
+            resultado_remessas = await executar_rpa(
+                "geracao_carnes_lote", processamentos=pendentes_lote, credenciais_sienge=credenciais_sienge
+            )
+            if resultado_remessas.dados:
+                execucao["manifestos_remessas"].append(resultado_remessas.dados)
+                remessas.extend(resultado_remessas.dados.get("remessas", []))
+        
+        remessas.extend(_remessas_carne_individual(processamentos))
+        remessas = [r for r in remessas if r.get("arquivo_remessa")]
+
+        # Remessa já confirmada hoje (mesmo arquivo, tamanho e mtime) não é reenviada
+        if parametros.usar_cache:
+            pendentes = []
+            for remessa in remessas:
+                if await memoizacao_estagios.obter(ESTAGIO_SICREDI, identidade_arquivo(remessa["arquivo_remessa"])):
+                    memoizacao["sicredi_reaproveitados"] += 1
+                else:
+                    pendentes.append(remessa)
+            if remessas and not pendentes:
+                marcar_lote(processamentos)
+                return True
+            remessas = pendentes
+
+        if not remessas:
+            marcar_lote(processamentos, "Nenhuma remessa gerada para o lote")
+            return False
+
+        logger.info(f"[{execucao_id}] Enviando ao Sicredi {len(remessas)} remessa(s) "
+                    f"de {len(processamentos)} contrato(s)")
+        resultado_sicredi = await executar_rpa(
+            "processamento_sicredi_lote",
+            arquivos_remessa=[r["arquivo_remessa"] for r in remessas],
+            credenciais_sicredi=credenciais_sicredi,
+            dados_por_arquivo={r["arquivo_remessa"]: r for r in remessas}
+        )
+        if resultado_sicredi.dados:
+            execucao["resultados_sicredi"].append(resultado_sicredi.dados)
+
+            # Memoiza por arquivo e por título o que o Sicredi confirmou
+            for arquivo, protocolo in resultado_sicredi.dados.get("protocolos_por_arquivo", {}).items():
+                await memoizacao_estagios.salvar(
+                    ESTAGIO_SICREDI, identidade_arquivo(arquivo),
+                    {"sucesso": True, "mensagem": "Remessa confirmada no Sicredi", "dados": protocolo}
+                )
+            for numero_titulo, protocolo in resultado_sicredi.dados.get("protocolos_por_titulo", {}).items():
+                await memoizacao_estagios.salvar(
+                    ESTAGIO_SICREDI, {"numero_titulo": numero_titulo},
+                    {"sucesso": True, "mensagem": "Título confirmado no Sicredi", "dados": protocolo}
+                )
+        marcar_lote(processamentos, None if resultado_sicredi.sucesso
+                    else resultado_sicredi.erro or resultado_sicredi.mensagem)
+        return resultado_sicredi.sucesso
+    
+    inicio_pipeline = datetime.now()
+    pipeline = await executar_pipeline(
+        contratos_reajuste[:limite],
+        processar_sienge,
+        enviar_lote_sicredi,
+        limite_produtores=parametros.concorrencia_sienge,
+        limite_consumidores=parametros.concorrencia_sicredi,
+        tamanho_lote=parametros.tamanho_lote_remessa
+    )
+    duracao_pipeline = (datetime.now() - inicio_pipeline).total_seconds()
+    
+    for concluido in pipeline["producao"]:
+        if concluido["erro"]:
+            status_titulos[str(concluido["item"].get("numero_titulo"))] = {"status": "erro", "erro": concluido["erro"]}
+            logger.error(f"[{execucao_id}] Erro no Sienge para {concluido['item'].get('numero_titulo')}: "
+                         f"{concluido['erro']}")
+    lotes_com_erro = [lote for lote in pipeline["lotes"] if lote["erro"] or not lote["resultado"]]
+    for lote in lotes_com_erro:
+        if lote["erro"]:
+            # Exceção no consumidor: o lote não chegou a ser marcado
+            marcar_lote(lote["itens"], lote["erro"])
+        logger.error(f"[{execucao_id}] Lote Sicredi com {len(lote['itens'])} contrato(s) falhou: {lote['erro']}")
+    
+    execucao["etapas_concluidas"].extend(["processamento_sienge", "remessa_lote_sienge", "processamento_sicredi"])
+    execucao["contratos_processados_sienge"] = contratos_processados
+    execucao["pipeline"] = {
+        "duracao_segundos": duracao_pipeline,
+        "contratos_por_hora": vazao_por_hora(limite, duracao_pipeline),
+        "lotes_sicredi": len(pipeline["lotes"]),
+        "lotes_com_erro": len(lotes_com_erro),
+        "tamanho_medio_lote": round(
+            sum(len(lote["itens"]) for lote in pipeline["lotes"]) / len(pipeline["lotes"]), 1
+        ) if pipeline["lotes"] else 0
+    }
+    
+    return contratos_processados, status_titulos
+
 async def executar_workflow_background(execucao_id: str, parametros: ParametrosWorkflow):
     """
     Executa workflow completo em background
@@ -209,11 +718,19 @@ async def executar_workflow_background(execucao_id: str, parametros: ParametrosW
         execucao["etapa_atual"] = "rpa_coleta_indices"
         execucao["etapas_concluidas"] = []
         
+        execucao["memoizacao"] = {}
+
         # ETAPA 1: Coleta de Índices
         logger.info(f"[{execucao_id}] Executando RPA Coleta de Índices")
-        resultado_indices = await executar_coleta_indices(
-            planilha_id=parametros.planilha_calculo_id,
-            credenciais_google=parametros.credenciais_google
+        resultado_indices, execucao["memoizacao"]["coleta"] = await memoizacao_estagios.executar(
+            ESTAGIO_COLETA,
+            {"planilha_id": parametros.planilha_calculo_id},
+            lambda: executar_rpa(
+                "coleta_indices",
+                planilha_id=parametros.planilha_calculo_id,
+                credenciais_google=parametros.credenciais_google
+            ),
+            usar_cache=parametros.usar_cache
         )
         
         if not resultado_indices.sucesso:
@@ -227,12 +744,18 @@ async def executar_workflow_background(execucao_id: str, parametros: ParametrosW
         
         # ETAPA 2: Análise de Planilhas
         logger.info(f"[{execucao_id}] Executando RPA Análise de Planilhas")
-        resultado_analise = await executar_analise_planilhas(
-            planilha_calculo_id=parametros.planilha_calculo_id,
-            planilha_apoio_id=parametros.planilha_apoio_id,
-            credenciais_google=parametros.credenciais_google
+        resultado_analise, execucao["memoizacao"]["analise"] = await memoizacao_estagios.executar(
+            ESTAGIO_ANALISE,
+            {"planilha_calculo_id": parametros.planilha_calculo_id, "planilha_apoio_id": parametros.planilha_apoio_id},
+            lambda: executar_rpa(
+                "analise_planilhas",
+                planilha_calculo_id=parametros.planilha_calculo_id,
+                planilha_apoio_id=parametros.planilha_apoio_id,
+                credenciais_google=parametros.credenciais_google
+            ),
+            usar_cache=parametros.usar_cache
         )
-        
+
         if not resultado_analise.sucesso:
             execucao["status"] = "erro"
             execucao["erro"] = f"Falha na análise de planilhas: {resultado_analise.erro}"
@@ -250,60 +773,15 @@ async def executar_workflow_background(execucao_id: str, parametros: ParametrosW
             execucao["fim"] = datetime.now().isoformat()
             return
         
-        # ETAPA 3: Processamento Sienge
-        execucao["etapa_atual"] = "rpa_sienge"
-        contratos_processados = []
-        
         limite = len(contratos_reajuste) if parametros.processar_todos else min(3, len(contratos_reajuste))
         
-        for i, contrato in enumerate(contratos_reajuste[:limite]):
-            logger.info(f"[{execucao_id}] Processando contrato {i+1}/{limite} no Sienge")
-            
-            # Obtém credenciais Sienge das variáveis de ambiente
-            credenciais_sienge = {
-                "url": os.getenv("SIENGE_URL", ""),
-                "usuario": os.getenv("SIENGE_USERNAME", ""),
-                "senha": os.getenv("SIENGE_PASSWORD", "")
-            }
-            
-            resultado_sienge = await executar_processamento_sienge(
-                contrato=contrato,
-                indices_economicos=resultado_indices.dados,
-                credenciais_sienge=credenciais_sienge
-            )
-            
-            if resultado_sienge.sucesso:
-                contratos_processados.append(resultado_sienge.dados)
-        
-        execucao["etapas_concluidas"].append("processamento_sienge")
-        execucao["contratos_processados_sienge"] = contratos_processados
-        
-        # ETAPA 4: Processamento Sicredi (se houver contratos processados)
-        if contratos_processados:
-            execucao["etapa_atual"] = "rpa_sicredi"
-            resultados_sicredi = []
-            
-            credenciais_sicredi = {
-                "url": os.getenv("SICREDI_URL", ""),
-                "usuario": os.getenv("SICREDI_USERNAME", ""),
-                "senha": os.getenv("SICREDI_PASSWORD", "")
-            }
-            
-            for processamento in contratos_processados:
-                arquivo_remessa = processamento.get("carne_gerado", {}).get("nome_arquivo")
-                
-                if arquivo_remessa:
-                    resultado_sicredi = await executar_processamento_sicredi(
-                        arquivo_remessa=arquivo_remessa,
-                        credenciais_sicredi=credenciais_sicredi,
-                        dados_processamento=processamento
-                    )
-                    
-                    if resultado_sicredi.sucesso:
-                        resultados_sicredi.append(resultado_sicredi.dados)
-            
-            execucao["etapas_concluidas"].append("processamento_sicredi")
-            execucao["resultados_sicredi"] = resultados_sicredi
+        contratos_processados, _ = await _executar_rpas_sienge_sicredi(
+            execucao_id,
+            contratos_reajuste,
+            resultado_indices.dados,
+            parametros,
+            limite=limite
+        )
         
         # Finalização
         execucao["status"] = "concluido"
@@ -319,6 +797,40 @@ async def executar_workflow_background(execucao_id: str, parametros: ParametrosW
         execucao["erro"] = str(e)
         execucao["fim"] = datetime.now().isoformat()
 
+async def executar_fila_background(
+    execucao_id: str,
+    contratos: List[Dict[str, Any]],
+    indices: Dict[str, Any],
+    parametros: ParametrosProcessarFila
+):
+    """
+    Executa RPAs 3 e 4 sobre a fila persistida e atualiza o status de cada contrato nela
+    """
+    try:
+        execucao = obter_execucao(execucao_id)
+        execucao["etapas_concluidas"] = []
+        execucao["resultado_indices"] = indices
+        
+        contratos_processados, status_titulos = await _executar_rpas_sienge_sicredi(
+            execucao_id, contratos, indices, parametros
+        )
+        
+        execucao["contratos_fila_atualizados"] = await atualizar_status_fila(status_titulos)
+        
+        execucao["status"] = "concluido"
+        execucao["fim"] = datetime.now().isoformat()
+        execucao["mensagem"] = (f"Fila processada - {len(contratos_processados)} de "
+                                f"{len(contratos)} contratos processados")
+        
+        logger.info(f"[{execucao_id}] Processamento da fila concluído")
+        
+    except Exception as e:
+        logger.error(f"[{execucao_id}] Erro no processamento da fila: {str(e)}")
+        execucao = obter_execucao(execucao_id)
+        execucao["status"] = "erro"
+        execucao["erro"] = str(e)
+        execucao["fim"] = datetime.now().isoformat()
+
 # ============================================================================
 # ENDPOINTS INDIVIDUAIS DOS RPAS
 # ============================================================================
@@ -329,7 +841,8 @@ async def executar_rpa_coleta_indices(parametros: ParametrosColetaIndices):
     Executa apenas o RPA de Coleta de Índices Econômicos
     """
     try:
-        resultado = await executar_coleta_indices(
+        resultado = await executar_rpa(
+            "coleta_indices",
             planilha_id=parametros.planilha_id,
             credenciais_google=parametros.credenciais_google
         )
@@ -351,7 +864,8 @@ async def executar_rpa_analise_planilhas(parametros: ParametrosAnalisePlanilhas)
     Executa apenas o RPA de Análise de Planilhas
     """
     try:
-        resultado = await executar_analise_planilhas(
+        resultado = await executar_rpa(
+            "analise_planilhas",
             planilha_calculo_id=parametros.planilha_calculo_id,
             planilha_apoio_id=parametros.planilha_apoio_id,
             credenciais_google=parametros.credenciais_google
@@ -374,7 +888,8 @@ async def executar_rpa_sienge(parametros: ParametrosSienge):
     Executa apenas o RPA de Processamento Sienge
     """
     try:
-        resultado = await executar_processamento_sienge(
+        resultado = await executar_rpa(
+            "processamento_sienge",
             contrato=parametros.contrato,
             indices_economicos=parametros.indices_economicos,
             credenciais_sienge=parametros.credenciais_sienge
@@ -397,7 +912,8 @@ async def executar_rpa_sicredi(parametros: ParametrosSicredi):
     Executa apenas o RPA de Processamento Sicredi
     """
     try:
-        resultado = await executar_processamento_sicredi(
+        resultado = await executar_rpa(
+            "processamento_sicredi",
             arquivo_remessa=parametros.arquivo_remessa,
             credenciais_sicredi=parametros.credenciais_sicredi,
             dados_processamento=parametros.dados_processamento
@@ -414,35 +930,65 @@ async def executar_rpa_sicredi(parametros: ParametrosSicredi):
         logger.error(f"Erro no RPA Sicredi: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
+@app.post("/rpa/sicredi/retorno", response_model=RespostaAPI)
+async def conciliar_retorno_sicredi(parametros: ParametrosRetornoSicredi):
+    """
+    Concilia arquivos de retorno do Sicredi com os contratos processados
+    """
+    try:
+        faltando = [a for a in parametros.arquivos_retorno if not os.path.isfile(a)]
+        if faltando:
+            raise HTTPException(status_code=400, detail=f"Arquivos de retorno não encontrados: {faltando}")
+        
+        resumo = await conciliar_retornos(parametros.arquivos_retorno, parametros.titulos_esperados)
+        situacoes = resumo["por_situacao"]
+        pendencias = situacoes.get("rejeitado", 0) + situacoes.get("ausente_no_retorno", 0)
+        
+        return RespostaAPI(
+            sucesso=pendencias == 0,
+            mensagem=f"Conciliação de {resumo['total_titulos']} títulos - {pendencias} pendência(s) de registro",
+            dados=resumo
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro na conciliação do retorno Sicredi: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
 # ============================================================================
 # ENDPOINTS DE MONITORAMENTO
 # ============================================================================
 
 @app.get("/execucoes", response_model=RespostaAPI)
-async def listar_execucoes():
+async def listar_execucoes(
+    status: Optional[str] = None,
+    desde: Optional[str] = None,
+    limite: int = 50
+):
     """
-    Lista todas as execuções ativas na memória
+    Lista execuções (mais recentes primeiro), filtrando por status e data de início
     """
+    execucoes = await armazenamento_execucoes.listar(status=status, desde=desde, limite=limite)
     return RespostaAPI(
         sucesso=True,
-        mensagem=f"Total de {len(execucoes_ativas)} execuções na memória",
+        mensagem=f"Total de {len(execucoes)} execuções",
         dados={
-            "total": len(execucoes_ativas),
-            "execucoes": list(execucoes_ativas.keys()),
-            "detalhes": execucoes_ativas
+            "total": len(execucoes),
+            "execucoes": list(execucoes.keys()),
+            "detalhes": execucoes
         }
     )
 
 @app.delete("/execucoes/{execucao_id}", response_model=RespostaAPI)
 async def limpar_execucao(execucao_id: str):
     """
-    Remove execução da memória
+    Remove execução da memória e do armazenamento
     """
-    if execucao_id in execucoes_ativas:
-        del execucoes_ativas[execucao_id]
+    if await armazenamento_execucoes.remover(execucao_id):
         return RespostaAPI(
             sucesso=True,
-            mensagem=f"Execução {execucao_id} removida da memória"
+            mensagem=f"Execução {execucao_id} removida"
         )
     else:
         raise HTTPException(status_code=404, detail="Execução não encontrada")
@@ -450,17 +996,40 @@ async def limpar_execucao(execucao_id: str):
 @app.delete("/execucoes", response_model=RespostaAPI)
 async def limpar_todas_execucoes():
     """
-    Limpa todas as execuções da memória
+    Limpa todas as execuções da memória e do armazenamento
     """
-    total = len(execucoes_ativas)
-    execucoes_ativas.clear()
+    total = await armazenamento_execucoes.remover()
     
     return RespostaAPI(
         sucesso=True,
-        mensagem=f"{total} execuções removidas da memória",
+        mensagem=f"{total} execuções removidas",
         dados={"execucoes_removidas": total}
     )
 
+@app.delete("/memoizacao", response_model=RespostaAPI)
+async def invalidar_memoizacao(
+    estagio: Optional[str] = None,
+    data_negocio: Optional[str] = None,
+    numero_titulo: Optional[str] = None
+):
+    """
+    Invalida resultados memoizados de estágios (coleta, analise, sienge, sicredi)
+
+    Sem filtros remove tudo; numero_titulo restringe aos estágios por contrato
+    (sienge e o registro do título no sicredi).
+    """
+    removidos = await memoizacao_estagios.invalidar(
+        estagio=estagio,
+        data_negocio=data_negocio,
+        entradas={"numero_titulo": numero_titulo} if numero_titulo else None
+    )
+
+    return RespostaAPI(
+        sucesso=True,
+        mensagem=f"{removidos} resultado(s) memoizado(s) invalidado(s)",
+        dados={"removidos": removidos, "estagio": estagio, "data_negocio": data_negocio, "numero_titulo": numero_titulo}
+    )
+
 # ============================================================================
 # MAIN
 # ============================================================================
@@ -0,0 +1,484 @@
+"""
+Agendador Assíncrono (cron)
+Execução periódica de tarefas no event loop, sem schedule + asyncio.run
+
+Desenvolvido em Português Brasileiro
+
+- Expressões cron de 5 campos (minuto hora dia mês dia-da-semana), com
+  *, listas, intervalos e passos (ex.: "0 8 * * 1-5", "*/30 6-18 * * *")
+- Lock distribuído no MongoDB (collection locks_agendador) para que duas
+  instâncias do agendador não executem a mesma tarefa ao mesmo tempo;
+  sem MongoDB (ou com erro dele ao adquirir), lock por arquivo em
+  dados_processamento/locks/. Após uma falha o MongoDB fica em pausa por
+  RPA_AGENDADOR_PAUSA_MONGODB_SEGUNDOS e depois volta a ser tentado
+- Atraso aleatório (jitter) antes de cada execução
+- Recuperação de execução perdida: se o host estava fora no horário, a
+  última ocorrência perdida roda uma vez ao subir (dentro de um limite)
+- Histórico com duração de cada execução (MongoDB historico_agendador ou
+  dados_processamento/historico_agendador.json)
+
+Uma única event loop para todas as tarefas: cliente MongoDB e demais
+recursos são reaproveitados entre execuções.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+try:
+    import pymongo
+    from core.mongodb_manager import mongodb_manager
+    MONGODB_DISPONIVEL = True
+except ImportError:
+    MONGODB_DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+FUSO_PADRAO = os.getenv("RPA_TIMEZONE", "America/Sao_Paulo")
+
+# Lock expira sozinho se a instância morrer sem liberar; renovado durante a execução
+DURACAO_LOCK_SEGUNDOS = 300
+
+# Após falha do MongoDB, usa o armazenamento local por este tempo antes de tentar de novo
+PAUSA_MONGODB_PADRAO = 60.0
+
+# Registros de histórico mantidos por tarefa no JSON local
+MAX_HISTORICO_LOCAL = 200
+
+_NOMES_MESES = {n: i for i, n in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_NOMES_DIAS = {n: i for i, n in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+
+def _fuso(nome: str):
+    if ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(nome)
+    except Exception:
+        logger.warning(f"⚠️ Fuso {nome} indisponível, usando horário local")
+        return None
+
+
+class ExpressaoCron:
+    """
+    Expressão cron de 5 campos
+
+    Dia do mês e dia da semana seguem a regra do cron: quando os dois estão
+    restritos, basta um deles coincidir. Domingo = 0 (ou 7).
+    """
+
+    LIMITES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expressao: str):
+        self.expressao = expressao.strip()
+        campos = self.expressao.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expressão cron deve ter 5 campos: '{expressao}'")
+
+        nomes = [None, None, None, _NOMES_MESES, _NOMES_DIAS]
+        valores = [self._interpretar(c, lim, n) for c, lim, n in zip(campos, self.LIMITES, nomes)]
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = valores
+        self.dias_semana = {0 if d == 7 else d for d in dias_semana}
+        self.dia_restrito = campos[2] != "*"
+        self.semana_restrita = campos[4] != "*"
+
+    @staticmethod
+    def _interpretar(campo: str, limites: tuple, nomes: Optional[Dict[str, int]]) -> set:
+        minimo, maximo = limites
+
+        def valor(texto: str) -> int:
+            return nomes[texto] if nomes and texto in nomes else int(texto)
+
+        valores = set()
+        for parte in campo.lower().split(","):
+            passo, tem_passo = 1, "/" in parte
+            if tem_passo:
+                parte, passo_texto = parte.split("/", 1)
+                passo = int(passo_texto)
+            if parte == "*":
+                inicio, fim = minimo, maximo
+            elif "-" in parte:
+                inicio_texto, fim_texto = parte.split("-", 1)
+                inicio, fim = valor(inicio_texto), valor(fim_texto)
+            else:
+                # "5/15" = a partir de 5, de 15 em 15
+                inicio = valor(parte)
+                fim = maximo if tem_passo else inicio
+            if not (minimo <= inicio <= maximo and minimo <= fim <= maximo) or passo < 1:
+                raise ValueError(f"Campo cron fora do intervalo {minimo}-{maximo}: '{campo}'")
+            valores.update(range(inicio, fim + 1, passo))
+        return valores
+
+    def _dia_coincide(self, momento: datetime) -> bool:
+        dia_semana = (momento.weekday() + 1) % 7
+        coincide_dia = momento.day in self.dias
+        coincide_semana = dia_semana in self.dias_semana
+        if self.dia_restrito and self.semana_restrita:
+            return coincide_dia or coincide_semana
+        return coincide_dia and coincide_semana
+
+    def proxima(self, apos: datetime) -> datetime:
+        """Primeira ocorrência estritamente depois de `apos`"""
+        momento = apos.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = momento + timedelta(days=366 * 5)
+
+        while momento < limite:
+            if momento.month not in self.meses:
+                ano, mes = (momento.year + 1, 1) if momento.month == 12 else (momento.year, momento.month + 1)
+                momento = momento.replace(year=ano, month=mes, day=1, hour=0, minute=0)
+                continue
+            if not self._dia_coincide(momento):
+                momento = (momento + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if momento.hour not in self.horas:
+                momento = (momento + timedelta(hours=1)).replace(minute=0)
+                continue
+            if momento.minute not in self.minutos:
+                momento += timedelta(minutes=1)
+                continue
+            return momento
+
+        raise ValueError(f"Expressão cron sem ocorrências: '{self.expressao}'")
+
+    def ultima_ate(self, desde: datetime, ate: datetime) -> Optional[datetime]:
+        """Ocorrência mais recente no intervalo (desde, ate]"""
+        ultima = None
+        momento = self.proxima(desde)
+        while momento <= ate:
+            ultima = momento
+            momento = self.proxima(momento)
+        return ultima
+
+
+class TarefaAgendada:
+    """Tarefa periódica: corrotina sem argumentos + expressão cron + políticas"""
+
+    def __init__(
+        self,
+        nome: str,
+        cron: str,
+        funcao: Callable[[], Awaitable[Any]],
+        jitter_segundos: float = 0,
+        recuperar_perdida: bool = True,
+        atraso_maximo_recuperacao: timedelta = timedelta(hours=12)
+    ):
+        self.nome = nome
+        self.cron = ExpressaoCron(cron)
+        self.funcao = funcao
+        self.jitter_segundos = jitter_segundos
+        self.recuperar_perdida = recuperar_perdida
+        self.atraso_maximo_recuperacao = atraso_maximo_recuperacao
+        self.proxima_execucao: Optional[datetime] = None
+
+
+class AgendadorAsync:
+    """
+    Executa tarefas cron em uma única event loop, com lock distribuído,
+    jitter, recuperação de execução perdida e histórico de duração
+    """
+
+    def __init__(
+        self,
+        fuso: str = FUSO_PADRAO,
+        pasta_local: str = "dados_processamento"
+    ):
+        self.fuso = _fuso(fuso)
+        self.pasta_local = pasta_local
+        self.arquivo_historico = os.path.join(pasta_local, "historico_agendador.json")
+        self.pasta_locks = os.path.join(pasta_local, "locks")
+        self.mongodb_ativo = MONGODB_DISPONIVEL
+        self.pausa_mongodb = float(os.getenv("RPA_AGENDADOR_PAUSA_MONGODB_SEGUNDOS") or PAUSA_MONGODB_PADRAO)
+        self._mongodb_pausado_ate = 0.0
+        # Tarefas cujo lock atual está no MongoDB (as demais usam arquivo)
+        self._locks_mongodb: set = set()
+        self.identificador = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.tarefas: Dict[str, TarefaAgendada] = {}
+
+    def agora(self) -> datetime:
+        return datetime.now(self.fuso) if self.fuso else datetime.now()
+
+    def adicionar(self, nome: str, cron: str, funcao: Callable[[], Awaitable[Any]], **opcoes) -> TarefaAgendada:
+        """
+        Registra uma tarefa
+
+        Args:
+            nome: Identificador único (também é a chave do lock)
+            cron: Expressão cron de 5 campos
+            funcao: Corrotina sem argumentos
+            **opcoes: jitter_segundos, recuperar_perdida, atraso_maximo_recuperacao
+        """
+        tarefa = TarefaAgendada(nome, cron, funcao, **opcoes)
+        self.tarefas[nome] = tarefa
+        logger.info(f"⏰ Tarefa {nome} agendada: '{cron}'")
+        return tarefa
+
+    async def iniciar(self):
+        """Roda todas as tarefas até ser cancelado"""
+        if not self.tarefas:
+            logger.warning("⚠️ Nenhuma tarefa agendada")
+            return
+
+        logger.info(f"🚀 Agendador iniciado ({self.identificador})")
+        lacos = [asyncio.create_task(self._laco_tarefa(t), name=f"agendador-{t.nome}") for t in self.tarefas.values()]
+        try:
+            await asyncio.gather(*lacos)
+        finally:
+            for laco in lacos:
+                laco.cancel()
+
+    async def _laco_tarefa(self, tarefa: TarefaAgendada):
+        perdida = await self._execucao_perdida(tarefa) if tarefa.recuperar_perdida else None
+        if perdida:
+            logger.warning(f"⏪ Tarefa {tarefa.nome}: execução de {perdida.isoformat()} perdida - recuperando")
+            await self._executar(tarefa, perdida, recuperacao=True)
+
+        while True:
+            tarefa.proxima_execucao = tarefa.cron.proxima(self.agora())
+            logger.info(f"📅 Próxima execução de {tarefa.nome}: {tarefa.proxima_execucao.isoformat()}")
+
+            # Dorme em trechos: acompanha ajustes de relógio e suspensão do host
+            while (restante := (tarefa.proxima_execucao - self.agora()).total_seconds()) > 0:
+                await asyncio.sleep(min(restante, 60))
+
+            try:
+                await self._executar(tarefa, tarefa.proxima_execucao)
+            except Exception as e:
+                # Uma ocorrência com erro de infraestrutura não derruba o laço
+                # (nem, via gather, as demais tarefas)
+                logger.error(f"💥 Falha ao executar a tarefa {tarefa.nome}: {str(e)}")
+
+    async def _execucao_perdida(self, tarefa: TarefaAgendada) -> Optional[datetime]:
+        """Última ocorrência entre a última execução registrada e agora, se dentro do limite"""
+        agora = self.agora()
+        ultima = await self._ultima_agendada(tarefa.nome)
+        desde = max(ultima, agora - tarefa.atraso_maximo_recuperacao) if ultima else agora - tarefa.atraso_maximo_recuperacao
+        return tarefa.cron.ultima_ate(desde, agora)
+
+    async def executar_agora(self, nome: str) -> Dict[str, Any]:
+        """Execução manual (também respeita o lock)"""
+        return await self._executar(self.tarefas[nome], self.agora())
+
+    async def _executar(self, tarefa: TarefaAgendada, agendado_para: datetime, recuperacao: bool = False) -> Dict[str, Any]:
+        if tarefa.jitter_segundos:
+            await asyncio.sleep(random.uniform(0, tarefa.jitter_segundos))
+
+        registro = {
+            "tarefa": tarefa.nome,
+            "agendado_para": agendado_para.isoformat(),
+            "recuperacao": recuperacao,
+            "instancia": self.identificador
+        }
+
+        if not await self._adquirir_lock(tarefa.nome):
+            logger.warning(f"🔒 Tarefa {tarefa.nome} já em execução em outra instância - ignorada")
+            return {**registro, "status": "ignorada_lock"}
+
+        # Outra instância pode ter executado esta ocorrência enquanto esperávamos o jitter
+        ultima = await self._ultima_agendada(tarefa.nome)
+        if ultima and ultima >= agendado_para:
+            await self._liberar_lock(tarefa.nome)
+            logger.info(f"ℹ️ Tarefa {tarefa.nome} de {agendado_para.isoformat()} já executada por outra instância")
+            return {**registro, "status": "ja_executada"}
+
+        renovacao = asyncio.create_task(self._renovar_lock(tarefa.nome))
+        inicio = self.agora()
+        logger.info(f"▶️ Executando tarefa {tarefa.nome} (agendada para {agendado_para.isoformat()})")
+        try:
+            await tarefa.funcao()
+            registro.update({"status": "sucesso", "erro": None})
+        except Exception as e:
+            logger.error(f"💥 Tarefa {tarefa.nome} falhou: {str(e)}")
+            registro.update({"status": "erro", "erro": str(e)})
+        finally:
+            renovacao.cancel()
+            await self._liberar_lock(tarefa.nome)
+
+        fim = self.agora()
+        registro.update({
+            "inicio": inicio.isoformat(),
+            "fim": fim.isoformat(),
+            "duracao_segundos": round((fim - inicio).total_seconds(), 3)
+        })
+        await self._registrar_historico(registro)
+        logger.info(f"🏁 Tarefa {tarefa.nome}: {registro['status']} em {registro['duracao_segundos']}s")
+        return registro
+
+    # ------------------------------------------------------------------
+    # Lock distribuído
+    # ------------------------------------------------------------------
+
+    async def _mongodb_conectado(self) -> bool:
+        """MongoDB conectado e fora da pausa após falha"""
+        if not self.mongodb_ativo or time.monotonic() < self._mongodb_pausado_ate:
+            return False
+        try:
+            if mongodb_manager.conectado or await mongodb_manager.conectar():
+                return True
+        except Exception as e:
+            logger.warning(f"⚠️ MongoDB indisponível para o agendador: {str(e)}")
+        self._pausar_mongodb()
+        return False
+
+    def _pausar_mongodb(self):
+        self._mongodb_pausado_ate = time.monotonic() + self.pausa_mongodb
+
+    async def _adquirir_lock(self, nome: str) -> bool:
+        agora = datetime.utcnow()
+        expira_em = agora + timedelta(seconds=DURACAO_LOCK_SEGUNDOS)
+
+        if await self._mongodb_conectado():
+            try:
+                await mongodb_manager.database.locks_agendador.find_one_and_update(
+                    {"_id": nome, "$or": [{"expira_em": {"$lt": agora}}, {"dono": self.identificador}]},
+                    {"$set": {"dono": self.identificador, "adquirido_em": agora, "expira_em": expira_em}},
+                    upsert=True
+                )
+                self._locks_mongodb.add(nome)
+                return True
+            except pymongo.errors.DuplicateKeyError:
+                # Documento existe com outro dono e não expirado
+                return False
+            except pymongo.errors.PyMongoError as e:
+                logger.warning(f"⚠️ Falha ao adquirir lock de {nome} no MongoDB: {str(e)} - usando lock local")
+                self._pausar_mongodb()
+
+        self._locks_mongodb.discard(nome)
+        return self._adquirir_lock_local(nome, expira_em)
+
+    async def _renovar_lock(self, nome: str):
+        while True:
+            await asyncio.sleep(DURACAO_LOCK_SEGUNDOS / 3)
+            expira_em = datetime.utcnow() + timedelta(seconds=DURACAO_LOCK_SEGUNDOS)
+            try:
+                if nome in self._locks_mongodb:
+                    await mongodb_manager.database.locks_agendador.update_one(
+                        {"_id": nome, "dono": self.identificador}, {"$set": {"expira_em": expira_em}}
+                    )
+                else:
+                    self._gravar_lock_local(nome, expira_em)
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao renovar lock de {nome}: {str(e)}")
+
+    async def _liberar_lock(self, nome: str):
+        try:
+            if nome in self._locks_mongodb:
+                self._locks_mongodb.discard(nome)
+                await mongodb_manager.database.locks_agendador.delete_one({"_id": nome, "dono": self.identificador})
+                return
+        except Exception as e:
+            # Lock expira sozinho em DURACAO_LOCK_SEGUNDOS
+            logger.warning(f"⚠️ Falha ao liberar lock de {nome} no MongoDB: {str(e)}")
+            return
+
+        caminho = self._caminho_lock(nome)
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                if json.load(f).get("dono") == self.identificador:
+                    os.remove(caminho)
+        except (OSError, ValueError):
+            pass
+
+    def _caminho_lock(self, nome: str) -> str:
+        return os.path.join(self.pasta_locks, f"{nome}.lock")
+
+    def _adquirir_lock_local(self, nome: str, expira_em: datetime) -> bool:
+        os.makedirs(self.pasta_locks, exist_ok=True)
+        caminho = self._caminho_lock(nome)
+        try:
+            descritor = os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    atual = json.load(f)
+                if atual.get("dono") != self.identificador and atual.get("expira_em", "") >= datetime.utcnow().isoformat():
+                    return False
+            except (OSError, ValueError):
+                pass
+            # Lock expirado (instância morreu) ou nosso: assume
+            self._gravar_lock_local(nome, expira_em)
+            return True
+
+        with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+            json.dump({"dono": self.identificador, "expira_em": expira_em.isoformat()}, f)
+        return True
+
+    def _gravar_lock_local(self, nome: str, expira_em: datetime):
+        caminho = self._caminho_lock(nome)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({"dono": self.identificador, "expira_em": expira_em.isoformat()}, f)
+        os.replace(temporario, caminho)
+
+    # ------------------------------------------------------------------
+    # Histórico
+    # ------------------------------------------------------------------
+
+    async def _registrar_historico(self, registro: Dict[str, Any]):
+        if await self._mongodb_conectado():
+            try:
+                await mongodb_manager.database.historico_agendador.insert_one(dict(registro))
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao gravar histórico do agendador no MongoDB: {str(e)}")
+                self._pausar_mongodb()
+
+        historico = self._carregar_historico_local()
+        historico.append(registro)
+        da_tarefa = [r for r in historico if r["tarefa"] == registro["tarefa"]]
+        if len(da_tarefa) > MAX_HISTORICO_LOCAL:
+            descartar = {id(r) for r in da_tarefa[:-MAX_HISTORICO_LOCAL]}
+            historico = [r for r in historico if id(r) not in descartar]
+
+        os.makedirs(self.pasta_local, exist_ok=True)
+        temporario = f"{self.arquivo_historico}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(historico, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(temporario, self.arquivo_historico)
+
+    def _carregar_historico_local(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.arquivo_historico):
+            return []
+        try:
+            with open(self.arquivo_historico, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return []
+
+    async def historico(self, nome: Optional[str] = None, limite: int = 50) -> List[Dict[str, Any]]:
+        """Execuções mais recentes (com duracao_segundos), opcionalmente de uma tarefa"""
+        filtro = {"tarefa": nome} if nome else {}
+        if await self._mongodb_conectado():
+            try:
+                cursor = mongodb_manager.database.historico_agendador.find(filtro, {"_id": 0}).sort(
+                    "agendado_para", pymongo.DESCENDING
+                ).limit(limite)
+                return await cursor.to_list(length=limite)
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao ler histórico do agendador no MongoDB: {str(e)}")
+                self._pausar_mongodb()
+
+        registros = [r for r in self._carregar_historico_local() if not nome or r["tarefa"] == nome]
+        return sorted(registros, key=lambda r: r["agendado_para"], reverse=True)[:limite]
+
+    async def _ultima_agendada(self, nome: str) -> Optional[datetime]:
+        """Horário agendado da última execução registrada (de qualquer instância, com MongoDB)"""
+        registros = await self.historico(nome, limite=1)
+        if not registros:
+            return None
+        ultima = datetime.fromisoformat(registros[0]["agendado_para"])
+        if self.fuso and ultima.tzinfo is None:
+            ultima = ultima.replace(tzinfo=self.fuso)
+        return ultima
@@ -0,0 +1,371 @@
+"""
+Armazenamento de Execuções da API
+Estado das execuções de workflow persistido e publicado como eventos
+
+Desenvolvido em Português Brasileiro
+
+Substitui o dict em memória do api_rpa: as execuções ficam no MongoDB
+(collection execucoes_api, TTL em expira_em, índices por status/data) ou
+na tabela execucoes_api do banco local SQLite (core/sqlite_manager), e
+sobrevivem a reinícios. Cada atualização grava só a linha da execução. Em
+memória ficam apenas as execuções em andamento e as últimas concluídas.
+
+Cada atualização vinda dos workers (core/executor_jobs.py) é comparada
+com o estado anterior e vira eventos (status, etapa, contrato) para os
+assinantes - o endpoint SSE /workflow/eventos. Campos mantidos pela própria
+API (CAMPOS_DA_API, ex.: requisicoes_anexadas) não são sobrescritos pelo
+estado completo que o worker envia a cada poucos segundos.
+
+Configuração (.env):
+- RPA_TTL_EXECUCOES_DIAS: dias até a execução expirar do armazenamento
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from core.sqlite_manager import SQLiteManager, sqlite_manager
+
+try:
+    import pymongo
+    from core.mongodb_manager import mongodb_manager
+    MONGODB_DISPONIVEL = True
+except ImportError:
+    MONGODB_DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+TTL_DIAS_PADRAO = 30
+
+# Execuções concluídas mantidas em memória (as demais são lidas do armazenamento)
+MAX_CONCLUIDAS_EM_MEMORIA = 50
+
+# Eventos pendentes por assinante antes de descartar os mais antigos
+TAMANHO_FILA_ASSINANTE = 200
+
+STATUS_FINAIS = ("concluido", "erro")
+
+# Campos que só a API altera (o worker não os conhece)
+CAMPOS_DA_API = ("requisicoes_anexadas",)
+
+
+def _serializavel(dados: Dict[str, Any]) -> Dict[str, Any]:
+    return json.loads(json.dumps(dados, ensure_ascii=False, default=str))
+
+
+class ArmazenamentoExecucoes:
+    """
+    Execuções de workflow: memória (ativas) + MongoDB/SQLite (histórico) + eventos
+    """
+
+    def __init__(
+        self,
+        banco_local: Optional[SQLiteManager] = None,
+        ttl_dias: Optional[int] = None
+    ):
+        self.banco_local = banco_local or sqlite_manager
+        self.ttl_dias = int(os.getenv("RPA_TTL_EXECUCOES_DIAS", TTL_DIAS_PADRAO)) if ttl_dias is None else ttl_dias
+        self.mongodb_ativo = MONGODB_DISPONIVEL
+        self.execucoes: Dict[str, Dict[str, Any]] = {}
+        self._publicados: Dict[str, Dict[str, Any]] = {}
+        self._assinantes: List[tuple] = []
+        self._persistencias_pendentes: set = set()
+
+    # ------------------------------------------------------------------
+    # Estado em memória (chamado de forma síncrona pela API)
+    # ------------------------------------------------------------------
+
+    def registrar(self, execucao_id: str, dados: Dict[str, Any]):
+        """Nova execução"""
+        self.execucoes[execucao_id] = dados
+        self._publicar_mudancas(execucao_id)
+        self._agendar_persistencia(execucao_id)
+
+    def obter(self, execucao_id: str) -> Optional[Dict[str, Any]]:
+        """Execução em memória (mesmo dict, alterado in-place pelos workflows)"""
+        return self.execucoes.get(execucao_id)
+
+    def atualizar(self, execucao_id: str, dados: Dict[str, Any]):
+        """Aplica um estado parcial ou completo (ex.: enviado pelo worker), exceto CAMPOS_DA_API"""
+        atual = self.execucoes.setdefault(execucao_id, {})
+        atual.update({k: v for k, v in dados.items() if k not in CAMPOS_DA_API or k not in atual})
+        self._publicar_mudancas(execucao_id)
+        self._agendar_persistencia(execucao_id)
+        if dados.get("status") in STATUS_FINAIS:
+            self._liberar_memoria()
+
+    def anexar_requisicao(self, execucao_id: str) -> int:
+        """Conta uma submissão idêntica anexada à execução em memória"""
+        dados = self.execucoes.get(execucao_id)
+        if dados is None:
+            return 0
+        dados["requisicoes_anexadas"] = dados.get("requisicoes_anexadas", 0) + 1
+        self._agendar_persistencia(execucao_id)
+        return dados["requisicoes_anexadas"]
+
+    def _persistencia_ativa(self) -> bool:
+        # Processos de job mantêm o estado só em memória e o enviam à API
+        return os.getenv("RPA_PROCESSO_WORKER") != "1"
+
+    def _agendar_persistencia(self, execucao_id: str):
+        if not self._persistencia_ativa() or execucao_id in self._persistencias_pendentes:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # Várias atualizações seguidas viram uma escrita com o estado mais recente
+        self._persistencias_pendentes.add(execucao_id)
+        loop.create_task(self.persistir(execucao_id))
+
+    def _liberar_memoria(self):
+        concluidas = sorted(
+            (k for k, v in self.execucoes.items() if v.get("status") in STATUS_FINAIS),
+            key=lambda k: self.execucoes[k].get("fim") or ""
+        )
+        for execucao_id in concluidas[:-MAX_CONCLUIDAS_EM_MEMORIA or None]:
+            if execucao_id not in self._persistencias_pendentes:
+                self.execucoes.pop(execucao_id, None)
+                self._publicados.pop(execucao_id, None)
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def _documento(self, execucao_id: str, dados: Dict[str, Any]) -> Dict[str, Any]:
+        agora = datetime.now()
+        return {
+            "execucao_id": execucao_id,
+            "status": dados.get("status"),
+            "inicio": dados.get("inicio"),
+            "fim": dados.get("fim"),
+            "atualizado_em": agora,
+            "expira_em": agora + timedelta(days=self.ttl_dias),
+            "dados": _serializavel(dados)
+        }
+
+    async def persistir(self, execucao_id: str):
+        """Grava o estado atual da execução (MongoDB e, se indisponível, SQLite)"""
+        self._persistencias_pendentes.discard(execucao_id)
+        dados = self.execucoes.get(execucao_id)
+        if dados is None:
+            return
+        documento = self._documento(execucao_id, dados)
+
+        if self.mongodb_ativo:
+            try:
+                if mongodb_manager.conectado or await mongodb_manager.conectar():
+                    await mongodb_manager.database.execucoes_api.replace_one(
+                        {"execucao_id": execucao_id}, documento, upsert=True
+                    )
+                    return
+                self.mongodb_ativo = False
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB indisponível para execuções, usando SQLite: {str(e)}")
+                self.mongodb_ativo = False
+
+        await self.banco_local.salvar_execucao_api(documento)
+
+    async def buscar(self, execucao_id: str) -> Optional[Dict[str, Any]]:
+        """Execução em memória ou, se já liberada, do armazenamento"""
+        if execucao_id in self.execucoes:
+            return self.execucoes[execucao_id]
+
+        if self.mongodb_ativo:
+            try:
+                if mongodb_manager.conectado or await mongodb_manager.conectar():
+                    documento = await mongodb_manager.database.execucoes_api.find_one(
+                        {"execucao_id": execucao_id}, {"_id": 0, "dados": 1}
+                    )
+                    return documento["dados"] if documento else None
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao buscar execução no MongoDB: {str(e)}")
+
+        documento = await self.banco_local.obter_execucao_api(execucao_id)
+        return documento["dados"] if documento else None
+
+    async def buscar_por_chave_idempotencia(
+        self,
+        chave: str,
+        desde: Optional[str] = None
+    ) -> Optional[tuple]:
+        """
+        Execução mais recente com a chave de idempotência
+
+        Args:
+            chave: Chave gravada em dados["chave_idempotencia"]
+            desde: Data/hora ISO mínima de início (padrão: qualquer, dentro do TTL)
+
+        Returns:
+            (execucao_id, dados) ou None
+        """
+        candidatas = [
+            (execucao_id, dados) for execucao_id, dados in self.execucoes.items()
+            if dados.get("chave_idempotencia") == chave and (not desde or (dados.get("inicio") or "") >= desde)
+        ]
+        if candidatas:
+            return max(candidatas, key=lambda item: item[1].get("inicio") or "")
+
+        filtro: Dict[str, Any] = {"dados.chave_idempotencia": chave}
+        if desde:
+            filtro["inicio"] = {"$gte": desde}
+
+        if self.mongodb_ativo:
+            try:
+                if mongodb_manager.conectado or await mongodb_manager.conectar():
+                    documento = await mongodb_manager.database.execucoes_api.find_one(
+                        filtro, {"_id": 0, "execucao_id": 1, "dados": 1}, sort=[("inicio", pymongo.DESCENDING)]
+                    )
+                    return (documento["execucao_id"], documento["dados"]) if documento else None
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao buscar chave de idempotência no MongoDB: {str(e)}")
+
+        documentos = await self.banco_local.listar_execucoes_api(desde=desde, chave_idempotencia=chave, limite=1)
+        return (documentos[0]["execucao_id"], documentos[0]["dados"]) if documentos else None
+
+    def em_andamento(self) -> Dict[str, Dict[str, Any]]:
+        """Execuções ainda não finalizadas"""
+        return {k: v for k, v in self.execucoes.items() if v.get("status") not in STATUS_FINAIS}
+
+    async def listar(
+        self,
+        status: Optional[str] = None,
+        desde: Optional[str] = None,
+        limite: int = 50
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Execuções mais recentes primeiro
+
+        Args:
+            status: Filtra por status (iniciado, concluido, erro...)
+            desde: Data/hora ISO mínima de início
+            limite: Quantidade máxima
+        """
+        filtro: Dict[str, Any] = {}
+        if status:
+            filtro["status"] = status
+        if desde:
+            filtro["inicio"] = {"$gte": desde}
+
+        documentos: List[Dict[str, Any]] = []
+        if self.mongodb_ativo:
+            try:
+                if mongodb_manager.conectado or await mongodb_manager.conectar():
+                    cursor = mongodb_manager.database.execucoes_api.find(
+                        filtro, {"_id": 0, "execucao_id": 1, "dados": 1}
+                    ).sort("inicio", pymongo.DESCENDING).limit(limite)
+                    documentos = await cursor.to_list(length=limite)
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao listar execuções no MongoDB: {str(e)}")
+        else:
+            documentos = await self.banco_local.listar_execucoes_api(status=status, desde=desde, limite=limite)
+
+        execucoes = {d["execucao_id"]: d["dados"] for d in documentos}
+
+        # Estado em memória é mais recente que o persistido
+        for execucao_id, dados in self.execucoes.items():
+            if (not status or dados.get("status") == status) and (not desde or (dados.get("inicio") or "") >= desde):
+                execucoes[execucao_id] = dados
+
+        ordenadas = sorted(execucoes.items(), key=lambda item: item[1].get("inicio") or "", reverse=True)
+        return dict(ordenadas[:limite])
+
+    async def remover(self, execucao_id: Optional[str] = None) -> int:
+        """Remove uma execução (ou todas, sem execucao_id) da memória e do armazenamento"""
+        filtro = {"execucao_id": execucao_id} if execucao_id else {}
+        removidas = 0
+
+        if self.mongodb_ativo:
+            try:
+                if mongodb_manager.conectado or await mongodb_manager.conectar():
+                    removidas = (await mongodb_manager.database.execucoes_api.delete_many(filtro)).deleted_count
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao remover execuções no MongoDB: {str(e)}")
+
+        removidas = max(removidas, await self.banco_local.remover_execucoes_api(execucao_id))
+
+        if execucao_id:
+            em_memoria = [execucao_id] if execucao_id in self.execucoes else []
+        else:
+            em_memoria = list(self.execucoes)
+        for chave in em_memoria:
+            self.execucoes.pop(chave, None)
+            self._publicados.pop(chave, None)
+
+        return max(removidas, len(em_memoria))
+
+    async def recuperar_interrompidas(self) -> int:
+        """
+        Na subida da API: execuções que estavam em andamento morreram com os workers
+
+        Returns:
+            Quantidade de execuções marcadas com erro
+        """
+        interrompidas = [
+            (execucao_id, dados)
+            for execucao_id, dados in (await self.listar(limite=500)).items()
+            if dados.get("status") not in STATUS_FINAIS and execucao_id not in self.execucoes
+        ]
+        for execucao_id, dados in interrompidas:
+            self.execucoes[execucao_id] = dados
+            self.atualizar(execucao_id, {
+                "status": "erro",
+                "erro": "API reiniciada durante a execução",
+                "fim": datetime.now().isoformat()
+            })
+        if interrompidas:
+            logger.warning(f"⚠️ {len(interrompidas)} execução(ões) interrompida(s) pelo reinício marcadas com erro")
+        return len(interrompidas)
+
+    # ------------------------------------------------------------------
+    # Eventos
+    # ------------------------------------------------------------------
+
+    def assinar(self, execucao_id: Optional[str] = None) -> asyncio.Queue:
+        """Fila de eventos de uma execução (ou de todas, sem execucao_id)"""
+        fila: asyncio.Queue = asyncio.Queue(maxsize=TAMANHO_FILA_ASSINANTE)
+        self._assinantes.append((execucao_id, fila))
+        return fila
+
+    def cancelar_assinatura(self, fila: asyncio.Queue):
+        self._assinantes = [(e, f) for e, f in self._assinantes if f is not fila]
+
+    def _publicar_mudancas(self, execucao_id: str):
+        atual = self.execucoes.get(execucao_id) or {}
+        anterior = self._publicados.get(execucao_id, {})
+        eventos = []
+
+        if atual.get("status") != anterior.get("status"):
+            eventos.append(("status", {"status": atual.get("status"), "erro": atual.get("erro"),
+                                       "mensagem": atual.get("mensagem")}))
+        if atual.get("etapa_atual") != anterior.get("etapa_atual"):
+            eventos.append(("etapa", {"etapa_atual": atual.get("etapa_atual"),
+                                      "etapas_concluidas": list(atual.get("etapas_concluidas") or [])}))
+        if atual.get("progresso_contratos") != anterior.get("progresso_contratos"):
+            eventos.append(("contrato", dict(atual.get("progresso_contratos") or {})))
+
+        if not eventos:
+            return
+
+        self._publicados[execucao_id] = _serializavel({
+            "status": atual.get("status"),
+            "etapa_atual": atual.get("etapa_atual"),
+            "progresso_contratos": atual.get("progresso_contratos")
+        })
+
+        timestamp = datetime.now().isoformat()
+        for tipo, dados in eventos:
+            evento = _serializavel({"evento": tipo, "execucao_id": execucao_id, "dados": dados, "timestamp": timestamp})
+            for filtro, fila in self._assinantes:
+                if filtro and filtro != execucao_id:
+                    continue
+                if fila.full():
+                    fila.get_nowait()
+                fila.put_nowait(evento)
+
+
+# Instância global
+armazenamento_execucoes = ArmazenamentoExecucoes()
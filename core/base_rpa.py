@@ -11,6 +11,8 @@ import json
 import traceback
 import logging
 
+from core.recursos_aquecidos import recursos_ativos
+
 # Import para type hints
 if TYPE_CHECKING:
     from core.browser_manager import RPABrowser
@@ -41,6 +43,8 @@ def get_logger(nome: str) -> logging.Logger:
 # Importações para persistência
 try:
     from core.mongodb_manager import mongodb_manager
+    from core.escritor_lote import escritor_lote
+    from core.rollups_execucoes import rollups_execucoes
     MONGODB_DISPONIVEL = True
 except ImportError:
     MONGODB_DISPONIVEL = False
@@ -129,9 +133,15 @@ class BaseRPA(ABC):
             # Inicializa browser se necessário
             if self.usar_browser:
                 try:
-                    from core.browser_manager import RPABrowser
-                    self.browser = RPABrowser(headless=False)
-                    self.logger.info("✅ Browser Selenium inicializado")
+                    recursos = recursos_ativos()
+                    if recursos:
+                        # Daemon RPA: Firefox já aberto, emprestado do pool
+                        self.browser = recursos.emprestar_browser()
+                        self.logger.info("✅ Browser Selenium emprestado do pool aquecido")
+                    else:
+                        from core.browser_manager import RPABrowser
+                        self.browser = RPABrowser(headless=False)
+                        self.logger.info("✅ Browser Selenium inicializado")
                 except ImportError:
                     self.logger.warning("⚠️ Browser não disponível")
                     self.browser = None
@@ -149,13 +159,20 @@ class BaseRPA(ABC):
         try:
             self.logger.info("🧹 Finalizando recursos do RPA...")
 
-            # Fecha browser
-            if self.browser:
-                self.browser.close()
-                self.logger.info("✅ Browser fechado")
+            recursos = recursos_ativos()
 
-            # Desconecta MongoDB
-            if self.mongo_manager:
+            # Fecha browser (ou devolve ao pool do daemon)
+            if self.browser:
+                if recursos:
+                    recursos.devolver_browser(self.browser)
+                    self.logger.info("✅ Browser devolvido ao pool")
+                else:
+                    self.browser.close()
+                    self.logger.info("✅ Browser fechado")
+                self.browser = None
+
+            # Desconecta MongoDB (no daemon a conexão permanece aberta)
+            if self.mongo_manager and not recursos:
                 if hasattr(self.mongo_manager, 'desconectar'):
                     await self.mongo_manager.desconectar()
                 elif hasattr(self.mongo_manager, 'disconnect'):
@@ -262,9 +279,6 @@ class BaseRPA(ABC):
             if not self.mongo_manager or not self.mongo_manager.conectado:
                 return
 
-            # Usa a estrutura correta do MongoDB Manager
-            collection = self.mongo_manager.database.execucoes_rpa
-
             documento = {
                 "nome_rpa": self.nome_rpa,
                 "timestamp_inicio": self.inicio_execucao,
@@ -277,8 +291,10 @@ class BaseRPA(ABC):
                 "erro": resultado.erro
             }
 
-            await collection.insert_one(documento)
-            self.logger.info("💾 Execução salva no MongoDB para auditoria")
+            # Gravação em lote (core/escritor_lote), descarregada no finalizar
+            await escritor_lote.inserir("execucoes_rpa", documento)
+            await rollups_execucoes.registrar_execucao(documento)
+            self.logger.info("💾 Execução enviada ao MongoDB para auditoria")
 
         except Exception as e:
             self.logger.error(f"⚠️ Erro ao salvar execução: {str(e)}")
@@ -0,0 +1,202 @@
+"""
+Credenciais Google - Cache de credenciais, tokens e clientes por processo
+Compartilhado por Google Sheets/Drive (gspread) e Gmail (notificações)
+
+Desenvolvido em Português Brasileiro
+
+Antes cada RPA lia o arquivo da conta de serviço e autorizava um gspread
+novo, e cada NotificadorEmail montava o serviço do Gmail (com download do
+documento de discovery). Aqui:
+- O arquivo da conta de serviço é lido uma vez por processo
+- Cada identidade (arquivo + escopos + usuário delegado) tem um único objeto
+  de credenciais: o access token é reaproveitado até expirar e renovado
+  sob demanda pelo google-auth
+- Sheets e Drive usam a mesma AuthorizedSession (mesma identidade/escopos),
+  com pool de conexões HTTP compartilhado por todos os clientes gspread
+- O documento de discovery do Gmail fica em dados_processamento/cache_google/
+  e o serviço é construído a partir dele, sem rede
+
+O Gmail usa outra identidade (escopo gmail.send, delegado ao remetente) e o
+transporte httplib2 do googleapiclient, então tem credenciais próprias no
+mesmo cache em vez de dividir a sessão do Sheets.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from google.oauth2.service_account import Credentials
+    from google.auth.transport.requests import AuthorizedSession
+    GOOGLE_AUTH_DISPONIVEL = True
+except ImportError:
+    GOOGLE_AUTH_DISPONIVEL = False
+
+ESCOPOS_SHEETS = (
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+)
+ESCOPOS_GMAIL = ("https://www.googleapis.com/auth/gmail.send",)
+
+URL_DISCOVERY = "https://{api}.googleapis.com/$discovery/rest?version={versao}"
+
+
+class CacheCredenciaisGoogle:
+    """
+    Credenciais, sessões HTTP e clientes Google reaproveitados no processo
+    """
+
+    def __init__(self, pasta_discovery: str = "dados_processamento/cache_google"):
+        self.pasta_discovery = pasta_discovery
+        self._trava = threading.RLock()
+        self._informacoes_conta: Dict[str, Dict[str, Any]] = {}
+        self._credenciais: Dict[Tuple, Any] = {}
+        self._sessoes: Dict[Tuple, Any] = {}
+        self._clientes_sheets: Dict[str, Any] = {}
+        self._servicos: Dict[Tuple, Any] = {}
+
+    def _verificar_disponivel(self):
+        if not GOOGLE_AUTH_DISPONIVEL:
+            raise ImportError("google-auth não disponível. Instale: pip install google-auth")
+
+    # ------------------------------------------------------------------
+    # Credenciais e sessão
+    # ------------------------------------------------------------------
+
+    def credenciais(self, caminho: str, escopos: Sequence[str], sujeito: Optional[str] = None):
+        """
+        Credenciais da conta de serviço para a identidade pedida (uma por processo)
+
+        Args:
+            caminho: Arquivo JSON da conta de serviço
+            escopos: Escopos OAuth
+            sujeito: Usuário a personificar (delegação de domínio), se houver
+        """
+        self._verificar_disponivel()
+        caminho = os.path.realpath(caminho)
+        chave = (caminho, tuple(sorted(escopos)), sujeito)
+
+        with self._trava:
+            credenciais = self._credenciais.get(chave)
+            if credenciais is None:
+                informacoes = self._informacoes_conta.get(caminho)
+                if informacoes is None:
+                    with open(caminho, encoding="utf-8") as f:
+                        informacoes = json.load(f)
+                    self._informacoes_conta[caminho] = informacoes
+
+                credenciais = Credentials.from_service_account_info(informacoes, scopes=list(escopos))
+                if sujeito:
+                    credenciais = credenciais.with_subject(sujeito)
+                self._credenciais[chave] = credenciais
+            return credenciais
+
+    def sessao(self, caminho: str, escopos: Sequence[str] = ESCOPOS_SHEETS, sujeito: Optional[str] = None):
+        """AuthorizedSession (requests) única para a identidade"""
+        credenciais = self.credenciais(caminho, escopos, sujeito)
+        chave = (os.path.realpath(caminho), tuple(sorted(escopos)), sujeito)
+
+        with self._trava:
+            sessao = self._sessoes.get(chave)
+            if sessao is None:
+                sessao = AuthorizedSession(credenciais)
+                self._sessoes[chave] = sessao
+            return sessao
+
+    # ------------------------------------------------------------------
+    # Clientes
+    # ------------------------------------------------------------------
+
+    def cliente_sheets(self, caminho: str):
+        """Cliente gspread (Sheets + Drive) sobre a sessão compartilhada"""
+        caminho = os.path.realpath(caminho)
+
+        with self._trava:
+            cliente = self._clientes_sheets.get(caminho)
+            if cliente is None:
+                import gspread
+
+                credenciais = self.credenciais(caminho, ESCOPOS_SHEETS)
+                sessao = self.sessao(caminho, ESCOPOS_SHEETS)
+                cliente = gspread.Client(auth=credenciais, session=sessao)
+                self._clientes_sheets[caminho] = cliente
+                logger.info(f"📗 Cliente Google Sheets criado: {caminho}")
+            return cliente
+
+    def _documento_discovery(self, api: str, versao: str) -> str:
+        """Documento de discovery: cache local, o embutido no googleapiclient ou download"""
+        arquivo = os.path.join(self.pasta_discovery, f"{api}_{versao}.json")
+        if os.path.exists(arquivo):
+            with open(arquivo, encoding="utf-8") as f:
+                return f.read()
+
+        documento = None
+        try:
+            from googleapiclient.discovery_cache import get_static_doc
+            documento = get_static_doc(api, versao)
+        except ImportError:
+            pass
+
+        if not documento:
+            import requests
+            resposta = requests.get(URL_DISCOVERY.format(api=api, versao=versao), timeout=30)
+            resposta.raise_for_status()
+            documento = resposta.text
+
+        os.makedirs(self.pasta_discovery, exist_ok=True)
+        temporario = f"{arquivo}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(documento)
+        os.replace(temporario, arquivo)
+        logger.info(f"📦 Discovery {api} {versao} salvo em {arquivo}")
+        return documento
+
+    def servico_gmail(self, caminho: str, remetente: str):
+        """Serviço Gmail delegado ao remetente (construído uma vez por identidade)"""
+        chave = ("gmail", os.path.realpath(caminho), remetente)
+
+        with self._trava:
+            servico = self._servicos.get(chave)
+            if servico is None:
+                from googleapiclient.discovery import build_from_document
+
+                credenciais = self.credenciais(caminho, ESCOPOS_GMAIL, sujeito=remetente)
+                servico = build_from_document(self._documento_discovery("gmail", "v1"), credentials=credenciais)
+                self._servicos[chave] = servico
+            return servico
+
+    # ------------------------------------------------------------------
+    # Manutenção
+    # ------------------------------------------------------------------
+
+    def limpar(self):
+        """Descarta tudo (arquivo de credenciais trocado, reciclagem do daemon)"""
+        with self._trava:
+            for sessao in self._sessoes.values():
+                try:
+                    sessao.close()
+                except Exception:
+                    pass
+            self._informacoes_conta.clear()
+            self._credenciais.clear()
+            self._sessoes.clear()
+            self._clientes_sheets.clear()
+            self._servicos.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._trava:
+            return {
+                "identidades": len(self._credenciais),
+                "tokens_validos": sum(1 for c in self._credenciais.values() if getattr(c, "valid", False)),
+                "sessoes": len(self._sessoes),
+                "clientes_sheets": len(self._clientes_sheets),
+                "servicos": len(self._servicos)
+            }
+
+
+# Instância global
+cache_credenciais_google = CacheCredenciaisGoogle()
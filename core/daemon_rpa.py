@@ -0,0 +1,488 @@
+"""
+Daemon RPA - Worker residente com recursos aquecidos
+Recebe jobs por socket local e executa sem partida a frio
+
+Desenvolvido em Português Brasileiro
+
+Cada execução a frio abre um Firefox, autoriza o gspread, conecta ao
+MongoDB e monta o serviço do Gmail antes de fazer qualquer trabalho útil.
+O daemon mantém esses recursos abertos (core/recursos_aquecidos) e executa
+os jobs do agendador, da API e da linha de comando.
+
+Protocolo (127.0.0.1:RPA_DAEMON_PORTA, uma linha JSON por mensagem):
+    {"acao": "executar", "job": "coleta_indices", "parametros": {...}}
+    {"acao": "saude"} | {"acao": "reciclar"} | {"acao": "encerrar"}
+
+Até RPA_DAEMON_VAGAS jobs rodam ao mesmo tempo em uma thread própria com
+event loop persistente (o cliente Motor do MongoDB fica preso ao loop em que
+foi criado), cada um com seu browser do pool. O padrão de vagas acompanha a
+concorrência configurada (RPA_WORKERS x RPA_CONCORRENCIA_SIENGE), para que o
+fan-out do Sienge e o pool de workers não fiquem enfileirados atrás de um
+único browser. O loop do servidor só atende o socket, então "saude" responde
+mesmo com jobs em andamento.
+
+Ao ganhar uma vaga o daemon responde {"evento": "iniciado"}; o timeout do
+cliente (RPA_TIMEOUT_JOB_SEGUNDOS) conta a partir daí, sem o tempo de fila.
+
+O socket abre antes do aquecimento (MongoDB fora do ar leva o timeout de
+conexão inteiro): enquanto aquece, "saude" responde com status "aquecendo"
+e os jobs recebidos esperam na fila.
+
+Reciclagem sem interromper jobs: após RPA_DAEMON_RECICLAR_APOS_JOBS jobs ou
+RPA_DAEMON_RECICLAR_APOS_HORAS horas, o daemon para de liberar vagas, espera
+os jobs em andamento e renova os recursos. SIGTERM/"encerrar" param de
+aceitar jobs, esperam os em andamento terminarem e fecham os recursos.
+
+Uso:
+    python -m core.daemon_rpa iniciar
+    python -m core.daemon_rpa saude | reciclar | encerrar
+    python -m core.daemon_rpa executar coleta_indices '{"planilha_id": "..."}'
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import os
+import signal
+import sys
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from core.recursos_aquecidos import RecursosAquecidos, ativar_recursos, recursos_ativos
+
+logger = logging.getLogger(__name__)
+
+HOST_DAEMON = "127.0.0.1"
+PORTA_PADRAO = 8765
+RECICLAR_APOS_JOBS_PADRAO = 50
+RECICLAR_APOS_HORAS_PADRAO = 6
+TIMEOUT_JOB_PADRAO = 4 * 3600
+LIMITE_MENSAGEM = 64 * 1024 * 1024
+EVENTO_INICIADO = {"evento": "iniciado"}
+
+# Jobs aceitos pelo daemon: nome -> "modulo:funcao" (corrotina que retorna ResultadoRPA)
+JOBS_RPA = {
+    "coleta_indices": "rpa_coleta_indices.rpa_coleta_indices:executar_coleta_indices",
+    "analise_planilhas": "rpa_analise_planilhas.rpa_analise_planilhas:executar_analise_planilhas",
+    "processamento_sienge": "rpa_sienge.rpa_sienge:executar_processamento_sienge",
+    "geracao_carnes_lote": "rpa_sienge.rpa_sienge:executar_geracao_carnes_lote",
+    "processamento_sicredi": "rpa_sicredi.rpa_sicredi:executar_processamento_sicredi",
+    "processamento_sicredi_lote": "rpa_sicredi.rpa_sicredi:executar_processamento_sicredi_lote",
+}
+
+
+def _porta_daemon() -> int:
+    return int(os.getenv("RPA_DAEMON_PORTA", PORTA_PADRAO))
+
+
+def _vagas_padrao() -> int:
+    """Vagas suficientes para o pool de workers x fan-out do Sienge"""
+    from core.executor_jobs import TAMANHO_POOL_PADRAO
+    from workflows.execucao_paralela import CONCORRENCIA_PADRAO
+
+    workers = max(1, int(os.getenv("RPA_WORKERS", TAMANHO_POOL_PADRAO)))
+    return workers * max(1, int(os.getenv("RPA_CONCORRENCIA_SIENGE", CONCORRENCIA_PADRAO)))
+
+
+def _resolver_job(job: str):
+    if job not in JOBS_RPA:
+        raise ValueError(f"Job desconhecido: {job}")
+    nome_modulo, nome_funcao = JOBS_RPA[job].split(":", 1)
+    return getattr(importlib.import_module(nome_modulo), nome_funcao)
+
+
+def _resultado_para_dict(resultado) -> Dict[str, Any]:
+    if hasattr(resultado, "para_dict"):
+        return json.loads(json.dumps(resultado.para_dict(), ensure_ascii=False, default=str))
+    return {"sucesso": False, "mensagem": "Job não retornou ResultadoRPA", "erro": repr(resultado)}
+
+
+class DaemonRPA:
+    """
+    Servidor local que executa jobs RPA com recursos aquecidos
+    """
+
+    def __init__(
+        self,
+        porta: Optional[int] = None,
+        reciclar_apos_jobs: Optional[int] = None,
+        reciclar_apos_horas: Optional[float] = None,
+        recursos: Optional[RecursosAquecidos] = None,
+        vagas: Optional[int] = None
+    ):
+        self.porta = _porta_daemon() if porta is None else porta
+        self.vagas = max(1, int(os.getenv("RPA_DAEMON_VAGAS") or 0) or _vagas_padrao()) if vagas is None else max(1, vagas)
+        self.reciclar_apos_jobs = int(os.getenv("RPA_DAEMON_RECICLAR_APOS_JOBS", RECICLAR_APOS_JOBS_PADRAO)) \
+            if reciclar_apos_jobs is None else reciclar_apos_jobs
+        self.reciclar_apos_horas = float(os.getenv("RPA_DAEMON_RECICLAR_APOS_HORAS", RECICLAR_APOS_HORAS_PADRAO)) \
+            if reciclar_apos_horas is None else reciclar_apos_horas
+        self.recursos = recursos or RecursosAquecidos(
+            max_browsers_ociosos=int(os.getenv("RPA_DAEMON_BROWSERS") or self.vagas),
+            headless=os.getenv("RPA_DAEMON_HEADLESS", "false").lower() == "true"
+        )
+
+        self.iniciado_em = datetime.now()
+        self.jobs_executados = 0
+        self.jobs_com_erro = 0
+        self.jobs_desde_reciclagem = 0
+        self.jobs_atuais: Dict[int, Dict[str, Any]] = {}
+        self.jobs_na_fila = 0
+        self.aquecendo = False
+        self.encerrando = False
+
+        self._loop_jobs: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_jobs: Optional[threading.Thread] = None
+        self._ids_jobs = itertools.count(1)
+        self._vagas_jobs: Optional[asyncio.Semaphore] = None
+        self._trava_exclusiva: Optional[asyncio.Lock] = None
+        self._parar: Optional[asyncio.Event] = None
+
+    # ------------------------------------------------------------------
+    # Thread de jobs (loop persistente)
+    # ------------------------------------------------------------------
+
+    def _iniciar_thread_jobs(self):
+        pronto = threading.Event()
+
+        def rodar():
+            self._loop_jobs = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop_jobs)
+            self._vagas_jobs = asyncio.Semaphore(self.vagas)
+            self._trava_exclusiva = asyncio.Lock()
+            pronto.set()
+            self._loop_jobs.run_forever()
+            self._loop_jobs.close()
+
+        self._thread_jobs = threading.Thread(target=rodar, name="daemon-rpa-jobs", daemon=True)
+        self._thread_jobs.start()
+        pronto.wait()
+
+    async def _no_loop_jobs(self, corrotina):
+        """Executa a corrotina no loop de jobs e aguarda sem bloquear o servidor"""
+        futuro = asyncio.run_coroutine_threadsafe(corrotina, self._loop_jobs)
+        return await asyncio.wrap_future(futuro)
+
+    def _precisa_reciclar(self) -> bool:
+        if self.reciclar_apos_jobs > 0 and self.jobs_desde_reciclagem >= self.reciclar_apos_jobs:
+            return True
+        idade_horas = self.recursos.saude()["idade_segundos"] / 3600
+        return self.reciclar_apos_horas > 0 and idade_horas >= self.reciclar_apos_horas
+
+    @asynccontextmanager
+    async def _exclusivo(self):
+        """Ocupa todas as vagas: espera os jobs em andamento e segura os novos"""
+        async with self._trava_exclusiva:
+            ocupadas = 0
+            try:
+                for _ in range(self.vagas):
+                    await self._vagas_jobs.acquire()
+                    ocupadas += 1
+                yield
+            finally:
+                for _ in range(ocupadas):
+                    self._vagas_jobs.release()
+
+    async def _aquecer(self):
+        """Aquecimento inicial com todas as vagas ocupadas (jobs esperam na fila)"""
+        try:
+            async with self._exclusivo():
+                await self.recursos.aquecer()
+        except Exception as e:
+            logger.warning(f"⚠️ Falha no aquecimento: {str(e)} - jobs seguem sem recursos aquecidos")
+        finally:
+            self.aquecendo = False
+            logger.info("✅ Recursos aquecidos - daemon pronto")
+
+    async def _reciclar(self):
+        self.recursos.reciclar()
+        self.jobs_desde_reciclagem = 0
+        await self.recursos.aquecer()
+
+    async def _executar_job(self, job: str, parametros: Dict[str, Any], ao_iniciar=None) -> Dict[str, Any]:
+        """Roda no loop de jobs: até self.vagas jobs ao mesmo tempo"""
+        if self._precisa_reciclar():
+            async with self._exclusivo():
+                # Outro job pode ter reciclado enquanto este esperava
+                if self._precisa_reciclar():
+                    await self._reciclar()
+
+        async with self._vagas_jobs:
+            self.jobs_na_fila -= 1
+            id_job = next(self._ids_jobs)
+            self.jobs_atuais[id_job] = {"job": job, "inicio": datetime.now().isoformat()}
+            if ao_iniciar:
+                ao_iniciar()
+            logger.info(f"🔥 Executando job aquecido: {job} ({len(self.jobs_atuais)}/{self.vagas} vagas)")
+            try:
+                funcao = _resolver_job(job)
+                resultado = _resultado_para_dict(await funcao(**parametros))
+            except Exception as e:
+                logger.error(f"❌ Erro no job {job}: {str(e)}")
+                resultado = {"sucesso": False, "mensagem": f"Erro no job {job}", "erro": str(e)}
+            finally:
+                self.jobs_atuais.pop(id_job, None)
+                self.jobs_executados += 1
+                self.jobs_desde_reciclagem += 1
+
+            if not resultado.get("sucesso"):
+                self.jobs_com_erro += 1
+            return resultado
+
+    # ------------------------------------------------------------------
+    # Servidor
+    # ------------------------------------------------------------------
+
+    def saude(self) -> Dict[str, Any]:
+        if self.encerrando:
+            status = "encerrando"
+        elif self.aquecendo:
+            status = "aquecendo"
+        else:
+            status = "ocupado" if self.jobs_atuais else "ocioso"
+        return {
+            "status": status,
+            "pid": os.getpid(),
+            "iniciado_em": self.iniciado_em.isoformat(),
+            "jobs_executados": self.jobs_executados,
+            "jobs_com_erro": self.jobs_com_erro,
+            "jobs_na_fila": self.jobs_na_fila,
+            "vagas": self.vagas,
+            "jobs_atuais": list(self.jobs_atuais.values()),
+            "thread_jobs_viva": bool(self._thread_jobs and self._thread_jobs.is_alive()),
+            "recursos": self.recursos.saude()
+        }
+
+    async def _atender(self, mensagem: Dict[str, Any], ao_iniciar=None) -> Dict[str, Any]:
+        acao = mensagem.get("acao")
+
+        if acao == "saude":
+            return {"sucesso": True, "dados": self.saude()}
+
+        if acao == "reciclar":
+            # Espera os jobs em andamento terminarem
+            async def reciclar():
+                async with self._exclusivo():
+                    await self._reciclar()
+            await self._no_loop_jobs(reciclar())
+            return {"sucesso": True, "mensagem": "Recursos reciclados"}
+
+        if acao == "encerrar":
+            self._parar.set()
+            return {"sucesso": True, "mensagem": "Daemon encerrando após os jobs em andamento"}
+
+        if acao == "executar":
+            if self.encerrando:
+                return {"sucesso": False, "mensagem": "Daemon encerrando", "erro": "encerrando"}
+            job = mensagem.get("job")
+            if job not in JOBS_RPA:
+                return {"sucesso": False, "mensagem": f"Job desconhecido: {job}", "erro": "job_desconhecido"}
+            self.jobs_na_fila += 1
+            return await self._no_loop_jobs(
+                self._executar_job(job, mensagem.get("parametros") or {}, ao_iniciar=ao_iniciar)
+            )
+
+        return {"sucesso": False, "mensagem": f"Ação desconhecida: {acao}", "erro": "acao_desconhecida"}
+
+    async def _conexao(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        try:
+            linha = await leitor.readline()
+            loop = asyncio.get_running_loop()
+
+            def ao_iniciar():
+                # Chamado no loop de jobs; a escrita acontece no loop do servidor
+                linha_evento = (json.dumps(EVENTO_INICIADO) + "\n").encode("utf-8")
+                loop.call_soon_threadsafe(escritor.write, linha_evento)
+
+            try:
+                resposta = await self._atender(json.loads(linha), ao_iniciar=ao_iniciar)
+            except json.JSONDecodeError:
+                resposta = {"sucesso": False, "mensagem": "Mensagem inválida", "erro": "json_invalido"}
+            escritor.write((json.dumps(resposta, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+            await escritor.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # Cliente desistiu; o job (se houver) termina normalmente
+            pass
+        finally:
+            escritor.close()
+
+    async def iniciar(self):
+        """Abre o socket, aquece os recursos em segundo plano e atende até SIGTERM/SIGINT ou "encerrar" """
+        self._parar = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sinal in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sinal, self._parar.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        self._iniciar_thread_jobs()
+        ativar_recursos(self.recursos)
+
+        servidor = await asyncio.start_server(self._conexao, HOST_DAEMON, self.porta, limit=LIMITE_MENSAGEM)
+        logger.info(f"🔥 Daemon RPA ouvindo em {HOST_DAEMON}:{self.porta} (pid {os.getpid()}) - aquecendo recursos")
+
+        # Agendado antes de qualquer job: ocupa as vagas primeiro
+        self.aquecendo = True
+        asyncio.run_coroutine_threadsafe(self._aquecer(), self._loop_jobs)
+
+        async with servidor:
+            await self._parar.wait()
+            self.encerrando = True
+            servidor.close()
+            logger.info("🛑 Encerrando daemon RPA - aguardando jobs em andamento")
+
+            async def finalizar():
+                async with self._exclusivo():
+                    self.recursos.encerrar()
+                    # Grava o buffer de auditoria e fecha a conexão mantida aberta
+                    try:
+                        from core.mongodb_manager import mongodb_manager
+                        await mongodb_manager.desconectar()
+                    except ImportError:
+                        pass
+            await self._no_loop_jobs(finalizar())
+
+        ativar_recursos(None)
+        self._loop_jobs.call_soon_threadsafe(self._loop_jobs.stop)
+        self._thread_jobs.join(timeout=10)
+        logger.info("✅ Daemon RPA encerrado")
+
+
+# ============================================================================
+# CLIENTE
+# ============================================================================
+
+class DaemonIndisponivel(Exception):
+    """Nenhum daemon ouvindo na porta configurada"""
+
+
+class ClienteDaemonRPA:
+    """
+    Cliente do daemon (uma conexão por mensagem)
+    """
+
+    def __init__(self, porta: Optional[int] = None, timeout: Optional[float] = None):
+        self.porta = _porta_daemon() if porta is None else porta
+        self.timeout = float(os.getenv("RPA_TIMEOUT_JOB_SEGUNDOS", TIMEOUT_JOB_PADRAO)) if timeout is None else timeout
+
+    async def enviar(self, mensagem: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            leitor, escritor = await asyncio.wait_for(
+                asyncio.open_connection(HOST_DAEMON, self.porta, limit=LIMITE_MENSAGEM), timeout=5
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise DaemonIndisponivel(f"Daemon RPA indisponível em {HOST_DAEMON}:{self.porta}: {str(e)}")
+
+        try:
+            escritor.write((json.dumps(mensagem, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+            await escritor.drain()
+            while True:
+                # Espera por vaga e execução têm cada uma o seu prazo
+                linha = await asyncio.wait_for(leitor.readline(), timeout=self.timeout)
+                if not linha:
+                    raise ConnectionError("Daemon fechou a conexão sem responder")
+                resposta = json.loads(linha)
+                if resposta != EVENTO_INICIADO:
+                    return resposta
+        finally:
+            escritor.close()
+
+    async def saude(self) -> Dict[str, Any]:
+        return await self.enviar({"acao": "saude"})
+
+    async def reciclar(self) -> Dict[str, Any]:
+        return await self.enviar({"acao": "reciclar"})
+
+    async def encerrar(self) -> Dict[str, Any]:
+        return await self.enviar({"acao": "encerrar"})
+
+    async def executar(self, job: str, **parametros) -> Dict[str, Any]:
+        return await self.enviar({"acao": "executar", "job": job, "parametros": parametros})
+
+
+async def executar_rpa(job: str, **parametros):
+    """
+    Executa o job no daemon aquecido; sem daemon, executa a frio neste processo
+
+    Só cai para a execução local quando não há daemon ouvindo. Se o daemon
+    aceitou o job, o resultado dele é o resultado (sem reexecutar: Sienge e
+    Sicredi não são idempotentes).
+
+    Returns:
+        ResultadoRPA
+    """
+    from core.base_rpa import ResultadoRPA
+
+    usar_daemon = os.getenv("RPA_DAEMON_HABILITADO", "true").lower() == "true"
+    # Dentro do próprio daemon (job chamando job) executa direto
+    if usar_daemon and recursos_ativos() is None:
+        try:
+            dados = await ClienteDaemonRPA().executar(job, **parametros)
+            resultado = ResultadoRPA(
+                sucesso=bool(dados.get("sucesso")),
+                mensagem=dados.get("mensagem", ""),
+                dados=dados.get("dados"),
+                erro=dados.get("erro"),
+                tempo_execucao=dados.get("tempo_execucao")
+            )
+            if dados.get("timestamp"):
+                resultado.timestamp = datetime.fromisoformat(dados["timestamp"])
+            return resultado
+        except DaemonIndisponivel:
+            logger.debug(f"Daemon RPA indisponível - executando {job} a frio")
+        except (ConnectionError, asyncio.TimeoutError, json.JSONDecodeError) as e:
+            return ResultadoRPA(
+                sucesso=False,
+                mensagem=f"Falha de comunicação com o daemon RPA no job {job}",
+                erro=str(e)
+            )
+
+    return await _resolver_job(job)(**parametros)
+
+
+# ============================================================================
+# LINHA DE COMANDO
+# ============================================================================
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    comando = sys.argv[1].lower() if len(sys.argv) > 1 else ""
+    cliente = ClienteDaemonRPA()
+
+    try:
+        if comando == "iniciar":
+            asyncio.run(DaemonRPA().iniciar())
+
+        elif comando in ("saude", "reciclar", "encerrar"):
+            resposta = asyncio.run(getattr(cliente, comando)())
+            print(json.dumps(resposta, indent=2, ensure_ascii=False))
+
+        elif comando == "executar" and len(sys.argv) > 2:
+            parametros = json.loads(sys.argv[3]) if len(sys.argv) > 3 else {}
+            inicio = time.monotonic()
+            resultado = asyncio.run(executar_rpa(sys.argv[2], **parametros))
+            print(f"{resultado} ({time.monotonic() - inicio:.1f}s)")
+            sys.exit(0 if resultado.sucesso else 1)
+
+        else:
+            print("🔧 Uso:")
+            print("  python -m core.daemon_rpa iniciar                    # Inicia o daemon")
+            print("  python -m core.daemon_rpa saude                      # Estado do daemon")
+            print("  python -m core.daemon_rpa reciclar                   # Renova browsers/clientes")
+            print("  python -m core.daemon_rpa encerrar                   # Encerra após os jobs em andamento")
+            print("  python -m core.daemon_rpa executar <job> '<json>'    # Executa um job")
+            print(f"  Jobs: {', '.join(JOBS_RPA)}")
+
+    except DaemonIndisponivel as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
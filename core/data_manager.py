@@ -19,6 +19,9 @@ try:
 except ImportError:
     MONGODB_DISPONIVEL = False
 
+from core.historico_jsonl import HistoricoJSONL, historico_execucoes
+from core.sqlite_manager import sqlite_manager
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,8 +33,10 @@ class DataManagerHibrido:
 
     def __init__(self):
         self.pasta_logs = "logs"
-        self.arquivo_historico = os.path.join(self.pasta_logs,
-                                              "historico_execucoes.json")
+        self.historico = historico_execucoes
+        self.historico_indices = HistoricoJSONL(
+            os.path.join(self.pasta_logs, "indices_economicos.jsonl"),
+            arquivo_legado=os.path.join(self.pasta_logs, "indices_economicos.json"))
         self.mongodb_ativo = False
         self._garantir_pasta_logs()
 
@@ -69,6 +74,7 @@ class DataManagerHibrido:
         }
 
         sucesso_mongodb = False
+        sucesso_sqlite = False
         sucesso_json = False
 
         # Tentar MongoDB primeiro (se disponível)
@@ -81,6 +87,11 @@ class DataManagerHibrido:
             except Exception as e:
                 logger.warning(f"⚠️ [{nome_rpa}] Falha MongoDB: {str(e)}")
 
+        # Sem MongoDB: banco local SQLite (consultável, com índices)
+        if not sucesso_mongodb:
+            sucesso_sqlite = await sqlite_manager.salvar_execucao_rpa(
+                nome_rpa, parametros, resultado) is not None
+
         # Sempre salvar em JSON (fallback garantido)
         try:
             await self._salvar_json(dados_execucao)
@@ -89,28 +100,12 @@ class DataManagerHibrido:
         except Exception as e:
             logger.error(f"❌ [{nome_rpa}] Falha JSON: {str(e)}")
 
-        return sucesso_mongodb or sucesso_json
+        return sucesso_mongodb or sucesso_sqlite or sucesso_json
 
     async def _salvar_json(self, dados_execucao: Dict[str, Any]):
-        """Salva dados em arquivo JSON"""
+        """Acrescenta a execução ao histórico JSONL (sem reler o arquivo)"""
         try:
-            # Carregar histórico existente
-            historico = []
-            if os.path.exists(self.arquivo_historico):
-                with open(self.arquivo_historico, 'r', encoding='utf-8') as f:
-                    historico = json.load(f)
-
-            # Adicionar nova execução
-            historico.append(dados_execucao)
-
-            # Manter apenas últimas 200 execuções
-            if len(historico) > 200:
-                historico = historico[-200:]
-
-            # Salvar arquivo
-            with open(self.arquivo_historico, 'w', encoding='utf-8') as f:
-                json.dump(historico, f, indent=2, ensure_ascii=False)
-
+            self.historico.anexar(dados_execucao)
         except Exception as e:
             raise Exception(f"Erro ao salvar JSON: {str(e)}")
 
@@ -127,6 +122,11 @@ class DataManagerHibrido:
             except Exception as e:
                 logger.warning(f"⚠️ Falha ao ler MongoDB: {str(e)}")
 
+        # Banco local SQLite; JSON se ainda estiver vazio
+        execucoes = await sqlite_manager.obter_execucoes_recentes(limite)
+        if execucoes:
+            return execucoes
+
         # Fallback para JSON
         return await self._obter_execucoes_json(limite)
 
@@ -134,15 +134,8 @@ class DataManagerHibrido:
                                     limite: int = 30) -> List[Dict[str, Any]]:
         """Lê execuções do arquivo JSON"""
         try:
-            if not os.path.exists(self.arquivo_historico):
-                return []
-
-            with open(self.arquivo_historico, 'r', encoding='utf-8') as f:
-                historico = json.load(f)
-
-            # Retornar últimas execuções
-            return historico[-limite:] if len(
-                historico) > limite else historico
+            # Só as últimas linhas, via índice de offsets
+            return self.historico.ultimos(limite)
 
         except Exception as e:
             logger.error(f"❌ Erro ao ler JSON: {str(e)}")
@@ -158,6 +151,11 @@ class DataManagerHibrido:
             except Exception as e:
                 logger.warning(f"⚠️ Falha estatísticas MongoDB: {str(e)}")
 
+        estatisticas = await sqlite_manager.obter_estatisticas_dashboard()
+        if estatisticas.get("total_execucoes"):
+            estatisticas["fonte_dados"] = "SQLite"
+            return estatisticas
+
         # Calcular estatísticas do JSON
         return await self._calcular_estatisticas_json()
 
@@ -215,31 +213,16 @@ class DataManagerHibrido:
                 logger.warning(
                     f"⚠️ Falha ao salvar índices no MongoDB: {str(e)}")
 
+        # Sem MongoDB: banco local SQLite
+        if await sqlite_manager.salvar_indices_economicos(indices_data) is not None:
+            return True
+
         # Fallback: salvar em arquivo específico
         try:
-            arquivo_indices = os.path.join(self.pasta_logs,
-                                           "indices_economicos.json")
-
-            # Carregar histórico
-            historico_indices = []
-            if os.path.exists(arquivo_indices):
-                with open(arquivo_indices, 'r', encoding='utf-8') as f:
-                    historico_indices = json.load(f)
-
-            # Adicionar novos dados
-            entrada = {
+            self.historico_indices.anexar({
                 "timestamp": datetime.now().isoformat(),
                 "dados": indices_data
-            }
-            historico_indices.append(entrada)
-
-            # Manter últimas 50 entradas
-            if len(historico_indices) > 50:
-                historico_indices = historico_indices[-50:]
-
-            # Salvar
-            with open(arquivo_indices, 'w', encoding='utf-8') as f:
-                json.dump(historico_indices, f, indent=2, ensure_ascii=False)
+            })
 
             return True
 
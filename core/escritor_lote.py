@@ -0,0 +1,346 @@
+"""
+Escritor em Lote - Gravação assíncrona (write-behind) de registros de auditoria no MongoDB
+Agrupa inserts/upserts em bulk_write por tamanho ou tempo
+
+Desenvolvido em Português Brasileiro
+
+Execuções, índices e contratos processados eram gravados com um insert_one
+por evento - com workers Sienge em paralelo, uma ida ao MongoDB por contrato.
+Aqui os registros entram em um buffer e vão em um bulk_write por coleção
+quando o buffer atinge `tamanho_lote` ou a cada `intervalo` segundos.
+
+Sem MongoDB (fora do ar ou erro de rede), o lote vai para um spool local
+(dados_processamento/spool_mongodb.jsonl, Extended JSON) e é reenviado, na
+ordem, antes do próximo lote; enquanto o spool não esvazia, os lotes novos
+entram atrás dele (um upsert antigo não sobrescreve um mais novo). Os
+inserts recebem _id no cliente, então reenviar um lote que chegou a ser
+gravado não duplica nada (duplicate key é ignorado); upserts são
+idempotentes por natureza. Incrementos ($inc) não
+são: um lote reenviado após gravação parcial pode contar em dobro (os
+rollups do dashboard têm reconstrução para isso). Um upsert pode levar um
+incremento condicional (se_inserido), gravado logo em seguida só quando o
+bulk_write informa que o upsert criou o documento - reprocessar o mesmo
+filtro não conta de novo.
+
+Descarga no desligamento: MongoDBManager.desconectar() descarrega antes de
+fechar; se o processo sair com registros no buffer, eles vão para o spool.
+
+Configuração (.env):
+- RPA_LOTE_MONGODB_TAMANHO: registros por lote
+- RPA_LOTE_MONGODB_INTERVALO_SEGUNDOS: tempo máximo no buffer
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import time
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from bson import ObjectId, json_util
+    from pymongo import InsertOne, ReplaceOne, UpdateOne
+    from pymongo.errors import BulkWriteError
+    from core.mongodb_manager import mongodb_manager
+    MONGODB_DISPONIVEL = True
+except ImportError:
+    MONGODB_DISPONIVEL = False
+
+TAMANHO_LOTE_PADRAO = 100
+INTERVALO_PADRAO = 2.0
+# Com o MongoDB fora, não tenta reconectar a cada lote (conectar espera o timeout)
+ESPERA_RECONEXAO_SEGUNDOS = 30
+# Código de erro do MongoDB para chave duplicada (insert já gravado antes)
+CODIGO_CHAVE_DUPLICADA = 11000
+
+
+class EscritorLote:
+    """
+    Buffer de gravações no MongoDB com descarga em lote e spool local
+    """
+
+    def __init__(
+        self,
+        tamanho_lote: Optional[int] = None,
+        intervalo: Optional[float] = None,
+        arquivo_spool: str = "dados_processamento/spool_mongodb.jsonl"
+    ):
+        self.tamanho_lote = int(os.getenv("RPA_LOTE_MONGODB_TAMANHO", TAMANHO_LOTE_PADRAO)) \
+            if tamanho_lote is None else tamanho_lote
+        self.intervalo = float(os.getenv("RPA_LOTE_MONGODB_INTERVALO_SEGUNDOS", INTERVALO_PADRAO)) \
+            if intervalo is None else intervalo
+        self.arquivo_spool = arquivo_spool
+        self._pendentes: List[Dict[str, Any]] = []
+        self._tarefa: Optional[asyncio.Task] = None
+        self._proxima_conexao = 0.0
+        self._reenviando = False
+        self.gravados = 0
+        self.enviados_spool = 0
+        self.reenviados_spool = 0
+
+        atexit.register(self._salvar_pendentes_no_spool)
+
+    # ------------------------------------------------------------------
+    # Enfileiramento
+    # ------------------------------------------------------------------
+
+    async def inserir(self, colecao: str, documento: Dict[str, Any]) -> str:
+        """
+        Enfileira um insert
+
+        Returns:
+            _id do documento (atribuído já no enfileiramento)
+        """
+        documento = dict(documento)
+        documento.setdefault("_id", ObjectId())
+        await self._enfileirar({"colecao": colecao, "tipo": "inserir", "documento": documento})
+        return str(documento["_id"])
+
+    async def substituir(
+        self,
+        colecao: str,
+        filtro: Dict[str, Any],
+        documento: Dict[str, Any],
+        se_inserido: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Enfileira um replace_one com upsert
+
+        Args:
+            se_inserido: Incremento (colecao, filtro, incrementos, ao_inserir)
+                gravado só se o upsert criar o documento
+        """
+        operacao = {"colecao": colecao, "tipo": "substituir", "filtro": filtro, "documento": documento}
+        if se_inserido:
+            operacao["se_inserido"] = se_inserido
+        await self._enfileirar(operacao)
+
+    async def incrementar(
+        self,
+        colecao: str,
+        filtro: Dict[str, Any],
+        incrementos: Dict[str, Any],
+        ao_inserir: Optional[Dict[str, Any]] = None
+    ):
+        """Enfileira um update $inc com upsert (contadores; somados dentro do lote)"""
+        await self._enfileirar({
+            "colecao": colecao, "tipo": "incrementar", "filtro": filtro,
+            "incrementos": incrementos, "ao_inserir": ao_inserir or {}
+        })
+
+    async def _enfileirar(self, operacao: Dict[str, Any]):
+        self._pendentes.append(operacao)
+        self._garantir_tarefa()
+        if len(self._pendentes) >= self.tamanho_lote:
+            await self.descarregar()
+
+    def _garantir_tarefa(self):
+        """Descarga periódica no loop atual (o loop muda entre asyncio.run de jobs)"""
+        loop = asyncio.get_running_loop()
+        if self._tarefa and not self._tarefa.done() and self._tarefa.get_loop() is loop:
+            return
+        self._tarefa = loop.create_task(self._descarregar_periodicamente())
+
+    async def _descarregar_periodicamente(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            if self._pendentes:
+                await self.descarregar()
+
+    # ------------------------------------------------------------------
+    # Descarga
+    # ------------------------------------------------------------------
+
+    async def descarregar(self):
+        """Grava o buffer (e o spool, se houver) no MongoDB; em falha, vai para o spool"""
+        lote, self._pendentes = self._pendentes, []
+        if not lote:
+            return
+
+        try:
+            if not mongodb_manager.conectado and time.monotonic() >= self._proxima_conexao:
+                if not await mongodb_manager.conectar():
+                    self._proxima_conexao = time.monotonic() + ESPERA_RECONEXAO_SEGUNDOS
+
+            if not mongodb_manager.conectado:
+                self._enviar_spool(lote)
+                return
+
+            # O spool é mais antigo que o lote: vai antes, senão um upsert
+            # reenviado sobrescreveria uma gravação mais nova do mesmo filtro
+            await self.reenviar_spool()
+            if self._spool_pendente():
+                # Reenvio falhou ou está em andamento: o lote entra atrás dele
+                self._enviar_spool(lote)
+                return
+
+            await self._gravar(lote)
+            self.gravados += len(lote)
+        except asyncio.CancelledError:
+            # Loop encerrando no meio da gravação: o lote não se perde
+            self._enviar_spool(lote)
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao gravar lote no MongoDB: {str(e)} - enviando ao spool")
+            self._enviar_spool(lote)
+
+    @staticmethod
+    def _requisicao(operacao: Dict[str, Any]):
+        if operacao["tipo"] == "substituir":
+            return ReplaceOne(operacao["filtro"], operacao["documento"], upsert=True)
+        if operacao["tipo"] == "incrementar":
+            atualizacao = {"$inc": operacao["incrementos"]}
+            if operacao["ao_inserir"]:
+                atualizacao["$setOnInsert"] = operacao["ao_inserir"]
+            return UpdateOne(operacao["filtro"], atualizacao, upsert=True)
+        return InsertOne(operacao["documento"])
+
+    async def _gravar(self, lote: List[Dict[str, Any]]):
+        """
+        Um bulk_write por coleção. Upserts repetidos do mesmo filtro ficam só
+        com o último; incrementos do mesmo filtro são somados em um update
+        """
+        por_colecao: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        for indice, operacao in enumerate(lote):
+            operacoes = por_colecao.setdefault(operacao["colecao"], {})
+            if operacao["tipo"] == "inserir":
+                operacoes[indice] = operacao
+                continue
+
+            chave = (operacao["tipo"], json_util.dumps(operacao["filtro"], sort_keys=True))
+            anterior = operacoes.get(chave)
+            if operacao["tipo"] == "incrementar" and anterior:
+                incrementos = dict(anterior["incrementos"])
+                for campo, valor in operacao["incrementos"].items():
+                    incrementos[campo] = incrementos.get(campo, 0) + valor
+                operacao = dict(operacao, incrementos=incrementos)
+            operacoes[chave] = operacao
+
+        seguintes: List[Dict[str, Any]] = []
+        for colecao, operacoes in por_colecao.items():
+            operacoes = list(operacoes.values())
+            requisicoes = [self._requisicao(operacao) for operacao in operacoes]
+            try:
+                resultado = await mongodb_manager.database[colecao].bulk_write(requisicoes, ordered=False)
+                inseridos = list(resultado.upserted_ids or {})
+            except BulkWriteError as e:
+                inseridos = [upsert["index"] for upsert in e.details.get("upserted", [])]
+                erros = [erro for erro in e.details.get("writeErrors", [])
+                         if erro.get("code") != CODIGO_CHAVE_DUPLICADA]
+                if erros:
+                    # Erro no documento (não de rede): reenviar não resolveria
+                    logger.error(f"❌ {len(erros)} registro(s) rejeitado(s) em {colecao}: {erros[0].get('errmsg')}")
+            seguintes.extend(
+                {"tipo": "incrementar", "ao_inserir": {}, **operacoes[indice]["se_inserido"]}
+                for indice in inseridos if operacoes[indice].get("se_inserido")
+            )
+
+        if seguintes:
+            # Incrementos dos upserts que criaram documento. Se falharem vão
+            # sozinhos para o spool: reenviar o upsert não inseriria de novo
+            try:
+                await self._gravar(seguintes)
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao gravar incrementos condicionais: {str(e)} - enviando ao spool")
+                self._enviar_spool(seguintes)
+
+    # ------------------------------------------------------------------
+    # Spool local
+    # ------------------------------------------------------------------
+
+    def _enviar_spool(self, lote: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.arquivo_spool), exist_ok=True)
+        with open(self.arquivo_spool, "a", encoding="utf-8") as f:
+            for operacao in lote:
+                f.write(json_util.dumps(operacao, ensure_ascii=False) + "\n")
+        self.enviados_spool += len(lote)
+        logger.warning(f"💾 {len(lote)} registro(s) guardado(s) no spool local: {self.arquivo_spool}")
+
+    def _spool_pendente(self) -> bool:
+        return os.path.exists(self.arquivo_spool) or os.path.exists(f"{self.arquivo_spool}.reenviando")
+
+    def _devolver_ao_spool(self, operacoes: List[Dict[str, Any]]):
+        """Recoloca operações não reenviadas no início do spool (antes das gravadas depois)"""
+        posteriores = ""
+        if os.path.exists(self.arquivo_spool):
+            with open(self.arquivo_spool, encoding="utf-8") as f:
+                posteriores = f.read()
+        temporario = f"{self.arquivo_spool}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            for operacao in operacoes:
+                f.write(json_util.dumps(operacao, ensure_ascii=False) + "\n")
+            f.write(posteriores)
+        os.replace(temporario, self.arquivo_spool)
+        logger.warning(f"💾 {len(operacoes)} registro(s) devolvido(s) ao spool local: {self.arquivo_spool}")
+
+    async def reenviar_spool(self) -> int:
+        """Reenvia o spool ao MongoDB, na ordem; o que falhar volta para o início do spool"""
+        if self._reenviando or not self._spool_pendente():
+            return 0
+        self._reenviando = True
+        try:
+            return await self._reenviar_spool()
+        finally:
+            self._reenviando = False
+
+    async def _reenviar_spool(self) -> int:
+        # Renomeia antes de ler: novas falhas escrevem em um spool novo
+        em_reenvio = f"{self.arquivo_spool}.reenviando"
+        if not os.path.exists(em_reenvio):
+            os.replace(self.arquivo_spool, em_reenvio)
+
+        with open(em_reenvio, encoding="utf-8") as f:
+            operacoes = [json_util.loads(linha) for linha in f if linha.strip()]
+
+        reenviados = 0
+        for inicio in range(0, len(operacoes), self.tamanho_lote):
+            lote = operacoes[inicio:inicio + self.tamanho_lote]
+            try:
+                await self._gravar(lote)
+                reenviados += len(lote)
+            except Exception as e:
+                logger.warning(f"⚠️ Reenvio do spool interrompido: {str(e)}")
+                self._devolver_ao_spool(operacoes[inicio:])
+                break
+
+        os.remove(em_reenvio)
+        self.reenviados_spool += reenviados
+        if reenviados:
+            logger.info(f"📤 {reenviados} registro(s) do spool gravado(s) no MongoDB")
+        return reenviados
+
+    def _salvar_pendentes_no_spool(self):
+        """Saída do processo com buffer cheio (atexit): nada se perde"""
+        lote, self._pendentes = self._pendentes, []
+        if lote:
+            self._enviar_spool(lote)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    async def encerrar(self):
+        """Para a descarga periódica e grava o que restou"""
+        if self._tarefa and self._tarefa.get_loop() is asyncio.get_running_loop():
+            self._tarefa.cancel()
+        self._tarefa = None
+        await self.descarregar()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        linhas_spool = 0
+        if os.path.exists(self.arquivo_spool):
+            with open(self.arquivo_spool, encoding="utf-8") as f:
+                linhas_spool = sum(1 for _ in f)
+        return {
+            "pendentes": len(self._pendentes),
+            "gravados": self.gravados,
+            "no_spool": linhas_spool,
+            "enviados_spool": self.enviados_spool,
+            "reenviados_spool": self.reenviados_spool
+        }
+
+
+# Instância global
+escritor_lote = EscritorLote() if MONGODB_DISPONIVEL else None
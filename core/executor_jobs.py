@@ -0,0 +1,262 @@
+"""
+Executor de Jobs RPA em Processos Dedicados
+Tira a execução dos workflows do processo da API (uvicorn)
+
+Desenvolvido em Português Brasileiro
+
+Selenium e gspread são síncronos: rodando como BackgroundTasks dentro do
+uvicorn, um workflow em andamento trava /health e /workflow/status para
+todos. Aqui cada job roda em um processo próprio (spawn, um navegador por
+processo), com no máximo `tamanho_pool` processos ao mesmo tempo; os
+demais aguardam na fila.
+
+O processo do job envia o estado da execução à API por um Pipe a cada
+`intervalo_progresso` segundos e ao terminar. Se o processo travar
+(navegador pendurado) ele é encerrado ao estourar `timeout_job`; se
+morrer, a execução é marcada com erro - a API continua de pé nos dois
+casos.
+
+Contrato do alvo ("modulo:funcao"): corrotina (execucao_id, *argumentos)
+em um módulo que expõe salvar_execucao(execucao_id, dados) e
+obter_execucao(execucao_id), como o api_rpa.
+
+Configuração (.env):
+- RPA_WORKERS: processos simultâneos (0 = executa no próprio processo da API)
+- RPA_TIMEOUT_JOB_SEGUNDOS: tempo máximo de um job
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_POOL_PADRAO = 2
+TIMEOUT_JOB_PADRAO = 4 * 3600
+INTERVALO_PROGRESSO_PADRAO = 2.0
+
+# Status finais gravados pelos workflows
+STATUS_FINAIS = ("concluido", "erro")
+
+
+def _resolver_alvo(alvo: str):
+    nome_modulo, nome_funcao = alvo.split(":", 1)
+    modulo = importlib.import_module(nome_modulo)
+    return modulo, getattr(modulo, nome_funcao)
+
+
+def _copia_serializavel(estado: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Estado da execução em tipos simples (atravessa o Pipe sem objetos do worker)"""
+    return json.loads(json.dumps(estado or {}, ensure_ascii=False, default=str))
+
+
+def _executar_no_worker(
+    alvo: str,
+    execucao_id: str,
+    estado_inicial: Dict[str, Any],
+    argumentos: tuple,
+    conexao,
+    intervalo_progresso: float
+):
+    """Ponto de entrada do processo do job (precisa ser importável por causa do spawn)"""
+    # Estado fica em memória no worker; quem persiste e publica é a API
+    os.environ["RPA_PROCESSO_WORKER"] = "1"
+
+    async def executar():
+        modulo, funcao = _resolver_alvo(alvo)
+        modulo.salvar_execucao(execucao_id, dict(estado_inicial, pid_worker=os.getpid()))
+
+        async def reportar_progresso():
+            while True:
+                await asyncio.sleep(intervalo_progresso)
+                conexao.send(_copia_serializavel(modulo.obter_execucao(execucao_id)))
+
+        progresso = asyncio.create_task(reportar_progresso())
+        try:
+            await funcao(execucao_id, *argumentos)
+        except Exception as e:
+            execucao = modulo.obter_execucao(execucao_id)
+            execucao["status"] = "erro"
+            execucao["erro"] = str(e)
+            execucao["fim"] = datetime.now().isoformat()
+        finally:
+            progresso.cancel()
+
+        conexao.send(_copia_serializavel(modulo.obter_execucao(execucao_id)))
+
+    try:
+        asyncio.run(executar())
+    finally:
+        conexao.close()
+
+
+class ExecutorJobs:
+    """
+    Fila de jobs RPA executados em processos isolados, com limite de simultâneos
+    """
+
+    def __init__(
+        self,
+        tamanho_pool: Optional[int] = None,
+        timeout_job: Optional[float] = None,
+        intervalo_progresso: float = INTERVALO_PROGRESSO_PADRAO
+    ):
+        self.tamanho_pool = int(os.getenv("RPA_WORKERS", TAMANHO_POOL_PADRAO)) if tamanho_pool is None else tamanho_pool
+        self.timeout_job = float(os.getenv("RPA_TIMEOUT_JOB_SEGUNDOS", TIMEOUT_JOB_PADRAO)) if timeout_job is None else timeout_job
+        self.intervalo_progresso = intervalo_progresso
+        self.contexto = multiprocessing.get_context("spawn")
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._processos: Dict[str, Any] = {}
+        self._tarefas: Dict[str, asyncio.Task] = {}
+
+    async def submeter(
+        self,
+        execucao_id: str,
+        alvo: str,
+        *argumentos,
+        ao_atualizar: Callable[[str, Dict[str, Any]], None]
+    ):
+        """
+        Enfileira o job e retorna imediatamente
+
+        Args:
+            execucao_id: ID da execução (chave do estado na API)
+            alvo: "modulo:funcao" da corrotina do workflow
+            argumentos: Argumentos após execucao_id (precisam ser picklable)
+            ao_atualizar: Chamado no loop da API com cada estado recebido do worker
+        """
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(max(1, self.tamanho_pool))
+
+        tarefa = asyncio.create_task(self._supervisionar(execucao_id, alvo, argumentos, ao_atualizar))
+        self._tarefas[execucao_id] = tarefa
+        tarefa.add_done_callback(lambda _: self._tarefas.pop(execucao_id, None))
+
+    async def _supervisionar(self, execucao_id, alvo, argumentos, ao_atualizar):
+        modulo, funcao = _resolver_alvo(alvo)
+        ao_atualizar(execucao_id, {"etapa_atual": "aguardando_worker"})
+
+        # Sem pool: executa no processo da API (desenvolvimento/depuração)
+        if self.tamanho_pool <= 0:
+            async def reportar_progresso():
+                while True:
+                    await asyncio.sleep(self.intervalo_progresso)
+                    ao_atualizar(execucao_id, _copia_serializavel(modulo.obter_execucao(execucao_id)))
+
+            progresso = asyncio.create_task(reportar_progresso())
+            try:
+                await funcao(execucao_id, *argumentos)
+            except Exception as e:
+                # Mesmo tratamento do worker: a falha vira estado da execução, não some na tarefa
+                execucao = modulo.obter_execucao(execucao_id)
+                execucao["status"] = "erro"
+                execucao["erro"] = str(e)
+                execucao["fim"] = datetime.now().isoformat()
+                logger.error(f"💥 Job {execucao_id} falhou: {str(e)}")
+            finally:
+                progresso.cancel()
+            ao_atualizar(execucao_id, _copia_serializavel(modulo.obter_execucao(execucao_id)))
+            return
+
+        async with self._semaforo:
+            ao_atualizar(execucao_id, {"etapa_atual": "iniciando_worker"})
+            estado_inicial = _copia_serializavel(modulo.obter_execucao(execucao_id))
+            recepcao, envio = self.contexto.Pipe(duplex=False)
+            processo = self.contexto.Process(
+                target=_executar_no_worker,
+                args=(alvo, execucao_id, estado_inicial, argumentos, envio, self.intervalo_progresso),
+                name=f"rpa-job-{execucao_id}",
+                daemon=True
+            )
+            processo.start()
+            envio.close()
+            self._processos[execucao_id] = processo
+            logger.info(f"🚀 Job {execucao_id} iniciado no worker pid={processo.pid}")
+
+            loop = asyncio.get_running_loop()
+            try:
+                ultimo_estado = await asyncio.to_thread(
+                    self._acompanhar, processo, recepcao,
+                    lambda estado: loop.call_soon_threadsafe(ao_atualizar, execucao_id, estado)
+                )
+            finally:
+                self._processos.pop(execucao_id, None)
+                recepcao.close()
+
+            if processo.is_alive():
+                self._encerrar_processo(processo)
+                ao_atualizar(execucao_id, {
+                    "status": "erro",
+                    "erro": f"Job excedeu {self.timeout_job:.0f}s e o worker foi encerrado",
+                    "fim": datetime.now().isoformat()
+                })
+                logger.error(f"⏱️ Job {execucao_id} encerrado por timeout")
+            elif (ultimo_estado or {}).get("status") not in STATUS_FINAIS:
+                ao_atualizar(execucao_id, {
+                    "status": "erro",
+                    "erro": f"Worker encerrado inesperadamente (exitcode {processo.exitcode})",
+                    "fim": datetime.now().isoformat()
+                })
+                logger.error(f"💥 Worker do job {execucao_id} morreu (exitcode {processo.exitcode})")
+            else:
+                logger.info(f"✅ Job {execucao_id} finalizado: {ultimo_estado.get('status')}")
+
+    def _acompanhar(self, processo, recepcao, entregar) -> Optional[Dict[str, Any]]:
+        """Lê estados do Pipe até o worker terminar ou estourar o timeout (roda em thread)"""
+        limite = time.monotonic() + self.timeout_job
+        ultimo_estado = None
+
+        while time.monotonic() < limite:
+            try:
+                if recepcao.poll(1.0):
+                    ultimo_estado = recepcao.recv()
+                    entregar(ultimo_estado)
+                    continue
+            except (EOFError, OSError):
+                break
+            if not processo.is_alive():
+                break
+
+        processo.join(timeout=5)
+        return ultimo_estado
+
+    def _encerrar_processo(self, processo):
+        processo.terminate()
+        processo.join(timeout=10)
+        if processo.is_alive():
+            processo.kill()
+            processo.join(timeout=5)
+
+    def cancelar(self, execucao_id: str) -> bool:
+        """Encerra o worker de um job em andamento"""
+        processo = self._processos.get(execucao_id)
+        if not processo:
+            return False
+        self._encerrar_processo(processo)
+        return True
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Processos em execução e jobs aguardando worker"""
+        return {
+            "tamanho_pool": self.tamanho_pool,
+            "em_execucao": len(self._processos),
+            "aguardando_worker": max(0, len(self._tarefas) - len(self._processos)),
+            "pids": [p.pid for p in self._processos.values()]
+        }
+
+    def encerrar(self):
+        """Encerra todos os workers (desligamento da API)"""
+        for processo in list(self._processos.values()):
+            self._encerrar_processo(processo)
+        for tarefa in list(self._tarefas.values()):
+            tarefa.cancel()
+
+
+# Instância global
+executor_jobs = ExecutorJobs()
@@ -0,0 +1,259 @@
+"""
+Fila de Processamento - Consumo pelos RPAs Sienge e Sicredi
+Lê a fila gerada pelo RPA Análise de Planilhas e os índices já coletados
+
+Desenvolvido em Português Brasileiro
+
+Permite rodar apenas os RPAs 3 e 4 a partir do que os RPAs 1 e 2 já
+persistiram no dia, sem coletar índices nem reanalisar planilhas de novo.
+
+Persistência (mesma dos RPAs 1 e 2):
+- Fila: MongoDB fila_processamento_sienge (documento único com "contratos"),
+  sem MongoDB o banco local SQLite (core/sqlite_manager) ou, se ele falhar,
+  dados_processamento/fila_contratos_sienge.json
+- Índices: MongoDB indices_coletados (último documento), SQLite
+  ou dados_processamento/indices_coletados.jsonl (último registro)
+
+No JSON local, o arquivo da fila é um snapshot gravado só quando a fila é
+montada (atômico). As mudanças de status vão para um journal append-only ao
+lado (fila_contratos_sienge.status.jsonl) e são aplicadas na leitura; o
+journal é incorporado e zerado na próxima gravação da fila.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+try:
+    import pymongo
+    from core.mongodb_manager import mongodb_manager
+    MONGODB_DISPONIVEL = True
+except ImportError:
+    MONGODB_DISPONIVEL = False
+
+from core.historico_jsonl import HistoricoJSONL, historico_indices_coletados
+from core.sqlite_manager import sqlite_manager
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_FILA = os.path.join("dados_processamento", "fila_contratos_sienge.json")
+ARQUIVO_STATUS_FILA = os.path.join("dados_processamento", "fila_contratos_sienge.status.jsonl")
+
+STATUS_PENDENTE = "pendente"
+STATUS_PROCESSADO = "processado"
+STATUS_ERRO = "erro"
+
+# Journal de status da fila JSON (sem rotação: é zerado a cada nova fila)
+journal_status_fila = HistoricoJSONL(ARQUIVO_STATUS_FILA, max_bytes=0)
+
+
+async def _mongodb_conectado() -> bool:
+    if not MONGODB_DISPONIVEL:
+        return False
+    try:
+        return mongodb_manager.conectado or await mongodb_manager.conectar()
+    except Exception as e:
+        logger.warning(f"⚠️ MongoDB indisponível, usando JSON local: {str(e)}")
+        return False
+
+
+def _ler_json(caminho: str) -> Any:
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+async def ler_fila_local() -> Optional[Dict[str, Any]]:
+    """Fila local: banco SQLite ou, sem fila nele, o JSON com o journal aplicado"""
+    fila = await sqlite_manager.obter_fila_processamento()
+    return fila if fila is not None else _ler_fila_json()
+
+
+async def gravar_fila_local(fila: Dict[str, Any]):
+    """
+    Grava a fila no banco SQLite (ou no JSON, se o banco falhar)
+
+    Quem monta a fila deve partir de ler_fila_local(), que já inclui os
+    status atualizados.
+    """
+    if await sqlite_manager.salvar_fila_processamento(fila) is None:
+        _gravar_fila_json(fila)
+
+
+def _ler_fila_json() -> Optional[Dict[str, Any]]:
+    """Fila do JSON local com os status do journal aplicados"""
+    with journal_status_fila.travado():
+        fila = _ler_json(ARQUIVO_FILA)
+        eventos = journal_status_fila.todos() if fila else []
+
+    if not fila:
+        return None
+
+    por_titulo = {str(c.get("numero_titulo")): c for c in fila.get("contratos", [])}
+    for evento in eventos:
+        contrato = por_titulo.get(str(evento.get("numero_titulo")))
+        if contrato is not None:
+            contrato["status_processamento"] = evento["status"]
+            contrato["processado_em"] = evento.get("processado_em")
+            contrato["erro_processamento"] = evento.get("erro")
+    if eventos:
+        fila["timestamp_ultima_atualizacao"] = eventos[-1].get("processado_em")
+    return fila
+
+
+def _gravar_fila_json(fila: Dict[str, Any]):
+    """Grava o snapshot da fila (temporário + os.replace) e zera o journal"""
+    os.makedirs(os.path.dirname(ARQUIVO_FILA), exist_ok=True)
+    with journal_status_fila.travado():
+        temporario = f"{ARQUIVO_FILA}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(fila, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(temporario, ARQUIVO_FILA)
+        journal_status_fila.limpar()
+
+
+async def carregar_fila_processamento(
+    titulos: Optional[Iterable[str]] = None,
+    incluir_com_erro: bool = False
+) -> Dict[str, Any]:
+    """
+    Carrega contratos pendentes da fila persistida pelo RPA Análise de Planilhas
+
+    Args:
+        titulos: Subconjunto de números de título (padrão: toda a fila pendente)
+        incluir_com_erro: Se True, reprocessa também contratos com status "erro"
+
+    Returns:
+        {"contratos": [...], "origem": "mongodb"|"json"|None,
+         "timestamp_fila": ..., "titulos_nao_encontrados": [...]}
+    """
+    fila, origem = None, None
+
+    if await _mongodb_conectado():
+        try:
+            fila = await mongodb_manager.database.fila_processamento_sienge.find_one(
+                {}, {"_id": 0}, sort=[("timestamp_criacao", pymongo.DESCENDING)]
+            )
+            origem = "mongodb" if fila else None
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler fila no MongoDB, usando JSON: {str(e)}")
+
+    status_aceitos = {STATUS_PENDENTE, STATUS_ERRO} if incluir_com_erro else {STATUS_PENDENTE}
+
+    if fila is None:
+        # Só os contratos nos status pedidos (índice de status do SQLite)
+        fila = await sqlite_manager.obter_fila_processamento(status=sorted(status_aceitos))
+        origem = "sqlite" if fila is not None else None
+
+    if fila is None:
+        fila = _ler_fila_json()
+        origem = "json" if fila else None
+
+    fila = fila or {}
+    contratos = [
+        c for c in fila.get("contratos", [])
+        if c.get("status_processamento", STATUS_PENDENTE) in status_aceitos
+    ]
+
+    nao_encontrados = []
+    if titulos is not None:
+        selecionados = [str(t) for t in titulos]
+        por_titulo = {str(c.get("numero_titulo")): c for c in contratos}
+        nao_encontrados = [t for t in selecionados if t not in por_titulo]
+        contratos = [por_titulo[t] for t in dict.fromkeys(selecionados) if t in por_titulo]
+
+    return {
+        "contratos": contratos,
+        "origem": origem,
+        "timestamp_fila": fila.get("timestamp_criacao") or fila.get("timestamp_ultima_atualizacao"),
+        "titulos_nao_encontrados": nao_encontrados
+    }
+
+
+async def carregar_indices_coletados() -> Optional[Dict[str, Any]]:
+    """
+    Últimos índices IPCA/IGP-M coletados pelo RPA Coleta de Índices
+
+    Returns:
+        {"ipca": {...}, "igpm": {...}, "timestamp": ...} ou None se não houver coleta
+    """
+    if await _mongodb_conectado():
+        try:
+            documento = await mongodb_manager.database.indices_coletados.find_one(
+                {}, {"_id": 0}, sort=[("timestamp", pymongo.DESCENDING)]
+            )
+            if documento:
+                return {
+                    "ipca": documento.get("ipca", {}),
+                    "igpm": documento.get("igpm", {}),
+                    "timestamp": str(documento.get("timestamp"))
+                }
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao ler índices no MongoDB, usando JSON: {str(e)}")
+
+    ultimo = await sqlite_manager.obter_ultimos_indices_coletados()
+    if ultimo is None:
+        registros = historico_indices_coletados.ultimos(1)
+        if not registros:
+            return None
+        ultimo = registros[-1]
+
+    return {"ipca": ultimo.get("ipca", {}), "igpm": ultimo.get("igpm", {}), "timestamp": ultimo.get("timestamp")}
+
+
+async def atualizar_status_fila(atualizacoes: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Marca contratos da fila como processados ou com erro
+
+    Args:
+        atualizacoes: numero_titulo -> {"status": "processado"|"erro", "erro": ...}
+
+    Returns:
+        Quantidade de contratos atualizados
+    """
+    if not atualizacoes:
+        return 0
+
+    agora = datetime.now().isoformat()
+
+    if await _mongodb_conectado():
+        try:
+            operacoes = [
+                pymongo.UpdateOne(
+                    {},
+                    {"$set": {
+                        "contratos.$[c].status_processamento": dados["status"],
+                        "contratos.$[c].processado_em": agora,
+                        "contratos.$[c].erro_processamento": dados.get("erro")
+                    }},
+                    array_filters=[{"c.numero_titulo": titulo}]
+                )
+                for titulo, dados in atualizacoes.items()
+            ]
+            resultado = await mongodb_manager.database.fila_processamento_sienge.bulk_write(operacoes, ordered=False)
+            return resultado.modified_count
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao atualizar fila no MongoDB, usando JSON: {str(e)}")
+
+    # Fila no banco local: UPDATE pelo título
+    atualizados = await sqlite_manager.atualizar_status_fila(atualizacoes)
+    if atualizados:
+        return atualizados
+
+    fila = _ler_json(ARQUIVO_FILA)
+    if not fila:
+        return 0
+
+    # Só acrescenta os eventos ao journal: o snapshot da fila não é regravado
+    titulos_na_fila = {str(c.get("numero_titulo")) for c in fila.get("contratos", [])}
+    eventos = [
+        {"numero_titulo": titulo, "status": dados["status"], "erro": dados.get("erro"), "processado_em": agora}
+        for titulo, dados in atualizacoes.items()
+        if str(titulo) in titulos_na_fila
+    ]
+    journal_status_fila.anexar_varios(eventos)
+
+    return len(eventos)
@@ -0,0 +1,406 @@
+"""
+Histórico JSONL - Armazenamento append-only para os fallbacks em arquivo
+Um registro JSON por linha, rotação por tamanho e índice de offsets
+
+Desenvolvido em Português Brasileiro
+
+Os fallbacks JSON (histórico de execuções, índices coletados) liam o
+arquivo inteiro, acrescentavam um registro e regravavam tudo a cada
+gravação - custo proporcional ao histórico e arquivo corrompido se dois
+RPAs gravassem ao mesmo tempo. Aqui:
+- anexar() escreve uma linha no fim do arquivo (O_APPEND) sob trava de
+  arquivo (fcntl.flock), então gravações concorrentes de processos
+  diferentes não se misturam
+- Cada linha tem seu offset gravado em um índice ao lado (<arquivo>.idx,
+  8 bytes por registro), então ultimos(n) lê só as n últimas linhas
+- Ao passar de `max_bytes`, o arquivo vira <arquivo>.1 (o .1 vira .2, ...)
+  e só `arquivos_rotacionados` antigos são mantidos
+- compactar() reescreve em arquivo temporário e troca com os.replace
+  (atômico): quem lê vê o arquivo antigo ou o novo, nunca um pela metade
+
+O índice é só um acelerador: se não bater com o arquivo (queda no meio de
+uma gravação, arquivo editado à mão), é reconstruído a partir das linhas.
+
+Um JSON antigo (lista de registros) informado em `arquivo_legado` é
+importado no primeiro acesso e renomeado para <arquivo>.migrado.
+
+Configuração (.env):
+- RPA_HISTORICO_MAX_BYTES: tamanho do arquivo antes de rotacionar
+- RPA_HISTORICO_ARQUIVOS_ROTACIONADOS: quantos arquivos antigos manter
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+    FCNTL_DISPONIVEL = True
+except ImportError:
+    # Windows: só a trava entre threads do mesmo processo
+    FCNTL_DISPONIVEL = False
+
+MAX_BYTES_PADRAO = 5 * 1024 * 1024
+ARQUIVOS_ROTACIONADOS_PADRAO = 3
+
+# Offset de cada linha no índice: inteiro sem sinal de 8 bytes
+FORMATO_OFFSET = ">Q"
+TAMANHO_OFFSET = struct.calcsize(FORMATO_OFFSET)
+
+
+def _linha(registro: Dict[str, Any]) -> bytes:
+    return (json.dumps(registro, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def _decodificar(linhas: Iterable[bytes]) -> List[Dict[str, Any]]:
+    registros = []
+    for linha in linhas:
+        if not linha.strip():
+            continue
+        try:
+            registros.append(json.loads(linha))
+        except ValueError:
+            # Linha truncada por queda no meio da gravação
+            logger.warning("⚠️ Linha inválida ignorada no histórico JSONL")
+    return registros
+
+
+class HistoricoJSONL:
+    """
+    Registros JSON em arquivo append-only com rotação e índice de offsets
+    """
+
+    def __init__(
+        self,
+        caminho: str,
+        max_bytes: Optional[int] = None,
+        arquivos_rotacionados: Optional[int] = None,
+        arquivo_legado: Optional[str] = None
+    ):
+        """
+        Args:
+            caminho: Arquivo .jsonl
+            max_bytes: Tamanho para rotacionar (0 = nunca rotaciona)
+            arquivos_rotacionados: Quantos arquivos rotacionados manter
+            arquivo_legado: JSON antigo (lista) a importar no primeiro acesso
+        """
+        self.caminho = caminho
+        self.max_bytes = int(os.getenv("RPA_HISTORICO_MAX_BYTES", MAX_BYTES_PADRAO)) \
+            if max_bytes is None else max_bytes
+        self.arquivos_rotacionados = int(os.getenv("RPA_HISTORICO_ARQUIVOS_ROTACIONADOS",
+                                                   ARQUIVOS_ROTACIONADOS_PADRAO)) \
+            if arquivos_rotacionados is None else arquivos_rotacionados
+        self.arquivo_legado = arquivo_legado
+        self._trava_local = threading.RLock()
+        self._profundidade = 0
+        self._arquivo_trava = None
+
+    # ------------------------------------------------------------------
+    # Caminhos e trava
+    # ------------------------------------------------------------------
+
+    def _arquivo(self, geracao: int = 0) -> str:
+        return self.caminho if geracao == 0 else f"{self.caminho}.{geracao}"
+
+    @staticmethod
+    def _indice(arquivo: str) -> str:
+        return f"{arquivo}.idx"
+
+    @contextmanager
+    def travado(self):
+        """Trava exclusiva (threads e processos) sobre o histórico; reentrante"""
+        with self._trava_local:
+            if self._profundidade == 0:
+                pasta = os.path.dirname(self.caminho)
+                if pasta:
+                    os.makedirs(pasta, exist_ok=True)
+                self._arquivo_trava = open(f"{self.caminho}.lock", "a")
+                if FCNTL_DISPONIVEL:
+                    fcntl.flock(self._arquivo_trava, fcntl.LOCK_EX)
+            self._profundidade += 1
+            try:
+                yield
+            finally:
+                self._profundidade -= 1
+                if self._profundidade == 0:
+                    # Fechar o descritor libera o flock
+                    self._arquivo_trava.close()
+                    self._arquivo_trava = None
+
+    # ------------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------------
+
+    def anexar(self, registro: Dict[str, Any]):
+        """Acrescenta um registro no fim do histórico"""
+        self.anexar_varios([registro])
+
+    def anexar_varios(self, registros: Iterable[Dict[str, Any]]):
+        """Acrescenta vários registros em uma única escrita"""
+        linhas = [_linha(registro) for registro in registros]
+        if not linhas:
+            return
+
+        with self.travado():
+            self._migrar_legado()
+            tamanho = self._descartar_linha_truncada()
+            if self.max_bytes and tamanho and tamanho + sum(map(len, linhas)) > self.max_bytes:
+                self._rotacionar()
+                tamanho = 0
+
+            offsets = []
+            for linha in linhas:
+                offsets.append(tamanho)
+                tamanho += len(linha)
+
+            with open(self.caminho, "ab") as f:
+                f.write(b"".join(linhas))
+            with open(self._indice(self.caminho), "ab") as f:
+                f.write(b"".join(struct.pack(FORMATO_OFFSET, offset) for offset in offsets))
+
+    def _descartar_linha_truncada(self) -> int:
+        """
+        Corta uma última linha sem quebra (queda no meio da gravação)
+
+        O registro truncado nunca foi indexado; deixá-lo no arquivo faria a
+        reconstrução do índice contá-lo como registro. Retorna o tamanho final.
+        """
+        if not os.path.exists(self.caminho):
+            return 0
+        with open(self.caminho, "r+b") as f:
+            tamanho = f.seek(0, os.SEEK_END)
+            fim = tamanho
+            while fim:
+                inicio = max(0, fim - 4096)
+                f.seek(inicio)
+                bloco = f.read(fim - inicio)
+                quebra = bloco.rfind(b"\n")
+                if quebra >= 0:
+                    fim = inicio + quebra + 1
+                    break
+                fim = inicio
+            if fim != tamanho:
+                f.truncate(fim)
+                logger.warning(f"⚠️ Registro truncado descartado do histórico: {self.caminho}")
+        return fim
+
+    def _rotacionar(self):
+        """arquivo -> .1 -> .2 ...; descarta o que passar de arquivos_rotacionados"""
+        for geracao in range(self.arquivos_rotacionados, 0, -1):
+            origem = self._arquivo(geracao - 1)
+            destino = self._arquivo(geracao)
+            if geracao == self.arquivos_rotacionados:
+                self._remover(destino)
+            if os.path.exists(origem):
+                os.replace(origem, destino)
+                if os.path.exists(self._indice(origem)):
+                    os.replace(self._indice(origem), self._indice(destino))
+                else:
+                    self._remover(self._indice(destino))
+
+        if self.arquivos_rotacionados <= 0:
+            self._remover(self.caminho)
+        self._remover(self._indice(self.caminho))
+        logger.info(f"🔄 Histórico rotacionado: {self.caminho}")
+
+    @staticmethod
+    def _remover(arquivo: str):
+        try:
+            os.remove(arquivo)
+        except FileNotFoundError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def _ler_offsets(self, arquivo: str) -> List[int]:
+        indice = self._indice(arquivo)
+        if not os.path.exists(indice):
+            return self._reconstruir_indice(arquivo)
+        with open(indice, "rb") as f:
+            dados = f.read()
+        quantidade = len(dados) // TAMANHO_OFFSET
+        return list(struct.unpack(f">{quantidade}Q", dados[:quantidade * TAMANHO_OFFSET]))
+
+    def _reconstruir_indice(self, arquivo: str) -> List[int]:
+        """Refaz o índice a partir das linhas do arquivo"""
+        offsets = []
+        posicao = 0
+        with open(arquivo, "rb") as f:
+            for linha in f:
+                if linha.strip():
+                    offsets.append(posicao)
+                posicao += len(linha)
+
+        temporario = f"{self._indice(arquivo)}.tmp"
+        with open(temporario, "wb") as f:
+            f.write(b"".join(struct.pack(FORMATO_OFFSET, offset) for offset in offsets))
+        os.replace(temporario, self._indice(arquivo))
+        logger.info(f"🧭 Índice do histórico reconstruído: {arquivo} ({len(offsets)} registros)")
+        return offsets
+
+    def _ultimas_linhas(self, arquivo: str, n: int) -> List[bytes]:
+        """Até n últimas linhas do arquivo, lendo só a partir do offset indexado"""
+        linhas = self._ler_a_partir_do_indice(arquivo, self._ler_offsets(arquivo), n)
+        if linhas is None:
+            linhas = self._ler_a_partir_do_indice(arquivo, self._reconstruir_indice(arquivo), n) or []
+        return linhas
+
+    @staticmethod
+    def _ler_a_partir_do_indice(arquivo: str, offsets: List[int], n: int) -> Optional[List[bytes]]:
+        """None se o índice não bater com o arquivo"""
+        esperadas = min(n, len(offsets))
+        # Índice inteiro pedido: lê desde o início para notar registros fora do índice
+        inicio = 0 if esperadas == len(offsets) else offsets[-esperadas]
+        with open(arquivo, "rb") as f:
+            if inicio:
+                f.seek(inicio - 1)
+                if f.read(1) != b"\n":
+                    return None
+            linhas = [linha for linha in f.read().split(b"\n") if linha.strip()]
+        return linhas if len(linhas) == esperadas else None
+
+    def ultimos(self, n: int) -> List[Dict[str, Any]]:
+        """
+        Os n registros mais recentes, do mais antigo para o mais novo
+
+        Continua nos arquivos rotacionados se o atual não tiver n registros.
+        """
+        if n <= 0:
+            return []
+
+        with self.travado():
+            self._migrar_legado()
+            blocos: List[List[Dict[str, Any]]] = []
+            faltam = n
+            for geracao in range(self.arquivos_rotacionados + 1):
+                arquivo = self._arquivo(geracao)
+                if not os.path.exists(arquivo):
+                    break
+                registros = _decodificar(self._ultimas_linhas(arquivo, faltam))
+                blocos.append(registros)
+                faltam -= len(registros)
+                if faltam <= 0:
+                    break
+
+        registros = [registro for bloco in reversed(blocos) for registro in bloco]
+        return registros[-n:]
+
+    def todos(self) -> List[Dict[str, Any]]:
+        """Todos os registros (rotacionados inclusive), do mais antigo para o mais novo"""
+        with self.travado():
+            self._migrar_legado()
+            registros: List[Dict[str, Any]] = []
+            for geracao in range(self.arquivos_rotacionados, -1, -1):
+                arquivo = self._arquivo(geracao)
+                if os.path.exists(arquivo):
+                    with open(arquivo, "rb") as f:
+                        registros.extend(_decodificar(f))
+            return registros
+
+    # ------------------------------------------------------------------
+    # Manutenção
+    # ------------------------------------------------------------------
+
+    def compactar(self, manter: Optional[int] = None) -> int:
+        """
+        Reescreve o histórico em um único arquivo (rotacionados descartados)
+
+        Args:
+            manter: Só os N registros mais recentes (None = todos)
+
+        Returns:
+            Número de registros mantidos
+        """
+        with self.travado():
+            registros = self.todos() if manter is None else self.ultimos(manter)
+            self._substituir(registros)
+            for geracao in range(1, self.arquivos_rotacionados + 1):
+                self._remover(self._arquivo(geracao))
+                self._remover(self._indice(self._arquivo(geracao)))
+            logger.info(f"🗜️ Histórico compactado: {self.caminho} ({len(registros)} registros)")
+            return len(registros)
+
+    def limpar(self):
+        """Esvazia o histórico (atual e rotacionados)"""
+        with self.travado():
+            for geracao in range(self.arquivos_rotacionados + 1):
+                self._remover(self._arquivo(geracao))
+                self._remover(self._indice(self._arquivo(geracao)))
+
+    def _substituir(self, registros: List[Dict[str, Any]]):
+        """Grava arquivo e índice novos em temporários e troca com os.replace"""
+        linhas = [_linha(registro) for registro in registros]
+        offsets, posicao = [], 0
+        for linha in linhas:
+            offsets.append(posicao)
+            posicao += len(linha)
+
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, "wb") as f:
+            f.write(b"".join(linhas))
+            f.flush()
+            os.fsync(f.fileno())
+        temporario_indice = f"{self._indice(self.caminho)}.tmp"
+        with open(temporario_indice, "wb") as f:
+            f.write(b"".join(struct.pack(FORMATO_OFFSET, offset) for offset in offsets))
+
+        # Índice removido antes da troca: se cair entre as duas, é reconstruído
+        self._remover(self._indice(self.caminho))
+        os.replace(temporario, self.caminho)
+        os.replace(temporario_indice, self._indice(self.caminho))
+
+    def _migrar_legado(self):
+        """Importa o JSON antigo (lista de registros) uma única vez"""
+        if not self.arquivo_legado or not os.path.exists(self.arquivo_legado):
+            return
+
+        try:
+            with open(self.arquivo_legado, "r", encoding="utf-8") as f:
+                registros = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Histórico antigo ilegível, não migrado: {self.arquivo_legado} ({str(e)})")
+            return
+
+        if isinstance(registros, dict):
+            registros = [registros]
+        existentes = self._registros_atuais()
+        self._substituir(registros + existentes)
+        os.replace(self.arquivo_legado, f"{self.arquivo_legado}.migrado")
+        logger.info(f"📦 Histórico migrado para JSONL: {self.arquivo_legado} -> {self.caminho} "
+                    f"({len(registros)} registros)")
+
+    def _registros_atuais(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.caminho):
+            return []
+        with open(self.caminho, "rb") as f:
+            return _decodificar(f)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        arquivos = [self._arquivo(g) for g in range(self.arquivos_rotacionados + 1)]
+        existentes = [a for a in arquivos if os.path.exists(a)]
+        return {
+            "arquivo": self.caminho,
+            "bytes": sum(os.path.getsize(a) for a in existentes),
+            "arquivos": len(existentes),
+            "registros_atual": os.path.getsize(self._indice(self.caminho)) // TAMANHO_OFFSET
+            if os.path.exists(self._indice(self.caminho)) else 0
+        }
+
+
+# Instâncias globais dos históricos compartilhados entre módulos
+historico_execucoes = HistoricoJSONL(
+    os.path.join("logs", "historico_execucoes.jsonl"),
+    arquivo_legado=os.path.join("logs", "historico_execucoes.json")
+)
+historico_indices_coletados = HistoricoJSONL(
+    os.path.join("dados_processamento", "indices_coletados.jsonl"),
+    arquivo_legado=os.path.join("dados_processamento", "indices_coletados.json")
+)
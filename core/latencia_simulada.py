@@ -0,0 +1,76 @@
+"""
+Latência Simulada
+Amostragem de tempos de etapa para os simuladores dos RPAs
+
+Desenvolvido em Português Brasileiro
+
+Cada etapa recebe uma especificação:
+    {"distribuicao": "fixa" | "uniforme" | "normal" | "lognormal" | "exponencial",
+     "media": segundos, "desvio": segundos, "minimo": segundos, "maximo": segundos}
+
+A escala de tempo permite rodar testes de carga comprimidos
+(ex.: escala 0.01 transforma 1s em 10ms mantendo a forma da distribuição).
+"""
+
+import asyncio
+import math
+import random
+from typing import Dict, Any, Optional
+
+
+class AmostradorLatencia:
+    """
+    Sorteia e aplica latências por etapa conforme distribuições configuradas
+    """
+
+    def __init__(
+        self,
+        latencias: Dict[str, Dict[str, Any]],
+        escala_tempo: float = 1.0,
+        semente: Optional[int] = None
+    ):
+        self.latencias = latencias
+        self.escala_tempo = escala_tempo
+        self.aleatorio = random.Random(semente)
+
+    def amostrar(self, etapa: str) -> float:
+        """Retorna latência (segundos, já na escala) para a etapa"""
+        spec = self.latencias.get(etapa)
+        if not spec:
+            return 0.0
+
+        distribuicao = spec.get("distribuicao", "fixa")
+        media = float(spec.get("media", 0.0))
+        desvio = float(spec.get("desvio", 0.0))
+
+        if distribuicao == "uniforme":
+            valor = self.aleatorio.uniform(spec.get("minimo", 0.0), spec.get("maximo", media * 2))
+        elif distribuicao == "normal":
+            valor = self.aleatorio.gauss(media, desvio)
+        elif distribuicao == "lognormal":
+            # Converte média/desvio desejados para parâmetros da normal subjacente
+            if media <= 0:
+                valor = 0.0
+            else:
+                sigma2 = math.log(1 + (desvio / media) ** 2)
+                mu = math.log(media) - sigma2 / 2
+                valor = self.aleatorio.lognormvariate(mu, math.sqrt(sigma2))
+        elif distribuicao == "exponencial":
+            valor = self.aleatorio.expovariate(1 / media) if media > 0 else 0.0
+        else:
+            valor = media
+
+        minimo = spec.get("minimo", 0.0)
+        maximo = spec.get("maximo")
+        valor = max(valor, minimo)
+        if maximo is not None:
+            valor = min(valor, maximo)
+
+        return valor * self.escala_tempo
+
+    async def aguardar(self, etapa: str) -> float:
+        """Aguarda a latência sorteada para a etapa e retorna o tempo aguardado"""
+        segundos = self.amostrar(etapa)
+        if segundos > 0:
+            await asyncio.sleep(segundos)
+        return segundos
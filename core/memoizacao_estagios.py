@@ -0,0 +1,317 @@
+"""
+Memoização de Estágios do Workflow
+Reaproveita o resultado de estágios já concluídos na mesma data de negócio
+
+Desenvolvido em Português Brasileiro
+
+Estágios: coleta (índices), analise (planilhas), sienge (por contrato) e
+sicredi (por arquivo de remessa). A chave é estágio + entradas
+normalizadas + data de negócio; credenciais nunca entram na chave nem
+no armazenamento. Só resultados com sucesso são memoizados, então uma
+nova tentativa do workflow após falha no Sienge pula coleta e análise
+e reexecuta apenas o que falhou.
+
+Persistência: MongoDB (collection memoizacao_estagios). Só quando o
+MongoDB falha o registro vai para o banco local SQLite (core/sqlite_manager,
+upsert indexado pela chave) e, se ele também falhar, para o JSON
+dados_processamento/memoizacao_estagios.json. Uma falha do MongoDB só o
+suspende por RPA_MEMOIZACAO_PAUSA_MONGODB_SEGUNDOS; depois ele volta a ser
+tentado. Consultas que não acham a chave no MongoDB olham o armazenamento
+local (registros gravados durante a queda).
+Invalidação explícita por estágio, data e/ou entradas.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
+
+from core.base_rpa import ResultadoRPA
+from core.sqlite_manager import sqlite_manager
+
+try:
+    from core.mongodb_manager import mongodb_manager
+    MONGODB_DISPONIVEL = True
+except ImportError:
+    MONGODB_DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+ESTAGIO_COLETA = "coleta"
+ESTAGIO_ANALISE = "analise"
+ESTAGIO_SIENGE = "sienge"
+ESTAGIO_SICREDI = "sicredi"
+
+# Campos removidos das entradas antes de gerar a chave
+CAMPOS_SENSIVEIS = ("credenciais", "credenciais_google", "credenciais_sienge", "credenciais_sicredi", "senha")
+
+# Datas de negócio mantidas no armazenamento local
+DIAS_RETENCAO_LOCAL = 7
+
+# Tempo sem tentar o MongoDB após uma falha
+PAUSA_MONGODB_PADRAO = 60.0
+
+
+def data_negocio_atual() -> str:
+    """Data de negócio = data do dia (ISO), mesma convenção do ciclo Sienge"""
+    return date.today().isoformat()
+
+
+def normalizar_entradas(entradas: Any) -> Any:
+    """Ordena chaves, remove credenciais e converte valores para tipos JSON estáveis"""
+    if isinstance(entradas, dict):
+        return {
+            str(k): normalizar_entradas(v)
+            for k, v in sorted(entradas.items(), key=lambda item: str(item[0]))
+            if str(k) not in CAMPOS_SENSIVEIS
+        }
+    if isinstance(entradas, (list, tuple)):
+        return [normalizar_entradas(v) for v in entradas]
+    if isinstance(entradas, str):
+        return entradas.strip()
+    if entradas is None or isinstance(entradas, (bool, int, float)):
+        return entradas
+    return str(entradas)
+
+
+def chave_estagio(estagio: str, entradas: Any, data_negocio: Optional[str] = None) -> str:
+    """estagio:data:hash das entradas normalizadas"""
+    conteudo = json.dumps(normalizar_entradas(entradas), sort_keys=True, ensure_ascii=False)
+    resumo = hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:24]
+    return f"{estagio}:{data_negocio or data_negocio_atual()}:{resumo}"
+
+
+def identidade_arquivo(caminho: str) -> Dict[str, Any]:
+    """Entradas de um arquivo para a chave: caminho, tamanho e mtime (sem ler o conteúdo)"""
+    try:
+        estado = os.stat(caminho)
+        return {"arquivo": os.path.abspath(caminho), "tamanho": estado.st_size, "mtime_ns": estado.st_mtime_ns}
+    except OSError:
+        return {"arquivo": os.path.abspath(caminho)}
+
+
+class MemoizacaoEstagios:
+    """
+    Armazena e consulta resultados de estágios do workflow por data de negócio
+    """
+
+    def __init__(self, arquivo_local: str = "dados_processamento/memoizacao_estagios.json",
+                 pausa_mongodb: Optional[float] = None):
+        self.arquivo_local = arquivo_local
+        self.mongodb_ativo = MONGODB_DISPONIVEL
+        self.pausa_mongodb = float(os.getenv("RPA_MEMOIZACAO_PAUSA_MONGODB_SEGUNDOS", PAUSA_MONGODB_PADRAO)) \
+            if pausa_mongodb is None else pausa_mongodb
+        self._mongodb_pausado_ate = 0.0
+        self._cache_local: Tuple[Optional[int], Dict[str, Any]] = (None, {})
+
+    async def _mongodb_pronto(self) -> bool:
+        """MongoDB conectado e fora da pausa após falha"""
+        if not self.mongodb_ativo or time.monotonic() < self._mongodb_pausado_ate:
+            return False
+        try:
+            if mongodb_manager.conectado or await mongodb_manager.conectar():
+                return True
+        except Exception as e:
+            logger.warning(f"⚠️ MongoDB indisponível para memoização: {str(e)}")
+        self._pausar_mongodb()
+        return False
+
+    def _pausar_mongodb(self):
+        self._mongodb_pausado_ate = time.monotonic() + self.pausa_mongodb
+
+    async def obter(
+        self,
+        estagio: str,
+        entradas: Any,
+        data_negocio: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Resultado memoizado do estágio (dict) ou None"""
+        chave = chave_estagio(estagio, entradas, data_negocio)
+        registro = None
+
+        if await self._mongodb_pronto():
+            try:
+                registro = await mongodb_manager.database.memoizacao_estagios.find_one(
+                    {"chave": chave}, {"_id": 0}
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB indisponível para memoização, usando armazenamento local: {str(e)}")
+                self._pausar_mongodb()
+
+        if registro is None:
+            registro = await sqlite_manager.obter_memoizacao(chave)
+        if registro is None:
+            registro = self._carregar_local().get(chave)
+
+        return registro["resultado"] if registro else None
+
+    async def salvar(
+        self,
+        estagio: str,
+        entradas: Any,
+        resultado: Dict[str, Any],
+        data_negocio: Optional[str] = None
+    ):
+        """Memoiza o resultado do estágio (MongoDB; local só se ele falhar)"""
+        data_negocio = data_negocio or data_negocio_atual()
+        registro = {
+            "chave": chave_estagio(estagio, entradas, data_negocio),
+            "estagio": estagio,
+            "data_negocio": data_negocio,
+            "entradas": normalizar_entradas(entradas),
+            # Ida e volta em JSON: mesmo formato no MongoDB e no arquivo local
+            "resultado": json.loads(json.dumps(resultado, ensure_ascii=False, default=str)),
+            "salvo_em": datetime.now().isoformat()
+        }
+
+        if await self._mongodb_pronto():
+            try:
+                await mongodb_manager.database.memoizacao_estagios.replace_one(
+                    {"chave": registro["chave"]}, registro, upsert=True
+                )
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao memoizar no MongoDB: {str(e)}")
+                self._pausar_mongodb()
+
+        limite = (date.today() - timedelta(days=DIAS_RETENCAO_LOCAL)).isoformat()
+        if await sqlite_manager.salvar_memoizacao(registro, data_limite=limite) is not None:
+            return
+
+        # Último recurso: JSON local
+        try:
+            registros = self._carregar_local()
+            registros[registro["chave"]] = registro
+            self._salvar_local(registros)
+        except Exception as e:
+            logger.error(f"❌ Falha ao salvar memoização local: {str(e)}")
+
+    async def invalidar(
+        self,
+        estagio: Optional[str] = None,
+        data_negocio: Optional[str] = None,
+        entradas: Any = None
+    ) -> int:
+        """
+        Remove resultados memoizados
+
+        Args:
+            estagio: Apenas este estágio (padrão: todos)
+            data_negocio: Apenas esta data (padrão: todas)
+            entradas: Apenas registros cujas entradas contêm estes campos
+                (ex.: {"numero_titulo": "123"})
+
+        Returns:
+            Quantidade de registros removidos (maior entre MongoDB e local)
+        """
+        filtro: Dict[str, Any] = {}
+        if estagio:
+            filtro["estagio"] = estagio
+        if data_negocio:
+            filtro["data_negocio"] = data_negocio
+        for campo, valor in (normalizar_entradas(entradas) or {}).items():
+            filtro[f"entradas.{campo}"] = valor
+
+        removidos_mongodb = 0
+        if await self._mongodb_pronto():
+            try:
+                resultado = await mongodb_manager.database.memoizacao_estagios.delete_many(filtro)
+                removidos_mongodb = resultado.deleted_count
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao invalidar memoização no MongoDB: {str(e)}")
+                self._pausar_mongodb()
+
+        removidos_sqlite = await sqlite_manager.invalidar_memoizacao(filtro)
+
+        def corresponde(registro: Dict[str, Any]) -> bool:
+            for campo, valor in filtro.items():
+                if campo.startswith("entradas."):
+                    atual = (registro.get("entradas") or {}).get(campo[len("entradas."):])
+                else:
+                    atual = registro.get(campo)
+                if atual != valor:
+                    return False
+            return True
+
+        registros = self._carregar_local()
+        mantidos = {k: v for k, v in registros.items() if not corresponde(v)}
+        if len(mantidos) != len(registros):
+            self._salvar_local(mantidos)
+
+        removidos = max(removidos_mongodb, removidos_sqlite + len(registros) - len(mantidos))
+        logger.info(f"🧹 Memoização invalidada ({filtro or 'tudo'}): {removidos} registro(s)")
+        return removidos
+
+    async def executar(
+        self,
+        estagio: str,
+        entradas: Any,
+        funcao: Callable[[], Awaitable[ResultadoRPA]],
+        data_negocio: Optional[str] = None,
+        usar_cache: bool = True
+    ) -> Tuple[ResultadoRPA, bool]:
+        """
+        Executa o estágio ou devolve o resultado já memoizado
+
+        Args:
+            estagio: Nome do estágio (coleta, analise, sienge, sicredi)
+            entradas: Entradas que determinam o resultado (sem credenciais)
+            funcao: Corrotina sem argumentos que executa o estágio
+            data_negocio: Data de negócio (padrão: hoje)
+            usar_cache: Se False, executa sempre (e atualiza a memoização)
+
+        Returns:
+            (ResultadoRPA, True se veio da memoização)
+        """
+        if usar_cache:
+            memoizado = await self.obter(estagio, entradas, data_negocio)
+            if memoizado is not None:
+                logger.info(f"♻️ Estágio {estagio} reaproveitado da memoização ({data_negocio or data_negocio_atual()})")
+                return ResultadoRPA(
+                    sucesso=memoizado.get("sucesso", True),
+                    mensagem=memoizado.get("mensagem", ""),
+                    dados=memoizado.get("dados"),
+                    erro=memoizado.get("erro"),
+                    tempo_execucao=memoizado.get("tempo_execucao")
+                ), True
+
+        resultado = await funcao()
+        if resultado.sucesso:
+            await self.salvar(estagio, entradas, resultado.para_dict(), data_negocio)
+        return resultado, False
+
+    def _carregar_local(self) -> Dict[str, Any]:
+        """Registros do JSON local (relido só quando o arquivo muda)"""
+        try:
+            mtime_ns = os.stat(self.arquivo_local).st_mtime_ns
+        except OSError:
+            return {}
+        if self._cache_local[0] == mtime_ns:
+            return dict(self._cache_local[1])
+        try:
+            with open(self.arquivo_local, 'r', encoding='utf-8') as f:
+                registros = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Arquivo de memoização ilegível: {str(e)}")
+            return {}
+        self._cache_local = (mtime_ns, registros)
+        return dict(registros)
+
+    def _salvar_local(self, registros: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.arquivo_local), exist_ok=True)
+
+        # Mantém apenas datas de negócio recentes
+        limite = (date.today() - timedelta(days=DIAS_RETENCAO_LOCAL)).isoformat()
+        registros = {k: v for k, v in registros.items() if v.get("data_negocio", "") >= limite}
+
+        temporario = f"{self.arquivo_local}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(registros, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(temporario, self.arquivo_local)
+
+
+# Instância global
+memoizacao_estagios = MemoizacaoEstagios()
@@ -6,7 +6,8 @@ Desenvolvido em Português Brasileiro
 """
 
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, Any, List, Optional
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -68,6 +69,11 @@ class MongoDBManager:
                 ("data_processamento", pymongo.DESCENDING)
             ])
             
+            # Conciliação de retorno do Sicredi (busca por nosso número)
+            await self.database.contratos_processados.create_index([
+                ("nosso_numero", pymongo.ASCENDING)
+            ])
+            
             # Índices para fila de processamento Sienge
             await self.database.fila_processamento_sienge.create_index([
                 ("timestamp_criacao", pymongo.DESCENDING),
@@ -103,6 +109,78 @@ class MongoDBManager:
                 ("status_auditoria", pymongo.ASCENDING)
             ])
             
+            # Índices para checkpoints do RPA Sienge (um por contrato/ciclo)
+            await self.database.checkpoints_sienge.create_index([
+                ("ciclo", pymongo.ASCENDING),
+                ("numero_titulo", pymongo.ASCENDING)
+            ], unique=True)
+
+            await self.database.checkpoints_sienge.create_index([
+                ("ciclo", pymongo.ASCENDING),
+                ("status", pymongo.ASCENDING)
+            ])
+
+            # Memoização de estágios do workflow (reexecuções no mesmo dia)
+            await self.database.memoizacao_estagios.create_index([
+                ("chave", pymongo.ASCENDING)
+            ], unique=True)
+
+            await self.database.memoizacao_estagios.create_index([
+                ("estagio", pymongo.ASCENDING),
+                ("data_negocio", pymongo.ASCENDING)
+            ])
+
+            # Execuções da API (consulta por status/data e expiração por TTL)
+            await self.database.execucoes_api.create_index([
+                ("execucao_id", pymongo.ASCENDING)
+            ], unique=True)
+
+            await self.database.execucoes_api.create_index([
+                ("status", pymongo.ASCENDING),
+                ("inicio", pymongo.DESCENDING)
+            ])
+
+            await self.database.execucoes_api.create_index([
+                ("expira_em", pymongo.ASCENDING)
+            ], expireAfterSeconds=0)
+
+            await self.database.execucoes_api.create_index([
+                ("dados.chave_idempotencia", pymongo.ASCENDING),
+                ("inicio", pymongo.DESCENDING)
+            ])
+
+            # Agendador: lock por tarefa (expira sozinho) e histórico de duração
+            await self.database.locks_agendador.create_index([
+                ("expira_em", pymongo.ASCENDING)
+            ], expireAfterSeconds=3600)
+
+            await self.database.historico_agendador.create_index([
+                ("tarefa", pymongo.ASCENDING),
+                ("agendado_para", pymongo.DESCENDING)
+            ])
+
+            # Rollups do dashboard (leitura por período)
+            await self.database.rollups_execucoes.create_index([
+                ("granularidade", pymongo.ASCENDING),
+                ("periodo", pymongo.DESCENDING)
+            ])
+
+            await self.database.rollups_execucoes.create_index([
+                ("nome_rpa", pymongo.ASCENDING),
+                ("granularidade", pymongo.ASCENDING),
+                ("periodo", pymongo.DESCENDING)
+            ])
+
+            await self.database.rollups_planilhas.create_index([
+                ("granularidade", pymongo.ASCENDING),
+                ("periodo", pymongo.DESCENDING)
+            ])
+
+            await self.database.rollups_planilhas.create_index([
+                ("granularidade", pymongo.ASCENDING),
+                ("ativas", pymongo.ASCENDING)
+            ])
+
             logger.info("✅ Índices MongoDB criados")
             
         except Exception as e:
@@ -132,10 +210,14 @@ class MongoDBManager:
                 "erro": resultado.get("erro", None)
             }
             
-            result = await self.database.execucoes_rpa.insert_one(documento)
+            # Gravação em lote (core/escritor_lote): o _id já vem definido
+            from core.escritor_lote import escritor_lote
+            from core.rollups_execucoes import rollups_execucoes
+            execucao_id = await escritor_lote.inserir("execucoes_rpa", documento)
+            await rollups_execucoes.registrar_execucao(documento)
             
-            logger.info(f"💾 Execução {nome_rpa} salva no MongoDB: {result.inserted_id}")
-            return str(result.inserted_id)
+            logger.info(f"💾 Execução {nome_rpa} enviada ao MongoDB: {execucao_id}")
+            return execucao_id
             
         except Exception as e:
             logger.error(f"❌ Erro ao salvar execução: {str(e)}")
@@ -172,6 +254,8 @@ class MongoDBManager:
             await self.conectar()
         
         try:
+            from core.escritor_lote import escritor_lote
+
             # Salvar IPCA
             if "ipca" in indices_data:
                 doc_ipca = {
@@ -182,7 +266,7 @@ class MongoDBManager:
                     "periodo": "acumulado_12_meses",
                     "metodo_coleta": indices_data["ipca"].get("metodo", "webscraping")
                 }
-                await self.database.indices_economicos.insert_one(doc_ipca)
+                await escritor_lote.inserir("indices_economicos", doc_ipca)
             
             # Salvar IGPM
             if "igpm" in indices_data:
@@ -194,7 +278,7 @@ class MongoDBManager:
                     "periodo": "acumulado_12_meses",
                     "metodo_coleta": indices_data["igpm"].get("metodo", "webscraping")
                 }
-                await self.database.indices_economicos.insert_one(doc_igpm)
+                await escritor_lote.inserir("indices_economicos", doc_igpm)
             
             logger.info("💾 Índices econômicos salvos no MongoDB")
             return "success"
@@ -266,71 +350,153 @@ class MongoDBManager:
                 "dados_completos": contrato_data
             }
             
-            # Upsert baseado no número do título
-            result = await self.database.contratos_processados.replace_one(
+            # Upsert baseado no número do título (gravação em lote); o rollup
+            # diário só conta se o upsert criar o documento
+            from core.escritor_lote import escritor_lote
+            from core.rollups_execucoes import rollups_execucoes
+            await escritor_lote.substituir(
+                "contratos_processados",
                 {"numero_titulo": documento["numero_titulo"]},
                 documento,
-                upsert=True
+                se_inserido=rollups_execucoes.incremento_contrato(documento["data_processamento"])
             )
             
-            logger.info(f"💾 Contrato {documento['numero_titulo']} salvo no MongoDB")
-            return str(result.upserted_id) if result.upserted_id else "updated"
+            logger.info(f"💾 Contrato {documento['numero_titulo']} enviado ao MongoDB")
+            return "enfileirado"
             
         except Exception as e:
             logger.error(f"❌ Erro ao salvar contrato: {str(e)}")
             return None
     
-    async def obter_estatisticas_dashboard(self) -> Dict[str, Any]:
+    async def obter_contratos_processados(self, numeros_titulo: List[str]) -> Optional[List[Dict[str, Any]]]:
         """
-        Obtém estatísticas para o dashboard
+        Obtém contratos processados de vários títulos em uma única consulta ($in)
+        
+        Returns:
+            Lista de contratos (sem dados_completos) ou None se indisponível
         """
-        if not self.conectado:
-            await self.conectar()
+        if not self.conectado and not await self.conectar():
+            return None
         
         try:
-            # Total de execuções
-            total_execucoes = await self.database.execucoes_rpa.count_documents({})
-            
-            # Execuções hoje
-            hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            execucoes_hoje = await self.database.execucoes_rpa.count_documents({
-                "timestamp_inicio": {"$gte": hoje}
-            })
-            
-            # Taxa de sucesso últimos 30 dias
-            data_limite = datetime.now() - timedelta(days=30)
-            cursor_recentes = self.database.execucoes_rpa.find({
-                "timestamp_inicio": {"$gte": data_limite}
-            })
-            
-            total_recentes = 0
-            sucessos_recentes = 0
+            cursor = self.database.contratos_processados.find(
+                {"numero_titulo": {"$in": list(numeros_titulo)}},
+                {"_id": 0, "dados_completos": 0}
+            )
+            return await cursor.to_list(length=None)
             
-            async for doc in cursor_recentes:
-                total_recentes += 1
-                if doc.get("sucesso"):
-                    sucessos_recentes += 1
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter contratos processados: {str(e)}")
+            return None
+    
+    async def atualizar_retorno_contratos(self, atualizacoes: List[Dict[str, Any]]) -> int:
+        """
+        Grava a situação do retorno Sicredi de vários contratos em um bulk_write
+        
+        Args:
+            atualizacoes: Campos $set por contrato (devem conter numero_titulo)
+        
+        Returns:
+            Quantidade de contratos atualizados
+        """
+        if not atualizacoes:
+            return 0
+        if not self.conectado and not await self.conectar():
+            return 0
+        
+        try:
+            operacoes = [
+                pymongo.UpdateOne({"numero_titulo": campos["numero_titulo"]}, {"$set": campos})
+                for campos in atualizacoes
+            ]
+            resultado = await self.database.contratos_processados.bulk_write(operacoes, ordered=False)
+            logger.info(f"💾 Retorno Sicredi gravado em {resultado.modified_count} contratos")
+            return resultado.modified_count
             
-            taxa_sucesso = (sucessos_recentes / total_recentes * 100) if total_recentes > 0 else 0
+        except Exception as e:
+            logger.error(f"❌ Erro ao atualizar retorno dos contratos: {str(e)}")
+            return 0
+    
+    async def salvar_checkpoint_sienge(self, checkpoint: Dict[str, Any]) -> Optional[str]:
+        """
+        Salva checkpoint de contrato do RPA Sienge (upsert por ciclo + título)
+        
+        Returns:
+            "ok" se salvo, None em caso de erro
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+        
+        try:
+            await self.database.checkpoints_sienge.replace_one(
+                {"ciclo": checkpoint["ciclo"], "numero_titulo": checkpoint["numero_titulo"]},
+                checkpoint,
+                upsert=True
+            )
+            return "ok"
             
-            # Contratos processados últimos 30 dias
-            contratos_processados = await self.database.contratos_processados.count_documents({
-                "data_processamento": {"$gte": data_limite}
-            })
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar checkpoint: {str(e)}")
+            return None
+    
+    async def obter_checkpoint_sienge(self, ciclo: str, numero_titulo: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém checkpoint de contrato do RPA Sienge no ciclo
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+        
+        try:
+            return await self.database.checkpoints_sienge.find_one(
+                {"ciclo": ciclo, "numero_titulo": numero_titulo},
+                {"_id": 0}
+            )
             
-            return {
-                "total_execucoes": total_execucoes,
-                "execucoes_hoje": execucoes_hoje,
-                "taxa_sucesso": round(taxa_sucesso, 1),
-                "contratos_processados_mes": contratos_processados,
-                "ultima_atualizacao": datetime.now().isoformat()
-            }
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter checkpoint: {str(e)}")
+            return None
+    
+    async def obter_estatisticas_dashboard(self) -> Dict[str, Any]:
+        """
+        Obtém estatísticas para o dashboard (rollups pré-agregados, uma leitura)
+        """
+        if not self.conectado:
+            await self.conectar()
+        
+        try:
+            from core.rollups_execucoes import rollups_execucoes
+            return await rollups_execucoes.obter_estatisticas(dias=30)
             
         except Exception as e:
             logger.error(f"❌ Erro ao obter estatísticas: {str(e)}")
             return {}
     
-    async def obter_planilhas_cliente(self, numero_titulo: str = None, cliente: str = None, 
+    async def salvar_planilha_extraida(self, planilha: Dict[str, Any]) -> Optional[str]:
+        """
+        Registra planilha extraída para auditoria
+
+        Returns:
+            ID da planilha ou None em caso de erro
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            documento = dict(planilha)
+            documento.setdefault("data_extracao", datetime.now())
+            documento.setdefault("status_auditoria", "ativo")
+            resultado = await self.database.planilhas_extraidas.insert_one(documento)
+
+            # Contadores do dashboard mantidos na gravação (core/rollups_execucoes)
+            from core.rollups_execucoes import rollups_execucoes
+            await rollups_execucoes.registrar_planilha(documento)
+            return str(resultado.inserted_id)
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar planilha extraída: {str(e)}")
+            return None
+
+    async def obter_planilhas_cliente(self, numero_titulo: str = None, cliente: str = None,
                                      limite: int = 10) -> List[Dict[str, Any]]:
         """
         Obtém planilhas extraídas de um cliente específico para auditoria
@@ -365,48 +531,15 @@ class MongoDBManager:
 
     async def obter_estatisticas_planilhas(self) -> Dict[str, Any]:
         """
-        Obtém estatísticas das planilhas extraídas para dashboard
+        Obtém estatísticas das planilhas extraídas para dashboard (contadores
+        mantidos na gravação, sem varrer planilhas_extraidas)
         """
         if not self.conectado:
             await self.conectar()
         
         try:
-            # Total de planilhas
-            total_planilhas = await self.database.planilhas_extraidas.count_documents({
-                "status_auditoria": "ativo"
-            })
-            
-            # Planilhas hoje
-            hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            planilhas_hoje = await self.database.planilhas_extraidas.count_documents({
-                "data_extracao": {"$gte": hoje},
-                "status_auditoria": "ativo"
-            })
-            
-            # Últimos 7 dias
-            data_limite = datetime.now() - timedelta(days=7)
-            planilhas_semana = await self.database.planilhas_extraidas.count_documents({
-                "data_extracao": {"$gte": data_limite},
-                "status_auditoria": "ativo"
-            })
-            
-            # Clientes únicos com planilhas
-            pipeline = [
-                {"$match": {"status_auditoria": "ativo"}},
-                {"$group": {"_id": "$cliente"}},
-                {"$count": "total"}
-            ]
-            
-            resultado_clientes = await self.database.planilhas_extraidas.aggregate(pipeline).to_list(1)
-            clientes_unicos = resultado_clientes[0]["total"] if resultado_clientes else 0
-            
-            return {
-                "total_planilhas": total_planilhas,
-                "planilhas_hoje": planilhas_hoje,
-                "planilhas_semana": planilhas_semana,
-                "clientes_unicos": clientes_unicos,
-                "ultima_atualizacao": datetime.now().isoformat()
-            }
+            from core.rollups_execucoes import rollups_execucoes
+            return await rollups_execucoes.obter_estatisticas_planilhas()
             
         except Exception as e:
             logger.error(f"❌ Erro ao obter estatísticas de planilhas: {str(e)}")
@@ -421,18 +554,25 @@ class MongoDBManager:
         
         try:
             from bson import ObjectId
-            result = await self.database.planilhas_extraidas.update_one(
-                {"_id": ObjectId(planilha_id)},
+            # Documento anterior: só uma planilha ativa sai dos contadores
+            anterior = await self.database.planilhas_extraidas.find_one_and_update(
+                {"_id": ObjectId(planilha_id), "status_auditoria": "ativo"},
                 {
                     "$set": {
                         "status_auditoria": "inativo",
                         "data_inativacao": datetime.now()
                     }
-                }
+                },
+                projection={"data_extracao": 1, "cliente": 1}
             )
+            if anterior is None:
+                return False
+
+            from core.rollups_execucoes import rollups_execucoes
+            await rollups_execucoes.registrar_planilha(anterior, ativa=False)
             
             logger.info(f"📋 Planilha {planilha_id} marcada como inativa")
-            return result.modified_count > 0
+            return True
             
         except Exception as e:
             logger.error(f"❌ Erro ao marcar planilha como inativa: {str(e)}")
@@ -440,9 +580,12 @@ class MongoDBManager:
 
     async def desconectar(self):
         """
-        Desconecta do MongoDB
+        Desconecta do MongoDB (após gravar o que está no buffer de lote)
         """
         if self.client:
+            from core.escritor_lote import escritor_lote
+            await escritor_lote.encerrar()
+
             self.client.close()
             self.conectado = False
             logger.info("🔌 Desconectado do MongoDB")
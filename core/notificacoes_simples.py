@@ -20,9 +20,9 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 try:
-    from google.oauth2.service_account import Credentials
-    from googleapiclient.discovery import build
-    GOOGLE_DISPONIVEL = True
+    import googleapiclient.discovery  # noqa: F401
+    from core.credenciais_google import cache_credenciais_google, GOOGLE_AUTH_DISPONIVEL
+    GOOGLE_DISPONIVEL = GOOGLE_AUTH_DISPONIVEL
 except ImportError:
     GOOGLE_DISPONIVEL = False
     logger.warning("Bibliotecas do Google não disponíveis. Instale: pip install google-api-python-client google-auth")
@@ -67,20 +67,12 @@ class NotificadorEmail:
                 logger.warning("Arquivo de credenciais do Google não encontrado")
                 return
             
-            # Carregar credenciais
-            credentials = Credentials.from_service_account_file(
-                arquivo_credenciais,
-                scopes=['https://www.googleapis.com/auth/gmail.send']
-            )
-            
             # Configurar email do remetente (deve ser delegado na conta de serviço)
             self.email_remetente = os.getenv('EMAIL_REMETENTE', 'sistema.rpa@empresa.com')
             
-            # Delegar credenciais para o email remetente
-            delegated_credentials = credentials.with_subject(self.email_remetente)
-            
-            # Criar serviço Gmail
-            self.service = build('gmail', 'v1', credentials=delegated_credentials)
+            # Serviço Gmail delegado ao remetente, compartilhado no processo
+            # (token reaproveitado e discovery em cache local)
+            self.service = cache_credenciais_google.servico_gmail(arquivo_credenciais, self.email_remetente)
             
             logger.info(f"Gmail API inicializada com sucesso para {self.email_remetente}")
             
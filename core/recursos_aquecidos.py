@@ -0,0 +1,168 @@
+"""
+Recursos Aquecidos - Browsers, clientes Google Sheets e MongoDB reaproveitados
+Usado pelo daemon RPA (core/daemon_rpa.py) para evitar partida a frio por job
+
+Desenvolvido em Português Brasileiro
+
+Fora do daemon nada muda: recursos_ativos() retorna None e cada RPA abre e
+fecha seus próprios recursos. Dentro do daemon:
+- BaseRPA empresta um Firefox do pool em vez de abrir outro, e devolve ao
+  finalizar (sem fechar e sem desconectar o MongoDB)
+- Clientes gspread, tokens e o serviço Gmail ficam no cache do processo
+  (core/credenciais_google), que a reciclagem renova
+
+Reciclagem: reciclar() troca a geração; browsers ociosos fecham na hora e
+os emprestados fecham quando devolvidos, sem interromper jobs.
+"""
+
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+from core.credenciais_google import cache_credenciais_google
+
+logger = logging.getLogger(__name__)
+
+# Instância ativa no processo (definida pelo daemon)
+_recursos: Optional["RecursosAquecidos"] = None
+
+
+def recursos_ativos() -> Optional["RecursosAquecidos"]:
+    """Recursos aquecidos do processo, ou None fora do daemon"""
+    return _recursos
+
+
+def ativar_recursos(recursos: Optional["RecursosAquecidos"]):
+    global _recursos
+    _recursos = recursos
+
+
+class RecursosAquecidos:
+    """
+    Pool de browsers + conexão MongoDB persistente + cache Google do processo
+    """
+
+    def __init__(self, max_browsers_ociosos: int = 2, headless: bool = False):
+        self.max_browsers_ociosos = max_browsers_ociosos
+        self.headless = headless
+        self.geracao = 0
+        self.criado_em = time.monotonic()
+        self.reciclado_em: Optional[float] = None
+        self._browsers_ociosos: List[Any] = []
+        self._browsers_emprestados: Dict[int, int] = {}
+        self.browsers_criados = 0
+
+    # ------------------------------------------------------------------
+    # Browsers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _browser_saudavel(browser) -> bool:
+        driver = getattr(browser, "_driver", None)
+        if driver is None:
+            return False
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _fechar_browser(browser):
+        try:
+            browser.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao fechar browser: {str(e)}")
+
+    def emprestar_browser(self):
+        """Browser ocioso saudável do pool, ou um novo"""
+        while self._browsers_ociosos:
+            browser = self._browsers_ociosos.pop()
+            if self._browser_saudavel(browser):
+                self._browsers_emprestados[id(browser)] = self.geracao
+                return browser
+            logger.warning("⚠️ Browser ocioso não responde - descartado")
+            self._fechar_browser(browser)
+
+        from core.browser_manager import RPABrowser
+        browser = RPABrowser(headless=self.headless)
+        self.browsers_criados += 1
+        self._browsers_emprestados[id(browser)] = self.geracao
+        logger.info(f"🦊 Novo browser no pool (total criado: {self.browsers_criados})")
+        return browser
+
+    def devolver_browser(self, browser):
+        """Volta ao pool se saudável, da geração atual e houver vaga; senão fecha"""
+        geracao = self._browsers_emprestados.pop(id(browser), None)
+        if (geracao == self.geracao and len(self._browsers_ociosos) < self.max_browsers_ociosos
+                and self._browser_saudavel(browser)):
+            try:
+                # Sessão limpa para o próximo job (cookies/login de outro sistema)
+                browser._driver.delete_all_cookies()
+                browser._driver.get("about:blank")
+                self._browsers_ociosos.append(browser)
+                return
+            except Exception:
+                pass
+        self._fechar_browser(browser)
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    async def aquecer(self, browsers: int = 1):
+        """Abre de antemão o que os jobs vão precisar"""
+        try:
+            from core.mongodb_manager import mongodb_manager
+            if not mongodb_manager.conectado:
+                await mongodb_manager.conectar()
+        except ImportError:
+            pass
+
+        try:
+            # Instancia o notificador (Gmail) uma vez para o processo
+            import core.notificacoes_simples  # noqa: F401
+        except Exception as e:
+            logger.warning(f"⚠️ Notificações indisponíveis: {str(e)}")
+
+        for _ in range(min(browsers, self.max_browsers_ociosos)):
+            try:
+                browser = self.emprestar_browser()
+                self.devolver_browser(browser)
+            except Exception as e:
+                logger.warning(f"⚠️ Não foi possível aquecer browser: {str(e)}")
+                break
+
+    def reciclar(self):
+        """Nova geração: fecha ociosos e descarta clientes; emprestados fecham ao voltar"""
+        self.geracao += 1
+        self.reciclado_em = time.monotonic()
+        for browser in self._browsers_ociosos:
+            self._fechar_browser(browser)
+        self._browsers_ociosos = []
+        cache_credenciais_google.limpar()
+        logger.info(f"♻️ Recursos reciclados (geração {self.geracao})")
+
+    def encerrar(self):
+        """Fecha tudo (desligamento do daemon)"""
+        for browser in self._browsers_ociosos:
+            self._fechar_browser(browser)
+        self._browsers_ociosos = []
+        cache_credenciais_google.limpar()
+        logger.info("🧹 Recursos aquecidos encerrados")
+
+    def saude(self) -> Dict[str, Any]:
+        try:
+            from core.mongodb_manager import mongodb_manager
+            mongodb = mongodb_manager.conectado
+        except ImportError:
+            mongodb = None
+        return {
+            "geracao": self.geracao,
+            "browsers_ociosos": len(self._browsers_ociosos),
+            "browsers_emprestados": len(self._browsers_emprestados),
+            "browsers_criados": self.browsers_criados,
+            "google": cache_credenciais_google.estatisticas(),
+            "mongodb_conectado": mongodb,
+            "idade_segundos": round(time.monotonic() - (self.reciclado_em or self.criado_em), 1)
+        }
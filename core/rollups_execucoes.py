@@ -0,0 +1,345 @@
+"""
+Rollups de Execuções - Estatísticas do dashboard mantidas na gravação
+Contadores por RPA e por dia/hora em vez de varrer execucoes_rpa
+
+Desenvolvido em Português Brasileiro
+
+Cada execução gravada incrementa (via core/escritor_lote, em lote) três
+documentos da coleção rollups_execucoes para o RPA e três para "_todos":
+- granularidade "hora" e "dia": total, sucessos, erros, soma das durações
+  e histograma de duração
+- granularidade "total": o acumulado desde sempre
+
+Contratos processados entram no bucket diário de "_todos" só quando o
+upsert em contratos_processados cria o documento (incremento condicional do
+escritor em lote), então reprocessar um título não conta de novo - mesma
+contagem de documentos distintos de reconstruir(). O dashboard lê tudo em
+uma consulta indexada (granularidade, periodo).
+
+reconstruir() refaz os rollups a partir de execucoes_rpa/contratos_processados
+- usado na primeira implantação (histórico anterior) e para corrigir
+contagens duplicadas por reenvio de spool.
+
+Planilhas extraídas (auditoria) seguem o mesmo esquema na coleção
+rollups_planilhas: planilhas ativas no total, por dia de extração e por
+cliente, incrementadas ao registrar e decrementadas ao inativar, com
+reconstruir_planilhas() para o histórico anterior.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pymongo
+    from core.mongodb_manager import mongodb_manager
+    from core.escritor_lote import escritor_lote
+    MONGODB_DISPONIVEL = True
+except ImportError:
+    MONGODB_DISPONIVEL = False
+
+TODOS_RPAS = "_todos"
+COLECAO_ROLLUPS = "rollups_execucoes"
+COLECAO_ROLLUPS_PLANILHAS = "rollups_planilhas"
+
+# Faixas do histograma de duração (limite superior em segundos)
+FAIXAS_DURACAO: List[Tuple[str, float]] = [
+    ("ate_10s", 10),
+    ("ate_30s", 30),
+    ("ate_1min", 60),
+    ("ate_5min", 300),
+    ("ate_15min", 900),
+    ("ate_1h", 3600),
+    ("acima_1h", float("inf")),
+]
+
+
+def faixa_duracao(segundos: Optional[float]) -> str:
+    segundos = segundos or 0
+    for nome, limite in FAIXAS_DURACAO:
+        if segundos < limite:
+            return nome
+    return FAIXAS_DURACAO[-1][0]
+
+
+def inicio_periodo(momento: datetime, granularidade: str) -> datetime:
+    if granularidade == "hora":
+        return momento.replace(minute=0, second=0, microsecond=0)
+    if granularidade == "dia":
+        return momento.replace(hour=0, minute=0, second=0, microsecond=0)
+    return datetime(1970, 1, 1)
+
+
+def chave_rollup(nome_rpa: str, granularidade: str, periodo: Optional[datetime]) -> str:
+    if granularidade == "total":
+        return f"{nome_rpa}|total"
+    formato = "%Y-%m-%dT%H" if granularidade == "hora" else "%Y-%m-%d"
+    return f"{nome_rpa}|{granularidade}|{periodo.strftime(formato)}"
+
+
+class RollupsExecucoes:
+    """
+    Contadores pré-agregados das execuções para o dashboard
+    """
+
+    def __init__(self):
+        self._historico_verificado = False
+        self._planilhas_verificadas = False
+
+    @staticmethod
+    def _operacao(nome_rpa: str, granularidade: str, momento: datetime, incrementos: Dict[str, Any]) -> Dict[str, Any]:
+        periodo = inicio_periodo(momento, granularidade)
+        return {
+            "colecao": COLECAO_ROLLUPS,
+            "filtro": {"_id": chave_rollup(nome_rpa, granularidade, periodo)},
+            "incrementos": incrementos,
+            "ao_inserir": {"nome_rpa": nome_rpa, "granularidade": granularidade, "periodo": periodo}
+        }
+
+    async def _incrementar(self, nome_rpa: str, granularidade: str, momento: datetime, incrementos: Dict[str, Any]):
+        await escritor_lote.incrementar(**self._operacao(nome_rpa, granularidade, momento, incrementos))
+
+    async def registrar_execucao(self, documento: Dict[str, Any]):
+        """Incrementa os rollups de uma execução (documento de execucoes_rpa)"""
+        momento = documento.get("timestamp_inicio") or datetime.now()
+        sucesso = bool(documento.get("sucesso"))
+        duracao = documento.get("tempo_execucao_segundos") or 0
+        incrementos = {
+            "total": 1,
+            "sucessos": 1 if sucesso else 0,
+            "erros": 0 if sucesso else 1,
+            "duracao_total_segundos": duracao,
+            f"histograma_duracao.{faixa_duracao(duracao)}": 1
+        }
+
+        for nome_rpa in (documento.get("nome_rpa") or "desconhecido", TODOS_RPAS):
+            for granularidade in ("hora", "dia", "total"):
+                await self._incrementar(nome_rpa, granularidade, momento, incrementos)
+
+    def incremento_contrato(self, momento: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Incremento de um contrato processado no dia, para o se_inserido do
+        upsert em contratos_processados (conta só títulos novos)
+        """
+        return self._operacao(TODOS_RPAS, "dia", momento or datetime.now(), {"contratos_processados": 1})
+
+    async def obter_estatisticas(self, dias: int = 30) -> Dict[str, Any]:
+        """Estatísticas do dashboard em uma única leitura indexada"""
+        # Primeira leitura do processo: rollups vazios com execuções antigas = implantação nova
+        if not self._historico_verificado:
+            self._historico_verificado = True
+            if (not await mongodb_manager.database[COLECAO_ROLLUPS].find_one({"_id": chave_rollup(TODOS_RPAS, "total", None)})
+                    and await mongodb_manager.database.execucoes_rpa.find_one({}, {"_id": 1})):
+                await self.reconstruir()
+
+        hoje = inicio_periodo(datetime.now(), "dia")
+        data_limite = hoje - timedelta(days=dias - 1)
+
+        cursor = mongodb_manager.database[COLECAO_ROLLUPS].find({
+            "$or": [
+                {"granularidade": "dia", "periodo": {"$gte": data_limite}},
+                {"granularidade": "total", "nome_rpa": TODOS_RPAS}
+            ]
+        })
+
+        total_execucoes = 0
+        hoje_total = 0
+        periodo_total = 0
+        periodo_sucessos = 0
+        contratos = 0
+        por_rpa: Dict[str, Dict[str, Any]] = {}
+
+        async for doc in cursor:
+            if doc["granularidade"] == "total":
+                total_execucoes = doc.get("total", 0)
+                continue
+
+            if doc["nome_rpa"] == TODOS_RPAS:
+                periodo_total += doc.get("total", 0)
+                periodo_sucessos += doc.get("sucessos", 0)
+                contratos += doc.get("contratos_processados", 0)
+                if doc["periodo"] == hoje:
+                    hoje_total = doc.get("total", 0)
+                continue
+
+            rpa = por_rpa.setdefault(doc["nome_rpa"], {"execucoes": 0, "sucessos": 0, "duracao_total_segundos": 0})
+            rpa["execucoes"] += doc.get("total", 0)
+            rpa["sucessos"] += doc.get("sucessos", 0)
+            rpa["duracao_total_segundos"] += doc.get("duracao_total_segundos", 0)
+
+        for rpa in por_rpa.values():
+            execucoes = rpa["execucoes"]
+            rpa["taxa_sucesso"] = round(rpa["sucessos"] / execucoes * 100, 1) if execucoes else 0
+            rpa["duracao_media_segundos"] = round(rpa.pop("duracao_total_segundos") / execucoes, 1) if execucoes else 0
+
+        return {
+            "total_execucoes": total_execucoes,
+            "execucoes_hoje": hoje_total,
+            "taxa_sucesso": round(periodo_sucessos / periodo_total * 100, 1) if periodo_total else 0,
+            "contratos_processados_mes": contratos,
+            "por_rpa": por_rpa,
+            "ultima_atualizacao": datetime.now().isoformat()
+        }
+
+    async def obter_serie(self, granularidade: str = "hora", desde: Optional[datetime] = None,
+                          nome_rpa: str = TODOS_RPAS) -> List[Dict[str, Any]]:
+        """Série temporal (hora/dia) de um RPA para gráficos"""
+        desde = desde or datetime.now() - timedelta(hours=24)
+        cursor = mongodb_manager.database[COLECAO_ROLLUPS].find({
+            "nome_rpa": nome_rpa,
+            "granularidade": granularidade,
+            "periodo": {"$gte": inicio_periodo(desde, granularidade)}
+        }).sort("periodo", pymongo.ASCENDING)
+        return [doc async for doc in cursor]
+
+    async def reconstruir(self, dias: Optional[int] = None) -> int:
+        """
+        Recalcula os rollups a partir das coleções de origem
+
+        Args:
+            dias: Só os últimos N dias (None = tudo, incluindo os totais)
+
+        Returns:
+            Número de documentos de rollup gravados
+        """
+        await escritor_lote.descarregar()
+        database = mongodb_manager.database
+        filtro_execucoes: Dict[str, Any] = {}
+        filtro_contratos: Dict[str, Any] = {}
+        if dias:
+            limite = inicio_periodo(datetime.now(), "dia") - timedelta(days=dias - 1)
+            filtro_execucoes = {"timestamp_inicio": {"$gte": limite}}
+            filtro_contratos = {"data_processamento": {"$gte": limite}}
+
+        rollups: Dict[str, Dict[str, Any]] = {}
+
+        def acumular(nome_rpa, granularidade, momento, incrementos):
+            periodo = inicio_periodo(momento, granularidade)
+            doc = rollups.setdefault(chave_rollup(nome_rpa, granularidade, periodo), {
+                "nome_rpa": nome_rpa, "granularidade": granularidade, "periodo": periodo
+            })
+            for campo, valor in incrementos.items():
+                if campo.startswith("histograma_duracao."):
+                    histograma = doc.setdefault("histograma_duracao", {})
+                    faixa = campo.split(".", 1)[1]
+                    histograma[faixa] = histograma.get(faixa, 0) + valor
+                else:
+                    doc[campo] = doc.get(campo, 0) + valor
+
+        granularidades = ("hora", "dia") if dias else ("hora", "dia", "total")
+        projecao = {"nome_rpa": 1, "timestamp_inicio": 1, "sucesso": 1, "tempo_execucao_segundos": 1}
+        async for execucao in database.execucoes_rpa.find(filtro_execucoes, projecao):
+            duracao = execucao.get("tempo_execucao_segundos") or 0
+            sucesso = bool(execucao.get("sucesso"))
+            incrementos = {
+                "total": 1, "sucessos": int(sucesso), "erros": int(not sucesso),
+                "duracao_total_segundos": duracao,
+                f"histograma_duracao.{faixa_duracao(duracao)}": 1
+            }
+            momento = execucao.get("timestamp_inicio") or datetime.now()
+            for nome_rpa in (execucao.get("nome_rpa") or "desconhecido", TODOS_RPAS):
+                for granularidade in granularidades:
+                    acumular(nome_rpa, granularidade, momento, incrementos)
+
+        async for contrato in database.contratos_processados.find(filtro_contratos, {"data_processamento": 1}):
+            acumular(TODOS_RPAS, "dia", contrato.get("data_processamento") or datetime.now(),
+                     {"contratos_processados": 1})
+
+        filtro_remocao: Dict[str, Any] = {"granularidade": {"$in": list(granularidades)}}
+        if dias:
+            filtro_remocao["periodo"] = {"$gte": limite}
+        await database[COLECAO_ROLLUPS].delete_many(filtro_remocao)
+
+        if rollups:
+            await database[COLECAO_ROLLUPS].insert_many(
+                [dict(doc, _id=chave) for chave, doc in rollups.items()], ordered=False
+            )
+        logger.info(f"📊 Rollups reconstruídos: {len(rollups)} documento(s)")
+        return len(rollups)
+
+    # ------------------------------------------------------------------
+    # Planilhas extraídas (auditoria)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _operacoes_planilha(planilha: Dict[str, Any], incremento: int) -> List[Dict[str, Any]]:
+        """Contadores da planilha: total, dia de extração e cliente"""
+        momento = planilha.get("data_extracao")
+        dia = inicio_periodo(momento if isinstance(momento, datetime) else datetime.now(), "dia")
+        cliente = planilha.get("cliente") or ""
+        return [
+            {"colecao": COLECAO_ROLLUPS_PLANILHAS, "filtro": {"_id": chave}, "incrementos": {"ativas": incremento},
+             "ao_inserir": ao_inserir}
+            for chave, ao_inserir in (
+                ("total", {"granularidade": "total"}),
+                (f"dia|{dia.strftime('%Y-%m-%d')}", {"granularidade": "dia", "periodo": dia}),
+                (f"cliente|{cliente}", {"granularidade": "cliente", "cliente": cliente}),
+            )
+        ]
+
+    async def registrar_planilha(self, planilha: Dict[str, Any], ativa: bool = True):
+        """Conta uma planilha ativa (ou desconta, ao inativar)"""
+        for operacao in self._operacoes_planilha(planilha, 1 if ativa else -1):
+            await escritor_lote.incrementar(**operacao)
+
+    async def obter_estatisticas_planilhas(self) -> Dict[str, Any]:
+        """Estatísticas de planilhas ativas (semana = últimos 7 dias de calendário, incluindo hoje)"""
+        database = mongodb_manager.database
+        if not self._planilhas_verificadas:
+            self._planilhas_verificadas = True
+            if (not await database[COLECAO_ROLLUPS_PLANILHAS].find_one({"_id": "total"})
+                    and await database.planilhas_extraidas.find_one({"status_auditoria": "ativo"}, {"_id": 1})):
+                await self.reconstruir_planilhas()
+
+        hoje = inicio_periodo(datetime.now(), "dia")
+        total = planilhas_hoje = planilhas_semana = 0
+        cursor = database[COLECAO_ROLLUPS_PLANILHAS].find({
+            "$or": [
+                {"_id": "total"},
+                {"granularidade": "dia", "periodo": {"$gte": hoje - timedelta(days=6)}}
+            ]
+        })
+        async for doc in cursor:
+            if doc["granularidade"] == "total":
+                total = doc.get("ativas", 0)
+                continue
+            planilhas_semana += doc.get("ativas", 0)
+            if doc["periodo"] == hoje:
+                planilhas_hoje = doc.get("ativas", 0)
+
+        clientes_unicos = await database[COLECAO_ROLLUPS_PLANILHAS].count_documents(
+            {"granularidade": "cliente", "ativas": {"$gt": 0}}
+        )
+        return {
+            "total_planilhas": total,
+            "planilhas_hoje": planilhas_hoje,
+            "planilhas_semana": planilhas_semana,
+            "clientes_unicos": clientes_unicos,
+            "ultima_atualizacao": datetime.now().isoformat()
+        }
+
+    async def reconstruir_planilhas(self) -> int:
+        """Recalcula os contadores de planilhas a partir de planilhas_extraidas"""
+        await escritor_lote.descarregar()
+        database = mongodb_manager.database
+        rollups: Dict[str, Dict[str, Any]] = {}
+
+        projecao = {"data_extracao": 1, "cliente": 1}
+        async for planilha in database.planilhas_extraidas.find({"status_auditoria": "ativo"}, projecao):
+            for operacao in self._operacoes_planilha(planilha, 1):
+                doc = rollups.setdefault(operacao["filtro"]["_id"], dict(operacao["ao_inserir"], ativas=0))
+                doc["ativas"] += 1
+
+        await database[COLECAO_ROLLUPS_PLANILHAS].delete_many({})
+        if rollups:
+            await database[COLECAO_ROLLUPS_PLANILHAS].insert_many(
+                [dict(doc, _id=chave) for chave, doc in rollups.items()], ordered=False
+            )
+        logger.info(f"📊 Rollups de planilhas reconstruídos: {len(rollups)} documento(s)")
+        return len(rollups)
+
+
+# Instância global
+rollups_execucoes = RollupsExecucoes() if MONGODB_DISPONIVEL else None
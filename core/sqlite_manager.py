@@ -0,0 +1,1129 @@
+"""
+SQLite Manager
+Backend local (offline) com a mesma interface do MongoDBManager
+
+Desenvolvido em Português Brasileiro
+
+Sem MongoDB, execuções, fila, índices e planilhas extraídas iam para
+arquivos JSON avulsos, sem índices nem controle de concorrência. Aqui tudo
+fica em um banco SQLite em dados_processamento/ (sqlite3 da biblioteca
+padrão):
+- WAL: leitores não bloqueiam o escritor, então vários workers no mesmo
+  host leem e gravam ao mesmo tempo; escritas usam BEGIN IMMEDIATE e
+  esperam a trava por até `timeout` segundos em vez de falhar
+- Cada tabela guarda o documento inteiro em JSON (datas preservadas) e
+  copia para colunas os campos filtrados/ordenados, com os mesmos índices
+  criados no MongoDB
+- Os métodos públicos são os do MongoDBManager (async, mesmos retornos);
+  as consultas rodam em threads (asyncio.to_thread), uma conexão por thread
+
+Fila de processamento: no MongoDB é um documento único com a lista
+"contratos"; aqui cada contrato é uma linha (status indexado), então marcar
+um contrato como processado é um UPDATE, não a regravação da fila.
+
+Configuração (.env):
+- RPA_SQLITE_ARQUIVO: caminho do banco local
+- RPA_SQLITE_TIMEOUT_SEGUNDOS: espera pela trava de escrita
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_PADRAO = os.path.join("dados_processamento", "rpa_local.sqlite3")
+TIMEOUT_PADRAO = 30.0
+
+# Parâmetros por consulta IN (limite de variáveis do SQLite)
+TAMANHO_BLOCO_IN = 500
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes_rpa (
+    id TEXT PRIMARY KEY,
+    nome_rpa TEXT NOT NULL,
+    timestamp_inicio TEXT NOT NULL,
+    sucesso INTEGER NOT NULL,
+    tempo_execucao_segundos REAL NOT NULL DEFAULT 0,
+    documento TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_execucoes_rpa_nome_inicio ON execucoes_rpa (nome_rpa, timestamp_inicio DESC);
+
+CREATE TABLE IF NOT EXISTS execucoes_api (
+    execucao_id TEXT PRIMARY KEY,
+    status TEXT,
+    inicio TEXT,
+    chave_idempotencia TEXT,
+    expira_em TEXT NOT NULL,
+    documento TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_execucoes_api_status_inicio ON execucoes_api (status, inicio DESC);
+CREATE INDEX IF NOT EXISTS idx_execucoes_api_inicio ON execucoes_api (inicio DESC);
+CREATE INDEX IF NOT EXISTS idx_execucoes_api_chave ON execucoes_api (chave_idempotencia, inicio DESC);
+CREATE INDEX IF NOT EXISTS idx_execucoes_api_expira ON execucoes_api (expira_em);
+CREATE INDEX IF NOT EXISTS idx_execucoes_rpa_inicio ON execucoes_rpa (timestamp_inicio DESC);
+
+CREATE TABLE IF NOT EXISTS indices_economicos (
+    id INTEGER PRIMARY KEY,
+    tipo_indice TEXT NOT NULL,
+    data_coleta TEXT NOT NULL,
+    documento TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_indices_economicos_tipo_data ON indices_economicos (tipo_indice, data_coleta DESC);
+
+CREATE TABLE IF NOT EXISTS indices_coletados (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    documento TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_indices_coletados_timestamp ON indices_coletados (timestamp DESC);
+
+CREATE TABLE IF NOT EXISTS contratos_processados (
+    numero_titulo TEXT PRIMARY KEY,
+    nosso_numero TEXT,
+    data_processamento TEXT NOT NULL,
+    documento TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_contratos_processados_nosso_numero ON contratos_processados (nosso_numero);
+CREATE INDEX IF NOT EXISTS idx_contratos_processados_data ON contratos_processados (data_processamento DESC);
+
+CREATE TABLE IF NOT EXISTS fila_processamento_sienge (
+    posicao INTEGER PRIMARY KEY,
+    numero_titulo TEXT NOT NULL,
+    status_processamento TEXT NOT NULL,
+    processado_em TEXT,
+    erro_processamento TEXT,
+    documento TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fila_sienge_titulo ON fila_processamento_sienge (numero_titulo);
+CREATE INDEX IF NOT EXISTS idx_fila_sienge_status ON fila_processamento_sienge (status_processamento, posicao);
+
+CREATE TABLE IF NOT EXISTS checkpoints_sienge (
+    ciclo TEXT NOT NULL,
+    numero_titulo TEXT NOT NULL,
+    status TEXT,
+    documento TEXT NOT NULL,
+    PRIMARY KEY (ciclo, numero_titulo)
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_sienge_status ON checkpoints_sienge (ciclo, status);
+
+CREATE TABLE IF NOT EXISTS planilhas_extraidas (
+    id TEXT PRIMARY KEY,
+    numero_titulo TEXT,
+    cliente TEXT,
+    data_extracao TEXT NOT NULL,
+    origem_sistema TEXT,
+    status_auditoria TEXT NOT NULL,
+    documento TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_planilhas_titulo_data ON planilhas_extraidas (numero_titulo, data_extracao DESC);
+CREATE INDEX IF NOT EXISTS idx_planilhas_cliente_data ON planilhas_extraidas (cliente, data_extracao DESC);
+CREATE INDEX IF NOT EXISTS idx_planilhas_origem_status ON planilhas_extraidas (origem_sistema, status_auditoria);
+CREATE INDEX IF NOT EXISTS idx_planilhas_status_data ON planilhas_extraidas (status_auditoria, data_extracao DESC);
+
+CREATE TABLE IF NOT EXISTS memoizacao_estagios (
+    chave TEXT PRIMARY KEY,
+    estagio TEXT NOT NULL,
+    data_negocio TEXT NOT NULL,
+    documento TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_memoizacao_estagio_data ON memoizacao_estagios (estagio, data_negocio);
+CREATE INDEX IF NOT EXISTS idx_memoizacao_data ON memoizacao_estagios (data_negocio);
+
+CREATE TABLE IF NOT EXISTS metadados (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+"""
+
+
+def _data(valor: Any) -> str:
+    """Datas das colunas: ISO com microssegundos (ordem textual = cronológica)"""
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    return valor.isoformat(timespec="microseconds")
+
+
+def _codificar(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return {"$date": _data(valor)}
+    return str(valor)
+
+
+def _decodificar(objeto: Dict[str, Any]) -> Any:
+    if len(objeto) == 1 and "$date" in objeto:
+        return datetime.fromisoformat(objeto["$date"])
+    return objeto
+
+
+def _para_json(documento: Dict[str, Any]) -> str:
+    return json.dumps(documento, ensure_ascii=False, default=_codificar)
+
+
+def _de_json(texto: str) -> Dict[str, Any]:
+    return json.loads(texto, object_hook=_decodificar)
+
+
+class SQLiteManager:
+    """
+    Gerenciador SQLite (WAL) para operação offline dos RPAs
+    """
+
+    def __init__(self, caminho: str = None, timeout: float = None):
+        self.caminho = caminho or os.getenv("RPA_SQLITE_ARQUIVO", ARQUIVO_PADRAO)
+        self.timeout = float(os.getenv("RPA_SQLITE_TIMEOUT_SEGUNDOS", TIMEOUT_PADRAO)) \
+            if timeout is None else timeout
+        self.conectado = False
+        self._local = threading.local()
+        self._conexoes: List[sqlite3.Connection] = []
+        self._trava = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Conexão
+    # ------------------------------------------------------------------
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão da thread atual (sqlite3 não compartilha conexões entre threads)"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=self.timeout,
+                                      isolation_level=None, check_same_thread=False)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+            with self._trava:
+                self._conexoes.append(conexao)
+        return conexao
+
+    @contextmanager
+    def _transacao(self):
+        """Transação de escrita: trava reservada já no início (sem upgrade com deadlock)"""
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexao
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+
+    async def _executar(self, funcao, *args):
+        return await asyncio.to_thread(funcao, *args)
+
+    async def conectar(self) -> bool:
+        """
+        Abre (ou cria) o banco local e garante tabelas e índices
+        """
+        try:
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            await self._executar(self._criar_esquema)
+
+            self.conectado = True
+            logger.info(f"✅ Banco local SQLite pronto (WAL): {self.caminho}")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao abrir banco SQLite: {str(e)}")
+            self.conectado = False
+            return False
+
+    def _criar_esquema(self):
+        self._conexao().executescript(ESQUEMA)
+
+    # ------------------------------------------------------------------
+    # Execuções
+    # ------------------------------------------------------------------
+
+    async def salvar_execucao_rpa(self, nome_rpa: str, parametros: Dict[str, Any],
+                                  resultado: Dict[str, Any]) -> str:
+        """
+        Salva execução de RPA no banco local
+
+        Returns:
+            ID da execução salva
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            agora = datetime.now()
+            documento = {
+                "_id": uuid.uuid4().hex,
+                "nome_rpa": nome_rpa,
+                "timestamp_inicio": agora,
+                "timestamp_fim": agora,
+                "parametros_entrada": parametros,
+                "resultado": resultado,
+                "sucesso": resultado.get("sucesso", False),
+                "tempo_execucao_segundos": resultado.get("tempo_execucao", 0),
+                "mensagem": resultado.get("mensagem", ""),
+                "erro": resultado.get("erro", None)
+            }
+            await self._executar(self._inserir_execucao, documento)
+
+            logger.info(f"💾 Execução {nome_rpa} salva no SQLite: {documento['_id']}")
+            return documento["_id"]
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar execução: {str(e)}")
+            return None
+
+    def _inserir_execucao(self, documento: Dict[str, Any]):
+        with self._transacao() as conexao:
+            conexao.execute(
+                "INSERT INTO execucoes_rpa (id, nome_rpa, timestamp_inicio, sucesso, tempo_execucao_segundos, documento) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (documento["_id"], documento["nome_rpa"], _data(documento["timestamp_inicio"]),
+                 int(bool(documento["sucesso"])), documento["tempo_execucao_segundos"] or 0,
+                 _para_json(documento))
+            )
+
+    async def obter_execucoes_recentes(self, limite: int = 30) -> List[Dict[str, Any]]:
+        """
+        Obtém execuções recentes dos RPAs
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            return await self._executar(self._consultar_documentos,
+                                        "SELECT documento FROM execucoes_rpa ORDER BY timestamp_inicio DESC LIMIT ?",
+                                        (limite,))
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter execuções: {str(e)}")
+            return []
+
+    def _consultar_documentos(self, sql: str, parametros: tuple = ()) -> List[Dict[str, Any]]:
+        """Documentos da consulta; se ela trouxer a coluna id, vira o _id (como no MongoDB)"""
+        documentos = []
+        for linha in self._conexao().execute(sql, parametros):
+            documento = _de_json(linha["documento"])
+            if "id" in linha.keys():
+                documento.setdefault("_id", str(linha["id"]))
+            documentos.append(documento)
+        return documentos
+
+    # ------------------------------------------------------------------
+    # Execuções da API (core/armazenamento_execucoes.py)
+    # ------------------------------------------------------------------
+
+    async def salvar_execucao_api(self, documento: Dict[str, Any]) -> Optional[str]:
+        """
+        Grava o estado de uma execução de workflow (upsert por execucao_id)
+
+        Args:
+            documento: Mesmo documento da collection execucoes_api (expira_em = TTL)
+
+        Returns:
+            ID da execução ou None em caso de erro
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+
+        try:
+            await self._executar(self._gravar_execucao_api, documento)
+            return documento["execucao_id"]
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar execução da API: {str(e)}")
+            return None
+
+    def _gravar_execucao_api(self, documento: Dict[str, Any]):
+        with self._transacao() as conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO execucoes_api "
+                "(execucao_id, status, inicio, chave_idempotencia, expira_em, documento) VALUES (?, ?, ?, ?, ?, ?)",
+                (documento["execucao_id"], documento.get("status"), documento.get("inicio"),
+                 (documento.get("dados") or {}).get("chave_idempotencia"),
+                 _data(documento["expira_em"]), _para_json(documento))
+            )
+            # TTL: o índice de expira_em torna a limpeza barata a cada gravação
+            conexao.execute("DELETE FROM execucoes_api WHERE expira_em < ?", (_data(datetime.now()),))
+
+    async def obter_execucao_api(self, execucao_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém o documento de uma execução da API (None se não existe ou expirou)
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+
+        try:
+            documentos = await self._executar(
+                self._consultar_documentos,
+                "SELECT documento FROM execucoes_api WHERE execucao_id = ? AND expira_em >= ?",
+                (execucao_id, _data(datetime.now()))
+            )
+            return documentos[0] if documentos else None
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter execução da API: {str(e)}")
+            return None
+
+    async def listar_execucoes_api(self, status: Optional[str] = None, desde: Optional[str] = None,
+                                   chave_idempotencia: Optional[str] = None,
+                                   limite: int = 50) -> List[Dict[str, Any]]:
+        """
+        Execuções da API mais recentes primeiro (pelo início)
+
+        Args:
+            status: Só execuções neste status
+            desde: Data/hora ISO mínima de início
+            chave_idempotencia: Só execuções com esta chave
+            limite: Quantidade máxima
+        """
+        if not self.conectado and not await self.conectar():
+            return []
+
+        try:
+            sql = "SELECT documento FROM execucoes_api WHERE expira_em >= ?"
+            parametros: List[Any] = [_data(datetime.now())]
+            for coluna, valor in (("status", status), ("chave_idempotencia", chave_idempotencia)):
+                if valor:
+                    sql += f" AND {coluna} = ?"
+                    parametros.append(valor)
+            if desde:
+                sql += " AND inicio >= ?"
+                parametros.append(desde)
+            sql += " ORDER BY inicio DESC LIMIT ?"
+            parametros.append(limite)
+
+            return await self._executar(self._consultar_documentos, sql, tuple(parametros))
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao listar execuções da API: {str(e)}")
+            return []
+
+    async def remover_execucoes_api(self, execucao_id: Optional[str] = None) -> int:
+        """
+        Remove uma execução da API (ou todas, sem execucao_id)
+
+        Returns:
+            Quantidade de execuções removidas
+        """
+        if not self.conectado and not await self.conectar():
+            return 0
+
+        try:
+            return await self._executar(self._remover_execucoes_api, execucao_id)
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao remover execuções da API: {str(e)}")
+            return 0
+
+    def _remover_execucoes_api(self, execucao_id: Optional[str]) -> int:
+        with self._transacao() as conexao:
+            if execucao_id:
+                return conexao.execute("DELETE FROM execucoes_api WHERE execucao_id = ?", (execucao_id,)).rowcount
+            return conexao.execute("DELETE FROM execucoes_api").rowcount
+
+    # ------------------------------------------------------------------
+    # Índices econômicos
+    # ------------------------------------------------------------------
+
+    async def salvar_indices_economicos(self, indices_data: Dict[str, Any]) -> str:
+        """
+        Salva índices econômicos coletados
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            documentos = []
+            for chave, tipo_indice in (("ipca", "IPCA"), ("igpm", "IGPM")):
+                if chave in indices_data:
+                    documentos.append({
+                        "tipo_indice": tipo_indice,
+                        "valor": indices_data[chave]["valor"],
+                        "fonte": indices_data[chave]["fonte"],
+                        "data_coleta": datetime.now(),
+                        "periodo": "acumulado_12_meses",
+                        "metodo_coleta": indices_data[chave].get("metodo", "webscraping")
+                    })
+            await self._executar(self._inserir_indices, documentos)
+
+            logger.info("💾 Índices econômicos salvos no SQLite")
+            return "success"
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar índices: {str(e)}")
+            return None
+
+    def _inserir_indices(self, documentos: List[Dict[str, Any]]):
+        with self._transacao() as conexao:
+            conexao.executemany(
+                "INSERT INTO indices_economicos (tipo_indice, data_coleta, documento) VALUES (?, ?, ?)",
+                [(d["tipo_indice"], _data(d["data_coleta"]), _para_json(d)) for d in documentos]
+            )
+
+    async def obter_indices_historico(self, dias: int = 30) -> Dict[str, List]:
+        """
+        Obtém histórico de índices econômicos
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            data_limite = _data(datetime.now() - timedelta(days=dias))
+            sql = ("SELECT id, documento FROM indices_economicos "
+                   "WHERE tipo_indice = ? AND data_coleta >= ? ORDER BY data_coleta DESC")
+            return {
+                "ipca": await self._executar(self._consultar_documentos, sql, ("IPCA", data_limite)),
+                "igpm": await self._executar(self._consultar_documentos, sql, ("IGPM", data_limite))
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter histórico: {str(e)}")
+            return {"ipca": [], "igpm": []}
+
+    async def salvar_indices_coletados(self, registro: Dict[str, Any]) -> Optional[str]:
+        """
+        Salva um registro do RPA Coleta de Índices (equivalente à coleção indices_coletados)
+
+        Returns:
+            ID do registro ou None em caso de erro
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            momento = registro.get("timestamp") or datetime.now()
+            if isinstance(momento, str):
+                momento = datetime.fromisoformat(momento)
+            return await self._executar(self._inserir_indices_coletados, _data(momento), registro)
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar índices coletados: {str(e)}")
+            return None
+
+    def _inserir_indices_coletados(self, momento: str, registro: Dict[str, Any]) -> str:
+        with self._transacao() as conexao:
+            cursor = conexao.execute("INSERT INTO indices_coletados (timestamp, documento) VALUES (?, ?)",
+                                     (momento, _para_json(registro)))
+            return str(cursor.lastrowid)
+
+    async def obter_ultimos_indices_coletados(self) -> Optional[Dict[str, Any]]:
+        """Registro mais recente do RPA Coleta de Índices (ou None)"""
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            documentos = await self._executar(
+                self._consultar_documentos,
+                "SELECT documento FROM indices_coletados ORDER BY timestamp DESC, id DESC LIMIT 1"
+            )
+            return documentos[0] if documentos else None
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter índices coletados: {str(e)}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Contratos processados e checkpoints
+    # ------------------------------------------------------------------
+
+    async def salvar_contrato_processado(self, contrato_data: Dict[str, Any]) -> str:
+        """
+        Salva dados de contrato processado (upsert pelo número do título)
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            documento = {
+                "numero_titulo": contrato_data.get("numero_titulo"),
+                "cliente": contrato_data.get("cliente"),
+                "empreendimento": contrato_data.get("empreendimento"),
+                "data_processamento": datetime.now(),
+                "status_sienge": contrato_data.get("status_sienge", "processado"),
+                "status_sicredi": contrato_data.get("status_sicredi", "pendente"),
+                "saldo_anterior": contrato_data.get("saldo_anterior", 0),
+                "saldo_novo": contrato_data.get("saldo_novo", 0),
+                "indice_aplicado": contrato_data.get("indice_aplicado", 0),
+                "indexador": contrato_data.get("indexador", ""),
+                "dados_completos": contrato_data
+            }
+            await self._executar(self._gravar_contratos, [documento])
+
+            logger.info(f"💾 Contrato {documento['numero_titulo']} salvo no SQLite")
+            return "ok"
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar contrato: {str(e)}")
+            return None
+
+    def _gravar_contratos(self, documentos: List[Dict[str, Any]]):
+        with self._transacao() as conexao:
+            conexao.executemany(
+                "INSERT OR REPLACE INTO contratos_processados "
+                "(numero_titulo, nosso_numero, data_processamento, documento) VALUES (?, ?, ?, ?)",
+                [(str(d["numero_titulo"]), d.get("nosso_numero"), _data(d["data_processamento"]), _para_json(d))
+                 for d in documentos]
+            )
+
+    async def obter_contratos_processados(self, numeros_titulo: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Obtém contratos processados de vários títulos (consultas IN pela chave primária)
+
+        Returns:
+            Lista de contratos (sem dados_completos) ou None se indisponível
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+
+        try:
+            documentos = await self._executar(self._buscar_contratos, [str(t) for t in numeros_titulo])
+            for documento in documentos:
+                documento.pop("dados_completos", None)
+            return documentos
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter contratos processados: {str(e)}")
+            return None
+
+    def _buscar_contratos(self, numeros_titulo: List[str]) -> List[Dict[str, Any]]:
+        documentos = []
+        for inicio in range(0, len(numeros_titulo), TAMANHO_BLOCO_IN):
+            bloco = numeros_titulo[inicio:inicio + TAMANHO_BLOCO_IN]
+            marcadores = ", ".join("?" * len(bloco))
+            documentos.extend(self._consultar_documentos(
+                f"SELECT documento FROM contratos_processados WHERE numero_titulo IN ({marcadores})", tuple(bloco)
+            ))
+        return documentos
+
+    async def atualizar_retorno_contratos(self, atualizacoes: List[Dict[str, Any]]) -> int:
+        """
+        Grava a situação do retorno Sicredi de vários contratos em uma transação
+
+        Args:
+            atualizacoes: Campos a definir por contrato (devem conter numero_titulo)
+
+        Returns:
+            Quantidade de contratos atualizados
+        """
+        if not atualizacoes:
+            return 0
+        if not self.conectado and not await self.conectar():
+            return 0
+
+        try:
+            atualizados = await self._executar(self._atualizar_contratos, atualizacoes)
+            logger.info(f"💾 Retorno Sicredi gravado em {atualizados} contratos")
+            return atualizados
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao atualizar retorno dos contratos: {str(e)}")
+            return 0
+
+    def _atualizar_contratos(self, atualizacoes: List[Dict[str, Any]]) -> int:
+        atualizados = 0
+        with self._transacao() as conexao:
+            for campos in atualizacoes:
+                linha = conexao.execute("SELECT documento FROM contratos_processados WHERE numero_titulo = ?",
+                                        (str(campos["numero_titulo"]),)).fetchone()
+                if linha is None:
+                    continue
+                documento = _de_json(linha["documento"])
+                if all(documento.get(campo) == valor for campo, valor in campos.items()):
+                    continue
+                documento.update(campos)
+                conexao.execute(
+                    "UPDATE contratos_processados SET nosso_numero = ?, documento = ? WHERE numero_titulo = ?",
+                    (documento.get("nosso_numero"), _para_json(documento), str(campos["numero_titulo"]))
+                )
+                atualizados += 1
+        return atualizados
+
+    async def salvar_checkpoint_sienge(self, checkpoint: Dict[str, Any]) -> Optional[str]:
+        """
+        Salva checkpoint de contrato do RPA Sienge (upsert por ciclo + título)
+
+        Returns:
+            "ok" se salvo, None em caso de erro
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+
+        try:
+            await self._executar(self._gravar_checkpoint, checkpoint)
+            return "ok"
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar checkpoint: {str(e)}")
+            return None
+
+    def _gravar_checkpoint(self, checkpoint: Dict[str, Any]):
+        with self._transacao() as conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO checkpoints_sienge (ciclo, numero_titulo, status, documento) "
+                "VALUES (?, ?, ?, ?)",
+                (checkpoint["ciclo"], str(checkpoint["numero_titulo"]), checkpoint.get("status"),
+                 _para_json(checkpoint))
+            )
+
+    async def obter_checkpoint_sienge(self, ciclo: str, numero_titulo: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém checkpoint de contrato do RPA Sienge no ciclo
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+
+        try:
+            documentos = await self._executar(
+                self._consultar_documentos,
+                "SELECT documento FROM checkpoints_sienge WHERE ciclo = ? AND numero_titulo = ?",
+                (ciclo, str(numero_titulo))
+            )
+            return documentos[0] if documentos else None
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter checkpoint: {str(e)}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Memoização de estágios
+    # ------------------------------------------------------------------
+
+    async def salvar_memoizacao(self, registro: Dict[str, Any], data_limite: Optional[str] = None) -> Optional[str]:
+        """
+        Salva resultado memoizado (upsert pela chave)
+
+        Args:
+            registro: Documento da memoização (chave, estagio, data_negocio, ...)
+            data_limite: Remove na mesma transação datas de negócio anteriores
+
+        Returns:
+            "ok" se salvo, None em caso de erro
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+
+        try:
+            await self._executar(self._gravar_memoizacao, registro, data_limite)
+            return "ok"
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar memoização: {str(e)}")
+            return None
+
+    def _gravar_memoizacao(self, registro: Dict[str, Any], data_limite: Optional[str]):
+        with self._transacao() as conexao:
+            conexao.execute(
+                "INSERT OR REPLACE INTO memoizacao_estagios (chave, estagio, data_negocio, documento) "
+                "VALUES (?, ?, ?, ?)",
+                (registro["chave"], registro["estagio"], registro["data_negocio"], _para_json(registro))
+            )
+            if data_limite:
+                conexao.execute("DELETE FROM memoizacao_estagios WHERE data_negocio < ?", (data_limite,))
+
+    async def obter_memoizacao(self, chave: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtém resultado memoizado pela chave
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+
+        try:
+            documentos = await self._executar(
+                self._consultar_documentos, "SELECT documento FROM memoizacao_estagios WHERE chave = ?", (chave,)
+            )
+            return documentos[0] if documentos else None
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter memoização: {str(e)}")
+            return None
+
+    async def invalidar_memoizacao(self, filtro: Dict[str, Any]) -> int:
+        """
+        Remove resultados memoizados
+
+        Args:
+            filtro: Mesmo filtro do MongoDB (estagio, data_negocio, entradas.<campo>)
+
+        Returns:
+            Quantidade de registros removidos
+        """
+        if not self.conectado and not await self.conectar():
+            return 0
+
+        try:
+            return await self._executar(self._remover_memoizacao, filtro)
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao invalidar memoização: {str(e)}")
+            return 0
+
+    def _remover_memoizacao(self, filtro: Dict[str, Any]) -> int:
+        condicoes, parametros = [], []
+        for coluna in ("estagio", "data_negocio"):
+            if coluna in filtro:
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(filtro[coluna])
+        campos_entradas = {k[len("entradas."):]: v for k, v in filtro.items() if k.startswith("entradas.")}
+        sql = "SELECT chave, documento FROM memoizacao_estagios"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+
+        with self._transacao() as conexao:
+            # Campos das entradas comparados no documento (mesma igualdade do MongoDB)
+            chaves = [
+                linha["chave"] for linha in conexao.execute(sql, parametros)
+                if all((_de_json(linha["documento"]).get("entradas") or {}).get(campo) == valor
+                       for campo, valor in campos_entradas.items())
+            ]
+            for inicio in range(0, len(chaves), TAMANHO_BLOCO_IN):
+                bloco = chaves[inicio:inicio + TAMANHO_BLOCO_IN]
+                conexao.execute(
+                    f"DELETE FROM memoizacao_estagios WHERE chave IN ({', '.join('?' * len(bloco))})", bloco
+                )
+            return len(chaves)
+
+    # ------------------------------------------------------------------
+    # Fila de processamento Sienge
+    # ------------------------------------------------------------------
+
+    async def salvar_fila_processamento(self, fila: Dict[str, Any]) -> Optional[int]:
+        """
+        Substitui a fila (mesmo documento gravado no MongoDB: metadados + "contratos")
+
+        Returns:
+            Quantidade de contratos na fila ou None em caso de erro
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+
+        try:
+            return await self._executar(self._gravar_fila, fila)
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar fila no SQLite: {str(e)}")
+            return None
+
+    def _gravar_fila(self, fila: Dict[str, Any]) -> int:
+        metadados = {chave: valor for chave, valor in fila.items() if chave != "contratos"}
+        contratos = fila.get("contratos", [])
+        with self._transacao() as conexao:
+            conexao.execute("DELETE FROM fila_processamento_sienge")
+            conexao.executemany(
+                "INSERT INTO fila_processamento_sienge "
+                "(posicao, numero_titulo, status_processamento, processado_em, erro_processamento, documento) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(posicao, str(c.get("numero_titulo")), c.get("status_processamento") or "pendente",
+                  c.get("processado_em"), c.get("erro_processamento"), _para_json(c))
+                 for posicao, c in enumerate(contratos)]
+            )
+            conexao.execute("INSERT OR REPLACE INTO metadados (chave, valor) VALUES ('fila_processamento_sienge', ?)",
+                            (_para_json(metadados),))
+        return len(contratos)
+
+    async def obter_fila_processamento(self, status: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Fila no formato do documento do MongoDB, com o status atual de cada contrato
+
+        Args:
+            status: Só contratos nestes status (consulta pelo índice de status)
+
+        Returns:
+            Fila ou None se nenhuma fila foi gravada
+        """
+        if not self.conectado and not await self.conectar():
+            return None
+
+        try:
+            return await self._executar(self._ler_fila, status)
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao ler fila no SQLite: {str(e)}")
+            return None
+
+    def _ler_fila(self, status: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        conexao = self._conexao()
+        # Leitura consistente de metadados + linhas (snapshot do WAL)
+        conexao.execute("BEGIN")
+        try:
+            linha = conexao.execute(
+                "SELECT valor FROM metadados WHERE chave = 'fila_processamento_sienge'").fetchone()
+            if linha is None:
+                return None
+
+            sql = ("SELECT status_processamento, processado_em, erro_processamento, documento "
+                   "FROM fila_processamento_sienge")
+            parametros: tuple = ()
+            if status is not None:
+                sql += f" WHERE status_processamento IN ({', '.join('?' * len(status))})"
+                parametros = tuple(status)
+            linhas = conexao.execute(sql + " ORDER BY posicao", parametros).fetchall()
+        finally:
+            conexao.execute("COMMIT")
+
+        fila = _de_json(linha["valor"])
+        fila["contratos"] = []
+        for contrato_linha in linhas:
+            contrato = _de_json(contrato_linha["documento"])
+            contrato["status_processamento"] = contrato_linha["status_processamento"]
+            contrato["processado_em"] = contrato_linha["processado_em"]
+            contrato["erro_processamento"] = contrato_linha["erro_processamento"]
+            fila["contratos"].append(contrato)
+        return fila
+
+    async def atualizar_status_fila(self, atualizacoes: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Marca contratos da fila como processados ou com erro (UPDATE pelo índice do título)
+
+        Args:
+            atualizacoes: numero_titulo -> {"status": "processado"|"erro", "erro": ...}
+
+        Returns:
+            Quantidade de contratos atualizados
+        """
+        if not atualizacoes:
+            return 0
+        if not self.conectado and not await self.conectar():
+            return 0
+
+        try:
+            return await self._executar(self._atualizar_fila, atualizacoes)
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao atualizar fila no SQLite: {str(e)}")
+            return 0
+
+    def _atualizar_fila(self, atualizacoes: Dict[str, Dict[str, Any]]) -> int:
+        agora = datetime.now().isoformat()
+        with self._transacao() as conexao:
+            atualizados = 0
+            for titulo, dados in atualizacoes.items():
+                cursor = conexao.execute(
+                    "UPDATE fila_processamento_sienge "
+                    "SET status_processamento = ?, processado_em = ?, erro_processamento = ? "
+                    "WHERE numero_titulo = ?",
+                    (dados["status"], agora, dados.get("erro"), str(titulo))
+                )
+                atualizados += cursor.rowcount
+            if atualizados:
+                linha = conexao.execute(
+                    "SELECT valor FROM metadados WHERE chave = 'fila_processamento_sienge'").fetchone()
+                metadados = _de_json(linha["valor"]) if linha else {}
+                metadados["timestamp_ultima_atualizacao"] = agora
+                conexao.execute("INSERT OR REPLACE INTO metadados (chave, valor) "
+                                "VALUES ('fila_processamento_sienge', ?)", (_para_json(metadados),))
+        return atualizados
+
+    # ------------------------------------------------------------------
+    # Dashboard
+    # ------------------------------------------------------------------
+
+    async def obter_estatisticas_dashboard(self) -> Dict[str, Any]:
+        """
+        Obtém estatísticas para o dashboard (mesmas chaves dos rollups do MongoDB)
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            return await self._executar(self._calcular_estatisticas, 30)
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter estatísticas: {str(e)}")
+            return {}
+
+    def _calcular_estatisticas(self, dias: int) -> Dict[str, Any]:
+        conexao = self._conexao()
+        hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        data_limite = _data(hoje - timedelta(days=dias - 1))
+
+        total_execucoes = conexao.execute("SELECT COUNT(*) FROM execucoes_rpa").fetchone()[0]
+        execucoes_hoje = conexao.execute("SELECT COUNT(*) FROM execucoes_rpa WHERE timestamp_inicio >= ?",
+                                         (_data(hoje),)).fetchone()[0]
+        contratos = conexao.execute("SELECT COUNT(*) FROM contratos_processados WHERE data_processamento >= ?",
+                                    (data_limite,)).fetchone()[0]
+
+        por_rpa: Dict[str, Dict[str, Any]] = {}
+        periodo_total = periodo_sucessos = 0
+        for linha in conexao.execute(
+            "SELECT nome_rpa, COUNT(*) AS execucoes, SUM(sucesso) AS sucessos, "
+            "SUM(tempo_execucao_segundos) AS duracao FROM execucoes_rpa "
+            "WHERE timestamp_inicio >= ? GROUP BY nome_rpa", (data_limite,)
+        ):
+            execucoes, sucessos = linha["execucoes"], linha["sucessos"] or 0
+            periodo_total += execucoes
+            periodo_sucessos += sucessos
+            por_rpa[linha["nome_rpa"]] = {
+                "execucoes": execucoes,
+                "sucessos": sucessos,
+                "taxa_sucesso": round(sucessos / execucoes * 100, 1),
+                "duracao_media_segundos": round((linha["duracao"] or 0) / execucoes, 1)
+            }
+
+        return {
+            "total_execucoes": total_execucoes,
+            "execucoes_hoje": execucoes_hoje,
+            "taxa_sucesso": round(periodo_sucessos / periodo_total * 100, 1) if periodo_total else 0,
+            "contratos_processados_mes": contratos,
+            "por_rpa": por_rpa,
+            "ultima_atualizacao": datetime.now().isoformat()
+        }
+
+    # ------------------------------------------------------------------
+    # Planilhas extraídas (auditoria)
+    # ------------------------------------------------------------------
+
+    async def salvar_planilha_extraida(self, planilha: Dict[str, Any]) -> Optional[str]:
+        """
+        Registra planilha extraída para auditoria
+
+        Returns:
+            ID da planilha ou None em caso de erro
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            documento = dict(planilha)
+            documento["_id"] = uuid.uuid4().hex
+            documento.setdefault("data_extracao", datetime.now())
+            documento.setdefault("status_auditoria", "ativo")
+            await self._executar(self._inserir_planilha, documento)
+            return documento["_id"]
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao salvar planilha extraída: {str(e)}")
+            return None
+
+    def _inserir_planilha(self, documento: Dict[str, Any]):
+        with self._transacao() as conexao:
+            conexao.execute(
+                "INSERT INTO planilhas_extraidas "
+                "(id, numero_titulo, cliente, data_extracao, origem_sistema, status_auditoria, documento) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (documento["_id"], documento.get("numero_titulo"), documento.get("cliente"),
+                 _data(documento["data_extracao"]), documento.get("origem_sistema"),
+                 documento["status_auditoria"], _para_json(documento))
+            )
+
+    async def obter_planilhas_cliente(self, numero_titulo: str = None, cliente: str = None,
+                                      limite: int = 10) -> List[Dict[str, Any]]:
+        """
+        Obtém planilhas extraídas de um cliente específico para auditoria
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            sql = "SELECT documento FROM planilhas_extraidas WHERE status_auditoria = 'ativo'"
+            parametros: List[Any] = []
+            if numero_titulo:
+                sql += " AND numero_titulo = ?"
+                parametros.append(numero_titulo)
+            if cliente:
+                # Equivalente ao $regex sem diferenciar maiúsculas do MongoDB
+                sql += " AND cliente LIKE ? ESCAPE '\\'"
+                parametros.append("%" + cliente.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+            sql += " ORDER BY data_extracao DESC LIMIT ?"
+            parametros.append(limite)
+
+            planilhas = await self._executar(self._consultar_documentos, sql, tuple(parametros))
+            for doc in planilhas:
+                # Verifica se arquivo ainda existe
+                doc["arquivo_existe"] = Path(doc.get("caminho_arquivo", "")).exists()
+            return planilhas
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter planilhas do cliente: {str(e)}")
+            return []
+
+    async def obter_estatisticas_planilhas(self) -> Dict[str, Any]:
+        """
+        Obtém estatísticas das planilhas extraídas para dashboard
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            data_limite = datetime.now() - timedelta(days=7)
+
+            # Todas as contagens em uma única consulta
+            linha = await self._executar(self._contar_planilhas, _data(hoje), _data(data_limite))
+
+            return {
+                "total_planilhas": linha["total"],
+                "planilhas_hoje": linha["hoje"],
+                "planilhas_semana": linha["semana"],
+                "clientes_unicos": linha["clientes"],
+                "ultima_atualizacao": datetime.now().isoformat()
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao obter estatísticas de planilhas: {str(e)}")
+            return {}
+
+    def _contar_planilhas(self, hoje: str, data_limite: str) -> sqlite3.Row:
+        return self._conexao().execute(
+            "SELECT COUNT(*) AS total, "
+            "COALESCE(SUM(data_extracao >= ?), 0) AS hoje, "
+            "COALESCE(SUM(data_extracao >= ?), 0) AS semana, "
+            "COUNT(DISTINCT cliente) AS clientes "
+            "FROM planilhas_extraidas WHERE status_auditoria = 'ativo'",
+            (hoje, data_limite)
+        ).fetchone()
+
+    async def marcar_planilha_inativa(self, planilha_id: str) -> bool:
+        """
+        Marca planilha como inativa (para exclusão lógica)
+        """
+        if not self.conectado:
+            await self.conectar()
+
+        try:
+            modificada = await self._executar(self._inativar_planilha, planilha_id)
+            logger.info(f"📋 Planilha {planilha_id} marcada como inativa")
+            return modificada
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao marcar planilha como inativa: {str(e)}")
+            return False
+
+    def _inativar_planilha(self, planilha_id: str) -> bool:
+        with self._transacao() as conexao:
+            linha = conexao.execute(
+                "SELECT documento FROM planilhas_extraidas WHERE id = ? AND status_auditoria != 'inativo'",
+                (planilha_id,)).fetchone()
+            if linha is None:
+                return False
+            documento = _de_json(linha["documento"])
+            documento["status_auditoria"] = "inativo"
+            documento["data_inativacao"] = datetime.now()
+            conexao.execute("UPDATE planilhas_extraidas SET status_auditoria = 'inativo', documento = ? WHERE id = ?",
+                            (_para_json(documento), planilha_id))
+            return True
+
+    async def desconectar(self):
+        """
+        Fecha as conexões de todas as threads (o WAL é incorporado ao banco)
+        """
+        with self._trava:
+            conexoes, self._conexoes = self._conexoes, []
+        for conexao in conexoes:
+            try:
+                conexao.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+        if self.conectado:
+            self.conectado = False
+            logger.info("🔌 Banco local SQLite fechado")
+
+
+# Instância global do SQLite Manager
+sqlite_manager = SQLiteManager()
@@ -0,0 +1,196 @@
+"""
+Teste do Agendador Assíncrono - interpretação e casamento de expressões cron
+
+Compara ExpressaoCron.proxima com uma verificação minuto a minuto (campos
+casados um a um) em um ano inteiro e confere casos conhecidos:
+nomes de mês/dia, passos, domingo 0/7, regra OU entre dia do mês e dia da
+semana, virada de ano/bissexto, ultima_ate e expressões inválidas.
+Com um MongoDB simulado que dá timeout, verifica que a tarefa roda com lock
+local, que o MongoDB entra em pausa e volta a ser tentado depois dela.
+
+Uso:
+    python core/teste_agendador_async.py
+"""
+
+import sys
+import shutil
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core import agendador_async
+from core.agendador_async import ExpressaoCron, AgendadorAsync
+
+EXPRESSOES = [
+    "0 8 * * *",
+    "*/30 6-18 * * *",
+    "0 8 * * 1-5",
+    "15 10 1,15 * *",
+    "0 0 1 * 0",
+    "5/20 * * jan,jul *",
+    "0 12 29 2 *",
+    "0 9 * * sun",
+    "0 9 * * 7",
+]
+
+
+def coincide(expressao: ExpressaoCron, momento: datetime) -> bool:
+    """Casamento direto, campo a campo (referência para proxima)"""
+    dia_semana = (momento.weekday() + 1) % 7
+    coincide_dia = momento.day in expressao.dias
+    coincide_semana = dia_semana in expressao.dias_semana
+    if expressao.dia_restrito and expressao.semana_restrita:
+        dia_ok = coincide_dia or coincide_semana
+    else:
+        dia_ok = coincide_dia and coincide_semana
+    return (momento.minute in expressao.minutos and momento.hour in expressao.horas
+            and momento.month in expressao.meses and dia_ok)
+
+
+def ocorrencias_minuto_a_minuto(expressao: ExpressaoCron, inicio: datetime, fim: datetime):
+    momento = inicio
+    while momento < fim:
+        if coincide(expressao, momento):
+            yield momento
+        momento += timedelta(minutes=1)
+
+
+class ColecaoForaDoAr:
+    """Coleção cujo servidor não responde (ServerSelectionTimeoutError)"""
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def __getattr__(self, nome):
+        async def operacao(*args, **kwargs):
+            self.chamadas += 1
+            raise agendador_async.pymongo.errors.ServerSelectionTimeoutError("timeout simulado")
+        return operacao
+
+
+async def teste_lock_mongodb_fora() -> bool:
+    if not agendador_async.MONGODB_DISPONIVEL:
+        print("   ⚠️ pymongo não instalado - lock com MongoDB fora não testado")
+        return True
+
+    pasta = tempfile.mkdtemp(prefix="teste_agendador_")
+    original = agendador_async.mongodb_manager
+    locks = ColecaoForaDoAr()
+    agendador_async.mongodb_manager = SimpleNamespace(
+        conectado=True,
+        database=SimpleNamespace(locks_agendador=locks, historico_agendador=ColecaoForaDoAr())
+    )
+    sucesso = True
+    try:
+        agendador = AgendadorAsync(pasta_local=pasta)
+        execucoes = []
+
+        async def tarefa():
+            execucoes.append(1)
+        agendador.adicionar("teste", "0 8 * * *", tarefa)
+
+        registro = await agendador.executar_agora("teste")
+        if registro.get("status") != "sucesso" or len(execucoes) != 1:
+            print(f"   ❌ Tarefa não rodou com lock local: {registro.get('status')}")
+            sucesso = False
+        if locks.chamadas != 1:
+            print(f"   ❌ MongoDB deveria ter sido tentado uma vez (tentado {locks.chamadas})")
+            sucesso = False
+
+        # Em pausa: não tenta o MongoDB de novo
+        await agendador.executar_agora("teste")
+        if locks.chamadas != 1 or len(execucoes) != 2:
+            print("   ❌ MongoDB tentado durante a pausa")
+            sucesso = False
+
+        # Pausa vencida: volta a tentar
+        agendador._mongodb_pausado_ate = 0.0
+        await agendador.executar_agora("teste")
+        if locks.chamadas != 2 or len(execucoes) != 3:
+            print("   ❌ MongoDB não voltou a ser tentado após a pausa")
+            sucesso = False
+    finally:
+        agendador_async.mongodb_manager = original
+        shutil.rmtree(pasta, ignore_errors=True)
+    return sucesso
+
+
+def executar_teste() -> bool:
+    print("🧪 TESTE DO AGENDADOR - EXPRESSÕES CRON")
+    print("=" * 50)
+    sucesso = True
+
+    # 1. proxima x varredura minuto a minuto (2024 é bissexto)
+    inicio, fim = datetime(2024, 1, 1), datetime(2025, 1, 1)
+    for texto in EXPRESSOES:
+        expressao = ExpressaoCron(texto)
+        esperadas = list(ocorrencias_minuto_a_minuto(expressao, inicio, fim))
+        obtidas = []
+        momento = expressao.proxima(inicio - timedelta(minutes=1))
+        while momento < fim:
+            obtidas.append(momento)
+            momento = expressao.proxima(momento)
+        status = "✅" if obtidas == esperadas else "❌"
+        print(f"   {status} '{texto}': {len(obtidas)} ocorrência(s)")
+        if obtidas != esperadas:
+            sucesso = False
+
+    # 2. Casos conhecidos
+    print("\n📅 Casos conhecidos...")
+    casos = [
+        # Sexta 20h -> segunda 8h (dias úteis)
+        ("0 8 * * 1-5", datetime(2024, 6, 7, 20, 0), datetime(2024, 6, 10, 8, 0)),
+        # Dia 1 OU domingo: domingo 2 de junho vem antes do dia 1 de julho
+        ("0 0 1 * 0", datetime(2024, 6, 1, 0, 0), datetime(2024, 6, 2, 0, 0)),
+        # 29/02 só em ano bissexto
+        ("0 12 29 2 *", datetime(2024, 3, 1), datetime(2028, 2, 29, 12, 0)),
+        # Virada de ano
+        ("30 23 31 12 *", datetime(2024, 12, 31, 23, 30), datetime(2025, 12, 31, 23, 30)),
+        # Segundos são ignorados: a próxima é estritamente depois
+        ("*/15 * * * *", datetime(2024, 1, 1, 10, 14, 59), datetime(2024, 1, 1, 10, 15)),
+    ]
+    for texto, apos, esperado in casos:
+        obtido = ExpressaoCron(texto).proxima(apos)
+        if obtido != esperado:
+            print(f"   ❌ '{texto}' após {apos}: {obtido} (esperado {esperado})")
+            sucesso = False
+    if ExpressaoCron("0 9 * * sun").dias_semana != ExpressaoCron("0 9 * * 7").dias_semana:
+        print("   ❌ Domingo como 'sun' e 7 diferem")
+        sucesso = False
+
+    # 3. Última ocorrência perdida (recuperação ao subir)
+    ultima = ExpressaoCron("0 8 * * *").ultima_ate(datetime(2024, 6, 1, 7, 0), datetime(2024, 6, 3, 9, 0))
+    if ultima != datetime(2024, 6, 3, 8, 0):
+        print(f"   ❌ ultima_ate: {ultima}")
+        sucesso = False
+    if ExpressaoCron("0 8 * * *").ultima_ate(datetime(2024, 6, 1, 8, 0), datetime(2024, 6, 1, 9, 0)) is not None:
+        print("   ❌ ultima_ate deveria excluir o início do intervalo")
+        sucesso = False
+
+    # 4. Expressões inválidas
+    print("\n🚫 Expressões inválidas...")
+    for texto in ("0 8 * *", "60 * * * *", "0 24 * * *", "0 0 0 * *", "*/0 * * * *", "0 0 * 13 *"):
+        try:
+            ExpressaoCron(texto)
+            print(f"   ❌ '{texto}' aceita")
+            sucesso = False
+        except ValueError:
+            pass
+
+    # 5. Lock com o MongoDB dando timeout
+    print("\n🔌 Lock com MongoDB fora do ar...")
+    if not asyncio.run(teste_lock_mongodb_fora()):
+        sucesso = False
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = executar_teste()
+    print("\n🎉 TESTE DO AGENDADOR CONCLUÍDO!" if sucesso else "\n💥 TESTE DO AGENDADOR FALHOU!")
+    sys.exit(0 if sucesso else 1)
@@ -0,0 +1,112 @@
+"""
+Teste do Armazenamento de Execuções - campos da API x estado do worker
+
+Verifica, com o banco local SQLite (sem MongoDB):
+- requisicoes_anexadas contado pela API sobrevive aos estados completos
+  enviados pelo worker (que trazem o valor inicial 0)
+- o estado do worker continua sendo aplicado (status, etapa, eventos)
+- o valor persistido e relido do armazenamento é o da API
+- chave de idempotência, listagem por status e remoção leem do SQLite
+
+Uso:
+    python core/teste_armazenamento_execucoes.py
+"""
+
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.armazenamento_execucoes import ArmazenamentoExecucoes
+from core.sqlite_manager import SQLiteManager
+
+EXECUCAO_ID = "exec_teste_armazenamento"
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DO ARMAZENAMENTO DE EXECUÇÕES")
+    print("=" * 50)
+
+    pasta = tempfile.mkdtemp(prefix="teste_armazenamento_")
+    banco = SQLiteManager(os.path.join(pasta, "rpa_local.sqlite3"))
+    sucesso = True
+
+    try:
+        armazenamento = ArmazenamentoExecucoes(banco_local=banco)
+        armazenamento.mongodb_ativo = False
+        eventos = armazenamento.assinar(EXECUCAO_ID)
+
+        inicial = {"status": "iniciado", "etapa_atual": "preparando", "inicio": "2024-06-01T08:00:00",
+                   "chave_idempotencia": "chave_teste", "requisicoes_anexadas": 0}
+        armazenamento.registrar(EXECUCAO_ID, dict(inicial))
+
+        # 1. Submissões anexadas intercaladas com estados completos do worker
+        print("\n📎 Anexando submissões durante a execução...")
+        for etapa in ("coleta_indices", "analise_planilhas", "processamento_sienge"):
+            armazenamento.anexar_requisicao(EXECUCAO_ID)
+            armazenamento.atualizar(EXECUCAO_ID, {**inicial, "status": "em_execucao", "etapa_atual": etapa})
+
+        estado = armazenamento.obter(EXECUCAO_ID)
+        print(f"   📊 Anexadas: {estado['requisicoes_anexadas']} | Etapa: {estado['etapa_atual']}")
+        if estado["requisicoes_anexadas"] != 3:
+            print("❌ Estado do worker sobrescreveu requisicoes_anexadas")
+            sucesso = False
+        if estado["status"] != "em_execucao" or estado["etapa_atual"] != "processamento_sienge":
+            print("❌ Estado do worker não foi aplicado")
+            sucesso = False
+        if eventos.qsize() < 4:
+            print(f"❌ Eventos de status/etapa não publicados ({eventos.qsize()})")
+            sucesso = False
+
+        # 2. Persistido e relido após liberar a memória
+        print("\n💾 Persistência...")
+        armazenamento.atualizar(EXECUCAO_ID, {**inicial, "status": "concluido", "fim": "2024-06-01T09:00:00"})
+        await armazenamento.persistir(EXECUCAO_ID)
+        armazenamento.execucoes.clear()
+        relida = await armazenamento.buscar(EXECUCAO_ID)
+        print(f"   📄 Relida: status {relida and relida.get('status')}, "
+              f"anexadas {relida and relida.get('requisicoes_anexadas')}")
+        if not relida or relida.get("requisicoes_anexadas") != 3 or relida.get("status") != "concluido":
+            print("❌ Execução persistida incorreta")
+            sucesso = False
+
+        # 3. Consultas e remoção direto do SQLite
+        print("\n🔎 Consultas no SQLite...")
+        armazenamento.execucoes["exec_em_andamento"] = {"status": "em_execucao", "inicio": "2024-06-02T08:00:00"}
+        await armazenamento.persistir("exec_em_andamento")
+        armazenamento.execucoes.clear()
+
+        por_chave = await armazenamento.buscar_por_chave_idempotencia("chave_teste", desde="2024-06-01T00:00:00")
+        recente = await armazenamento.buscar_por_chave_idempotencia("chave_teste", desde="2024-06-01T12:00:00")
+        concluidas = await armazenamento.listar(status="concluido")
+        todas = await armazenamento.listar()
+        print(f"   🔑 Por chave: {por_chave and por_chave[0]} | Concluídas: {list(concluidas)} | Todas: {list(todas)}")
+        if not por_chave or por_chave[0] != EXECUCAO_ID or recente is not None:
+            print("❌ Busca por chave de idempotência incorreta")
+            sucesso = False
+        if list(concluidas) != [EXECUCAO_ID] or list(todas) != ["exec_em_andamento", EXECUCAO_ID]:
+            print("❌ Listagem incorreta (filtro de status ou ordem por início)")
+            sucesso = False
+
+        removidas = await armazenamento.remover(EXECUCAO_ID)
+        restantes = await armazenamento.listar()
+        print(f"   🗑️ Removidas: {removidas} | Restantes: {list(restantes)}")
+        if removidas != 1 or list(restantes) != ["exec_em_andamento"] or await armazenamento.buscar(EXECUCAO_ID):
+            print("❌ Remoção incorreta")
+            sucesso = False
+    finally:
+        await banco.desconectar()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DO ARMAZENAMENTO CONCLUÍDO!" if sucesso else "\n💥 TESTE DO ARMAZENAMENTO FALHOU!")
+    sys.exit(0 if sucesso else 1)
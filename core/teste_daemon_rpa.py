@@ -0,0 +1,160 @@
+"""
+Teste do Daemon RPA - Vagas simultâneas, fila e timeout do cliente
+
+Sobe um daemon em porta local com um job de espera registrado só para o
+teste (sem browsers no pool, aquecimento lento simulado) e verifica:
+- o socket responde "aquecendo" antes do fim do aquecimento
+- jobs até o limite de vagas rodam ao mesmo tempo
+- o excedente espera vaga sem estourar o timeout do cliente
+- "saude" mostra os jobs em andamento
+- "reciclar" espera os jobs em andamento
+
+Uso:
+    python core/teste_daemon_rpa.py
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core import daemon_rpa
+from core.base_rpa import ResultadoRPA
+from core.daemon_rpa import DaemonRPA, ClienteDaemonRPA
+from core.recursos_aquecidos import RecursosAquecidos
+
+PORTA_TESTE = 8799
+DURACAO_JOB = 0.5
+DURACAO_AQUECIMENTO = 1.0
+PRAZO_PRONTO = 10.0
+
+
+async def job_espera(segundos: float = DURACAO_JOB) -> ResultadoRPA:
+    """Job de teste: só ocupa a vaga"""
+    await asyncio.sleep(segundos)
+    return ResultadoRPA(sucesso=True, mensagem="Espera concluída", dados={"segundos": segundos})
+
+
+class RecursosLentos(RecursosAquecidos):
+    """Aquecimento inicial demorado, como o de um MongoDB fora do ar (reciclagem não atrasa)"""
+
+    async def aquecer(self, browsers: int = 1):
+        if self.geracao == 0:
+            await asyncio.sleep(DURACAO_AQUECIMENTO)
+        await super().aquecer(browsers)
+
+
+async def aguardar_pronto(cliente: ClienteDaemonRPA, servidor: asyncio.Task) -> bool:
+    """Espera o socket abrir e o aquecimento terminar (status diferente de "aquecendo")"""
+    inicio = time.monotonic()
+    aquecendo_visto = False
+    while time.monotonic() - inicio < PRAZO_PRONTO:
+        if servidor.done():
+            print(f"❌ Daemon terminou antes de ficar pronto: {servidor.exception()!r}")
+            return False
+        try:
+            status = (await cliente.saude())["dados"]["status"]
+        except (daemon_rpa.DaemonIndisponivel, ConnectionError, asyncio.TimeoutError):
+            await asyncio.sleep(0.05)
+            continue
+        if status != "aquecendo":
+            print(f"   ✅ Pronto após {time.monotonic() - inicio:.2f}s")
+            if not aquecendo_visto:
+                print("❌ Socket só respondeu depois do aquecimento")
+                return False
+            return True
+        if not aquecendo_visto:
+            print(f"   📡 Socket respondendo durante o aquecimento ({time.monotonic() - inicio:.2f}s)")
+            aquecendo_visto = True
+        await asyncio.sleep(0.1)
+
+    print(f"❌ Daemon não ficou pronto em {PRAZO_PRONTO:.0f}s")
+    return False
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DO DAEMON RPA - VAGAS SIMULTÂNEAS")
+    print("=" * 50)
+
+    daemon_rpa.JOBS_RPA["espera_teste"] = "core.teste_daemon_rpa:job_espera"
+    daemon = DaemonRPA(
+        porta=PORTA_TESTE, vagas=2, reciclar_apos_jobs=0, reciclar_apos_horas=0,
+        recursos=RecursosLentos(max_browsers_ociosos=0)
+    )
+    servidor = asyncio.create_task(daemon.iniciar())
+    cliente = ClienteDaemonRPA(porta=PORTA_TESTE, timeout=DURACAO_JOB * 1.6)
+    sucesso = True
+
+    try:
+        print("\n📡 Aguardando o daemon...")
+        if not await aguardar_pronto(cliente, servidor):
+            return False
+
+        # 1. Duas vagas: dois jobs juntos levam o tempo de um
+        print("\n🔥 Dois jobs com duas vagas...")
+        inicio = time.monotonic()
+        respostas = await asyncio.gather(*(cliente.executar("espera_teste") for _ in range(2)))
+        duracao = time.monotonic() - inicio
+        print(f"   ⏱️ {duracao:.2f}s")
+        if not all(r.get("sucesso") for r in respostas) or duracao >= DURACAO_JOB * 1.5:
+            print("❌ Jobs não rodaram em paralelo")
+            sucesso = False
+
+        # 2. Quatro jobs: os dois últimos esperam vaga; o timeout (1.6x o job)
+        #    só conta a partir do início, então nenhum estoura
+        print("\n⏳ Quatro jobs com duas vagas (timeout menor que fila + execução)...")
+        inicio = time.monotonic()
+        tarefas = [asyncio.create_task(cliente.executar("espera_teste")) for _ in range(4)]
+        await asyncio.sleep(DURACAO_JOB / 2)
+        saude = (await cliente.saude())["dados"]
+        print(f"   📊 Em andamento: {len(saude['jobs_atuais'])} | Na fila: {saude['jobs_na_fila']}")
+        if len(saude["jobs_atuais"]) != 2 or saude["jobs_na_fila"] != 2:
+            print("❌ Saúde não reflete vagas ocupadas e fila")
+            sucesso = False
+
+        respostas = await asyncio.gather(*tarefas, return_exceptions=True)
+        duracao = time.monotonic() - inicio
+        print(f"   ⏱️ {duracao:.2f}s")
+        if not all(isinstance(r, dict) and r.get("sucesso") for r in respostas):
+            print(f"❌ Job na fila falhou: {respostas}")
+            sucesso = False
+        if not DURACAO_JOB * 2 <= duracao < DURACAO_JOB * 3:
+            print("❌ Quatro jobs deveriam levar duas rodadas")
+            sucesso = False
+
+        # 3. Reciclar espera os jobs em andamento
+        print("\n♻️ Reciclagem com jobs em andamento...")
+        tarefas = [asyncio.create_task(cliente.executar("espera_teste")) for _ in range(2)]
+        await asyncio.sleep(DURACAO_JOB / 5)
+        inicio = time.monotonic()
+        await cliente.reciclar()
+        espera = time.monotonic() - inicio
+        await asyncio.gather(*tarefas)
+        print(f"   ⏱️ Reciclagem após {espera:.2f}s")
+        if espera < DURACAO_JOB / 2:
+            print("❌ Reciclagem não esperou os jobs em andamento")
+            sucesso = False
+
+        saude = (await cliente.saude())["dados"]
+        if saude["jobs_executados"] != 8 or saude["jobs_com_erro"] != 0 or saude["jobs_atuais"]:
+            print(f"❌ Contadores inesperados: {saude}")
+            sucesso = False
+    finally:
+        try:
+            await cliente.encerrar()
+            await asyncio.wait_for(servidor, timeout=PRAZO_PRONTO)
+        except (daemon_rpa.DaemonIndisponivel, OSError, asyncio.TimeoutError) as e:
+            print(f"⚠️ Daemon não encerrou normalmente: {e!r}")
+            servidor.cancel()
+        del daemon_rpa.JOBS_RPA["espera_teste"]
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DO DAEMON CONCLUÍDO!" if sucesso else "\n💥 TESTE DO DAEMON FALHOU!")
+    sys.exit(0 if sucesso else 1)
@@ -0,0 +1,123 @@
+"""
+Teste do Escritor em Lote - spool local com o MongoDB fora e reenvio na volta
+
+Em um banco de teste verifica:
+- com o MongoDB fora, inserts/upserts/incrementos vão para o spool local
+- na primeira gravação com o MongoDB de volta o spool é reenviado
+- reenviar de novo o mesmo spool não duplica inserts nem upserts
+- um upsert no spool não sobrescreve um upsert mais novo do mesmo filtro
+  gravado depois da volta do MongoDB
+
+Requer MongoDB (MONGODB_URL, padrão mongodb://localhost:27017); o banco
+rpa_reparcelamento_teste é apagado ao final.
+
+Uso:
+    python core/teste_escritor_lote.py
+"""
+
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.mongodb_manager import mongodb_manager
+from core.escritor_lote import EscritorLote
+
+BANCO_TESTE = "rpa_reparcelamento_teste"
+
+
+async def contar(colecao: str, filtro=None) -> int:
+    return await mongodb_manager.database[colecao].count_documents(filtro or {})
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DO ESCRITOR EM LOTE - SPOOL E REENVIO")
+    print("=" * 50)
+
+    mongodb_manager.connection_string = os.getenv("MONGODB_URL", mongodb_manager.connection_string)
+    mongodb_manager.database_name = BANCO_TESTE
+    if not await mongodb_manager.conectar():
+        print("❌ MongoDB indisponível")
+        return False
+    await mongodb_manager.client.drop_database(BANCO_TESTE)
+
+    pasta = tempfile.mkdtemp(prefix="teste_escritor_")
+    escritor = EscritorLote(tamanho_lote=1000, intervalo=3600, arquivo_spool=os.path.join(pasta, "spool.jsonl"))
+    sucesso = True
+
+    try:
+        # 1. MongoDB fora: tudo vai para o spool
+        print("\n🔌 MongoDB fora do ar...")
+        mongodb_manager.conectado = False
+        escritor._proxima_conexao = time.monotonic() + 3600
+        for i in range(5):
+            await escritor.inserir("execucoes_teste", {"n": i})
+        await escritor.substituir("contratos_teste", {"numero_titulo": "1"}, {"numero_titulo": "1", "versao": 1})
+        await escritor.substituir("contratos_teste", {"numero_titulo": "1"}, {"numero_titulo": "1", "versao": 2})
+        await escritor.incrementar("contadores_teste", {"_id": "dia"}, {"total": 2})
+        await escritor.descarregar()
+
+        estatisticas = escritor.estatisticas()
+        print(f"   💾 No spool: {estatisticas['no_spool']}")
+        if estatisticas["no_spool"] != 8 or estatisticas["gravados"] != 0:
+            print("❌ Lote não foi para o spool")
+            sucesso = False
+        spool = Path(escritor.arquivo_spool).read_text(encoding="utf-8")
+
+        # 2. MongoDB de volta: a próxima gravação reenvia o spool
+        print("\n📤 MongoDB de volta...")
+        mongodb_manager.conectado = True
+        await escritor.inserir("execucoes_teste", {"n": 5})
+        await escritor.descarregar()
+
+        execucoes = await contar("execucoes_teste")
+        contrato = await mongodb_manager.database.contratos_teste.find_one({"numero_titulo": "1"})
+        contador = await mongodb_manager.database.contadores_teste.find_one({"_id": "dia"})
+        print(f"   📊 Execuções: {execucoes} | Contrato versão: {(contrato or {}).get('versao')} | "
+              f"Contador: {(contador or {}).get('total')}")
+        if execucoes != 6 or (contrato or {}).get("versao") != 2 or (contador or {}).get("total") != 2:
+            print("❌ Spool não foi reenviado por completo")
+            sucesso = False
+        if escritor.estatisticas()["no_spool"] != 0:
+            print("❌ Spool não foi esvaziado")
+            sucesso = False
+
+        # 3. Reenvio repetido (ex.: processo caiu após gravar e antes de apagar o spool)
+        print("\n🔁 Reenviando o mesmo spool outra vez...")
+        Path(escritor.arquivo_spool).write_text(spool, encoding="utf-8")
+        await escritor.reenviar_spool()
+        if await contar("execucoes_teste") != 6 or await contar("contratos_teste") != 1:
+            print("❌ Reenvio duplicou inserts ou upserts")
+            sucesso = False
+
+        # 4. Spool antigo x gravação nova do mesmo filtro
+        print("\n🕒 Upsert no spool seguido de upsert mais novo...")
+        mongodb_manager.conectado = False
+        await escritor.substituir("contratos_teste", {"numero_titulo": "2"}, {"numero_titulo": "2", "versao": 1})
+        await escritor.descarregar()
+        mongodb_manager.conectado = True
+        await escritor.substituir("contratos_teste", {"numero_titulo": "2"}, {"numero_titulo": "2", "versao": 2})
+        await escritor.descarregar()
+        contrato = await mongodb_manager.database.contratos_teste.find_one({"numero_titulo": "2"})
+        print(f"   📊 Contrato versão: {(contrato or {}).get('versao')}")
+        if (contrato or {}).get("versao") != 2:
+            print("❌ Upsert do spool sobrescreveu a gravação mais nova")
+            sucesso = False
+    finally:
+        await mongodb_manager.client.drop_database(BANCO_TESTE)
+        await mongodb_manager.desconectar()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DO ESCRITOR CONCLUÍDO!" if sucesso else "\n💥 TESTE DO ESCRITOR FALHOU!")
+    sys.exit(0 if sucesso else 1)
@@ -0,0 +1,139 @@
+"""
+Teste do Executor de Jobs - conclusão, timeout com encerramento e worker morto
+
+Os alvos dos jobs ficam neste módulo (importável pelo processo spawn), que
+expõe salvar_execucao/obter_execucao como o api_rpa. Verifica:
+- job normal chega à API com status final
+- job travado é encerrado ao estourar o timeout e marcado com erro
+- worker que morre é marcado com erro sem derrubar o processo da API
+- sem pool (tamanho_pool=0), exceção do job é marcada com erro
+
+Uso:
+    python core/teste_executor_jobs.py
+"""
+
+import os
+import sys
+import time
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.executor_jobs import ExecutorJobs
+
+TIMEOUT_TESTE = 3.0
+
+_execucoes: Dict[str, Dict[str, Any]] = {}
+
+
+def salvar_execucao(execucao_id: str, dados: Dict[str, Any]):
+    _execucoes[execucao_id] = dados
+
+
+def obter_execucao(execucao_id: str) -> Dict[str, Any]:
+    return _execucoes[execucao_id]
+
+
+async def job_rapido(execucao_id: str, valor: int):
+    execucao = obter_execucao(execucao_id)
+    execucao.update({"status": "concluido", "valor": valor, "fim": datetime.now().isoformat()})
+
+
+async def job_travado(execucao_id: str):
+    # Simula navegador pendurado: bloqueia o processo sem devolver o controle
+    obter_execucao(execucao_id)["etapa_atual"] = "travado"
+    time.sleep(3600)
+
+
+async def job_morre(execucao_id: str):
+    os._exit(3)
+
+
+async def job_falha(execucao_id: str):
+    raise RuntimeError("Falha simulada no job")
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DO EXECUTOR DE JOBS")
+    print("=" * 50)
+
+    estados: Dict[str, Dict[str, Any]] = {}
+
+    def ao_atualizar(execucao_id: str, estado: Dict[str, Any]):
+        estados.setdefault(execucao_id, {}).update(estado)
+
+    executor = ExecutorJobs(tamanho_pool=3, timeout_job=TIMEOUT_TESTE, intervalo_progresso=0.5)
+    jobs = {
+        "rapido": ("core.teste_executor_jobs:job_rapido", (7,)),
+        "travado": ("core.teste_executor_jobs:job_travado", ()),
+        "morre": ("core.teste_executor_jobs:job_morre", ()),
+    }
+    # O executor resolve os alvos pelo nome do módulo (não pelo __main__ deste script)
+    from core import teste_executor_jobs as modulo_alvos
+
+    inicio = time.monotonic()
+    for execucao_id, (alvo, argumentos) in jobs.items():
+        modulo_alvos.salvar_execucao(execucao_id, {"status": "iniciado"})
+        await executor.submeter(execucao_id, alvo, *argumentos, ao_atualizar=ao_atualizar)
+
+    pids = []
+    while executor._tarefas:
+        pids = pids or list(executor.estatisticas()["pids"])
+        await asyncio.sleep(0.1)
+    duracao = time.monotonic() - inicio
+    sucesso = True
+
+    for execucao_id, estado in estados.items():
+        print(f"   📋 {execucao_id}: {estado.get('status')} - {estado.get('erro') or estado.get('valor')}")
+
+    if estados["rapido"].get("status") != "concluido" or estados["rapido"].get("valor") != 7:
+        print("❌ Job normal não chegou concluído")
+        sucesso = False
+
+    if estados["travado"].get("status") != "erro" or "excedeu" not in (estados["travado"].get("erro") or ""):
+        print("❌ Job travado não foi marcado com timeout")
+        sucesso = False
+    if not TIMEOUT_TESTE <= duracao < TIMEOUT_TESTE + 15:
+        print(f"❌ Encerramento por timeout fora do esperado ({duracao:.1f}s)")
+        sucesso = False
+
+    if estados["morre"].get("status") != "erro" or "inesperadamente" not in (estados["morre"].get("erro") or ""):
+        print("❌ Worker morto não foi marcado com erro")
+        sucesso = False
+
+    vivos = []
+    for pid in pids:
+        try:
+            os.kill(pid, 0)
+            vivos.append(pid)
+        except OSError:
+            pass
+    if vivos:
+        print(f"❌ Workers ainda vivos: {vivos}")
+        sucesso = False
+
+    print(f"   ⏱️ {duracao:.1f}s")
+
+    # Sem pool: o job roda no processo da API e a exceção precisa virar estado
+    print("\n🧵 Sem pool (no processo da API)...")
+    executor_local = ExecutorJobs(tamanho_pool=0, timeout_job=TIMEOUT_TESTE, intervalo_progresso=0.5)
+    modulo_alvos.salvar_execucao("falha_local", {"status": "iniciado"})
+    await executor_local.submeter("falha_local", "core.teste_executor_jobs:job_falha", ao_atualizar=ao_atualizar)
+    await asyncio.gather(*executor_local._tarefas.values())
+    estado = estados["falha_local"]
+    print(f"   📋 falha_local: {estado.get('status')} - {estado.get('erro')}")
+    if estado.get("status") != "erro" or estado.get("erro") != "Falha simulada no job" or not estado.get("fim"):
+        print("❌ Exceção do job sem pool não foi marcada com erro")
+        sucesso = False
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DO EXECUTOR CONCLUÍDO!" if sucesso else "\n💥 TESTE DO EXECUTOR FALHOU!")
+    sys.exit(0 if sucesso else 1)
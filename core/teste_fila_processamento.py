@@ -0,0 +1,168 @@
+"""
+Teste da Fila de Processamento - status por título após Sienge + Sicredi
+
+Roda _executar_rpas_sienge_sicredi (api_rpa) com os RPAs substituídos por
+simulações, um contrato por lote, e grava o status devolvido na fila local:
+- contratos cujo lote subiu no Sicredi ficam "processado"
+- falha no Sienge, upload recusado pelo Sicredi e exceção no consumidor do
+  lote ficam "erro", com a mensagem de cada falha
+- nada é marcado "processado" antes do upload do lote
+O mesmo ciclo gravar -> atualizar -> recarregar é conferido no banco SQLite
+e, com o SQLite fora, no JSON com journal de status.
+
+Uso:
+    python core/teste_fila_processamento.py
+"""
+
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+import api_rpa
+from core import fila_processamento
+from core.base_rpa import ResultadoRPA
+from core.historico_jsonl import HistoricoJSONL
+from core.sqlite_manager import SQLiteManager
+
+TITULO_ERRO_SIENGE = "1003"
+TITULO_RECUSADO_SICREDI = "1004"
+TITULO_EXCECAO_LOTE = "1005"
+
+ESPERADO = {
+    "1000": ("processado", None),
+    "1001": ("processado", None),
+    "1002": ("processado", None),
+    TITULO_ERRO_SIENGE: ("erro", "Contrato não encontrado no Sienge"),
+    TITULO_RECUSADO_SICREDI: ("erro", "Remessa recusada pelo Sicredi"),
+    TITULO_EXCECAO_LOTE: ("erro", "Sessão do Sicredi expirada"),
+}
+
+PARAMETROS = SimpleNamespace(
+    relatorios_carteira=None,
+    concorrencia_sienge=3,
+    concorrencia_sicredi=2,
+    tamanho_lote_remessa=1,
+    usar_cache=False
+)
+
+
+def fila_teste() -> dict:
+    return {
+        "timestamp_criacao": "2024-06-01T08:00:00",
+        "contratos": [{"numero_titulo": titulo, "cliente": f"Cliente {titulo}"} for titulo in ESPERADO]
+    }
+
+
+async def executar_rpa_simulado(nome: str, **kwargs) -> ResultadoRPA:
+    if nome == "processamento_sienge":
+        titulo = kwargs["contrato"]["numero_titulo"]
+        if titulo == TITULO_ERRO_SIENGE:
+            return ResultadoRPA(sucesso=False, mensagem="Falha", erro=ESPERADO[titulo][1])
+        return ResultadoRPA(sucesso=True, mensagem="Reparcelado", dados={
+            "contrato_processado": {"numero_titulo": titulo, "cliente": f"Cliente {titulo}"},
+            "carne_gerado": {"sucesso": True, "tipo": "individual", "arquivo_gerado": f"remessa_{titulo}.rem"}
+        })
+
+    if nome == "processamento_sicredi_lote":
+        titulos = [t["numero_titulo"] for r in kwargs["dados_por_arquivo"].values() for t in r["titulos"]]
+        if TITULO_EXCECAO_LOTE in titulos:
+            raise RuntimeError(ESPERADO[TITULO_EXCECAO_LOTE][1])
+        if TITULO_RECUSADO_SICREDI in titulos:
+            return ResultadoRPA(sucesso=False, mensagem="Falha", erro=ESPERADO[TITULO_RECUSADO_SICREDI][1])
+        return ResultadoRPA(sucesso=True, mensagem="Enviado", dados={"protocolos_por_arquivo": {}})
+
+    raise AssertionError(f"RPA inesperado: {nome}")
+
+
+async def ciclo_fila(descricao: str) -> bool:
+    """Grava a fila, processa os pendentes, atualiza o status e relê"""
+    print(f"\n📋 Fila {descricao}...")
+    await fila_processamento.gravar_fila_local(fila_teste())
+    carregada = await fila_processamento.carregar_fila_processamento()
+
+    execucao_id = f"teste_fila_{descricao}"
+    api_rpa.execucoes_ativas[execucao_id] = {"etapas_concluidas": []}
+    _, status_titulos = await api_rpa._executar_rpas_sienge_sicredi(
+        execucao_id, carregada["contratos"], {}, PARAMETROS
+    )
+    atualizados = await fila_processamento.atualizar_status_fila(status_titulos)
+    api_rpa.execucoes_ativas.pop(execucao_id, None)
+
+    fila = await fila_processamento.ler_fila_local()
+    obtido = {
+        c["numero_titulo"]: (c.get("status_processamento"), c.get("erro_processamento"))
+        for c in fila["contratos"]
+    }
+    sucesso = True
+    print(f"   📊 Origem: {carregada['origem']} | Atualizados: {atualizados}")
+    for titulo, esperado in ESPERADO.items():
+        if obtido.get(titulo) != esperado:
+            print(f"   ❌ {titulo}: {obtido.get(titulo)} (esperado {esperado})")
+            sucesso = False
+    if atualizados != len(ESPERADO):
+        print("   ❌ Nem todos os títulos foram atualizados")
+        sucesso = False
+
+    pendentes = await fila_processamento.carregar_fila_processamento()
+    com_erro = await fila_processamento.carregar_fila_processamento(incluir_com_erro=True)
+    if pendentes["contratos"] or len(com_erro["contratos"]) != 3:
+        print("   ❌ Recarga após atualizar não separou pendentes e com erro")
+        sucesso = False
+    return sucesso
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DA FILA DE PROCESSAMENTO - STATUS APÓS SIENGE + SICREDI")
+    print("=" * 50)
+
+    pasta = tempfile.mkdtemp(prefix="teste_fila_")
+    originais = (
+        api_rpa.executar_rpa, fila_processamento.MONGODB_DISPONIVEL, fila_processamento.sqlite_manager,
+        fila_processamento.ARQUIVO_FILA, fila_processamento.journal_status_fila
+    )
+    sucesso = True
+
+    try:
+        # RPAs simulados; fila só no armazenamento local da pasta temporária
+        api_rpa.executar_rpa = executar_rpa_simulado
+
+        async def nao_memoizar(*args, **kwargs):
+            return None
+        api_rpa.memoizacao_estagios.salvar = nao_memoizar
+        fila_processamento.MONGODB_DISPONIVEL = False
+        fila_processamento.ARQUIVO_FILA = os.path.join(pasta, "fila_contratos_sienge.json")
+        fila_processamento.journal_status_fila = HistoricoJSONL(
+            os.path.join(pasta, "fila_contratos_sienge.status.jsonl"), max_bytes=0
+        )
+
+        # 1. Banco SQLite
+        fila_processamento.sqlite_manager = SQLiteManager(os.path.join(pasta, "rpa_local.db"))
+        sucesso = await ciclo_fila("sqlite") and sucesso
+        await fila_processamento.sqlite_manager.desconectar()
+
+        # 2. SQLite indisponível (caminho é uma pasta): JSON + journal
+        fila_processamento.sqlite_manager = SQLiteManager(pasta)
+        sucesso = await ciclo_fila("json") and sucesso
+        if not os.path.exists(fila_processamento.ARQUIVO_FILA):
+            print("❌ Fila JSON não foi gravada")
+            sucesso = False
+    finally:
+        (api_rpa.executar_rpa, fila_processamento.MONGODB_DISPONIVEL, fila_processamento.sqlite_manager,
+         fila_processamento.ARQUIVO_FILA, fila_processamento.journal_status_fila) = originais
+        vars(api_rpa.memoizacao_estagios).pop("salvar", None)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DA FILA CONCLUÍDO!" if sucesso else "\n💥 TESTE DA FILA FALHOU!")
+    sys.exit(0 if sucesso else 1)
@@ -0,0 +1,119 @@
+"""
+Teste do Histórico JSONL - rotação por tamanho, leitura entre arquivos e índice
+
+Em uma pasta temporária verifica:
+- ao passar de max_bytes o arquivo rotaciona e só arquivos_rotacionados
+  antigos ficam
+- ultimos(n) e todos() devolvem registros contíguos e em ordem, mesmo
+  atravessando arquivos rotacionados
+- índice de offsets corrompido é reconstruído
+- linha cortada (queda no meio da gravação) é descartada na próxima gravação
+- migração do JSON antigo e compactar()
+
+Uso:
+    python core/teste_historico_jsonl.py
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.historico_jsonl import HistoricoJSONL
+
+MAX_BYTES = 2000
+ROTACIONADOS = 2
+
+
+def sequencia(registros) -> list:
+    return [registro["n"] for registro in registros]
+
+
+def executar_teste() -> bool:
+    print("🧪 TESTE DO HISTÓRICO JSONL")
+    print("=" * 50)
+
+    pasta = tempfile.mkdtemp(prefix="teste_historico_")
+    caminho = os.path.join(pasta, "historico.jsonl")
+    sucesso = True
+
+    try:
+        historico = HistoricoJSONL(caminho, max_bytes=MAX_BYTES, arquivos_rotacionados=ROTACIONADOS)
+
+        # 1. Rotação
+        print("\n🔄 Anexando até rotacionar várias vezes...")
+        for n in range(300):
+            historico.anexar({"n": n, "texto": "x" * 20})
+        existentes = sorted(os.path.basename(a) for a in os.listdir(pasta) if not a.endswith((".idx", ".lock")))
+        print(f"   📁 Arquivos: {existentes}")
+        if existentes != ["historico.jsonl", "historico.jsonl.1", "historico.jsonl.2"]:
+            print("❌ Rotação não manteve só os arquivos configurados")
+            sucesso = False
+        if any(os.path.getsize(os.path.join(pasta, a)) > MAX_BYTES + 100 for a in existentes):
+            print("❌ Arquivo passou muito de max_bytes")
+            sucesso = False
+
+        # 2. Leitura entre arquivos
+        todos = sequencia(historico.todos())
+        ultimos = sequencia(historico.ultimos(100))
+        print(f"   📊 Mantidos: {len(todos)} ({todos[0]}..{todos[-1]})")
+        if todos != list(range(todos[0], 300)) or todos[0] == 0:
+            print("❌ todos() fora de ordem, com buracos ou sem descartar os antigos")
+            sucesso = False
+        if ultimos != list(range(200, 300)):
+            print("❌ ultimos(100) não atravessou os arquivos rotacionados corretamente")
+            sucesso = False
+        if sequencia(historico.ultimos(len(todos) + 50)) != todos:
+            print("❌ ultimos(n > total) deveria devolver tudo")
+            sucesso = False
+
+        # 3. Índice corrompido
+        print("\n🩹 Índice corrompido...")
+        with open(f"{caminho}.idx", "r+b") as f:
+            f.truncate(8)
+        if sequencia(historico.ultimos(5)) != list(range(295, 300)):
+            print("❌ ultimos() com índice corrompido")
+            sucesso = False
+
+        # 4. Linha cortada no fim do arquivo
+        print("\n✂️ Linha cortada...")
+        with open(caminho, "ab") as f:
+            f.write(b'{"n": 999, "texto": "cor')
+        historico.anexar({"n": 300})
+        if sequencia(historico.ultimos(2)) != [299, 300]:
+            print("❌ Linha cortada contaminou o registro seguinte")
+            sucesso = False
+
+        # 5. Migração do JSON antigo + compactar
+        print("\n📦 Migração e compactação...")
+        legado = os.path.join(pasta, "legado.json")
+        with open(legado, "w", encoding="utf-8") as f:
+            json.dump([{"n": -2}, {"n": -1}], f)
+        migrado = HistoricoJSONL(os.path.join(pasta, "migrado.jsonl"), max_bytes=0, arquivo_legado=legado)
+        migrado.anexar({"n": 0})
+        if sequencia(migrado.todos()) != [-2, -1, 0] or not os.path.exists(f"{legado}.migrado"):
+            print("❌ Migração do JSON antigo")
+            sucesso = False
+
+        mantidos = historico.compactar(manter=10)
+        if mantidos != 10 or sequencia(historico.todos()) != list(range(291, 301)):
+            print("❌ compactar(10) não manteve os 10 mais recentes")
+            sucesso = False
+        if os.path.exists(f"{caminho}.1"):
+            print("❌ compactar() deveria remover os rotacionados")
+            sucesso = False
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = executar_teste()
+    print("\n🎉 TESTE DO HISTÓRICO CONCLUÍDO!" if sucesso else "\n💥 TESTE DO HISTÓRICO FALHOU!")
+    sys.exit(0 if sucesso else 1)
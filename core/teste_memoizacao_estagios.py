@@ -0,0 +1,148 @@
+"""
+Teste da Memoização de Estágios - acerto, falta, invalidação e queda do MongoDB
+
+Usa um banco SQLite temporário como armazenamento local e verifica:
+- falta executa o estágio e memoiza; acerto não executa de novo
+- resultado com erro não é memoizado
+- invalidação por entradas remove só o contrato pedido
+- falha transitória do MongoDB grava no local e suspende o MongoDB só
+  pela pausa configurada (depois ele volta a ser usado)
+
+Uso:
+    python core/teste_memoizacao_estagios.py
+"""
+
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core import memoizacao_estagios as modulo
+from core.base_rpa import ResultadoRPA
+from core.memoizacao_estagios import MemoizacaoEstagios, ESTAGIO_SIENGE
+from core.sqlite_manager import sqlite_manager
+
+
+class ColecaoInstavel:
+    """Collection que falha nas primeiras operações e depois guarda em memória"""
+
+    def __init__(self, falhas: int):
+        self.falhas = falhas
+        self.registros = {}
+
+    def _talvez_falhar(self):
+        if self.falhas > 0:
+            self.falhas -= 1
+            raise ConnectionError("MongoDB fora do ar")
+
+    async def find_one(self, filtro, projecao=None):
+        self._talvez_falhar()
+        return self.registros.get(filtro["chave"])
+
+    async def replace_one(self, filtro, registro, upsert=False):
+        self._talvez_falhar()
+        self.registros[filtro["chave"]] = registro
+
+
+class MongoInstavel:
+    def __init__(self, falhas: int):
+        self.conectado = True
+        self.database = type("Banco", (), {"memoizacao_estagios": ColecaoInstavel(falhas)})()
+
+    async def conectar(self) -> bool:
+        return True
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DA MEMOIZAÇÃO DE ESTÁGIOS")
+    print("=" * 50)
+
+    pasta = tempfile.mkdtemp(prefix="teste_memoizacao_")
+    sqlite_manager.caminho = str(Path(pasta) / "rpa_local.sqlite3")
+    memo = MemoizacaoEstagios(arquivo_local=str(Path(pasta) / "memoizacao.json"))
+    memo.mongodb_ativo = False
+    sucesso = True
+    execucoes = []
+
+    def estagio(titulo: str, ok: bool = True):
+        async def funcao():
+            execucoes.append(titulo)
+            return ResultadoRPA(sucesso=ok, mensagem="Sienge", dados={"titulo": titulo}, erro=None if ok else "falha")
+        return funcao
+
+    # 1. Falta e acerto
+    print("\n♻️ Falta seguida de acerto...")
+    _, reaproveitado_1 = await memo.executar(ESTAGIO_SIENGE, {"numero_titulo": "1"}, estagio("1"))
+    resultado, reaproveitado_2 = await memo.executar(ESTAGIO_SIENGE, {"numero_titulo": "1"}, estagio("1"))
+    print(f"   📊 Execuções: {execucoes} | reaproveitado: {reaproveitado_1}, {reaproveitado_2}")
+    if reaproveitado_1 or not reaproveitado_2 or execucoes != ["1"] or resultado.dados != {"titulo": "1"}:
+        print("❌ Acerto/falta da memoização incorretos")
+        sucesso = False
+    if Path(memo.arquivo_local).exists():
+        print("❌ JSON local gravado com o SQLite disponível")
+        sucesso = False
+
+    # 2. Erro não é memoizado
+    print("\n🚫 Resultado com erro...")
+    await memo.executar(ESTAGIO_SIENGE, {"numero_titulo": "2"}, estagio("2", ok=False))
+    await memo.executar(ESTAGIO_SIENGE, {"numero_titulo": "2"}, estagio("2"))
+    if execucoes.count("2") != 2:
+        print("❌ Resultado com erro foi memoizado")
+        sucesso = False
+
+    # 3. Invalidação por entradas
+    print("\n🧹 Invalidação do título 1...")
+    removidos = await memo.invalidar(estagio=ESTAGIO_SIENGE, entradas={"numero_titulo": "1"})
+    mantido = await memo.obter(ESTAGIO_SIENGE, {"numero_titulo": "2"})
+    if removidos != 1 or await memo.obter(ESTAGIO_SIENGE, {"numero_titulo": "1"}) or not mantido:
+        print(f"❌ Invalidação incorreta (removidos={removidos})")
+        sucesso = False
+
+    # 4. Falha transitória do MongoDB
+    print("\n🔌 MongoDB com uma falha transitória...")
+    mongo = MongoInstavel(falhas=1)
+    modulo_original = getattr(modulo, "mongodb_manager", None)
+    modulo.mongodb_manager = mongo
+    memo.mongodb_ativo = True
+    memo.pausa_mongodb = 0.2
+    try:
+        await memo.salvar(ESTAGIO_SIENGE, {"numero_titulo": "3"}, {"sucesso": True, "dados": 3})
+        if not await sqlite_manager.obter_memoizacao(modulo.chave_estagio(ESTAGIO_SIENGE, {"numero_titulo": "3"})):
+            print("❌ Falha do MongoDB não gravou no armazenamento local")
+            sucesso = False
+
+        await memo.salvar(ESTAGIO_SIENGE, {"numero_titulo": "4"}, {"sucesso": True, "dados": 4})
+        if mongo.database.memoizacao_estagios.registros:
+            print("❌ MongoDB usado durante a pausa")
+            sucesso = False
+
+        await asyncio.sleep(0.25)
+        await memo.salvar(ESTAGIO_SIENGE, {"numero_titulo": "5"}, {"sucesso": True, "dados": 5})
+        if len(mongo.database.memoizacao_estagios.registros) != 1:
+            print("❌ MongoDB não voltou a ser usado após a pausa")
+            sucesso = False
+        if await sqlite_manager.obter_memoizacao(modulo.chave_estagio(ESTAGIO_SIENGE, {"numero_titulo": "5"})):
+            print("❌ Gravação local com o MongoDB funcionando")
+            sucesso = False
+
+        # Gravado localmente na queda continua visível com o MongoDB de volta
+        if (await memo.obter(ESTAGIO_SIENGE, {"numero_titulo": "3"}) or {}).get("dados") != 3:
+            print("❌ Registro da queda não encontrado")
+            sucesso = False
+    finally:
+        if modulo_original is None:
+            del modulo.mongodb_manager
+        else:
+            modulo.mongodb_manager = modulo_original
+        await sqlite_manager.desconectar()
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DA MEMOIZAÇÃO CONCLUÍDO!" if sucesso else "\n💥 TESTE DA MEMOIZAÇÃO FALHOU!")
+    sys.exit(0 if sucesso else 1)
@@ -0,0 +1,137 @@
+"""
+Teste dos Rollups de Execuções - contadores incrementais x reconstruir()
+
+Grava execuções e contratos (com títulos reprocessados) pelo caminho normal
+do MongoDBManager em um banco de teste e verifica que os rollups mantidos
+na gravação são iguais aos recalculados por reconstruir(). O mesmo para as
+planilhas extraídas (registro, inativação e reconstruir_planilhas()).
+
+Requer MongoDB (MONGODB_URL, padrão mongodb://localhost:27017); o banco
+rpa_reparcelamento_teste é apagado ao final.
+
+Uso:
+    python core/teste_rollups_execucoes.py
+"""
+
+import os
+import sys
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.mongodb_manager import mongodb_manager
+from core.escritor_lote import escritor_lote
+from core.rollups_execucoes import rollups_execucoes, COLECAO_ROLLUPS, COLECAO_ROLLUPS_PLANILHAS
+
+BANCO_TESTE = "rpa_reparcelamento_teste"
+
+
+async def rollups_atuais(colecao: str = COLECAO_ROLLUPS):
+    cursor = mongodb_manager.database[colecao].find()
+    return {doc["_id"]: doc for doc in await cursor.to_list(length=None)}
+
+
+async def verificar_planilhas() -> bool:
+    """Contadores de planilhas: registro, inativação (uma vez só) e reconstrução"""
+    sucesso = True
+    agora = datetime.now()
+    ids = {}
+    for nome, cliente, dias in (("a1", "Cliente A", 0), ("a2", "Cliente A", 3), ("b", "Cliente B", 10), ("c", "Cliente C", 0)):
+        ids[nome] = await mongodb_manager.salvar_planilha_extraida({
+            "cliente": cliente, "numero_titulo": nome, "data_extracao": agora - timedelta(days=dias)
+        })
+    if not await mongodb_manager.marcar_planilha_inativa(ids["c"]):
+        print("❌ Planilha ativa não foi inativada")
+        sucesso = False
+    if await mongodb_manager.marcar_planilha_inativa(ids["c"]):
+        print("❌ Planilha já inativa descontada de novo")
+        sucesso = False
+    await escritor_lote.descarregar()
+
+    estatisticas = await mongodb_manager.obter_estatisticas_planilhas()
+    obtido = {chave: estatisticas.get(chave) for chave in
+              ("total_planilhas", "planilhas_hoje", "planilhas_semana", "clientes_unicos")}
+    esperado = {"total_planilhas": 3, "planilhas_hoje": 1, "planilhas_semana": 2, "clientes_unicos": 2}
+    print(f"   📊 Planilhas: {obtido}")
+    if obtido != esperado:
+        print(f"❌ Estatísticas de planilhas incorretas (esperado {esperado})")
+        sucesso = False
+
+    incrementais = {chave: doc for chave, doc in (await rollups_atuais(COLECAO_ROLLUPS_PLANILHAS)).items()
+                    if doc.get("ativas")}
+    await rollups_execucoes.reconstruir_planilhas()
+    reconstruidos = await rollups_atuais(COLECAO_ROLLUPS_PLANILHAS)
+    if incrementais != reconstruidos:
+        print(f"❌ Rollups de planilhas divergentes: {sorted(set(incrementais) ^ set(reconstruidos))}")
+        sucesso = False
+    else:
+        print(f"   ✅ {len(reconstruidos)} documento(s) de rollup de planilhas idênticos")
+    return sucesso
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DOS ROLLUPS DE EXECUÇÕES")
+    print("=" * 50)
+
+    mongodb_manager.connection_string = os.getenv("MONGODB_URL", mongodb_manager.connection_string)
+    mongodb_manager.database_name = BANCO_TESTE
+    if not await mongodb_manager.conectar():
+        print("❌ MongoDB indisponível")
+        return False
+    await mongodb_manager.client.drop_database(BANCO_TESTE)
+    sucesso = True
+
+    try:
+        # 1. Execuções e contratos, com títulos reprocessados no mesmo lote e em lotes seguintes
+        print("\n💾 Gravando execuções e contratos...")
+        await mongodb_manager.salvar_execucao_rpa("coleta_indices", {}, {"sucesso": True, "tempo_execucao": 12})
+        await mongodb_manager.salvar_execucao_rpa("rpa_sienge", {}, {"sucesso": False, "tempo_execucao": 700})
+        for numero_titulo in ("1", "2", "1"):
+            await mongodb_manager.salvar_contrato_processado({"numero_titulo": numero_titulo})
+        await escritor_lote.descarregar()
+        for numero_titulo in ("2", "3"):
+            await mongodb_manager.salvar_contrato_processado({"numero_titulo": numero_titulo})
+        await escritor_lote.descarregar()
+
+        estatisticas = await mongodb_manager.obter_estatisticas_dashboard()
+        print(f"   📊 Execuções: {estatisticas['total_execucoes']} | "
+              f"Contratos: {estatisticas['contratos_processados_mes']}")
+        if estatisticas["contratos_processados_mes"] != 3:
+            print("❌ Título reprocessado contado de novo")
+            sucesso = False
+        if estatisticas["total_execucoes"] != 2:
+            print("❌ Total de execuções incorreto")
+            sucesso = False
+
+        # 2. Incremental == reconstruído
+        print("\n🔁 Comparando com reconstruir()...")
+        incrementais = await rollups_atuais()
+        await rollups_execucoes.reconstruir()
+        reconstruidos = await rollups_atuais()
+        if incrementais != reconstruidos:
+            divergentes = {
+                chave for chave in set(incrementais) | set(reconstruidos)
+                if incrementais.get(chave) != reconstruidos.get(chave)
+            }
+            print(f"❌ Rollups divergentes: {sorted(divergentes)}")
+            sucesso = False
+        else:
+            print(f"   ✅ {len(incrementais)} documento(s) de rollup idênticos")
+
+        # 3. Planilhas extraídas
+        print("\n📋 Planilhas extraídas...")
+        sucesso = await verificar_planilhas() and sucesso
+    finally:
+        await mongodb_manager.client.drop_database(BANCO_TESTE)
+        await mongodb_manager.desconectar()
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DOS ROLLUPS CONCLUÍDO!" if sucesso else "\n💥 TESTE DOS ROLLUPS FALHOU!")
+    sys.exit(0 if sucesso else 1)
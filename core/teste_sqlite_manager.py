@@ -0,0 +1,133 @@
+"""
+Teste do SQLite Manager - fila de processamento: gravação, UPDATE de status e releitura
+
+Em um banco temporário verifica:
+- a fila volta na ordem gravada, com os metadados
+- atualizar_status_fila marca processado/erro só nos títulos informados
+  (título inexistente não conta) e atualiza timestamp_ultima_atualizacao
+- o filtro por status devolve só os contratos naquele status, em ordem
+- atualizações concorrentes (threads diferentes) não se perdem
+- os dados sobrevivem a fechar e reabrir o banco (WAL incorporado)
+- gravar a fila de novo substitui a anterior
+
+Uso:
+    python core/teste_sqlite_manager.py
+"""
+
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.sqlite_manager import SQLiteManager
+
+
+def fila_teste(quantidade: int) -> dict:
+    return {
+        "timestamp_criacao": "2024-06-01T08:00:00",
+        "total_contratos": quantidade,
+        "contratos": [
+            {"numero_titulo": str(1000 + i), "cliente": f"Cliente {i}", "status_processamento": "pendente"}
+            for i in range(quantidade)
+        ]
+    }
+
+
+def titulos(fila: dict) -> list:
+    return [contrato["numero_titulo"] for contrato in fila["contratos"]]
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DO SQLITE - FILA DE PROCESSAMENTO")
+    print("=" * 50)
+
+    pasta = tempfile.mkdtemp(prefix="teste_sqlite_")
+    caminho = os.path.join(pasta, "rpa_local.db")
+    manager = SQLiteManager(caminho)
+    sucesso = True
+
+    try:
+        # 1. Gravação e releitura
+        print("\n💾 Gravando fila...")
+        if await manager.salvar_fila_processamento(fila_teste(6)) != 6:
+            print("❌ Fila não gravada")
+            return False
+        fila = await manager.obter_fila_processamento()
+        if titulos(fila) != [str(1000 + i) for i in range(6)] or fila.get("total_contratos") != 6:
+            print("❌ Fila relida fora de ordem ou sem metadados")
+            sucesso = False
+
+        # 2. UPDATE de status
+        print("\n✏️ Atualizando status...")
+        atualizados = await manager.atualizar_status_fila({
+            "1001": {"status": "processado"},
+            "1003": {"status": "erro", "erro": "Falha no upload Sicredi"},
+            "9999": {"status": "processado"},
+        })
+        print(f"   📊 Atualizados: {atualizados}")
+        if atualizados != 2:
+            print("❌ Contagem de atualizados incorreta")
+            sucesso = False
+
+        fila = await manager.obter_fila_processamento()
+        por_titulo = {c["numero_titulo"]: c for c in fila["contratos"]}
+        if (por_titulo["1001"]["status_processamento"] != "processado"
+                or not por_titulo["1001"]["processado_em"]
+                or por_titulo["1003"]["status_processamento"] != "erro"
+                or por_titulo["1003"]["erro_processamento"] != "Falha no upload Sicredi"
+                or por_titulo["1000"]["status_processamento"] != "pendente"):
+            print("❌ Status relido não corresponde ao atualizado")
+            sucesso = False
+        if not fila.get("timestamp_ultima_atualizacao"):
+            print("❌ timestamp_ultima_atualizacao não gravado")
+            sucesso = False
+
+        # 3. Filtro por status
+        pendentes = await manager.obter_fila_processamento(status=["pendente"])
+        com_erro = await manager.obter_fila_processamento(status=["erro"])
+        if titulos(pendentes) != ["1000", "1002", "1004", "1005"] or titulos(com_erro) != ["1003"]:
+            print(f"❌ Filtro por status: {titulos(pendentes)} / {titulos(com_erro)}")
+            sucesso = False
+
+        # 4. Atualizações concorrentes
+        print("\n🔀 Atualizações concorrentes...")
+        await manager.salvar_fila_processamento(fila_teste(40))
+        resultados = await asyncio.gather(*[
+            manager.atualizar_status_fila({str(1000 + i): {"status": "processado"}}) for i in range(40)
+        ])
+        processados = await manager.obter_fila_processamento(status=["processado"])
+        if sum(resultados) != 40 or len(processados["contratos"]) != 40:
+            print(f"❌ Atualizações perdidas: {sum(resultados)} / {len(processados['contratos'])}")
+            sucesso = False
+
+        # 5. Fechar e reabrir
+        print("\n🔌 Reabrindo o banco...")
+        await manager.desconectar()
+        manager = SQLiteManager(caminho)
+        reaberta = await manager.obter_fila_processamento(status=["processado"])
+        if reaberta is None or len(reaberta["contratos"]) != 40:
+            print("❌ Fila não sobreviveu ao fechar/reabrir")
+            sucesso = False
+
+        # 6. Nova fila substitui a anterior
+        await manager.salvar_fila_processamento(fila_teste(2))
+        fila = await manager.obter_fila_processamento()
+        if titulos(fila) != ["1000", "1001"] or any(c["status_processamento"] != "pendente" for c in fila["contratos"]):
+            print("❌ Nova fila não substituiu a anterior")
+            sucesso = False
+    finally:
+        await manager.desconectar()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DO SQLITE CONCLUÍDO!" if sucesso else "\n💥 TESTE DO SQLITE FALHOU!")
+    sys.exit(0 if sucesso else 1)
@@ -15,6 +15,10 @@ import os
 import requests
 from typing import Dict, Any, List
 import time
+import asyncio
+
+from core.historico_jsonl import historico_execucoes
+from core.fila_processamento import ler_fila_local
 
 # Configuração da página
 st.set_page_config(
@@ -69,15 +73,12 @@ class DashboardRPA:
 
     def __init__(self):
         self.api_url = "http://localhost:5000"
-        self.arquivo_historico = "logs/historico_execucoes.json"
+        self.historico = historico_execucoes
 
     def carregar_historico(self) -> List[Dict]:
         """Carrega histórico de execuções"""
         try:
-            if os.path.exists(self.arquivo_historico):
-                with open(self.arquivo_historico, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
+            return self.historico.ultimos(200)
         except:
             return []
 
@@ -95,27 +96,29 @@ class DashboardRPA:
     def obter_execucoes_ativas(self) -> Dict[str, Any]:
         """Obtém execuções ativas da API"""
         try:
-            response = requests.get(f"{self.api_url}/execucoes", timeout=5)
+            response = requests.get(f"{self.api_url}/execucoes", params={"limite": 20}, timeout=5)
             if response.status_code == 200:
                 return response.json()
-            return {"dados": {"total": 0, "execucoes": []}}
+            return {"dados": {"total": 0, "execucoes": [], "detalhes": {}}}
         except:
-            return {"dados": {"total": 0, "execucoes": []}}
+            return {"dados": {"total": 0, "execucoes": [], "detalhes": {}}}
+
+    def acompanhar_eventos(self, execucao_id: str):
+        """Eventos SSE da execução até ela concluir (substitui o polling de /workflow/status)"""
+        with requests.get(f"{self.api_url}/workflow/eventos/{execucao_id}", stream=True, timeout=(5, 60)) as response:
+            response.raise_for_status()
+            for linha in response.iter_lines(decode_unicode=True):
+                if linha and linha.startswith("data: "):
+                    yield json.loads(linha[len("data: "):])
 
 def carregar_estatisticas_fila():
     """Carrega estatísticas da fila de processamento do arquivo único"""
     try:
-        import json
-        import os
-
-        arquivo_fila = os.path.join("dados_processamento", "fila_contratos_sienge.json")
-
-        if not os.path.exists(arquivo_fila):
+        # Fila local (SQLite ou JSON) com os status atualizados
+        dados_fila = asyncio.run(ler_fila_local())
+        if not dados_fila:
             return {"total": 0, "pendentes": 0, "processados": 0, "erros": 0}
 
-        with open(arquivo_fila, 'r', encoding='utf-8') as f:
-            dados_fila = json.load(f)
-
         contratos = dados_fila.get("contratos", [])
         total = len(contratos)
         pendentes = sum(1 for c in contratos if c.get("status_processamento") == "pendente")
@@ -233,7 +236,7 @@ def main():
     with col4:
         # Taxa de sucesso
         if historico:
-            sucessos = sum(1 for exec in historico if exec["resultado"].get("sucesso_geral", False))
+            sucessos = sum(1 for execucao in historico if execucao["resultado"].get("sucesso_geral", False))
             taxa_sucesso = (sucessos / len(historico)) * 100
         else:
             taxa_sucesso = 0
@@ -281,10 +284,10 @@ def main():
 
             # Processa dados para gráfico
             df_historico = []
-            for exec in historico[-14:]:  # Últimos 14 dias
-                data = exec["resultado"]["data"]
-                sucesso = exec["resultado"].get("sucesso_geral", False)
-                contratos = exec["resultado"].get("contratos_identificados", 0)
+            for execucao in historico[-14:]:  # Últimos 14 dias
+                data = execucao["resultado"]["data"]
+                sucesso = execucao["resultado"].get("sucesso_geral", False)
+                contratos = execucao["resultado"].get("contratos_identificados", 0)
 
                 df_historico.append({
                     "Data": data,
@@ -360,40 +363,50 @@ def main():
         st.header("🔍 Execuções em Andamento")
 
         if execucoes_ativas["dados"]["total"] > 0:
+            detalhes = execucoes_ativas["dados"].get("detalhes", {})
             for exec_id in execucoes_ativas["dados"]["execucoes"]:
                 with st.expander(f"📋 Execução: {exec_id}"):
-                    try:
-                        response = requests.get(f"{dashboard.api_url}/workflow/status/{exec_id}")
-                        if response.status_code == 200:
-                            dados = response.json()["dados"]
-
-                            col1, col2, col3 = st.columns(3)
-
-                            with col1:
-                                st.write(f"**Status**: {dados.get('status', 'Desconhecido')}")
-                                st.write(f"**Etapa Atual**: {dados.get('etapa_atual', 'N/A')}")
-
-                            with col2:
-                                st.write(f"**Início**: {dados.get('inicio', 'N/A')}")
-                                etapas = dados.get('etapas_concluidas', [])
-                                st.write(f"**Etapas Concluídas**: {len(etapas)}/4")
-
-                            with col3:
-                                if dados.get('status') == 'concluido':
-                                    st.success("✅ Concluído")
-                                elif dados.get('status') == 'erro':
-                                    st.error("❌ Erro")
-                                else:
-                                    st.info("⏳ Em execução")
-
-                            # Barra de progresso
-                            progresso = len(etapas) / 4
-                            st.progress(progresso)
-
+                    dados = detalhes.get(exec_id, {})
+
+                    col1, col2, col3 = st.columns(3)
+                    status_col1, status_col3 = col1.empty(), col3.empty()
+                    col2.write(f"**Início**: {dados.get('inicio', 'N/A')}")
+                    barra = st.progress(0.0)
+                    contratos = st.empty()
+
+                    def exibir(dados: Dict[str, Any]):
+                        etapas = dados.get('etapas_concluidas', [])
+                        status_col1.markdown(f"**Status**: {dados.get('status', 'Desconhecido')}  \n"
+                                             f"**Etapa Atual**: {dados.get('etapa_atual', 'N/A')}  \n"
+                                             f"**Etapas Concluídas**: {len(etapas)}/4")
+                        if dados.get('status') == 'concluido':
+                            status_col3.success("✅ Concluído")
+                        elif dados.get('status') == 'erro':
+                            status_col3.error(f"❌ Erro: {dados.get('erro', '')}")
                         else:
-                            st.error("❌ Erro ao obter status")
-                    except:
-                        st.error("❌ Erro de conexão")
+                            status_col3.info("⏳ Em execução")
+                        barra.progress(min(len(etapas) / 4, 1.0))
+                        progresso = dados.get('progresso_contratos') or {}
+                        if progresso:
+                            contratos.write(f"**Contratos**: {progresso.get('processados', 0)}/{progresso.get('total', 0)} "
+                                            f"processados, {progresso.get('com_erro', 0)} com erro "
+                                            f"(último: {progresso.get('ultimo_titulo') or '-'})")
+
+                    exibir(dados)
+
+                    # Ao vivo: eventos empurrados pela API enquanto a execução roda
+                    if dados.get('status') not in ('concluido', 'erro') and st.checkbox("📡 Acompanhar ao vivo", key=f"live_{exec_id}"):
+                        try:
+                            for evento in dashboard.acompanhar_eventos(exec_id):
+                                if evento["evento"] == "estado":
+                                    dados = evento["dados"]
+                                elif evento["evento"] == "contrato":
+                                    dados["progresso_contratos"] = evento["dados"]
+                                else:
+                                    dados.update(evento["dados"])
+                                exibir(dados)
+                        except Exception:
+                            st.error("❌ Conexão com o stream de eventos perdida")
         else:
             st.info("ℹ️ Nenhuma execução ativa no momento")
 
@@ -429,14 +442,14 @@ def main():
 
             if apenas_sucessos:
                 historico_filtrado = [
-                    exec for exec in historico_filtrado 
-                    if exec["resultado"].get("sucesso_geral", False)
+                    execucao for execucao in historico_filtrado 
+                    if execucao["resultado"].get("sucesso_geral", False)
                 ]
 
             # Tabela de execuções
             dados_tabela = []
-            for exec in historico_filtrado:
-                resultado = exec["resultado"]
+            for execucao in historico_filtrado:
+                resultado = execucao["resultado"]
 
                 dados_tabela.append({
                     "Data": resultado["data"],
@@ -543,5 +556,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-```
-The code implements a dashboard with real-time monitoring of RPA processes, including statistics on processed contracts, success rates, and queue status, as well as historical data and scheduling information.
\ No newline at end of file
@@ -10,7 +10,6 @@ import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 import gspread
-from google.oauth2.service_account import Credentials
 import json
 import os
 import sys
@@ -20,6 +19,8 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from core.base_rpa import BaseRPA, ResultadoRPA
+from core.credenciais_google import cache_credenciais_google
+from core.fila_processamento import ARQUIVO_FILA, ler_fila_local, gravar_fila_local
 from core.notificacoes_simples import notificar_sucesso, notificar_erro
 
 
@@ -131,16 +132,8 @@ class RPAAnalisePlanilhas(BaseRPA):
             self.log_progresso(
                 f"Conectando ao Google Sheets: {credenciais_google}")
 
-            # Configura credenciais e escopos
-            credenciais = Credentials.from_service_account_file(
-                credenciais_google,
-                scopes=[
-                    "https://www.googleapis.com/auth/spreadsheets",
-                    "https://www.googleapis.com/auth/drive",
-                ]
-            )
-
-            self.cliente_sheets = gspread.authorize(credenciais)
+            # Cliente e token compartilhados no processo (core/credenciais_google)
+            self.cliente_sheets = cache_credenciais_google.cliente_sheets(credenciais_google)
             self.log_progresso("✅ Conectado ao Google Sheets com sucesso")
 
         except Exception as e:
@@ -895,15 +888,8 @@ class RPAAnalisePlanilhas(BaseRPA):
             fila_processamento: Lista de itens da fila
         """
         try:
-            import json
-            import os
-
-            # Cria diretório se não existir
-            os.makedirs("dados_processamento", exist_ok=True)
-
             # Nome único do arquivo - sempre o mesmo
-            arquivo_fila = os.path.join(
-                "dados_processamento", "fila_contratos_sienge.json")
+            arquivo_fila = ARQUIVO_FILA
 
             # Estrutura do arquivo único
             fila_completa = {
@@ -913,12 +899,10 @@ class RPAAnalisePlanilhas(BaseRPA):
                 "contratos": []
             }
 
-            # Se arquivo já existe, carrega dados anteriores
-            if os.path.exists(arquivo_fila):
-                try:
-                    with open(arquivo_fila, 'r', encoding='utf-8') as f:
-                        dados_existentes = json.load(f)
-
+            # Se arquivo já existe, carrega dados anteriores (com status atualizados)
+            try:
+                dados_existentes = await ler_fila_local()
+                if dados_existentes:
                     # Mantém contratos já processados
                     contratos_processados = [
                         c for c in dados_existentes.get("contratos", [])
@@ -929,9 +913,9 @@ class RPAAnalisePlanilhas(BaseRPA):
                         f"📋 Mantendo {len(contratos_processados)} contratos já processados")
                     fila_completa["contratos"].extend(contratos_processados)
 
-                except Exception as e:
-                    self.log_progresso(
-                        f"⚠️ Erro ao carregar arquivo anterior: {str(e)}")
+            except Exception as e:
+                self.log_progresso(
+                    f"⚠️ Erro ao carregar arquivo anterior: {str(e)}")
 
             # Estrutura da fila no formato esperado pelo RPA Sienge
             fila_completa["contratos"] = []
@@ -945,10 +929,8 @@ class RPAAnalisePlanilhas(BaseRPA):
             # Atualiza totais
             fila_completa["total_contratos"] = len(fila_completa["contratos"])
 
-            # Salva arquivo único
-            with open(arquivo_fila, 'w', encoding='utf-8') as f:
-                json.dump(fila_completa, f, indent=2,
-                          ensure_ascii=False, default=str)
+            # Salva a fila (banco local SQLite; arquivo único se ele falhar)
+            await gravar_fila_local(fila_completa)
 
             self.log_progresso(
                 f"✅ Fila salva no arquivo único: {arquivo_fila} ({len(fila_processamento)} novos + {len(fila_completa['contratos']) - len(fila_processamento)} anteriores)")
@@ -965,17 +947,8 @@ class RPAAnalisePlanilhas(BaseRPA):
         Salva a fila de contratos no arquivo único acumulativo
         """
         try:
-            import json
-            import os
-
-            # Cria diretório se não existir
-            pasta_dados = "dados_processamento"
-            if not os.path.exists(pasta_dados):
-                os.makedirs(pasta_dados)
-
             # Nome único do arquivo - sempre o mesmo
-            arquivo_fila = os.path.join(
-                pasta_dados, "fila_contratos_sienge.json")
+            arquivo_fila = ARQUIVO_FILA
 
             # Estrutura do arquivo único
             fila_dados = {
@@ -985,12 +958,10 @@ class RPAAnalisePlanilhas(BaseRPA):
                 "contratos": []
             }
 
-            # Se arquivo já existe, carrega e preserva contratos processados
-            if os.path.exists(arquivo_fila):
-                try:
-                    with open(arquivo_fila, 'r', encoding='utf-8') as f:
-                        dados_existentes = json.load(f)
-
+            # Se arquivo já existe, carrega e preserva contratos processados (com status atualizados)
+            try:
+                dados_existentes = await ler_fila_local()
+                if dados_existentes:
                     # Preserva apenas contratos já processados/com erro
                     contratos_anteriores = [
                         c for c in dados_existentes.get("contratos", [])
@@ -1001,9 +972,9 @@ class RPAAnalisePlanilhas(BaseRPA):
                     self.log_progresso(
                         f"📋 Preservando {len(contratos_anteriores)} contratos já processados")
 
-                except Exception as e:
-                    self.log_progresso(
-                        f"⚠️ Erro ao carregar arquivo anterior: {str(e)}")
+            except Exception as e:
+                self.log_progresso(
+                    f"⚠️ Erro ao carregar arquivo anterior: {str(e)}")
 
             # Adicionar novos contratos para processamento
             for contrato in contratos_para_reajuste:
@@ -1026,9 +997,8 @@ class RPAAnalisePlanilhas(BaseRPA):
             # Atualiza contadores
             fila_dados["total_contratos"] = len(fila_dados["contratos"])
 
-            # Salva arquivo único
-            with open(arquivo_fila, 'w', encoding='utf-8') as f:
-                json.dump(fila_dados, f, indent=2, ensure_ascii=False)
+            # Salva a fila (banco local SQLite; arquivo único se ele falhar)
+            await gravar_fila_local(fila_dados)
 
             self.log_progresso(
                 f"📄 Fila salva no arquivo único: {arquivo_fila} ({len(contratos_para_reajuste)} novos contratos)")
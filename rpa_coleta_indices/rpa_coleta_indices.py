@@ -19,7 +19,6 @@ import time
 import json
 import unicodedata
 import gspread
-from google.oauth2.service_account import Credentials
 from PyPDF2 import PdfReader
 import requests
 import aiohttp
@@ -28,6 +27,10 @@ import aiohttp
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from core.base_rpa import BaseRPA, ResultadoRPA
+from core.escritor_lote import escritor_lote
+from core.historico_jsonl import historico_indices_coletados
+from core.sqlite_manager import sqlite_manager
+from core.credenciais_google import cache_credenciais_google
 from core.notificacoes_simples import notificar_sucesso, notificar_erro
 
 
@@ -120,17 +123,8 @@ class RPAColetaIndices(BaseRPA):
             self.log_progresso(
                 f"Conectando ao Google Sheets com credenciais: {caminho_credenciais}")
 
-            # Configura credenciais e escopos
-            credenciais = Credentials.from_service_account_file(
-                caminho_credenciais,
-                scopes=[
-                    "https://www.googleapis.com/auth/spreadsheets",
-                    "https://www.googleapis.com/auth/drive",
-                ]
-            )
-
-            # Autoriza cliente
-            self.cliente_sheets = gspread.authorize(credenciais)
+            # Cliente e token compartilhados no processo (core/credenciais_google)
+            self.cliente_sheets = cache_credenciais_google.cliente_sheets(caminho_credenciais)
             self.log_progresso("✅ Conectado ao Google Sheets com sucesso")
 
         except Exception as e:
@@ -723,7 +717,6 @@ class RPAColetaIndices(BaseRPA):
         try:
             if self.mongo_manager and self.mongo_manager.conectado:
                 # Salva no MongoDB
-                collection = self.mongo_manager.database.indices_coletados
                 documento = {
                     "timestamp": datetime.now(),
                     "ipca": dados_ipca,
@@ -731,7 +724,8 @@ class RPAColetaIndices(BaseRPA):
                     "planilha_id": planilha_id,
                     "tipo": "coleta_indices"
                 }
-                await collection.insert_one(documento)
+                # Gravação em lote (core/escritor_lote)
+                await escritor_lote.inserir("indices_coletados", documento)
                 self.log_progresso("✅ Índices salvos no MongoDB")
             else:
                 # Fallback para JSON local
@@ -744,7 +738,7 @@ class RPAColetaIndices(BaseRPA):
 
     async def _salvar_indices_local(self, dados_ipca: Dict[str, Any], dados_igpm: Dict[str, Any], planilha_id: str):
         """
-        Salva índices localmente em JSON como fallback
+        Salva índices localmente (banco SQLite; JSONL se ele falhar) como fallback
 
         Args:
             dados_ipca: Dados do IPCA
@@ -752,20 +746,7 @@ class RPAColetaIndices(BaseRPA):
             planilha_id: ID da planilha
         """
         try:
-            # Garante que o diretório existe
-            os.makedirs("dados_processamento", exist_ok=True)
-
-            # Nome único do arquivo
-            arquivo_indices = "dados_processamento/indices_coletados.json"
-
-            # Carrega dados existentes ou cria lista vazia
-            dados_existentes = []
-            if os.path.exists(arquivo_indices):
-                with open(arquivo_indices, 'r', encoding='utf-8') as f:
-                    dados_existentes = json.load(f)
-
-            # Adiciona novo registro
-            novo_registro = {
+            registro = {
                 "timestamp": datetime.now().isoformat(),
                 "ipca": dados_ipca,
                 "igpm": dados_igpm,
@@ -773,14 +754,16 @@ class RPAColetaIndices(BaseRPA):
                 "tipo": "coleta_indices",
                 "status": "coletado"
             }
-            dados_existentes.append(novo_registro)
 
-            # Salva arquivo atualizado
-            with open(arquivo_indices, 'w', encoding='utf-8') as f:
-                json.dump(dados_existentes, f, indent=2, ensure_ascii=False)
+            if await sqlite_manager.salvar_indices_coletados(registro) is not None:
+                destino = sqlite_manager.caminho
+            else:
+                # Acrescenta o registro sem reler/regravar o histórico
+                historico_indices_coletados.anexar(registro)
+                destino = historico_indices_coletados.caminho
 
             self.log_progresso(
-                f"✅ Índices salvos localmente: {arquivo_indices}")
+                f"✅ Índices salvos localmente: {destino}")
 
         except Exception as e:
             self.log_progresso(
@@ -0,0 +1,477 @@
+"""
+CNAB240 - Validação de Arquivos de Remessa (Cobrança Sicredi)
+Valida a estrutura do arquivo antes do upload no WebBank
+
+Desenvolvido em Português Brasileiro
+
+Layout FEBRABAN 240 posições (posições 1-based):
+- 001-003 banco | 004-007 lote | 008 tipo de registro
+  0 = header de arquivo, 1 = header de lote, 3 = detalhe,
+  5 = trailer de lote, 9 = trailer de arquivo
+- Detalhe: 009-013 sequencial no lote | 014 segmento (P, Q, R, S, Y)
+- Segmento P: 086-100 valor nominal do título (2 decimais)
+- Trailer de lote: 018-023 registros do lote | 024-029 títulos | 030-046 valor total
+- Trailer de arquivo: 018-023 lotes | 024-029 registros do arquivo
+
+O arquivo é lido uma única vez, em bytes, via mmap (sem carregar o
+conteúdo inteiro em memória nem decodificar linhas válidas).
+"""
+
+import mmap
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+TAMANHO_REGISTRO = 240
+
+# Código do Sicredi na compensação
+BANCO_SICREDI = "748"
+
+TIPO_HEADER_ARQUIVO = ord("0")
+TIPO_HEADER_LOTE = ord("1")
+TIPO_DETALHE = ord("3")
+TIPO_TRAILER_LOTE = ord("5")
+TIPO_TRAILER_ARQUIVO = ord("9")
+
+SEGMENTOS_REMESSA = frozenset(b"PQRSY")
+
+# Erros detalhados guardados (o total continua sendo contado)
+MAX_ERROS = 200
+
+
+def _numero(registro: bytes, inicio: int, fim: int) -> Optional[int]:
+    """Campo numérico (posições 1-based, inclusivas); None se inválido"""
+    campo = registro[inicio - 1:fim]
+    return int(campo) if campo.isdigit() else None
+
+
+def _campo_em_branco(registro: bytes, inicio: int, fim: int) -> bool:
+    return not registro[inicio - 1:fim].strip(b" 0")
+
+
+def validar_remessa_cnab240(
+    arquivo_remessa: str,
+    banco_esperado: Optional[str] = BANCO_SICREDI,
+    max_erros: int = MAX_ERROS
+) -> Dict[str, Any]:
+    """
+    Valida arquivo de remessa CNAB240 em uma única passada
+
+    Verifica tamanho dos registros, ordem header/lotes/trailer, segmentos,
+    sequenciais, banco e os totais informados nos trailers.
+
+    Args:
+        arquivo_remessa: Caminho do arquivo
+        banco_esperado: Código do banco (None para não verificar)
+        max_erros: Quantidade máxima de erros detalhados no resultado
+
+    Returns:
+        Dict com valido, motivo, contagens, valor_total e erros
+        (lista de {"linha", "erro"})
+    """
+    erros: List[Dict[str, Any]] = []
+    total_erros = 0
+
+    def erro(linha: int, mensagem: str):
+        nonlocal total_erros
+        total_erros += 1
+        if len(erros) < max_erros:
+            erros.append({"linha": linha, "erro": mensagem})
+
+    tamanho = os.path.getsize(arquivo_remessa)
+    resultado = {
+        "arquivo": arquivo_remessa,
+        "formato": "CNAB240",
+        "tamanho_bytes": tamanho,
+        "linhas_total": 0,
+        "quantidade_lotes": 0,
+        "quantidade_registros_detalhe": 0,
+        "quantidade_titulos": 0,
+        "valor_total": 0.0,
+        "data_validacao": datetime.now().isoformat()
+    }
+
+    if tamanho == 0:
+        return {**resultado, "valido": False, "motivo": "Arquivo vazio",
+                "erros": [{"linha": 0, "erro": "Arquivo vazio"}], "total_erros": 1}
+
+    banco_arquivo = banco_esperado.encode() if banco_esperado else None
+
+    numero_linha = 0
+    header_arquivo = False
+    trailer_arquivo = False
+    lote_aberto = None          # número do lote em andamento
+    ultimo_lote = 0
+    quantidade_lotes = 0
+    registros_lote = 0
+    sequencial_esperado = 1
+    titulos_lote = 0
+    valor_lote = 0
+    titulos_total = 0
+    valor_total = 0
+    detalhes_total = 0
+    segmento_anterior = None
+
+    with open(arquivo_remessa, "rb") as arquivo, \
+            mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+
+        for linha in iter(dados.readline, b""):
+            numero_linha += 1
+            registro = linha.rstrip(b"\r\n")
+
+            if not registro:
+                # Linha vazia só é tolerada no final do arquivo
+                if dados.tell() < tamanho:
+                    erro(numero_linha, "Linha vazia no meio do arquivo")
+                continue
+
+            if len(registro) != TAMANHO_REGISTRO:
+                erro(numero_linha, f"Registro com {len(registro)} posições (esperado {TAMANHO_REGISTRO})")
+                continue
+
+            if trailer_arquivo:
+                erro(numero_linha, "Registro após o trailer de arquivo")
+                continue
+
+            if banco_arquivo and registro[0:3] != banco_arquivo:
+                erro(numero_linha, f"Banco {registro[0:3].decode('latin-1')} diferente de {banco_esperado}")
+
+            tipo = registro[7]
+            lote = _numero(registro, 4, 7)
+
+            if tipo == TIPO_HEADER_ARQUIVO:
+                if numero_linha != 1 or header_arquivo:
+                    erro(numero_linha, "Header de arquivo fora da primeira linha")
+                header_arquivo = True
+                if lote != 0:
+                    erro(numero_linha, "Header de arquivo deve ter lote 0000")
+
+            elif not header_arquivo and numero_linha == 1:
+                erro(numero_linha, "Arquivo não começa com header de arquivo (tipo 0)")
+                header_arquivo = True
+
+            if tipo == TIPO_HEADER_ARQUIVO:
+                continue
+
+            if tipo == TIPO_HEADER_LOTE:
+                if lote_aberto is not None:
+                    erro(numero_linha, f"Lote {lote_aberto} não foi encerrado antes do lote {lote}")
+                if lote is None or lote != ultimo_lote + 1:
+                    erro(numero_linha, f"Número de lote {lote} fora de sequência (esperado {ultimo_lote + 1})")
+                lote_aberto = lote
+                ultimo_lote = lote if lote is not None else ultimo_lote + 1
+                quantidade_lotes += 1
+                registros_lote = 1
+                sequencial_esperado = 1
+                titulos_lote = 0
+                valor_lote = 0
+                segmento_anterior = None
+
+            elif tipo == TIPO_DETALHE:
+                detalhes_total += 1
+                if lote_aberto is None:
+                    erro(numero_linha, "Registro de detalhe fora de lote")
+                    continue
+                registros_lote += 1
+                if lote != lote_aberto:
+                    erro(numero_linha, f"Detalhe com lote {lote} dentro do lote {lote_aberto}")
+
+                sequencial = _numero(registro, 9, 13)
+                if sequencial != sequencial_esperado:
+                    erro(numero_linha, f"Sequencial {sequencial} fora de ordem (esperado {sequencial_esperado})")
+                sequencial_esperado = (sequencial or sequencial_esperado) + 1
+
+                segmento = registro[13]
+                if segmento not in SEGMENTOS_REMESSA:
+                    erro(numero_linha, f"Segmento '{chr(segmento)}' inválido para remessa")
+                elif segmento == ord("P"):
+                    if segmento_anterior == ord("P"):
+                        erro(numero_linha - 1, "Segmento P sem segmento Q correspondente")
+                    valor = _numero(registro, 86, 100)
+                    if valor is None:
+                        erro(numero_linha, "Valor do título (086-100) não numérico")
+                    else:
+                        valor_lote += valor
+                    titulos_lote += 1
+                elif segmento == ord("Q") and segmento_anterior != ord("P"):
+                    erro(numero_linha, "Segmento Q sem segmento P anterior")
+                segmento_anterior = segmento
+
+            elif tipo == TIPO_TRAILER_LOTE:
+                if lote_aberto is None:
+                    erro(numero_linha, "Trailer de lote sem header de lote")
+                    continue
+                registros_lote += 1
+                if lote != lote_aberto:
+                    erro(numero_linha, f"Trailer com lote {lote} encerrando o lote {lote_aberto}")
+                if segmento_anterior == ord("P"):
+                    erro(numero_linha - 1, "Segmento P sem segmento Q correspondente")
+
+                informado = _numero(registro, 18, 23)
+                if informado != registros_lote:
+                    erro(numero_linha, f"Trailer do lote {lote_aberto} informa {informado} registros "
+                                       f"(contados {registros_lote})")
+
+                # Totais de cobrança são opcionais na remessa (brancos/zeros)
+                if not _campo_em_branco(registro, 24, 46):
+                    titulos_informados = _numero(registro, 24, 29)
+                    valor_informado = _numero(registro, 30, 46)
+                    if titulos_informados != titulos_lote:
+                        erro(numero_linha, f"Trailer do lote {lote_aberto} informa {titulos_informados} títulos "
+                                           f"(contados {titulos_lote})")
+                    if valor_informado != valor_lote:
+                        erro(numero_linha, f"Trailer do lote {lote_aberto} informa valor "
+                                           f"{(valor_informado or 0) / 100:.2f} (somado {valor_lote / 100:.2f})")
+
+                titulos_total += titulos_lote
+                valor_total += valor_lote
+                lote_aberto = None
+
+            elif tipo == TIPO_TRAILER_ARQUIVO:
+                trailer_arquivo = True
+                if lote_aberto is not None:
+                    erro(numero_linha, f"Lote {lote_aberto} não encerrado antes do trailer de arquivo")
+                if lote != 9999:
+                    erro(numero_linha, "Trailer de arquivo deve ter lote 9999")
+
+                lotes_informados = _numero(registro, 18, 23)
+                registros_informados = _numero(registro, 24, 29)
+                if lotes_informados != quantidade_lotes:
+                    erro(numero_linha, f"Trailer de arquivo informa {lotes_informados} lotes "
+                                       f"(contados {quantidade_lotes})")
+                if registros_informados != numero_linha:
+                    erro(numero_linha, f"Trailer de arquivo informa {registros_informados} registros "
+                                       f"(contados {numero_linha})")
+
+            else:
+                erro(numero_linha, f"Tipo de registro '{chr(tipo)}' inválido")
+
+    if not trailer_arquivo:
+        erro(numero_linha, "Trailer de arquivo (tipo 9) ausente")
+
+    resultado.update({
+        "linhas_total": numero_linha,
+        "quantidade_lotes": quantidade_lotes,
+        "quantidade_registros_detalhe": detalhes_total,
+        "quantidade_titulos": titulos_total,
+        "valor_total": valor_total / 100,
+        "valido": total_erros == 0,
+        "motivo": (
+            "Arquivo válido para processamento" if total_erros == 0
+            else f"{total_erros} erro(s) de estrutura - primeiro na linha {erros[0]['linha']}: {erros[0]['erro']}"
+        ),
+        "erros": erros,
+        "total_erros": total_erros
+    })
+    return resultado
+
+
+# ========================
+# MESCLAGEM DE REMESSAS
+# ========================
+
+# Limite do sequencial de 5 dígitos (registros por lote, incluindo header/trailer)
+MAX_REGISTROS_LOTE = 99_999
+
+# Máximo de segmentos por título (P, Q, R, S, Y) - reserva ao abrir um título
+SEGMENTOS_POR_TITULO = 5
+
+
+def _chave_header_arquivo(registro: bytes) -> bytes:
+    """Banco + empresa + convênio + agência/conta (ignora data/hora e NSA)"""
+    return registro[0:3] + registro[17:72]
+
+
+def _chave_header_lote(registro: bytes) -> bytes:
+    """Header de lote sem número do lote, nº remessa e data de gravação"""
+    return registro[0:3] + registro[7:183]
+
+
+def _ler_registros(arquivo_remessa: str):
+    """Itera registros (sem terminador de linha) via mmap"""
+    with open(arquivo_remessa, "rb") as arquivo, \
+            mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+        for linha in iter(dados.readline, b""):
+            registro = linha.rstrip(b"\r\n")
+            if registro:
+                yield registro
+
+
+class _EscritorRemessa:
+    """
+    Grava a remessa mesclada renumerando lotes/sequenciais
+
+    Os trailers de lote são gravados com espaço reservado e preenchidos no
+    fechamento, quando o modelo de trailer do cedente (formato dos totais)
+    já foi lido das remessas de origem.
+    """
+
+    def __init__(self, destino: str, header_arquivo: bytes):
+        self.saida = open(destino, "wb")
+        self.registros = 0
+        self.lotes = 0
+        self.titulos = 0
+        self.valor = 0
+        self.lote_aberto = False
+        self.chave_lote = None
+        self.trailers_lote = []       # (posição no arquivo, lote, registros, títulos, valor)
+        self.trailer_lote_modelo = None
+        self.trailer_arquivo_modelo = None
+        self._gravar(header_arquivo)
+
+    def _gravar(self, registro: bytes):
+        self.saida.write(registro + b"\r\n")
+        self.registros += 1
+
+    def abrir_lote(self, header_lote: bytes):
+        self.fechar_lote()
+        self.lotes += 1
+        self.chave_lote = _chave_header_lote(header_lote)
+        self.registros_lote = 1
+        self.titulos_lote = 0
+        self.valor_lote = 0
+        self.lote_aberto = True
+        self._gravar(header_lote[0:3] + b"%04d" % self.lotes + header_lote[7:])
+
+    def cabe_titulo(self) -> bool:
+        return self.registros_lote + SEGMENTOS_POR_TITULO + 1 <= MAX_REGISTROS_LOTE
+
+    def gravar_detalhe(self, registro: bytes):
+        self.registros_lote += 1
+        if registro[13] == ord("P"):
+            self.titulos_lote += 1
+            self.valor_lote += _numero(registro, 86, 100) or 0
+        # Sequencial = posição no lote (header é o registro 0)
+        self._gravar(
+            registro[0:3] + b"%04d" % self.lotes + registro[7:8]
+            + b"%05d" % (self.registros_lote - 1) + registro[13:]
+        )
+
+    def fechar_lote(self):
+        if not self.lote_aberto:
+            return
+        self.registros_lote += 1
+        self.trailers_lote.append(
+            (self.saida.tell(), self.lotes, self.registros_lote, self.titulos_lote, self.valor_lote)
+        )
+        self._gravar(b" " * TAMANHO_REGISTRO)
+        self.titulos += self.titulos_lote
+        self.valor += self.valor_lote
+        self.lote_aberto = False
+
+    def fechar(self):
+        self.fechar_lote()
+        self.registros += 1
+
+        modelo = self.trailer_arquivo_modelo or b" " * TAMANHO_REGISTRO
+        self.saida.write(
+            modelo[0:3] + b"99999" + modelo[8:17]
+            + b"%06d%06d" % (self.lotes, self.registros) + modelo[29:] + b"\r\n"
+        )
+
+        # Preenche trailers de lote mantendo o formato do cedente
+        modelo = self.trailer_lote_modelo or b" " * TAMANHO_REGISTRO
+        totais_preenchidos = not _campo_em_branco(modelo, 24, 46)
+        for posicao, lote, registros, titulos, valor in self.trailers_lote:
+            totais = b"%06d%017d" % (titulos, valor) if totais_preenchidos else modelo[23:46]
+            self.saida.seek(posicao)
+            self.saida.write(
+                modelo[0:3] + b"%04d" % lote + b"5" + modelo[8:17]
+                + b"%06d" % registros + totais + modelo[46:]
+            )
+
+        self.saida.close()
+
+
+def mesclar_remessas_cnab240(
+    arquivos_remessa: List[str],
+    pasta_destino: str,
+    banco_esperado: Optional[str] = BANCO_SICREDI
+) -> Dict[str, Any]:
+    """
+    Mescla remessas CNAB240 compatíveis em um único arquivo por cedente
+
+    Remessas com o mesmo header de arquivo (banco, empresa, convênio,
+    agência/conta) viram um arquivo; lotes com o mesmo header são unidos
+    em um único lote (respeitando o limite de 99.999 registros), com
+    lotes e sequenciais renumerados e trailers recalculados.
+    Arquivos inválidos não entram na mesclagem.
+
+    Args:
+        arquivos_remessa: Remessas geradas pelo Sienge
+        pasta_destino: Pasta onde gravar os arquivos mesclados
+        banco_esperado: Código do banco para validação prévia
+
+    Returns:
+        {"arquivos_mesclados": [{arquivo, origens, quantidade_lotes,
+        quantidade_titulos, valor_total}], "rejeitados": [{arquivo, motivo, erros}]}
+    """
+    os.makedirs(pasta_destino, exist_ok=True)
+    rejeitados = []
+    grupos: Dict[bytes, List[Dict[str, Any]]] = {}
+
+    # Valida cada origem e agrupa por cedente (header de arquivo)
+    for arquivo in dict.fromkeys(arquivos_remessa):
+        if not os.path.isfile(arquivo):
+            rejeitados.append({"arquivo": arquivo, "motivo": "Arquivo de remessa não encontrado", "erros": []})
+            continue
+
+        validacao = validar_remessa_cnab240(arquivo, banco_esperado)
+        if not validacao["valido"]:
+            rejeitados.append({"arquivo": arquivo, "motivo": validacao["motivo"], "erros": validacao["erros"][:10]})
+            continue
+
+        with open(arquivo, "rb") as f:
+            header = f.readline().rstrip(b"\r\n")
+        grupos.setdefault(_chave_header_arquivo(header), []).append({
+            "arquivo": arquivo,
+            "quantidade_titulos": validacao["quantidade_titulos"],
+            "valor_total": validacao["valor_total"]
+        })
+
+    carimbo = datetime.now().strftime("%Y%m%d_%H%M%S")
+    mesclados = []
+
+    for numero, origens in enumerate(grupos.values(), 1):
+        destino = os.path.join(pasta_destino, f"remessa_mesclada_{carimbo}_{numero:02d}.rem")
+        escritor = None
+
+        for origem in origens:
+            lotes_destino = set()
+            header_lote = None
+
+            for registro in _ler_registros(origem["arquivo"]):
+                tipo = registro[7]
+                if tipo == TIPO_HEADER_ARQUIVO:
+                    if escritor is None:
+                        escritor = _EscritorRemessa(destino, registro)
+                elif tipo == TIPO_HEADER_LOTE:
+                    header_lote = registro
+                elif tipo == TIPO_DETALHE:
+                    novo_lote = (
+                        not escritor.lote_aberto
+                        or escritor.chave_lote != _chave_header_lote(header_lote)
+                        or (registro[13] == ord("P") and not escritor.cabe_titulo())
+                    )
+                    if novo_lote:
+                        escritor.abrir_lote(header_lote)
+                    escritor.gravar_detalhe(registro)
+                    lotes_destino.add(escritor.lotes)
+                elif tipo == TIPO_TRAILER_LOTE:
+                    escritor.trailer_lote_modelo = escritor.trailer_lote_modelo or registro
+                elif tipo == TIPO_TRAILER_ARQUIVO:
+                    escritor.trailer_arquivo_modelo = escritor.trailer_arquivo_modelo or registro
+
+            origem["lotes_destino"] = sorted(lotes_destino)
+
+        escritor.fechar()
+        mesclados.append({
+            "arquivo": destino,
+            "origens": origens,
+            "quantidade_lotes": escritor.lotes,
+            "quantidade_registros": escritor.registros,
+            "quantidade_titulos": escritor.titulos,
+            "valor_total": escritor.valor / 100
+        })
+
+    return {"arquivos_mesclados": mesclados, "rejeitados": rejeitados}
@@ -0,0 +1,333 @@
+"""
+Retorno CNAB - Leitura e Conciliação de Arquivos de Retorno (Cobrança Sicredi)
+Confere quais boletos o banco efetivamente registrou após o upload da remessa
+
+Desenvolvido em Português Brasileiro
+
+Layout CNAB240 (FEBRABAN, posições 1-based), detalhes tipo 3:
+- Segmento T: 016-017 movimento | 038-057 nosso número | 059-073 seu número
+  (número do documento) | 074-081 vencimento DDMMAAAA | 082-096 valor nominal
+  | 106-130 uso da empresa | 214-223 motivos da ocorrência (5 x 2 dígitos)
+- Segmento U: 078-092 valor pago | 138-145 data da ocorrência DDMMAAAA
+
+Layout CNAB400 (Sicredi), registros tipo 1:
+- 048-062 nosso número | 109-110 ocorrência | 111-116 data DDMMAA
+  | 117-126 seu número | 147-152 vencimento DDMMAA | 153-165 valor
+  | 254-266 valor pago | 319-328 motivos da ocorrência
+
+O arquivo é lido em streaming (mmap, registro a registro) e as entradas
+viram colunas de um DataFrame indexável por nosso número/título. A
+conciliação com contratos_processados é um único merge vetorizado: uma
+consulta $in no MongoDB para buscar os contratos e um bulk_write para
+gravar a situação de todos de uma vez.
+"""
+
+import json
+import logging
+import mmap
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+import pandas as pd
+
+try:
+    from core.mongodb_manager import mongodb_manager
+    MONGODB_DISPONIVEL = True
+except ImportError:
+    MONGODB_DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+PASTA_CONCILIACOES = "dados_processamento/retornos"
+
+# Ocorrências de retorno (iguais no CNAB240 e no CNAB400 Sicredi)
+OCORRENCIAS = {
+    "02": "Entrada confirmada",
+    "03": "Entrada rejeitada",
+    "06": "Liquidação normal",
+    "09": "Baixado automaticamente",
+    "10": "Baixado conforme instruções",
+    "12": "Abatimento concedido",
+    "14": "Vencimento alterado",
+    "17": "Liquidação após baixa",
+    "19": "Confirmação de instrução de protesto",
+    "23": "Encaminhado a cartório",
+    "26": "Instrução rejeitada",
+    "27": "Confirmação de pedido de alteração",
+    "28": "Débito de tarifas/custas",
+    "30": "Alteração de dados rejeitada",
+}
+
+# Rejeições: título (ou instrução) não aceito pelo banco
+OCORRENCIAS_REJEICAO = frozenset({"03", "26", "30"})
+
+# Situações da conciliação por título
+SITUACAO_REGISTRADO = "registrado"
+SITUACAO_REJEITADO = "rejeitado"
+SITUACAO_AUSENTE = "ausente_no_retorno"
+SITUACAO_DESCONHECIDO = "sem_contrato"
+
+COLUNAS_RETORNO = [
+    "numero_titulo", "nosso_numero", "ocorrencia", "motivos", "data_ocorrencia",
+    "vencimento", "valor", "valor_pago", "uso_empresa", "linha", "formato", "arquivo_retorno",
+]
+
+
+def normalizar_titulo(titulos: pd.Series) -> pd.Series:
+    """Chave de conciliação: sem espaços nem zeros à esquerda"""
+    chave = titulos.astype(str).str.strip().str.lstrip("0")
+    return chave.where(chave != "", titulos.astype(str).str.strip())
+
+
+def _centavos(campo: bytes) -> int:
+    return int(campo) if campo.isdigit() else 0
+
+
+def _texto(campo: bytes) -> str:
+    return campo.decode("latin-1").strip()
+
+
+def ler_retorno_cnab(arquivo_retorno: str) -> pd.DataFrame:
+    """
+    Lê arquivo de retorno CNAB240 ou CNAB400 em uma passada
+
+    O formato é detectado pelo tamanho do primeiro registro.
+
+    Args:
+        arquivo_retorno: Caminho do arquivo de retorno baixado do WebBank
+
+    Returns:
+        DataFrame com uma linha por ocorrência de título (COLUNAS_RETORNO),
+        valores em reais e datas como datetime
+    """
+    colunas: Dict[str, list] = {c: [] for c in COLUNAS_RETORNO[:-2]}
+    formato = None
+
+    with open(arquivo_retorno, "rb") as arquivo, \
+            mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+        for numero_linha, linha in enumerate(iter(dados.readline, b""), 1):
+            registro = linha.rstrip(b"\r\n")
+            if not registro:
+                continue
+            if formato is None:
+                formato = "CNAB400" if len(registro) == 400 else "CNAB240"
+
+            if formato == "CNAB240":
+                if registro[7] != ord("3"):
+                    continue
+                segmento = registro[13]
+                if segmento == ord("T"):
+                    colunas["numero_titulo"].append(_texto(registro[58:73]))
+                    colunas["nosso_numero"].append(_texto(registro[37:57]))
+                    colunas["ocorrencia"].append(_texto(registro[15:17]))
+                    colunas["motivos"].append(_texto(registro[213:223]))
+                    colunas["vencimento"].append(_texto(registro[73:81]))
+                    colunas["valor"].append(_centavos(registro[81:96]))
+                    colunas["uso_empresa"].append(_texto(registro[105:130]))
+                    colunas["linha"].append(numero_linha)
+                    colunas["data_ocorrencia"].append("")
+                    colunas["valor_pago"].append(0)
+                elif segmento == ord("U") and colunas["linha"]:
+                    # Segmento U complementa o T imediatamente anterior
+                    colunas["valor_pago"][-1] = _centavos(registro[77:92])
+                    colunas["data_ocorrencia"][-1] = _texto(registro[137:145])
+            elif registro[0] == ord("1"):
+                colunas["numero_titulo"].append(_texto(registro[116:126]))
+                colunas["nosso_numero"].append(_texto(registro[47:62]))
+                colunas["ocorrencia"].append(_texto(registro[108:110]))
+                colunas["motivos"].append(_texto(registro[318:328]))
+                colunas["data_ocorrencia"].append(_texto(registro[110:116]))
+                colunas["vencimento"].append(_texto(registro[146:152]))
+                colunas["valor"].append(_centavos(registro[152:165]))
+                colunas["valor_pago"].append(_centavos(registro[253:266]))
+                colunas["uso_empresa"].append("")
+                colunas["linha"].append(numero_linha)
+
+    retorno = pd.DataFrame(colunas)
+    formato_data = "%d%m%y" if formato == "CNAB400" else "%d%m%Y"
+    for coluna in ("data_ocorrencia", "vencimento"):
+        retorno[coluna] = pd.to_datetime(retorno[coluna], format=formato_data, errors="coerce")
+    retorno["valor"] = retorno["valor"].astype("int64") / 100
+    retorno["valor_pago"] = retorno["valor_pago"].astype("int64") / 100
+    retorno["formato"] = formato or "CNAB240"
+    retorno["arquivo_retorno"] = arquivo_retorno
+    return retorno
+
+
+def ler_retornos(arquivos_retorno: Iterable[str]) -> pd.DataFrame:
+    """Lê vários retornos, indexados por título normalizado e nosso número"""
+    quadros = [ler_retorno_cnab(arquivo) for arquivo in arquivos_retorno]
+    retorno = pd.concat(quadros, ignore_index=True) if quadros else pd.DataFrame(columns=COLUNAS_RETORNO)
+    retorno["chave_titulo"] = normalizar_titulo(retorno["numero_titulo"])
+    return retorno.set_index(["chave_titulo", "nosso_numero"], drop=False).sort_index()
+
+
+def conciliar_retorno(retorno: pd.DataFrame, contratos: pd.DataFrame) -> pd.DataFrame:
+    """
+    Concilia ocorrências do retorno com os contratos enviados (merge vetorizado)
+
+    Um título é "registrado" se teve alguma ocorrência que não é rejeição
+    (entrada confirmada, liquidação, baixa...), "rejeitado" se só teve
+    rejeições, "ausente_no_retorno" se foi enviado e o banco não devolveu
+    nada, e "sem_contrato" se o retorno traz um título desconhecido.
+
+    Args:
+        retorno: Saída de ler_retornos / ler_retorno_cnab
+        contratos: DataFrame com ao menos numero_titulo
+
+    Returns:
+        DataFrame com uma linha por título e a coluna situacao
+    """
+    retorno = retorno.reset_index(drop=True)
+    if "chave_titulo" not in retorno:
+        retorno["chave_titulo"] = normalizar_titulo(retorno["numero_titulo"])
+    retorno["rejeicao"] = retorno["ocorrencia"].isin(OCORRENCIAS_REJEICAO)
+    retorno["aceite"] = ~retorno["rejeicao"]
+
+    # Última ocorrência de cada título (ordem do arquivo) + agregados
+    agrupado = retorno.groupby("chave_titulo", sort=False)
+    resumo = agrupado.agg(
+        nosso_numero=("nosso_numero", "last"),
+        ultima_ocorrencia=("ocorrencia", "last"),
+        data_ocorrencia=("data_ocorrencia", "last"),
+        valor=("valor", "last"),
+        valor_pago=("valor_pago", "max"),
+        arquivo_retorno=("arquivo_retorno", "last"),
+        aceite=("aceite", "any"),
+        quantidade_ocorrencias=("ocorrencia", "size"),
+        numero_titulo_retorno=("numero_titulo", "last"),
+    )
+    rejeicoes = retorno[retorno["rejeicao"]].groupby("chave_titulo", sort=False)["motivos"].last()
+    resumo["motivos_rejeicao"] = rejeicoes.reindex(resumo.index).fillna("")
+
+    enviados = contratos[["numero_titulo"]].astype(str).drop_duplicates()
+    enviados["chave_titulo"] = normalizar_titulo(enviados["numero_titulo"])
+
+    conciliacao = enviados.merge(
+        resumo.reset_index(), on="chave_titulo", how="outer", indicator=True
+    )
+    conciliacao["situacao"] = np.select(
+        [
+            conciliacao["_merge"] == "left_only",
+            conciliacao["_merge"] == "right_only",
+            conciliacao["aceite"].fillna(False).astype(bool),
+        ],
+        [SITUACAO_AUSENTE, SITUACAO_DESCONHECIDO, SITUACAO_REGISTRADO],
+        default=SITUACAO_REJEITADO,
+    )
+    conciliacao["numero_titulo"] = conciliacao["numero_titulo"].fillna(conciliacao["numero_titulo_retorno"])
+    conciliacao["descricao_ocorrencia"] = conciliacao["ultima_ocorrencia"].map(OCORRENCIAS).fillna("")
+
+    return conciliacao.drop(columns=["_merge", "aceite", "numero_titulo_retorno"])
+
+
+def resumir_conciliacao(conciliacao: pd.DataFrame, max_itens: int = 200) -> Dict[str, Any]:
+    """Totais por situação e listas de pendências (rejeitados/ausentes/sem contrato)"""
+    def itens(situacao: str) -> List[Dict[str, Any]]:
+        selecao = conciliacao[conciliacao["situacao"] == situacao].head(max_itens)
+        colunas = ["numero_titulo", "nosso_numero", "ultima_ocorrencia", "descricao_ocorrencia", "motivos_rejeicao"]
+        return json.loads(selecao[colunas].to_json(orient="records", force_ascii=False))
+
+    return {
+        "total_titulos": int(len(conciliacao)),
+        "por_situacao": {k: int(v) for k, v in conciliacao["situacao"].value_counts().items()},
+        "rejeitados": itens(SITUACAO_REJEITADO),
+        "ausentes_no_retorno": itens(SITUACAO_AUSENTE),
+        "sem_contrato": itens(SITUACAO_DESCONHECIDO),
+        "conciliado_em": datetime.now().isoformat(),
+    }
+
+
+def _atualizacoes_mongodb(conciliacao: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Documentos $set de retorno para os títulos que existem na base"""
+    selecao = conciliacao[conciliacao["situacao"] != SITUACAO_DESCONHECIDO]
+    registros = json.loads(selecao.to_json(orient="records", date_format="iso", force_ascii=False))
+    agora = datetime.now()
+    return [
+        {
+            "numero_titulo": registro["numero_titulo"],
+            "status_sicredi": registro["situacao"],
+            "nosso_numero": registro.get("nosso_numero"),
+            "retorno_sicredi": {
+                "situacao": registro["situacao"],
+                "ultima_ocorrencia": registro.get("ultima_ocorrencia"),
+                "descricao_ocorrencia": registro.get("descricao_ocorrencia"),
+                "motivos_rejeicao": registro.get("motivos_rejeicao"),
+                "data_ocorrencia": registro.get("data_ocorrencia"),
+                "valor_pago": registro.get("valor_pago"),
+                "arquivo_retorno": registro.get("arquivo_retorno"),
+                "conciliado_em": agora,
+            },
+        }
+        for registro in registros
+    ]
+
+
+async def conciliar_retornos(
+    arquivos_retorno: List[str],
+    titulos_esperados: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Ingestão de retornos: lê, concilia com contratos_processados e grava a situação
+
+    Args:
+        arquivos_retorno: Arquivos de retorno CNAB240/CNAB400
+        titulos_esperados: Títulos enviados nas remessas (ex.: manifesto do
+            ciclo). Sem essa lista, concilia os títulos presentes no retorno.
+
+    Returns:
+        Resumo da conciliação (resumir_conciliacao) + destino dos dados
+    """
+    retorno = ler_retornos(arquivos_retorno)
+    logger.info(f"📥 Retorno lido: {len(retorno)} ocorrência(s) em {len(arquivos_retorno)} arquivo(s)")
+
+    titulos = list(dict.fromkeys([str(t) for t in (titulos_esperados or [])]))
+    # O retorno traz o seu número com zeros à esquerda ("000000000000494") e a
+    # base guarda "494": consulta pela chave normalizada (e pelo valor bruto)
+    consulta = titulos or list(dict.fromkeys(
+        retorno["chave_titulo"].tolist() + retorno["numero_titulo"].tolist()
+    ))
+    contratos = pd.DataFrame({"numero_titulo": titulos}) if titulos else pd.DataFrame(columns=["numero_titulo"])
+    armazenamento = "json"
+
+    if MONGODB_DISPONIVEL:
+        try:
+            # Uma consulta $in para todos os títulos (em vez de uma por registro)
+            documentos = await mongodb_manager.obter_contratos_processados(consulta)
+            if documentos is not None:
+                armazenamento = "mongodb"
+                if not titulos:
+                    contratos = pd.DataFrame(documentos, columns=["numero_titulo"])
+        except Exception as e:
+            logger.warning(f"⚠️ MongoDB indisponível para conciliação, usando JSON: {str(e)}")
+
+    conciliacao = conciliar_retorno(retorno, contratos)
+    resumo = resumir_conciliacao(conciliacao)
+
+    if armazenamento == "mongodb":
+        atualizados = await mongodb_manager.atualizar_retorno_contratos(_atualizacoes_mongodb(conciliacao))
+        resumo["contratos_atualizados"] = atualizados
+    else:
+        os.makedirs(PASTA_CONCILIACOES, exist_ok=True)
+        caminho = os.path.join(
+            PASTA_CONCILIACOES, f"conciliacao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(
+                {"resumo": resumo, "titulos": _atualizacoes_mongodb(conciliacao)},
+                f, indent=2, ensure_ascii=False, default=str
+            )
+        resumo["arquivo_conciliacao"] = caminho
+
+    resumo["armazenamento"] = armazenamento
+    resumo["arquivos_retorno"] = list(arquivos_retorno)
+
+    situacoes = resumo["por_situacao"]
+    logger.info(
+        f"🔎 Conciliação: {situacoes.get(SITUACAO_REGISTRADO, 0)} registrados, "
+        f"{situacoes.get(SITUACAO_REJEITADO, 0)} rejeitados, "
+        f"{situacoes.get(SITUACAO_AUSENTE, 0)} ausentes no retorno"
+    )
+    return resumo
@@ -18,7 +18,9 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from core.base_rpa import BaseRPA, ResultadoRPA
+from core.escritor_lote import escritor_lote
 from core.notificacoes_simples import notificar_sucesso, notificar_erro
+from rpa_sicredi.cnab240 import validar_remessa_cnab240, mesclar_remessas_cnab240
 from typing import Dict, Any, List
 from datetime import datetime
 from pathlib import Path
@@ -34,6 +36,7 @@ class RPASicredi(BaseRPA):
     - Upload de arquivo de remessa gerado pelo Sienge
     - Validação e processamento do arquivo
     - Confirmação da atualização dos carnês
+    - Modo lote: várias remessas mescladas em um único upload
     """
 
     def __init__(self):
@@ -52,11 +55,18 @@ class RPASicredi(BaseRPA):
                 - arquivo_remessa: Caminho do arquivo gerado pelo Sienge
                 - credenciais_sicredi: URL, usuário e senha do Sicredi
                 - dados_processamento: Dados do reparcelamento processado
+                Ou, no modo lote:
+                - arquivos_remessa: Lista de remessas a mesclar e enviar juntas
+                - dados_por_arquivo: Dados de cada remessa (ex.: entrada do
+                  manifesto com "titulos"), indexados pelo caminho do arquivo
 
         Returns:
             ResultadoRPA com resultado do processamento
         """
         try:
+            if parametros.get("arquivos_remessa"):
+                return await self._executar_lote(parametros)
+
             self.log_progresso("Iniciando processamento no Sicredi WebBank")
 
             # Valida parâmetros
@@ -74,10 +84,7 @@ class RPASicredi(BaseRPA):
             # Configura credenciais
             self._configurar_credenciais(credenciais)
 
-            # Faz login no Sicredi WebBank
-            await self._fazer_login_sicredi()
-
-            # Valida arquivo antes do upload
+            # Valida arquivo antes do login/upload (arquivo ruim não abre sessão no WebBank)
             self.log_progresso("Validando arquivo de remessa")
             validacao_arquivo = await self._validar_arquivo_remessa(arquivo_remessa)
 
@@ -91,6 +98,9 @@ class RPASicredi(BaseRPA):
                     }
                 )
 
+            # Faz login no Sicredi WebBank
+            await self._fazer_login_sicredi()
+
             # Faz upload do arquivo de remessa
             self.log_progresso("Fazendo upload do arquivo de remessa")
             resultado_upload = await self._fazer_upload_arquivo(arquivo_remessa)
@@ -148,6 +158,123 @@ class RPASicredi(BaseRPA):
             # Sempre faz logout
             await self._fazer_logout_sicredi()
 
+    async def _executar_lote(self, parametros: Dict[str, Any]) -> ResultadoRPA:
+        """
+        Modo lote: mescla as remessas do ciclo e faz um único upload por cedente
+
+        Remessas compatíveis (mesmo header de arquivo CNAB240) são unidas
+        com lotes/sequenciais renumerados e trailers recalculados. O
+        protocolo do upload é mapeado de volta para cada remessa de origem
+        e para cada título dela. O logout fica a cargo do finally de executar.
+        """
+        arquivos_remessa = list(parametros.get("arquivos_remessa") or [])
+        credenciais = parametros.get("credenciais_sicredi")
+        dados_por_arquivo = parametros.get("dados_por_arquivo") or {}
+
+        if not credenciais:
+            return ResultadoRPA(
+                sucesso=False,
+                mensagem="Credenciais Sicredi não fornecidas",
+                erro="Parâmetro 'credenciais_sicredi' é obrigatório"
+            )
+
+        self.log_progresso(f"Iniciando processamento em lote de {len(arquivos_remessa)} remessa(s)")
+        self._configurar_credenciais(credenciais)
+
+        # Mescla fora do event loop (leitura/escrita de arquivos grandes)
+        pasta_destino = os.path.join("dados_processamento", "remessas", "mescladas")
+        mesclagem = await asyncio.to_thread(mesclar_remessas_cnab240, arquivos_remessa, pasta_destino)
+        rejeitados = mesclagem["rejeitados"]
+
+        for rejeitado in rejeitados:
+            self.log_progresso(f"❌ Remessa fora do lote: {rejeitado['arquivo']} - {rejeitado['motivo']}")
+
+        if not mesclagem["arquivos_mesclados"]:
+            return ResultadoRPA(
+                sucesso=False,
+                mensagem="Nenhuma remessa válida para envio em lote",
+                dados={"rejeitados": rejeitados}
+            )
+
+        self.log_progresso(
+            f"📦 {len(arquivos_remessa) - len(rejeitados)} remessa(s) mesclada(s) em "
+            f"{len(mesclagem['arquivos_mesclados'])} arquivo(s)"
+        )
+
+        await self._fazer_login_sicredi()
+
+        envios = []
+        protocolos_por_arquivo = {}
+        protocolos_por_titulo = {}
+
+        for mesclado in mesclagem["arquivos_mesclados"]:
+            arquivo = mesclado["arquivo"]
+            envio = {"arquivo_mesclado": arquivo, "origens": [o["arquivo"] for o in mesclado["origens"]]}
+            envios.append(envio)
+
+            validacao = await self._validar_arquivo_remessa(arquivo)
+            envio["validacao_arquivo"] = validacao
+            if not validacao["valido"]:
+                envio["sucesso"] = False
+                continue
+
+            self.log_progresso(f"Fazendo upload do arquivo mesclado ({mesclado['quantidade_titulos']} títulos)")
+            envio["upload"] = await self._fazer_upload_arquivo(arquivo)
+            if not envio["upload"]["sucesso"]:
+                envio["sucesso"] = False
+                continue
+
+            envio["processamento"] = await self._processar_arquivo_sicredi(arquivo)
+            if not envio["processamento"]["sucesso"]:
+                envio["sucesso"] = False
+                continue
+
+            envio["confirmacao"] = await self._confirmar_processamento()
+            envio["sucesso"] = envio["confirmacao"]["sucesso"]
+            if not envio["sucesso"]:
+                continue
+
+            # Protocolo único do upload vale para todas as remessas de origem
+            for origem in mesclado["origens"]:
+                protocolo = {
+                    "arquivo_mesclado": arquivo,
+                    "protocolo_upload": envio["upload"].get("protocolo_upload"),
+                    "numero_comprovante": envio["confirmacao"].get("numero_comprovante"),
+                    "lotes_destino": origem.get("lotes_destino", [])
+                }
+                protocolos_por_arquivo[origem["arquivo"]] = protocolo
+
+                for titulo in dados_por_arquivo.get(origem["arquivo"], {}).get("titulos", []):
+                    numero_titulo = str(titulo.get("numero_titulo", ""))
+                    if numero_titulo:
+                        protocolos_por_titulo[numero_titulo] = {**protocolo, "arquivo_remessa": origem["arquivo"]}
+
+        enviados_com_sucesso = sum(1 for e in envios if e["sucesso"])
+        sucesso = enviados_com_sucesso == len(envios) and not rejeitados
+
+        resultado_dados = {
+            "modo": "lote",
+            "arquivos_remessa": arquivos_remessa,
+            "arquivos_mesclados": mesclagem["arquivos_mesclados"],
+            "envios": envios,
+            "protocolos_por_arquivo": protocolos_por_arquivo,
+            "protocolos_por_titulo": protocolos_por_titulo,
+            "rejeitados": rejeitados,
+            "timestamp_processamento": datetime.now().isoformat()
+        }
+
+        await self._salvar_dados_processamento(resultado_dados)
+
+        return ResultadoRPA(
+            sucesso=sucesso,
+            mensagem=(
+                f"Processamento Sicredi em lote - {enviados_com_sucesso}/{len(envios)} upload(s), "
+                f"{len(protocolos_por_arquivo)} remessa(s) e {len(protocolos_por_titulo)} título(s) confirmados, "
+                f"{len(rejeitados)} remessa(s) rejeitada(s)"
+            ),
+            dados=resultado_dados
+        )
+
     def _configurar_credenciais(self, credenciais: Dict[str, Any]):
         """
         Configura credenciais do Sicredi
@@ -206,24 +333,23 @@ class RPASicredi(BaseRPA):
         try:
             self.log_progresso(f"Validando arquivo: {arquivo_remessa}")
 
-            # TODO: Cliente deve implementar validação específica
-            # Verificações básicas:
-            # - Arquivo existe
-            # - Formato correto (.txt)
-            # - Tamanho não zero
-            # - Estrutura do arquivo conforme padrão bancário
-
-            # Por enquanto, simula validação bem-sucedida
-            validacao = {
-                "valido": True,
-                "motivo": "Arquivo válido para processamento",
-                "tamanho_bytes": 1024,  # Simulado
-                "linhas_total": 50,     # Simulado
-                "formato": "CNAB240",   # Simulado
-                "data_validacao": datetime.now().isoformat()
-            }
+            if not os.path.isfile(arquivo_remessa):
+                return {
+                    "valido": False,
+                    "motivo": "Arquivo de remessa não encontrado",
+                    "arquivo": arquivo_remessa
+                }
 
-            self.log_progresso("✅ Arquivo validado com sucesso")
+            # Estrutura CNAB240 completa em uma passada (mmap)
+            validacao = validar_remessa_cnab240(arquivo_remessa)
+
+            if validacao["valido"]:
+                self.log_progresso(
+                    f"✅ Arquivo validado - {validacao['quantidade_titulos']} títulos, "
+                    f"R$ {validacao['valor_total']:,.2f}"
+                )
+            else:
+                self.log_progresso(f"❌ Arquivo rejeitado antes do upload: {validacao['motivo']}")
 
             return validacao
 
@@ -364,13 +490,13 @@ class RPASicredi(BaseRPA):
         try:
             if self.mongo_manager and self.mongo_manager.conectado:
                 # Salva no MongoDB
-                collection = self.mongo_manager.database.processamentos_sicredi
                 documento = {
                     "timestamp": datetime.now(),
                     "dados_processamento": dados_processamento,
                     "tipo": "processamento_sicredi"
                 }
-                await collection.insert_one(documento)
+                # Gravação em lote (core/escritor_lote)
+                await escritor_lote.inserir("processamentos_sicredi", documento)
                 self.log_progresso("✅ Dados salvos no MongoDB")
             else:
                 # Fallback para JSON local
@@ -480,4 +606,54 @@ async def executar_processamento_sicredi(
     except Exception as e:
         print(f"Aviso: Falha ao enviar notificação: {e}")
 
-    return resultado
\ No newline at end of file
+    return resultado
+
+
+async def executar_processamento_sicredi_lote(
+    arquivos_remessa: List[str],
+    credenciais_sicredi: Dict[str, Any],
+    dados_por_arquivo: Optional[Dict[str, Dict[str, Any]]] = None
+) -> ResultadoRPA:
+    """
+    Função auxiliar para enviar várias remessas em um único login/upload
+
+    Args:
+        arquivos_remessa: Caminhos das remessas geradas pelo Sienge
+        credenciais_sicredi: Credenciais de acesso ao Sicredi WebBank
+        dados_por_arquivo: Dados de cada remessa (ex.: entradas do manifesto), por caminho
+
+    Returns:
+        ResultadoRPA com protocolos mapeados por remessa e por título
+    """
+    rpa = RPASicredi()
+
+    parametros = {
+        "arquivos_remessa": arquivos_remessa,
+        "credenciais_sicredi": credenciais_sicredi,
+        "dados_por_arquivo": dados_por_arquivo or {}
+    }
+
+    resultado = await rpa.executar_com_monitoramento(parametros)
+
+    # Enviar notificação
+    try:
+        if resultado.sucesso:
+            notificar_sucesso(
+                nome_rpa="RPA Sicredi",
+                tempo_execucao=f"{resultado.tempo_execucao:.1f}s" if resultado.tempo_execucao else "N/A",
+                resultados={
+                    "remessas_enviadas": len(arquivos_remessa),
+                    "uploads_realizados": len((resultado.dados or {}).get("envios", [])),
+                    "carnes_atualizados": True
+                }
+            )
+        else:
+            notificar_erro(
+                nome_rpa="RPA Sicredi",
+                erro=resultado.erro or "Erro desconhecido",
+                detalhes=resultado.mensagem
+            )
+    except Exception as e:
+        print(f"Aviso: Falha ao enviar notificação: {e}")
+
+    return resultado
@@ -0,0 +1,154 @@
+"""
+Simulador RPA Sicredi
+Simula o processamento de remessas no Sicredi WebBank sem acessar o sistema real
+
+Desenvolvido em Português Brasileiro
+
+Segue as mesmas etapas do RPASicredi (login, validação, upload,
+processamento, confirmação) com latências configuráveis, permitindo
+rodar o pipeline Sienge -> Sicredi completo em testes de carga.
+"""
+
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from core.base_rpa import ResultadoRPA
+from core.latencia_simulada import AmostradorLatencia
+
+# Latências das etapas (segundos)
+LATENCIAS_PADRAO = {
+    "login": {"distribuicao": "fixa", "media": 0.5},
+    "validacao": {"distribuicao": "fixa", "media": 0.2},
+    "upload": {"distribuicao": "fixa", "media": 1.0},
+    "processamento": {"distribuicao": "fixa", "media": 1.5},
+    "confirmacao": {"distribuicao": "fixa", "media": 0.5},
+}
+
+# Latências para teste de carga
+LATENCIAS_CARGA = {
+    "login": {"distribuicao": "lognormal", "media": 3.0, "desvio": 1.5, "maximo": 20.0},
+    "validacao": {"distribuicao": "uniforme", "minimo": 0.1, "maximo": 0.5},
+    "upload": {"distribuicao": "lognormal", "media": 5.0, "desvio": 3.0, "maximo": 45.0},
+    "processamento": {"distribuicao": "exponencial", "media": 10.0, "maximo": 120.0},
+    "confirmacao": {"distribuicao": "lognormal", "media": 2.0, "desvio": 1.0, "maximo": 15.0},
+}
+
+
+class SimuladorSicredi:
+    """
+    Simulador do RPA Sicredi para testes e desenvolvimento
+    """
+
+    def __init__(
+        self,
+        latencias: Optional[Dict[str, Dict[str, Any]]] = None,
+        escala_tempo: float = 1.0,
+        semente: Optional[int] = None,
+        verbose: bool = True
+    ):
+        self.latencia = AmostradorLatencia(latencias or LATENCIAS_PADRAO, escala_tempo, semente)
+        self.verbose = verbose
+
+    def _log(self, mensagem: str):
+        if self.verbose:
+            print(mensagem)
+
+    async def executar_simulacao(
+        self,
+        arquivo_remessa: str,
+        credenciais: Dict[str, Any],
+        dados_processamento: Optional[Dict[str, Any]] = None
+    ) -> ResultadoRPA:
+        """
+        Executa simulação do processamento de remessa no Sicredi
+
+        Args:
+            arquivo_remessa: Nome/caminho do arquivo de remessa (não é lido)
+            credenciais: Credenciais Sicredi (apenas para log)
+            dados_processamento: Dados do reparcelamento processado
+
+        Returns:
+            ResultadoRPA no mesmo formato do RPASicredi
+        """
+        try:
+            if not arquivo_remessa:
+                return ResultadoRPA(
+                    sucesso=False,
+                    mensagem="SIMULAÇÃO - Arquivo de remessa não fornecido",
+                    erro="Parâmetro 'arquivo_remessa' é obrigatório"
+                )
+
+            self._log(f"🔐 SIMULAÇÃO - Login Sicredi: {credenciais.get('url', '')}")
+            await self.latencia.aguardar("login")
+
+            self._log(f"📄 SIMULAÇÃO - Validando remessa {arquivo_remessa}")
+            await self.latencia.aguardar("validacao")
+            validacao = {
+                "valido": True,
+                "motivo": "Arquivo válido para processamento",
+                "formato": "CNAB240",
+                "data_validacao": datetime.now().isoformat()
+            }
+
+            self._log("📤 SIMULAÇÃO - Upload da remessa")
+            await self.latencia.aguardar("upload")
+            upload = {
+                "sucesso": True,
+                "arquivo_enviado": arquivo_remessa,
+                "protocolo_upload": f"UPL{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
+                "status": "arquivo_recebido"
+            }
+
+            self._log("⚙️ SIMULAÇÃO - Processando remessa")
+            await self.latencia.aguardar("processamento")
+            processamento = {
+                "sucesso": True,
+                "arquivo_processado": arquivo_remessa,
+                "registros_processados": 1,
+                "registros_rejeitados": 0,
+                "status": "processado_com_sucesso"
+            }
+
+            self._log("✅ SIMULAÇÃO - Confirmando processamento")
+            await self.latencia.aguardar("confirmacao")
+            confirmacao = {
+                "sucesso": True,
+                "carnes_atualizados": True,
+                "numero_comprovante": f"COMP{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
+                "status_final": "processamento_confirmado"
+            }
+
+            return ResultadoRPA(
+                sucesso=True,
+                mensagem="SIMULAÇÃO - Processamento Sicredi concluído - Carnês atualizados",
+                dados={
+                    "arquivo_remessa": arquivo_remessa,
+                    "validacao_arquivo": validacao,
+                    "upload": upload,
+                    "processamento": processamento,
+                    "confirmacao": confirmacao,
+                    "dados_originais": dados_processamento or {},
+                    "timestamp_processamento": datetime.now().isoformat(),
+                    "tipo_execucao": "simulado"
+                }
+            )
+
+        except Exception as e:
+            return ResultadoRPA(
+                sucesso=False,
+                mensagem="Falha na simulação Sicredi",
+                erro=str(e)
+            )
+
+
+async def executar_simulacao_sicredi(
+    arquivo_remessa: str,
+    credenciais_sicredi: Dict[str, Any],
+    dados_processamento: Optional[Dict[str, Any]] = None
+) -> ResultadoRPA:
+    """
+    Função para executar simulação do RPA Sicredi
+    Usado para testes e desenvolvimento
+    """
+    simulador = SimuladorSicredi()
+    return await simulador.executar_simulacao(arquivo_remessa, credenciais_sicredi, dados_processamento)
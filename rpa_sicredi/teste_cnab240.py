@@ -0,0 +1,199 @@
+"""
+Teste do CNAB240 - validação de remessas (erros por linha e desempenho)
+
+Gera remessas CNAB240 sintéticas no layout Sicredi e verifica:
+- arquivo válido (com e sem totais no trailer de lote) é aceito, com
+  contagens e valor total corretos
+- sequencial fora de ordem, trailer de lote com contagem errada e
+  segmento P sem Q são apontados na linha certa
+- 100.000 segmentos são validados em menos de 1 segundo
+
+As funções gerar_registros/gravar_remessa também servem aos testes de
+mesclagem (teste_mesclagem_cnab240.py).
+
+Uso:
+    python rpa_sicredi/teste_cnab240.py
+    python rpa_sicredi/teste_cnab240.py --segmentos 200000 --limite-segundos 2
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Adiciona o diretório pai ao path para importar módulos; na frente, senão
+# rpa_sicredi/rpa_sicredi.py (pasta do script) esconde o pacote rpa_sicredi
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rpa_sicredi.cnab240 import validar_remessa_cnab240
+
+CNPJ_TESTE = "12345678000190"
+CONVENIO_TESTE = "CONV0001"
+TITULOS_POR_LOTE = 20_000
+
+
+def registro(campos: Dict[int, str]) -> bytes:
+    """Registro de 240 posições com os campos nas posições 1-based informadas"""
+    linha = bytearray(b" " * 240)
+    for inicio, texto in campos.items():
+        valor = texto.encode("latin-1")
+        linha[inicio - 1:inicio - 1 + len(valor)] = valor
+    return bytes(linha)
+
+
+def gerar_registros(
+    titulos: List[Tuple[str, int]],
+    convenio: str = CONVENIO_TESTE,
+    titulos_por_lote: int = TITULOS_POR_LOTE,
+    totais_trailer: bool = True,
+    numero_remessa: int = 1
+) -> List[bytes]:
+    """
+    Remessa CNAB240 Sicredi: um P + um Q por título
+
+    Args:
+        titulos: (numero_titulo, valor em centavos)
+        convenio: Convênio do cedente (remessas com o mesmo convênio são mescláveis)
+        titulos_por_lote: Títulos por lote
+        totais_trailer: Se False, deixa em branco os totais de cobrança do trailer de lote
+        numero_remessa: NSA do header de arquivo (não impede a mesclagem)
+    """
+    cedente = {18: "2", 19: CNPJ_TESTE, 33: f"{convenio:<20}", 53: "0748", 59: "000000012345"}
+    registros = [registro({
+        1: "748", 4: "0000", 8: "0", **cedente, 73: f"{'CEDENTE ' + convenio:<30}", 103: "SICREDI",
+        143: "1", 144: "01072024", 152: "080000", 158: f"{numero_remessa:06d}", 164: "081"
+    })]
+
+    blocos = [titulos[i:i + titulos_por_lote] for i in range(0, len(titulos), titulos_por_lote)] or [[]]
+    for numero_lote, bloco in enumerate(blocos, 1):
+        lote = f"{numero_lote:04d}"
+        registros.append(registro({
+            1: "748", 4: lote, 8: "1", 9: "R", 10: "01", 14: "040", 18: "2", 19: CNPJ_TESTE,
+            34: f"{convenio:<20}", 74: f"{'CEDENTE ' + convenio:<30}", 184: f"{numero_remessa:08d}"
+        }))
+        sequencial = 0
+        for numero_titulo, valor in bloco:
+            sequencial += 1
+            registros.append(registro({
+                1: "748", 4: lote, 8: "3", 9: f"{sequencial:05d}", 14: "P", 16: "01",
+                38: f"{numero_titulo:0>20}", 63: f"{numero_titulo:<15}", 78: "15082024", 86: f"{valor:015d}"
+            }))
+            sequencial += 1
+            registros.append(registro({
+                1: "748", 4: lote, 8: "3", 9: f"{sequencial:05d}", 14: "Q", 16: "01",
+                18: "1", 19: f"{int(numero_titulo) % 10**11:015d}", 34: f"{'SACADO ' + numero_titulo:<40}"
+            }))
+        totais = {24: f"{len(bloco):06d}", 30: f"{sum(v for _, v in bloco):017d}"} if totais_trailer else {}
+        registros.append(registro({1: "748", 4: lote, 8: "5", 18: f"{sequencial + 2:06d}", **totais}))
+
+    registros.append(registro({
+        1: "748", 4: "9999", 8: "9", 18: f"{len(blocos):06d}", 24: f"{len(registros) + 1:06d}"
+    }))
+    return registros
+
+
+def gravar_remessa(caminho: str, registros: List[bytes]) -> str:
+    with open(caminho, "wb") as f:
+        f.write(b"".join(r + b"\r\n" for r in registros))
+    return caminho
+
+
+def titulos_teste(quantidade: int, inicio: int = 1000) -> List[Tuple[str, int]]:
+    return [(str(inicio + i), 10_000 + i) for i in range(quantidade)]
+
+
+def substituir_campo(registro_original: bytes, inicio: int, texto: str) -> bytes:
+    return registro_original[:inicio - 1] + texto.encode("latin-1") + registro_original[inicio - 1 + len(texto):]
+
+
+def erros_na_linha(validacao: dict, linha: int, trecho: str) -> bool:
+    return any(e["linha"] == linha and trecho in e["erro"] for e in validacao["erros"])
+
+
+def executar_teste(segmentos: int, limite_segundos: float) -> bool:
+    print("🧪 TESTE DO CNAB240 - VALIDAÇÃO DE REMESSAS")
+    print("=" * 50)
+
+    pasta = tempfile.mkdtemp(prefix="teste_cnab240_")
+    sucesso = True
+
+    try:
+        # 1. Arquivos válidos
+        print("\n✅ Arquivos válidos...")
+        titulos = titulos_teste(5)
+        for totais in (True, False):
+            caminho = gravar_remessa(os.path.join(pasta, f"valida_{totais}.rem"),
+                                     gerar_registros(titulos, titulos_por_lote=3, totais_trailer=totais))
+            validacao = validar_remessa_cnab240(caminho)
+            print(f"   📄 Totais no trailer={totais}: {validacao['motivo']}")
+            if (not validacao["valido"] or validacao["quantidade_lotes"] != 2
+                    or validacao["quantidade_titulos"] != 5 or validacao["quantidade_registros_detalhe"] != 10
+                    or round(validacao["valor_total"] * 100) != sum(v for _, v in titulos)):
+                print(f"   ❌ Contagens incorretas: {validacao}")
+                sucesso = False
+
+        # 2. Erros por linha (linha 1 = header de arquivo, 2 = header de lote, 3.. = detalhes)
+        print("\n🚫 Arquivos com erro...")
+        base = gerar_registros(titulos_teste(3))
+
+        registros = list(base)
+        registros[4] = substituir_campo(registros[4], 9, "00007")
+        validacao = validar_remessa_cnab240(gravar_remessa(os.path.join(pasta, "sequencial.rem"), registros))
+        if not erros_na_linha(validacao, 5, "Sequencial 7 fora de ordem"):
+            print(f"   ❌ Sequencial quebrado não apontado na linha 5: {validacao['erros']}")
+            sucesso = False
+
+        registros = list(base)
+        registros[8] = substituir_campo(registros[8], 18, "000099")
+        validacao = validar_remessa_cnab240(gravar_remessa(os.path.join(pasta, "trailer.rem"), registros))
+        if not erros_na_linha(validacao, 9, "informa 99 registros (contados 8)"):
+            print(f"   ❌ Contagem do trailer de lote não apontada na linha 9: {validacao['erros']}")
+            sucesso = False
+
+        # Q do segundo título vira P (mesmo sequencial): o P da linha 5 fica sem Q
+        registros = list(base)
+        registros[5] = substituir_campo(base[4], 9, "00004")
+        validacao = validar_remessa_cnab240(gravar_remessa(os.path.join(pasta, "p_sem_q.rem"), registros))
+        if not erros_na_linha(validacao, 5, "Segmento P sem segmento Q"):
+            print(f"   ❌ P sem Q não apontado na linha 5: {validacao['erros']}")
+            sucesso = False
+
+        for nome in ("sequencial", "trailer", "p_sem_q"):
+            validacao = validar_remessa_cnab240(os.path.join(pasta, f"{nome}.rem"))
+            print(f"   📄 {nome}: {validacao['motivo']}")
+            if validacao["valido"]:
+                sucesso = False
+
+        # 3. Desempenho
+        print(f"\n⏱️ Validando {segmentos:,} segmentos...")
+        caminho = gravar_remessa(os.path.join(pasta, "grande.rem"), gerar_registros(titulos_teste(segmentos // 2)))
+        inicio = time.perf_counter()
+        validacao = validar_remessa_cnab240(caminho)
+        duracao = time.perf_counter() - inicio
+        print(f"   📊 {validacao['quantidade_registros_detalhe']:,} segmentos em {duracao:.3f}s "
+              f"({validacao['quantidade_lotes']} lotes, {validacao['motivo']})")
+        if not validacao["valido"] or validacao["quantidade_registros_detalhe"] != segmentos // 2 * 2:
+            print("   ❌ Remessa grande deveria ser válida")
+            sucesso = False
+        if duracao >= limite_segundos:
+            print(f"   ❌ Validação acima de {limite_segundos}s")
+            sucesso = False
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste da validação de remessas CNAB240")
+    parser.add_argument("--segmentos", type=int, default=100_000, help="Segmentos da remessa grande")
+    parser.add_argument("--limite-segundos", type=float, default=1.0, help="Tempo máximo da validação")
+    args = parser.parse_args()
+
+    sucesso = executar_teste(args.segmentos, args.limite_segundos)
+    print("\n🎉 TESTE DO CNAB240 CONCLUÍDO!" if sucesso else "\n💥 TESTE DO CNAB240 FALHOU!")
+    sys.exit(0 if sucesso else 1)
@@ -0,0 +1,243 @@
+"""
+Teste da Mesclagem CNAB240 - remessas do ciclo em um único upload por cedente
+
+Gera remessas com teste_cnab240.gerar_registros e verifica:
+- remessas do mesmo cedente viram um arquivo que passa na validação, com
+  lotes unidos, títulos/valor somados e lotes_destino de cada origem
+- 50.000 títulos (100.000 segmentos) são divididos em lotes de no máximo
+  99.999 registros, sem separar P e Q do mesmo título
+- totais do trailer de lote em branco na origem continuam em branco
+- RPASicredi._executar_lote (navegador simulado) mapeia o protocolo de
+  cada upload para as remessas e títulos de origem em protocolos_por_titulo,
+  sem protocolo para títulos de remessa rejeitada
+
+Uso:
+    python rpa_sicredi/teste_mesclagem_cnab240.py
+"""
+
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar módulos; na frente, senão
+# rpa_sicredi/rpa_sicredi.py (pasta do script) esconde o pacote rpa_sicredi
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rpa_sicredi.cnab240 import validar_remessa_cnab240, mesclar_remessas_cnab240, MAX_REGISTROS_LOTE
+from rpa_sicredi.rpa_sicredi import RPASicredi
+from rpa_sicredi.teste_cnab240 import (
+    gerar_registros, gravar_remessa, titulos_teste, substituir_campo
+)
+
+CREDENCIAIS = {"url": "https://sicredi.teste", "usuario": "teste", "senha": "teste"}
+
+
+def ler_registros(arquivo: str) -> list:
+    with open(arquivo, "rb") as f:
+        return [linha.rstrip(b"\r\n") for linha in f]
+
+
+def trailers_lote(arquivo: str) -> list:
+    return [r for r in ler_registros(arquivo) if r[7:8] == b"5"]
+
+
+def verificar_mesclagem(pasta: str) -> bool:
+    sucesso = True
+    origens = [
+        gravar_remessa(os.path.join(pasta, "remessa_a.rem"), gerar_registros(titulos_teste(3, 1000))),
+        gravar_remessa(os.path.join(pasta, "remessa_b.rem"),
+                       gerar_registros(titulos_teste(4, 2000), titulos_por_lote=2, numero_remessa=2)),
+        gravar_remessa(os.path.join(pasta, "remessa_c.rem"), gerar_registros(titulos_teste(2, 3000), numero_remessa=3)),
+    ]
+    mesclagem = mesclar_remessas_cnab240(origens, os.path.join(pasta, "mescladas"))
+    mesclados = mesclagem["arquivos_mesclados"]
+    if len(mesclados) != 1 or mesclagem["rejeitados"]:
+        print(f"   ❌ Esperado 1 arquivo mesclado: {mesclagem}")
+        return False
+
+    mesclado = mesclados[0]
+    validacao = validar_remessa_cnab240(mesclado["arquivo"])
+    print(f"   📄 {len(origens)} remessas -> {mesclado['quantidade_lotes']} lote(s), "
+          f"{mesclado['quantidade_titulos']} títulos: {validacao['motivo']}")
+    valor_esperado = sum(v for _, v in titulos_teste(3, 1000) + titulos_teste(4, 2000) + titulos_teste(2, 3000))
+    if (not validacao["valido"] or validacao["quantidade_lotes"] != 1 or validacao["quantidade_titulos"] != 9
+            or round(validacao["valor_total"] * 100) != valor_esperado
+            or round(mesclado["valor_total"] * 100) != valor_esperado):
+        print(f"   ❌ Arquivo mesclado incorreto: {validacao}")
+        sucesso = False
+    if [o.get("lotes_destino") for o in mesclado["origens"]] != [[1], [1], [1]]:
+        print(f"   ❌ lotes_destino incorretos: {mesclado['origens']}")
+        sucesso = False
+
+    # Trailer com totais preenchidos (modelo da origem)
+    trailer = trailers_lote(mesclado["arquivo"])[0]
+    if trailer[23:29] != b"000009" or int(trailer[29:46]) != valor_esperado:
+        print(f"   ❌ Totais do trailer de lote: {trailer[23:46]!r}")
+        sucesso = False
+
+    return sucesso
+
+
+def verificar_divisao_lotes(pasta: str) -> bool:
+    sucesso = True
+    titulos = titulos_teste(50_000, 100_000)
+    origens = [
+        gravar_remessa(os.path.join(pasta, "grande_1.rem"), gerar_registros(titulos[:30_000])),
+        gravar_remessa(os.path.join(pasta, "grande_2.rem"), gerar_registros(titulos[30_000:], numero_remessa=2)),
+    ]
+    mesclado = mesclar_remessas_cnab240(origens, os.path.join(pasta, "mescladas_grandes"))["arquivos_mesclados"][0]
+    validacao = validar_remessa_cnab240(mesclado["arquivo"])
+    registros_por_lote = [int(t[17:23]) for t in trailers_lote(mesclado["arquivo"])]
+    print(f"   📄 50.000 títulos -> registros por lote {registros_por_lote}: {validacao['motivo']}")
+
+    if not validacao["valido"] or validacao["quantidade_titulos"] != 50_000:
+        print(f"   ❌ Arquivo dividido inválido: {validacao['erros'][:5]}")
+        sucesso = False
+    if len(registros_por_lote) != 2 or max(registros_por_lote) > MAX_REGISTROS_LOTE:
+        print(f"   ❌ Lotes acima de {MAX_REGISTROS_LOTE} registros ou divisão inesperada")
+        sucesso = False
+    if [o["lotes_destino"] for o in mesclado["origens"]] != [[1], [1, 2]]:
+        print(f"   ❌ lotes_destino incorretos: {[o['lotes_destino'] for o in mesclado['origens']]}")
+        sucesso = False
+
+    return sucesso
+
+
+def verificar_totais_em_branco(pasta: str) -> bool:
+    origens = [
+        gravar_remessa(os.path.join(pasta, f"sem_totais_{i}.rem"),
+                       gerar_registros(titulos_teste(3, 4000 + 10 * i), totais_trailer=False, numero_remessa=i))
+        for i in (1, 2)
+    ]
+    mesclado = mesclar_remessas_cnab240(origens, os.path.join(pasta, "mescladas_sem_totais"))["arquivos_mesclados"][0]
+    validacao = validar_remessa_cnab240(mesclado["arquivo"])
+    trailer = trailers_lote(mesclado["arquivo"])[0]
+    print(f"   📄 Totais do trailer: {trailer[23:46]!r} ({validacao['motivo']})")
+    if not validacao["valido"] or trailer[23:46].strip() or int(trailer[17:23]) != 14:
+        print("   ❌ Totais em branco na origem foram preenchidos ou contagem errada")
+        return False
+    return True
+
+
+async def verificar_protocolos(pasta: str) -> bool:
+    sucesso = True
+    remessas = {
+        "a1": (gerar_registros(titulos_teste(2, 5000)), ["5000", "5001"]),
+        "a2": (gerar_registros(titulos_teste(2, 5100), numero_remessa=2), ["5100", "5101"]),
+        "b1": (gerar_registros(titulos_teste(1, 6000), convenio="CONV0002"), ["6000"]),
+    }
+    # Remessa com sequencial quebrado: rejeitada na mesclagem
+    invalida = gerar_registros(titulos_teste(1, 7000))
+    invalida[3] = substituir_campo(invalida[3], 9, "00009")
+    remessas["invalida"] = (invalida, ["7000"])
+
+    arquivos = {nome: gravar_remessa(os.path.join(pasta, f"{nome}.rem"), registros)
+                for nome, (registros, _) in remessas.items()}
+    dados_por_arquivo = {
+        arquivos[nome]: {"titulos": [{"numero_titulo": t} for t in titulos]}
+        for nome, (_, titulos) in remessas.items()
+    }
+
+    rpa = RPASicredi()
+    uploads = []
+    salvos = []
+
+    async def login():
+        rpa.logado_sicredi = True
+
+    async def upload(arquivo):
+        uploads.append(arquivo)
+        return {"sucesso": True, "protocolo_upload": f"PROT{len(uploads)}"}
+
+    async def processar(arquivo):
+        return {"sucesso": True}
+
+    async def confirmar():
+        return {"sucesso": True, "numero_comprovante": f"COMP{len(uploads)}"}
+
+    async def salvar(dados):
+        salvos.append(dados)
+
+    rpa._fazer_login_sicredi = login
+    rpa._fazer_upload_arquivo = upload
+    rpa._processar_arquivo_sicredi = processar
+    rpa._confirmar_processamento = confirmar
+    rpa._salvar_dados_processamento = salvar
+
+    resultado = await rpa._executar_lote({
+        "arquivos_remessa": list(arquivos.values()),
+        "credenciais_sicredi": CREDENCIAIS,
+        "dados_por_arquivo": dados_por_arquivo
+    })
+    print(f"   📊 {resultado.mensagem}")
+    dados = resultado.dados
+    protocolos = dados.get("protocolos_por_titulo", {})
+
+    if len(uploads) != 2 or len(salvos) != 1:
+        print(f"   ❌ Esperado 2 uploads (um por cedente) e 1 gravação: {uploads}")
+        return False
+    if resultado.sucesso or [r["arquivo"] for r in dados["rejeitados"]] != [arquivos["invalida"]]:
+        print("   ❌ Remessa inválida deveria ser rejeitada e o lote marcado sem sucesso")
+        sucesso = False
+
+    esperado = {}
+    for nome, protocolo in (("a1", "PROT1"), ("a2", "PROT1"), ("b1", "PROT2")):
+        for titulo in remessas[nome][1]:
+            esperado[titulo] = (protocolo, arquivos[nome])
+    obtido = {t: (p["protocolo_upload"], p["arquivo_remessa"]) for t, p in protocolos.items()}
+    if obtido != esperado:
+        print(f"   ❌ protocolos_por_titulo: {obtido} (esperado {esperado})")
+        sucesso = False
+
+    for titulo, protocolo in protocolos.items():
+        # PROTn/COMPn vêm do n-ésimo upload
+        numero = int(protocolo["protocolo_upload"].replace("PROT", ""))
+        if protocolo["arquivo_mesclado"] != uploads[numero - 1] or protocolo["lotes_destino"] != [1] \
+                or protocolo["numero_comprovante"] != f"COMP{numero}":
+            print(f"   ❌ Protocolo do título {titulo} incompleto: {protocolo}")
+            sucesso = False
+
+    if set(dados["protocolos_por_arquivo"]) != {arquivos["a1"], arquivos["a2"], arquivos["b1"]}:
+        print(f"   ❌ protocolos_por_arquivo: {list(dados['protocolos_por_arquivo'])}")
+        sucesso = False
+
+    return sucesso
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DA MESCLAGEM CNAB240")
+    print("=" * 50)
+
+    pasta = tempfile.mkdtemp(prefix="teste_mesclagem_")
+    diretorio_original = os.getcwd()
+    sucesso = True
+
+    try:
+        # _executar_lote grava em dados_processamento/ relativo ao diretório atual
+        os.chdir(pasta)
+
+        print("\n🔗 Mesclagem de remessas do mesmo cedente...")
+        sucesso = verificar_mesclagem(pasta) and sucesso
+
+        print("\n✂️ Divisão em lotes de até 99.999 registros...")
+        sucesso = verificar_divisao_lotes(pasta) and sucesso
+
+        print("\n⬜ Totais do trailer em branco...")
+        sucesso = verificar_totais_em_branco(pasta) and sucesso
+
+        print("\n🧾 Protocolos por título (RPASicredi em lote)...")
+        sucesso = await verificar_protocolos(pasta) and sucesso
+    finally:
+        os.chdir(diretorio_original)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DA MESCLAGEM CONCLUÍDO!" if sucesso else "\n💥 TESTE DA MESCLAGEM FALHOU!")
+    sys.exit(0 if sucesso else 1)
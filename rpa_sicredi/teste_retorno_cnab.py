@@ -0,0 +1,226 @@
+"""
+Teste do Retorno CNAB - leitura CNAB240 (T/U) e CNAB400 e conciliação
+
+Gera retornos pequenos nos dois layouts e verifica:
+- campos lidos de cada ocorrência (título, nosso número, ocorrência,
+  valores, datas, motivos)
+- situação de cada título na conciliação: registrado, rejeitado,
+  ausente_no_retorno e sem_contrato
+- conciliar_retornos sem a lista de títulos esperados acha na base os
+  contratos cujo seu número vem com zeros à esquerda ("000000000000494")
+
+Requer MongoDB (MONGODB_URL, padrão mongodb://localhost:27017) para a
+parte de conciliação com a base; o banco rpa_reparcelamento_teste é
+apagado ao final.
+
+Uso:
+    python rpa_sicredi/teste_retorno_cnab.py
+"""
+
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+import pandas as pd
+
+# Adiciona o diretório pai ao path para importar módulos; na frente, senão
+# rpa_sicredi/rpa_sicredi.py (pasta do script) esconde o pacote rpa_sicredi
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.mongodb_manager import mongodb_manager
+from rpa_sicredi.retorno_cnab import (
+    ler_retorno_cnab, ler_retornos, conciliar_retorno, conciliar_retornos,
+    SITUACAO_REGISTRADO, SITUACAO_REJEITADO, SITUACAO_AUSENTE, SITUACAO_DESCONHECIDO
+)
+
+BANCO_TESTE = "rpa_reparcelamento_teste"
+
+# Títulos da base; 498 foi enviado e não voltou no retorno, 999 não existe
+TITULOS_BASE = ["494", "495", "496", "497", "498"]
+
+ESPERADO = {
+    "494": SITUACAO_REGISTRADO,     # CNAB240, entrada confirmada + liquidação
+    "495": SITUACAO_REJEITADO,      # CNAB240, entrada rejeitada
+    "999": SITUACAO_DESCONHECIDO,   # CNAB240, título desconhecido
+    "496": SITUACAO_REGISTRADO,     # CNAB400, entrada confirmada
+    "497": SITUACAO_REJEITADO,      # CNAB400, entrada rejeitada
+    "498": SITUACAO_AUSENTE,
+}
+
+
+def registro(tamanho: int, campos: Dict[int, str]) -> bytes:
+    """Registro de tamanho fixo com os campos nas posições 1-based informadas"""
+    linha = bytearray(b" " * tamanho)
+    for inicio, texto in campos.items():
+        valor = texto.encode("latin-1")
+        linha[inicio - 1:inicio - 1 + len(valor)] = valor
+    return bytes(linha)
+
+
+def retorno_cnab240(caminho: str):
+    def detalhe(sequencial: int, segmento: str, campos: Dict[int, str]) -> bytes:
+        return registro(240, {1: "748", 4: "0001", 8: "3", 9: f"{sequencial:05d}", 14: segmento, **campos})
+
+    def titulo_t(sequencial: int, titulo: str, ocorrencia: str, valor: int, motivos: str = "") -> bytes:
+        return detalhe(sequencial, "T", {
+            16: ocorrencia, 38: f"{titulo:0>20}", 59: f"{titulo:0>15}", 74: "15072024",
+            82: f"{valor:015d}", 106: f"CTR{titulo}", 214: motivos
+        })
+
+    def titulo_u(sequencial: int, valor_pago: int, data: str) -> bytes:
+        return detalhe(sequencial, "U", {78: f"{valor_pago:015d}", 138: data})
+
+    registros = [
+        registro(240, {1: "748", 4: "0000", 8: "0"}),
+        registro(240, {1: "748", 4: "0001", 8: "1"}),
+        titulo_t(1, "494", "02", 150000), titulo_u(2, 0, "01072024"),
+        titulo_t(3, "494", "06", 150000), titulo_u(4, 150000, "15072024"),
+        titulo_t(5, "495", "03", 98765, "A1B2"), titulo_u(6, 0, "01072024"),
+        titulo_t(7, "999", "02", 1000), titulo_u(8, 0, "01072024"),
+        registro(240, {1: "748", 4: "0001", 8: "5", 18: "000010"}),
+        registro(240, {1: "748", 4: "9999", 8: "9", 18: "000001", 24: "000012"}),
+    ]
+    with open(caminho, "wb") as f:
+        f.write(b"".join(r + b"\r\n" for r in registros))
+
+
+def retorno_cnab400(caminho: str):
+    def detalhe(titulo: str, ocorrencia: str, valor: int, motivos: str = "") -> bytes:
+        return registro(400, {
+            1: "1", 48: f"{titulo:0>15}", 109: ocorrencia, 111: "020724", 117: f"{titulo:0>10}",
+            147: "150724", 153: f"{valor:013d}", 254: f"{0:013d}", 319: motivos
+        })
+
+    registros = [
+        registro(400, {1: "0"}),
+        detalhe("496", "02", 50000),
+        detalhe("497", "03", 70000, "XX"),
+        registro(400, {1: "9"}),
+    ]
+    with open(caminho, "wb") as f:
+        f.write(b"".join(r + b"\r\n" for r in registros))
+
+
+def verificar_leitura(arquivo_240: str, arquivo_400: str) -> bool:
+    sucesso = True
+
+    retorno = ler_retorno_cnab(arquivo_240)
+    print(f"   📄 CNAB240: {len(retorno)} ocorrência(s)")
+    liquidacao = retorno.iloc[1]
+    if (len(retorno) != 4 or retorno["formato"].iloc[0] != "CNAB240"
+            or liquidacao["numero_titulo"] != "000000000000494"
+            or liquidacao["ocorrencia"] != "06"
+            or liquidacao["valor"] != 1500.00 or liquidacao["valor_pago"] != 1500.00
+            or liquidacao["data_ocorrencia"] != pd.Timestamp(2024, 7, 15)
+            or liquidacao["vencimento"] != pd.Timestamp(2024, 7, 15)
+            or liquidacao["uso_empresa"] != "CTR494"):
+        print("   ❌ Segmentos T/U lidos incorretamente")
+        sucesso = False
+    if retorno.iloc[2]["motivos"] != "A1B2":
+        print("   ❌ Motivos da rejeição não lidos")
+        sucesso = False
+
+    retorno = ler_retorno_cnab(arquivo_400)
+    print(f"   📄 CNAB400: {len(retorno)} ocorrência(s)")
+    if (len(retorno) != 2 or retorno["formato"].iloc[0] != "CNAB400"
+            or retorno.iloc[0]["numero_titulo"] != "0000000496"
+            or retorno.iloc[0]["valor"] != 500.00
+            or retorno.iloc[0]["data_ocorrencia"] != pd.Timestamp(2024, 7, 2)
+            or retorno.iloc[1]["ocorrencia"] != "03" or retorno.iloc[1]["motivos"] != "XX"):
+        print("   ❌ Registros CNAB400 lidos incorretamente")
+        sucesso = False
+
+    return sucesso
+
+
+def verificar_conciliacao(arquivos: list) -> bool:
+    conciliacao = conciliar_retorno(ler_retornos(arquivos), pd.DataFrame({"numero_titulo": TITULOS_BASE}))
+    obtido = dict(zip(conciliacao["numero_titulo"].map(lambda t: t.lstrip("0")), conciliacao["situacao"]))
+    sucesso = True
+    for titulo, situacao in ESPERADO.items():
+        status = "✅" if obtido.get(titulo) == situacao else "❌"
+        print(f"   {status} {titulo}: {obtido.get(titulo)}")
+        if obtido.get(titulo) != situacao:
+            sucesso = False
+    return sucesso
+
+
+async def verificar_conciliacao_base(arquivos: list) -> bool:
+    mongodb_manager.connection_string = os.getenv("MONGODB_URL", mongodb_manager.connection_string)
+    mongodb_manager.database_name = BANCO_TESTE
+    if not await mongodb_manager.conectar():
+        print("❌ MongoDB indisponível")
+        return False
+    await mongodb_manager.client.drop_database(BANCO_TESTE)
+    sucesso = True
+
+    try:
+        await mongodb_manager.database.contratos_processados.insert_many(
+            [{"numero_titulo": titulo} for titulo in TITULOS_BASE]
+        )
+
+        # Sem títulos esperados: contratos achados pelo seu número normalizado
+        resumo = await conciliar_retornos(arquivos)
+        print(f"   📊 {resumo['por_situacao']} | atualizados: {resumo.get('contratos_atualizados')}")
+        if resumo["armazenamento"] != "mongodb" or resumo.get("contratos_atualizados") != 4:
+            print("❌ Contratos com seu número zero-padded não foram conciliados")
+            sucesso = False
+        if [item["numero_titulo"].lstrip("0") for item in resumo["sem_contrato"]] != ["999"]:
+            print("❌ Só o título 999 deveria ficar sem contrato")
+            sucesso = False
+
+        contratos = {
+            doc["numero_titulo"]: doc.get("status_sicredi")
+            async for doc in mongodb_manager.database.contratos_processados.find({})
+        }
+        for titulo in ("494", "495", "496", "497"):
+            if contratos.get(titulo) != ESPERADO[titulo]:
+                print(f"❌ {titulo} gravado como {contratos.get(titulo)} (esperado {ESPERADO[titulo]})")
+                sucesso = False
+
+        # Com títulos esperados: o que não voltou fica ausente
+        resumo = await conciliar_retornos(arquivos, titulos_esperados=TITULOS_BASE)
+        if [item["numero_titulo"] for item in resumo["ausentes_no_retorno"]] != ["498"]:
+            print("❌ Título enviado e fora do retorno não ficou ausente")
+            sucesso = False
+    finally:
+        await mongodb_manager.client.drop_database(BANCO_TESTE)
+        await mongodb_manager.desconectar()
+
+    return sucesso
+
+
+async def executar_teste() -> bool:
+    print("🧪 TESTE DO RETORNO CNAB - LEITURA E CONCILIAÇÃO")
+    print("=" * 50)
+
+    pasta = tempfile.mkdtemp(prefix="teste_retorno_")
+    arquivo_240 = os.path.join(pasta, "retorno.ret")
+    arquivo_400 = os.path.join(pasta, "retorno.crt")
+    retorno_cnab240(arquivo_240)
+    retorno_cnab400(arquivo_400)
+    sucesso = True
+
+    try:
+        print("\n📥 Leitura...")
+        sucesso = verificar_leitura(arquivo_240, arquivo_400) and sucesso
+
+        print("\n🔎 Conciliação...")
+        sucesso = verificar_conciliacao([arquivo_240, arquivo_400]) and sucesso
+
+        print("\n💾 Conciliação com a base...")
+        sucesso = await verificar_conciliacao_base([arquivo_240, arquivo_400]) and sucesso
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = asyncio.run(executar_teste())
+    print("\n🎉 TESTE DO RETORNO CONCLUÍDO!" if sucesso else "\n💥 TESTE DO RETORNO FALHOU!")
+    sys.exit(0 if sucesso else 1)
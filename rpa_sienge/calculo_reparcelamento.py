@@ -0,0 +1,288 @@
+"""
+Cálculo de Reparcelamento - Regras PDD seção 7.3.3
+Motor vetorizado de correção de saldo e cronograma de parcelas
+
+Desenvolvido em Português Brasileiro
+
+Regras (fixas por política da empresa):
+- Indexador IGP-M aplicado sobre o saldo devedor
+- Juros fixos de 8% a.a. (taxa efetiva, convertida para mensal)
+- Condição PM (parcelas mensais, sistema Price)
+- 1º vencimento no dia 15 do mês seguinte
+
+Todos os valores monetários são calculados em centavos inteiros (int64)
+com arredondamento meio-para-cima, como no Sienge; a última parcela
+absorve a diferença de arredondamento e zera o saldo.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+
+# Import funciona tanto quando executado da raiz quanto da pasta rpa_sienge
+try:
+    from rpa_sienge.processamento_relatorio import converter_valor_monetario
+except ImportError:
+    from processamento_relatorio import converter_valor_monetario
+
+# Parâmetros do PDD
+TIPO_CONDICAO = "PM"
+INDEXADOR = "IGP-M"
+TIPO_JUROS = "Fixo"
+PERCENTUAL_JUROS_ANUAL = 8.0
+DIA_VENCIMENTO = 15
+
+# IGP-M usado quando o índice não foi coletado (mesmo padrão do simulador)
+INDICE_IGPM_PADRAO = 3.89
+
+# Fator de correção em milionésimos (ex.: IGP-M 3,89% -> 1.038900 -> 1038900)
+ESCALA_FATOR = 1_000_000
+
+
+def _arredondar_meio_acima(valores: np.ndarray) -> np.ndarray:
+    """Arredonda para inteiro, meio para cima (afastando do zero)"""
+    # Tolerância absorve erro binário (ex.: 100.49999999 que deveria ser 100.5)
+    return (np.sign(valores) * np.floor(np.abs(valores) + 0.5 + 1e-9)).astype(np.int64)
+
+
+def para_centavos(valores: Iterable[float]) -> np.ndarray:
+    """Converte valores em reais para centavos inteiros"""
+    return _arredondar_meio_acima(np.asarray(valores, dtype=float) * 100)
+
+
+def fator_correcao_milionesimos(indice_percentual: float) -> int:
+    """Fator de correção (1 + índice/100) em milionésimos inteiros"""
+    return int(_arredondar_meio_acima(np.array([(100 + float(indice_percentual)) * 10_000]))[0])
+
+
+def taxa_mensal(percentual_anual: float = PERCENTUAL_JUROS_ANUAL) -> float:
+    """Taxa mensal equivalente à taxa efetiva anual"""
+    return (1 + percentual_anual / 100) ** (1 / 12) - 1
+
+
+def data_primeiro_vencimento(hoje: Optional[date] = None) -> date:
+    """Dia 15 do mês seguinte"""
+    hoje = hoje or date.today()
+    if hoje.month == 12:
+        return date(hoje.year + 1, 1, DIA_VENCIMENTO)
+    return date(hoje.year, hoje.month + 1, DIA_VENCIMENTO)
+
+
+def calcular_reparcelamentos(
+    saldos: Iterable[float],
+    quantidades_parcelas: Iterable[int],
+    indice_igpm: float = INDICE_IGPM_PADRAO,
+    percentual_juros_anual: float = PERCENTUAL_JUROS_ANUAL,
+    gerar_cronograma: bool = True
+) -> Dict[str, np.ndarray]:
+    """
+    Calcula o reparcelamento de toda a carteira de uma vez
+
+    Args:
+        saldos: Saldo devedor atual de cada contrato (reais)
+        quantidades_parcelas: Quantidade de parcelas do novo parcelamento
+        indice_igpm: IGP-M acumulado (%) aplicado sobre o saldo
+        percentual_juros_anual: Juros fixos (% a.a.)
+        gerar_cronograma: Se True, calcula juros/amortização/saldo de cada parcela
+
+    Returns:
+        Arrays em centavos por contrato: saldo_anterior, saldo_corrigido,
+        valor_parcela, valor_ultima_parcela, quantidade_parcelas e, com
+        cronograma, matrizes (contratos x parcelas) parcela, juros,
+        amortizacao e saldo_devedor (posições além do prazo ficam zeradas).
+    """
+    saldo_anterior = para_centavos(saldos)
+    quantidades = np.maximum(np.asarray(quantidades_parcelas, dtype=np.int64), 1)
+    total = saldo_anterior.size
+
+    # Correção IGP-M em aritmética inteira: centavos * fator / 10^6, meio para cima
+    fator = fator_correcao_milionesimos(indice_igpm)
+    saldo_corrigido = (saldo_anterior * fator + ESCALA_FATOR // 2) // ESCALA_FATOR
+
+    # Parcela Price: PV * i / (1 - (1 + i)^-n)
+    i = taxa_mensal(percentual_juros_anual)
+    if i > 0:
+        coeficiente = i / (1 - (1 + i) ** (-quantidades.astype(float)))
+    else:
+        coeficiente = 1 / quantidades.astype(float)
+    valor_parcela = _arredondar_meio_acima(saldo_corrigido * coeficiente)
+
+    resultado = {
+        "saldo_anterior": saldo_anterior,
+        "saldo_corrigido": saldo_corrigido,
+        "valor_parcela": valor_parcela,
+        "valor_ultima_parcela": valor_parcela.copy(),
+        "quantidade_parcelas": quantidades,
+        "fator_correcao": fator,
+        "taxa_mensal": i,
+    }
+
+    # Cronograma: percorre os meses, vetorizado sobre os contratos
+    prazo_maximo = int(quantidades.max()) if total else 0
+    if gerar_cronograma:
+        parcelas = np.zeros((total, prazo_maximo), dtype=np.int64)
+        juros = np.zeros_like(parcelas)
+        amortizacao = np.zeros_like(parcelas)
+        saldo_devedor = np.zeros_like(parcelas)
+
+    saldo = saldo_corrigido.copy()
+    for mes in range(prazo_maximo):
+        ativos = mes < quantidades
+        ultima = mes == quantidades - 1
+
+        juros_mes = np.where(ativos, _arredondar_meio_acima(saldo * i), 0)
+        # Última parcela quita o saldo restante (absorve arredondamentos)
+        amortizacao_mes = np.where(ultima, saldo, np.where(ativos, valor_parcela - juros_mes, 0))
+        saldo = saldo - amortizacao_mes
+
+        if gerar_cronograma:
+            parcelas[:, mes] = juros_mes + amortizacao_mes
+            juros[:, mes] = juros_mes
+            amortizacao[:, mes] = amortizacao_mes
+            saldo_devedor[:, mes] = np.where(ativos, saldo, 0)
+
+        resultado["valor_ultima_parcela"] = np.where(
+            ultima, juros_mes + amortizacao_mes, resultado["valor_ultima_parcela"]
+        )
+
+    if gerar_cronograma:
+        resultado.update({
+            "parcela": parcelas,
+            "juros": juros,
+            "amortizacao": amortizacao,
+            "saldo_devedor": saldo_devedor,
+        })
+
+    return resultado
+
+
+def datas_vencimento(quantidade: int, hoje: Optional[date] = None) -> List[str]:
+    """Datas dd/mm/aaaa das parcelas mensais a partir do 1º vencimento"""
+    primeiro = np.datetime64(data_primeiro_vencimento(hoje).replace(day=1), "M")
+    meses = primeiro + np.arange(quantidade)
+    dias = meses.astype("datetime64[D]") + (DIA_VENCIMENTO - 1)
+    return [d.strftime("%d/%m/%Y") for d in dias.astype(object)]
+
+
+def montar_detalhes(
+    calculo: Dict[str, np.ndarray],
+    indice: int,
+    indice_igpm: float,
+    hoje: Optional[date] = None,
+    incluir_cronograma: bool = True,
+    vencimentos: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Monta o dict detalhes (formato de _configurar_detalhes_reparcelamento) de um contrato
+
+    vencimentos: datas já formatadas para o maior prazo da carteira
+    (evita reformatar as mesmas datas para cada contrato)
+    """
+    quantidade = int(calculo["quantidade_parcelas"][indice])
+    if vencimentos is None or len(vencimentos) < quantidade:
+        vencimentos = datas_vencimento(quantidade, hoje)
+
+    detalhes = {
+        "detalhamento": f"CORREÇÃO {(hoje or datetime.now()).strftime('%m/%y')}",
+        "tipo_condicao": TIPO_CONDICAO,
+        "valor_total": int(calculo["saldo_corrigido"][indice]) / 100,
+        "quantidade_parcelas": quantidade,
+        "valor_parcela": int(calculo["valor_parcela"][indice]) / 100,
+        "valor_ultima_parcela": int(calculo["valor_ultima_parcela"][indice]) / 100,
+        "data_primeiro_vencimento": vencimentos[0],
+        "indexador": INDEXADOR,
+        "tipo_juros": TIPO_JUROS,
+        "percentual_juros": PERCENTUAL_JUROS_ANUAL,
+        "taxa_juros_mensal": round(calculo["taxa_mensal"] * 100, 6),
+        "indice_aplicado": indice_igpm,
+        "fator_correcao": calculo["fator_correcao"] / ESCALA_FATOR,
+        "saldo_anterior": int(calculo["saldo_anterior"][indice]) / 100,
+    }
+
+    if incluir_cronograma and "parcela" in calculo:
+        parcelas = calculo["parcela"][indice, :quantidade].tolist()
+        juros = calculo["juros"][indice, :quantidade].tolist()
+        amortizacao = calculo["amortizacao"][indice, :quantidade].tolist()
+        saldos = calculo["saldo_devedor"][indice, :quantidade].tolist()
+        detalhes["cronograma"] = [
+            {
+                "numero_parcela": n + 1,
+                "data_vencimento": vencimentos[n],
+                "valor_parcela": parcelas[n] / 100,
+                "juros": juros[n] / 100,
+                "amortizacao": amortizacao[n] / 100,
+                "saldo_devedor": saldos[n] / 100,
+            }
+            for n in range(quantidade)
+        ]
+
+    return detalhes
+
+
+def _indice_igpm(indices: Optional[Dict[str, Any]]) -> float:
+    """
+    IGP-M dos índices coletados (SEMPRE IGP-M conforme PDD)
+
+    O RPA Coleta de Índices grava o valor como texto com vírgula ("3,89");
+    aceita também "3.89" e números.
+    """
+    valor = (indices or {}).get("igpm", {}).get("valor")
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        return INDICE_IGPM_PADRAO
+    return converter_valor_monetario(valor)
+
+
+def calcular_carteira(
+    contratos: List[Dict[str, Any]],
+    indices: Optional[Dict[str, Any]] = None,
+    hoje: Optional[date] = None,
+    incluir_cronograma: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Calcula os detalhes de reparcelamento de todos os contratos elegíveis
+
+    Args:
+        contratos: Dicts com numero_titulo, saldo_total e parcelas_pendentes
+            (ex.: dados_financeiros de cada contrato ou linhas do resumo do lote)
+        indices: Índices econômicos coletados (usa indices["igpm"]["valor"])
+        hoje: Data de referência para vencimentos
+        incluir_cronograma: Se True, inclui o cronograma completo em cada detalhe
+
+    Returns:
+        Dict numero_titulo -> detalhes
+    """
+    indice_igpm = _indice_igpm(indices)
+    calculo = calcular_reparcelamentos(
+        [c.get("saldo_total", 0.0) or 0.0 for c in contratos],
+        [c.get("parcelas_pendentes", 1) or 1 for c in contratos],
+        indice_igpm,
+        gerar_cronograma=incluir_cronograma
+    )
+
+    prazo_maximo = int(calculo["quantidade_parcelas"].max()) if contratos else 0
+    vencimentos = datas_vencimento(prazo_maximo, hoje)
+
+    return {
+        str(contrato.get("numero_titulo", "")): montar_detalhes(
+            calculo, posicao, indice_igpm, hoje, incluir_cronograma, vencimentos
+        )
+        for posicao, contrato in enumerate(contratos)
+    }
+
+
+def calcular_detalhes_reparcelamento(
+    dados_financeiros: Dict[str, Any],
+    indices: Optional[Dict[str, Any]] = None,
+    hoje: Optional[date] = None,
+    incluir_cronograma: bool = True
+) -> Dict[str, Any]:
+    """Detalhes de reparcelamento de um único contrato"""
+    indice_igpm = _indice_igpm(indices)
+    calculo = calcular_reparcelamentos(
+        [dados_financeiros.get("saldo_total", 0.0) or 0.0],
+        [dados_financeiros.get("parcelas_pendentes", 1) or 1],
+        indice_igpm,
+        gerar_cronograma=incluir_cronograma
+    )
+    return montar_detalhes(calculo, 0, indice_igpm, hoje, incluir_cronograma)
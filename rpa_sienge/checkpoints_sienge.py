@@ -0,0 +1,214 @@
+"""
+Checkpoints do RPA Sienge
+Máquina de estados por contrato com retomada a partir da etapa que falhou
+
+Desenvolvido em Português Brasileiro
+
+Etapas (PDD seção 7.3): consulta -> validacao -> reparcelamento -> carne
+
+Cada etapa concluída é gravada com sua saída (arquivo do relatório,
+resultado da validação, novo título, arquivo do carnê). Em uma nova
+tentativa o RPA pula as etapas já concluídas; contratos finalizados no
+ciclo (data de processamento) não são executados novamente.
+
+Persistência: MongoDB (collection checkpoints_sienge) + JSON local por
+contrato (dados_processamento/checkpoints_sienge/<ciclo>/<titulo>.json)
+como fallback garantido. Cada gravação escreve só o arquivo do contrato,
+em temporário exclusivo + os.replace, então workers em paralelo não
+perdem checkpoints uns dos outros e um arquivo nunca fica pela metade.
+"""
+
+import json
+import os
+import re
+import shutil
+import logging
+import tempfile
+from datetime import datetime, date, timedelta
+from typing import Dict, Any, Optional
+
+try:
+    from core.mongodb_manager import mongodb_manager
+    MONGODB_DISPONIVEL = True
+except ImportError:
+    MONGODB_DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+# Ordem das etapas do processamento Sienge
+ETAPAS_SIENGE = ["consulta", "validacao", "reparcelamento", "carne"]
+
+# Status de contrato
+STATUS_EM_ANDAMENTO = "em_andamento"
+STATUS_FALHOU = "falhou"
+STATUS_CONCLUIDO = "concluido"
+STATUS_NAO_ELEGIVEL = "nao_elegivel"
+
+# Status que encerram o contrato no ciclo
+STATUS_FINAIS = (STATUS_CONCLUIDO, STATUS_NAO_ELEGIVEL)
+
+# Ciclos mantidos no arquivo local
+DIAS_RETENCAO_LOCAL = 7
+
+
+def ciclo_atual() -> str:
+    """Ciclo de processamento = data do dia (ISO)"""
+    return date.today().isoformat()
+
+
+class CheckpointsSienge:
+    """
+    Armazena e consulta checkpoints de contratos processados no Sienge
+    """
+
+    def __init__(self, pasta_local: str = "dados_processamento/checkpoints_sienge"):
+        self.pasta_local = pasta_local
+        self.mongodb_ativo = MONGODB_DISPONIVEL
+
+    def novo_checkpoint(self, ciclo: str, contrato: Dict[str, Any]) -> Dict[str, Any]:
+        """Cria checkpoint vazio para o contrato no ciclo"""
+        agora = datetime.now().isoformat()
+        return {
+            "ciclo": ciclo,
+            "numero_titulo": str(contrato.get("numero_titulo", "")),
+            "cliente": contrato.get("cliente", ""),
+            "status": STATUS_EM_ANDAMENTO,
+            "etapas": {},
+            "etapa_falha": None,
+            "ultimo_erro": None,
+            "tentativas": 0,
+            "criado_em": agora,
+            "atualizado_em": agora
+        }
+
+    async def carregar(self, ciclo: str, contrato: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Carrega checkpoint do contrato no ciclo (ou cria um novo)
+
+        Args:
+            ciclo: Ciclo de processamento (data ISO)
+            contrato: Dados do contrato
+
+        Returns:
+            Checkpoint do contrato
+        """
+        numero_titulo = str(contrato.get("numero_titulo", ""))
+        checkpoint = None
+
+        if self.mongodb_ativo:
+            try:
+                checkpoint = await mongodb_manager.obter_checkpoint_sienge(ciclo, numero_titulo)
+                if not mongodb_manager.conectado:
+                    self.mongodb_ativo = False
+            except Exception as e:
+                logger.warning(f"⚠️ MongoDB indisponível para checkpoints, usando JSON: {str(e)}")
+                self.mongodb_ativo = False
+
+        if checkpoint is None:
+            checkpoint = self._carregar_local(ciclo, numero_titulo)
+
+        return checkpoint or self.novo_checkpoint(ciclo, contrato)
+
+    async def salvar(self, checkpoint: Dict[str, Any]):
+        """Persiste checkpoint no MongoDB e no JSON local"""
+        checkpoint["atualizado_em"] = datetime.now().isoformat()
+
+        if self.mongodb_ativo:
+            try:
+                if await mongodb_manager.salvar_checkpoint_sienge(checkpoint) is None:
+                    self.mongodb_ativo = False
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao salvar checkpoint no MongoDB: {str(e)}")
+                self.mongodb_ativo = False
+
+        # Sempre salvar em JSON (fallback garantido)
+        try:
+            self._salvar_local(checkpoint)
+        except Exception as e:
+            logger.error(f"❌ Falha ao salvar checkpoint local: {str(e)}")
+
+    async def concluir_etapa(self, checkpoint: Dict[str, Any], etapa: str, saida: Dict[str, Any]):
+        """Registra etapa concluída com sua saída"""
+        checkpoint["etapas"][etapa] = {
+            "concluida_em": datetime.now().isoformat(),
+            "saida": saida
+        }
+        if checkpoint.get("etapa_falha") == etapa:
+            checkpoint["etapa_falha"] = None
+            checkpoint["ultimo_erro"] = None
+        checkpoint["status"] = STATUS_EM_ANDAMENTO
+        await self.salvar(checkpoint)
+
+    async def registrar_falha(self, checkpoint: Dict[str, Any], etapa: str, erro: str):
+        """Registra falha na etapa; a próxima tentativa retoma a partir dela"""
+        checkpoint["status"] = STATUS_FALHOU
+        checkpoint["etapa_falha"] = etapa
+        checkpoint["ultimo_erro"] = erro
+        checkpoint["tentativas"] = checkpoint.get("tentativas", 0) + 1
+        await self.salvar(checkpoint)
+
+    async def finalizar(self, checkpoint: Dict[str, Any], status: str, resultado: Dict[str, Any]):
+        """Encerra o contrato no ciclo (concluído ou não elegível)"""
+        checkpoint["status"] = status
+        checkpoint["resultado"] = resultado
+        checkpoint["finalizado_em"] = datetime.now().isoformat()
+        await self.salvar(checkpoint)
+
+    @staticmethod
+    def etapa_concluida(checkpoint: Dict[str, Any], etapa: str) -> bool:
+        return etapa in checkpoint.get("etapas", {})
+
+    @staticmethod
+    def saida_etapa(checkpoint: Dict[str, Any], etapa: str) -> Dict[str, Any]:
+        return checkpoint.get("etapas", {}).get(etapa, {}).get("saida", {})
+
+    @staticmethod
+    def esta_finalizado(checkpoint: Dict[str, Any]) -> bool:
+        return checkpoint.get("status") in STATUS_FINAIS
+
+    def _arquivo_local(self, ciclo: str, numero_titulo: str) -> str:
+        nome = re.sub(r"[^A-Za-z0-9._-]", "_", str(numero_titulo)) or "_"
+        return os.path.join(self.pasta_local, ciclo, f"{nome}.json")
+
+    def _carregar_local(self, ciclo: str, numero_titulo: str) -> Optional[Dict[str, Any]]:
+        arquivo = self._arquivo_local(ciclo, numero_titulo)
+        if not os.path.exists(arquivo):
+            return None
+        try:
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Checkpoint local ilegível ({arquivo}): {str(e)}")
+            return None
+        return checkpoint if str(checkpoint.get("numero_titulo")) == str(numero_titulo) else None
+
+    def _salvar_local(self, checkpoint: Dict[str, Any]):
+        """Grava só o arquivo do contrato (temporário exclusivo + os.replace)"""
+        arquivo = self._arquivo_local(checkpoint["ciclo"], checkpoint["numero_titulo"])
+        pasta_ciclo = os.path.dirname(arquivo)
+        novo_ciclo = not os.path.isdir(pasta_ciclo)
+        os.makedirs(pasta_ciclo, exist_ok=True)
+
+        descritor, temporario = tempfile.mkstemp(dir=pasta_ciclo, suffix=".tmp")
+        try:
+            with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f, indent=2, ensure_ascii=False, default=str)
+            os.replace(temporario, arquivo)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+        if novo_ciclo:
+            self._remover_ciclos_antigos()
+
+    def _remover_ciclos_antigos(self):
+        """Mantém apenas ciclos recentes"""
+        limite = (date.today() - timedelta(days=DIAS_RETENCAO_LOCAL)).isoformat()
+        for ciclo in os.listdir(self.pasta_local):
+            if ciclo < limite and os.path.isdir(os.path.join(self.pasta_local, ciclo)):
+                shutil.rmtree(os.path.join(self.pasta_local, ciclo), ignore_errors=True)
+
+
+# Instância global
+checkpoints_sienge = CheckpointsSienge()
@@ -8,9 +8,11 @@ Desenvolvido em Português Brasileiro
 """
 
 import pandas as pd
+import numpy as np
 from datetime import datetime, date, timedelta
 import os
 from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
 
 def criar_planilha_cliente_adimplente():
     """
@@ -635,5 +637,120 @@ def criar_todas_planilhas():
     
     return planilhas_criadas
 
+# ========================
+# CARTEIRA SINTÉTICA (TESTES DE CARGA)
+# ========================
+
+# Cenários do PDD e participação aproximada em uma carteira real
+CENARIOS_CARTEIRA = {
+    "adimplente": (criar_planilha_cliente_adimplente, 0.55),
+    "custas_honorarios": (criar_planilha_cliente_custas_honorarios, 0.15),
+    "limite_inadimplencia": (criar_planilha_cliente_limite_inadimplencia, 0.12),
+    "misto": (criar_planilha_cliente_misto, 0.08),
+    "inadimplente": (criar_planilha_cliente_inadimplente, 0.10),
+}
+
+# Colunas monetárias ajustadas pelo fator de valor de cada contrato
+COLUNAS_VALOR = ['Valor original', 'Valor atualizado', 'Valor corrigido',
+                 'Valor presente', 'Valor a receber']
+
+CNPJS_UNIDADES = ["12.345.678/0001-90", "23.456.789/0001-01", "34.567.890/0001-12"]
+
+
+def gerar_carteira_sintetica(
+    quantidade_contratos: int,
+    semente: int = 42,
+    pesos_cenarios: Optional[Dict[str, float]] = None,
+    parcelas_futuras: Tuple[int, int] = (12, 120)
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Gera carteira sintética no layout do relatório Saldo Devedor Presente
+
+    Cada contrato recebe um cenário do PDD (geradores acima), um fator de
+    valor (lognormal) e um prazo remanescente de parcelas PM futuras
+    sorteado em parcelas_futuras.
+
+    Args:
+        quantidade_contratos: Número de contratos da carteira
+        semente: Semente para reprodutibilidade
+        pesos_cenarios: Participação de cada cenário (padrão CENARIOS_CARTEIRA)
+        parcelas_futuras: Faixa (mín, máx) de parcelas PM futuras por contrato
+
+    Returns:
+        (DataFrame do relatório da carteira, lista de contratos no formato da fila)
+    """
+    rng = np.random.default_rng(semente)
+    pesos_cenarios = pesos_cenarios or {nome: peso for nome, (_, peso) in CENARIOS_CARTEIRA.items()}
+    nomes = list(pesos_cenarios)
+    pesos = np.array([pesos_cenarios[n] for n in nomes], dtype=float)
+
+    cenarios = rng.choice(len(nomes), size=quantidade_contratos, p=pesos / pesos.sum())
+    titulos = np.array([f"SIM{i:07d}" for i in range(1, quantidade_contratos + 1)])
+    clientes = np.char.add("CLIENTE SINTÉTICO ", titulos)
+    fatores = rng.lognormal(mean=0.0, sigma=0.35, size=quantidade_contratos)
+
+    blocos = []
+
+    # Parcelas dos cenários: replica o modelo de cada cenário para seus contratos
+    for indice, nome in enumerate(nomes):
+        contratos_cenario = np.flatnonzero(cenarios == indice)
+        if contratos_cenario.size == 0:
+            continue
+
+        modelo = pd.DataFrame(CENARIOS_CARTEIRA[nome][0]())
+        linhas_modelo = len(modelo)
+
+        bloco = modelo.iloc[np.tile(np.arange(linhas_modelo), contratos_cenario.size)].reset_index(drop=True)
+        dono = np.repeat(contratos_cenario, linhas_modelo)
+        bloco['Título'] = titulos[dono]
+        bloco['Cliente'] = clientes[dono]
+        bloco['Cód. cliente'] = (dono + 10000).astype(str)
+        for coluna in COLUNAS_VALOR:
+            bloco[coluna] = (bloco[coluna].astype(float) * fatores[dono]).round(2)
+        blocos.append(bloco)
+
+    # Parcelas PM futuras (prazo remanescente do contrato)
+    quantidade_futuras = rng.integers(parcelas_futuras[0], parcelas_futuras[1] + 1, size=quantidade_contratos)
+    total_futuras = int(quantidade_futuras.sum())
+    if total_futuras:
+        base = dict(criar_planilha_cliente_adimplente()[0])
+        futuras = pd.DataFrame(base, index=pd.RangeIndex(total_futuras))
+
+        dono = np.repeat(np.arange(quantidade_contratos), quantidade_futuras)
+        # Posição da parcela dentro do contrato (1..n)
+        inicio_contrato = np.repeat(np.cumsum(quantidade_futuras) - quantidade_futuras, quantidade_futuras)
+        sequencia = np.arange(total_futuras) - inicio_contrato + 1
+
+        hoje = pd.Timestamp(date.today())
+        futuras['Título'] = titulos[dono]
+        futuras['Cliente'] = clientes[dono]
+        futuras['Cód. cliente'] = (dono + 10000).astype(str)
+        futuras['Parcela/Sequencial'] = np.char.add("F", sequencia.astype(str))
+        futuras['Nº documento'] = np.char.add("PMF", sequencia.astype(str))
+        futuras['Data vencimento'] = (hoje + pd.to_timedelta(sequencia * 30 + 60, unit="D")).date
+        for coluna in COLUNAS_VALOR:
+            futuras[coluna] = (futuras[coluna].astype(float) * fatores[dono]).round(2)
+        blocos.append(futuras)
+
+    carteira = pd.concat(blocos, ignore_index=True)
+    carteira['Data vencimento'] = pd.to_datetime(carteira['Data vencimento'])
+    carteira = carteira.sort_values('Título', kind='stable').reset_index(drop=True)
+
+    contratos = [
+        {
+            "numero_titulo": str(titulos[i]),
+            "cliente": str(clientes[i]),
+            "empreendimento": f"EMPREENDIMENTO {i % 25 + 1:02d}",
+            "cnpj_unidade": CNPJS_UNIDADES[i % len(CNPJS_UNIDADES)],
+            "indexador": "IGP-M",
+            "status_processamento": "pendente",
+            "cenario": nomes[cenarios[i]]
+        }
+        for i in range(quantidade_contratos)
+    ]
+
+    return carteira, contratos
+
+
 if __name__ == "__main__":
     criar_todas_planilhas()
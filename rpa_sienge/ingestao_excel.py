@@ -0,0 +1,264 @@
+"""
+Ingestão de Relatórios Excel do Sienge
+Leitura em streaming das exportações Saldo Devedor Presente com cache colunar
+
+Desenvolvido em Português Brasileiro
+
+- Lê o .xlsx em modo read-only (openpyxl), linha a linha, sem carregar a
+  planilha inteira na memória
+- Lê apenas as colunas usadas pelas regras do PDD
+- Converte os blocos lidos para colunas tipadas (datas, valores, texto)
+- Guarda o resultado em cache colunar (Parquet) identificado pelo hash
+  do arquivo, tornando o reprocessamento da mesma exportação imediato
+"""
+
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 - apenas verifica disponibilidade do Parquet
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+# Import funciona tanto quando executado da raiz quanto da pasta rpa_sienge
+try:
+    from rpa_sienge.processamento_relatorio import (
+        mapear_colunas, converter_serie_datas, converter_serie_monetaria, normalizar_titulos
+    )
+except ImportError:
+    from processamento_relatorio import (
+        mapear_colunas, converter_serie_datas, converter_serie_monetaria, normalizar_titulos
+    )
+
+logger = logging.getLogger(__name__)
+
+# Cache ao lado das planilhas extraídas pelo RPA Sienge
+PASTA_CACHE = Path("dados_extraidos/planilhas_sienge/cache")
+
+# Alterar quando o formato do DataFrame em cache mudar (invalida caches antigos)
+VERSAO_CACHE = 1
+
+# Linhas convertidas por bloco durante a leitura
+TAMANHO_BLOCO = 50_000
+
+# Linhas iniciais inspecionadas para localizar o cabeçalho
+LINHAS_BUSCA_CABECALHO = 20
+
+# Mínimo de campos PDD reconhecidos para considerar uma linha como cabeçalho
+MINIMO_CAMPOS_CABECALHO = 3
+
+
+def calcular_hash_arquivo(caminho: Path, tamanho_bloco: int = 1024 * 1024) -> str:
+    """Calcula SHA-256 do arquivo lendo em blocos"""
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _caminho_cache(hash_arquivo: str, pasta_cache: Path) -> Path:
+    extensao = "parquet" if PARQUET_DISPONIVEL else "pkl"
+    return pasta_cache / f"{hash_arquivo}_v{VERSAO_CACHE}.{extensao}"
+
+
+def _ler_cache(caminho: Path) -> Optional[pd.DataFrame]:
+    try:
+        if caminho.suffix == ".parquet":
+            return pd.read_parquet(caminho)
+        return pd.read_pickle(caminho)
+    except Exception as e:
+        logger.warning(f"⚠️ Cache inválido {caminho.name}, relendo planilha: {e}")
+        return None
+
+
+def _gravar_cache(df: pd.DataFrame, caminho: Path):
+    try:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_suffix(caminho.suffix + ".tmp")
+        if caminho.suffix == ".parquet":
+            df.to_parquet(temporario, index=False)
+        else:
+            df.to_pickle(temporario)
+        # Substituição atômica: leitores nunca veem cache parcial
+        temporario.replace(caminho)
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível gravar cache {caminho.name}: {e}")
+
+
+def _converter_bloco(colunas: Dict[str, List[Any]], mapeamento: Dict[str, str]) -> pd.DataFrame:
+    """Converte um bloco de valores brutos em colunas tipadas"""
+    campos_por_coluna = {coluna: campo for campo, coluna in mapeamento.items()}
+    convertidas = {}
+
+    for nome, valores in colunas.items():
+        serie = pd.Series(valores, dtype="object")
+        campo = campos_por_coluna.get(nome)
+
+        if campo == "data_vencimento":
+            convertidas[nome] = converter_serie_datas(serie)
+        elif campo == "valor":
+            convertidas[nome] = converter_serie_monetaria(serie)
+        elif campo == "numero_titulo":
+            convertidas[nome] = normalizar_titulos(serie)
+        else:
+            convertidas[nome] = serie.where(serie.notna(), "").astype(str).str.strip()
+
+    return pd.DataFrame(convertidas)
+
+
+def _ler_xlsx_streaming(caminho: Path, tamanho_bloco: int = TAMANHO_BLOCO) -> pd.DataFrame:
+    """
+    Lê o relatório em modo read-only, apenas com as colunas mapeadas
+
+    Raises:
+        ValueError: Se o cabeçalho do relatório não for encontrado
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = workbook.worksheets[0]
+        linhas = planilha.iter_rows(values_only=True)
+
+        # Localiza cabeçalho (exportações podem ter linhas de título antes)
+        mapeamento = {}
+        cabecalho = []
+        for numero_cabecalho, linha in zip(range(1, LINHAS_BUSCA_CABECALHO + 1), linhas):
+            cabecalho = [str(c).strip() if c is not None else "" for c in linha]
+            mapeamento = mapear_colunas(c for c in cabecalho if c)
+            if len(mapeamento) >= MINIMO_CAMPOS_CABECALHO:
+                break
+        else:
+            raise ValueError(f"Cabeçalho do relatório Sienge não encontrado em {caminho.name}")
+
+        indices = {nome: cabecalho.index(nome) for nome in dict.fromkeys(mapeamento.values())}
+
+        # Continua a leitura a partir da linha seguinte ao cabeçalho, parando
+        # na última coluna necessária (exportação completa tem 39 colunas)
+        linhas = planilha.iter_rows(
+            min_row=numero_cabecalho + 1,
+            max_col=max(indices.values()) + 1,
+            values_only=True
+        )
+        blocos = []
+        colunas = {nome: [] for nome in indices}
+        total_bloco = 0
+
+        for linha in linhas:
+            if not any(v is not None for v in linha):
+                continue
+            for nome, indice in indices.items():
+                colunas[nome].append(linha[indice] if indice < len(linha) else None)
+            total_bloco += 1
+
+            if total_bloco >= tamanho_bloco:
+                blocos.append(_converter_bloco(colunas, mapeamento))
+                colunas = {nome: [] for nome in indices}
+                total_bloco = 0
+
+        if total_bloco or not blocos:
+            blocos.append(_converter_bloco(colunas, mapeamento))
+
+        return pd.concat(blocos, ignore_index=True) if len(blocos) > 1 else blocos[0]
+
+    finally:
+        workbook.close()
+
+
+def ler_relatorio_sienge(
+    caminho_arquivo,
+    usar_cache: bool = True,
+    pasta_cache: Optional[Path] = None
+) -> pd.DataFrame:
+    """
+    Lê relatório Saldo Devedor Presente exportado do Sienge
+
+    Retorna somente as colunas usadas pelas regras do PDD, com os nomes
+    originais do cabeçalho e tipos já convertidos (datetime64 para
+    vencimento, float64 para valores, texto para o restante).
+
+    Args:
+        caminho_arquivo: Caminho do .xlsx
+        usar_cache: Se True, reutiliza/grava o cache colunar
+        pasta_cache: Pasta do cache (padrão: PASTA_CACHE)
+
+    Returns:
+        DataFrame tipado do relatório
+    """
+    caminho = Path(caminho_arquivo)
+    if not caminho.exists():
+        raise FileNotFoundError(f"Relatório não encontrado: {caminho}")
+
+    arquivo_cache = None
+    if usar_cache:
+        arquivo_cache = _caminho_cache(calcular_hash_arquivo(caminho), Path(pasta_cache or PASTA_CACHE))
+        if arquivo_cache.exists():
+            df = _ler_cache(arquivo_cache)
+            if df is not None:
+                logger.info(f"⚡ Relatório {caminho.name} carregado do cache ({len(df)} linhas)")
+                return df
+
+    inicio = datetime.now()
+    df = _ler_xlsx_streaming(caminho)
+    logger.info(
+        f"📁 Relatório {caminho.name} lido em {(datetime.now() - inicio).total_seconds():.2f}s "
+        f"({len(df)} linhas, {len(df.columns)} colunas)"
+    )
+
+    if arquivo_cache is not None:
+        _gravar_cache(df, arquivo_cache)
+
+    return df
+
+
+def localizar_relatorio_baixado(
+    pasta_downloads,
+    padrao: str = "saldo_devedor_presente-*.xlsx",
+    desde: Optional[datetime] = None
+) -> Optional[Path]:
+    """
+    Localiza o relatório exportado mais recente na pasta de downloads
+
+    Args:
+        pasta_downloads: Pasta configurada no navegador para downloads
+        padrao: Padrão do nome do arquivo exportado pelo Sienge
+        desde: Ignora arquivos modificados antes deste instante
+
+    Returns:
+        Caminho do arquivo ou None se não encontrado
+    """
+    pasta = Path(pasta_downloads)
+    if not pasta.exists():
+        return None
+
+    limite = desde.timestamp() if desde else 0
+    candidatos = [
+        arquivo for arquivo in pasta.glob(padrao)
+        if arquivo.stat().st_mtime >= limite
+    ]
+    if not candidatos:
+        return None
+
+    return max(candidatos, key=lambda arquivo: arquivo.stat().st_mtime)
+
+
+def limpar_cache(pasta_cache: Optional[Path] = None, manter_dias: int = 30) -> int:
+    """Remove arquivos de cache mais antigos que manter_dias; retorna quantidade removida"""
+    pasta = Path(pasta_cache or PASTA_CACHE)
+    if not pasta.exists():
+        return 0
+
+    limite = datetime.now().timestamp() - manter_dias * 86400
+    removidos = 0
+    for arquivo in pasta.iterdir():
+        if arquivo.is_file() and arquivo.stat().st_mtime < limite:
+            arquivo.unlink()
+            removidos += 1
+    return removidos
@@ -0,0 +1,411 @@
+"""
+Processamento do Relatório Saldo Devedor Presente - Sienge
+Classificação vetorizada das parcelas conforme PDD seção 7.3.2
+
+Desenvolvido em Português Brasileiro
+
+Todo o processamento é feito sobre colunas (pandas/NumPy), sem iterar
+linha a linha. O módulo não depende do navegador, podendo ser usado
+tanto pelo RPA real quanto pelo simulador e pelos scripts de teste.
+"""
+
+import unicodedata
+from datetime import date
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+import pandas as pd
+
+# Status exato de parcela liquidada conforme PDD
+STATUS_QUITADA = "Quitada"
+
+# Quantidade de parcelas CT vencidas que caracteriza inadimplência
+LIMITE_CT_VENCIDAS = 3
+
+# Classes de parcela
+CLASSE_CT = "CT"
+CLASSE_REC_FAT = "REC_FAT"
+CLASSE_OUTRA = "OUTRA"
+
+# Cabeçalhos aceitos para cada campo (ordem = prioridade)
+CANDIDATOS_COLUNAS = {
+    "numero_titulo": ["Título", "Numero titulo", "Número do título", "Titulo"],
+    "cliente": ["Cliente", "Nome do cliente"],
+    "numero_parcela": ["Parcela/Sequencial", "Número da parcela", "Nº parcela", "Parcela"],
+    "tipo_parcela": ["Documento", "Tipo documento", "Parcela/Condição", "Tipo condição"],
+    "status": ["Status da parcela", "Status"],
+    "data_vencimento": ["Data vencimento", "Data de vencimento", "Vencimento"],
+    "valor": ["Valor a receber", "Saldo", "Valor corrigido", "Valor"],
+}
+
+# Colunas da tabela normalizada
+COLUNAS_NORMALIZADAS = [
+    "numero_titulo", "cliente", "numero_parcela", "tipo_parcela",
+    "status_parcela", "data_vencimento", "valor", "classe", "quitada", "vencida"
+]
+
+
+def _normalizar_texto(texto: str) -> str:
+    """Remove acentos, espaços extras e caixa para comparação de cabeçalhos"""
+    sem_acento = unicodedata.normalize("NFKD", str(texto))
+    sem_acento = "".join(c for c in sem_acento if not unicodedata.combining(c))
+    return " ".join(sem_acento.lower().split())
+
+
+def mapear_colunas(colunas: Iterable[str]) -> Dict[str, str]:
+    """
+    Mapeia os cabeçalhos do relatório para os campos usados nas regras do PDD
+
+    Primeiro procura correspondência exata (ignorando acentos e caixa),
+    depois correspondência parcial. O mapeamento é feito uma única vez
+    por relatório.
+
+    Args:
+        colunas: Cabeçalhos do DataFrame
+
+    Returns:
+        Dict campo -> nome real da coluna (apenas campos encontrados)
+    """
+    colunas = [str(c) for c in colunas]
+    normalizadas = {_normalizar_texto(c): c for c in colunas}
+    mapeamento = {}
+
+    for campo, candidatos in CANDIDATOS_COLUNAS.items():
+        for candidato in candidatos:
+            coluna = normalizadas.get(_normalizar_texto(candidato))
+            if coluna:
+                mapeamento[campo] = coluna
+                break
+        else:
+            for candidato in candidatos:
+                alvo = _normalizar_texto(candidato)
+                coluna = next((c for n, c in normalizadas.items() if alvo in n), None)
+                if coluna:
+                    mapeamento[campo] = coluna
+                    break
+
+    return mapeamento
+
+
+def converter_valor_monetario(valor: Any) -> float:
+    """
+    Converte um valor monetário brasileiro isolado para float
+
+    Aceita números, "1.234,56", "R$ 1.234,56" e "1234.56".
+    """
+    if valor is None:
+        return 0.0
+    if isinstance(valor, (int, float, np.integer, np.floating)):
+        return 0.0 if pd.isna(valor) else float(valor)
+    return float(converter_serie_monetaria(pd.Series([valor])).iloc[0])
+
+
+def converter_serie_monetaria(serie: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de valores monetários brasileiros para float
+
+    Valores já numéricos são aproveitados diretamente; somente as células
+    de texto passam pela limpeza (R$, separador de milhar e vírgula decimal).
+    Células inválidas viram 0.0.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype("float64").fillna(0.0)
+
+    # Números em células object viram "1234.5" e seguem pelo mesmo caminho
+    texto = (
+        serie.astype(str)
+        .str.replace("R$", "", regex=False)
+        .str.replace(r"\s", "", regex=True)
+    )
+    com_virgula = texto.str.contains(",", regex=False)
+    texto = texto.where(
+        ~com_virgula,
+        texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    )
+
+    return pd.to_numeric(texto, errors="coerce").astype("float64").fillna(0.0)
+
+
+def converter_serie_datas(serie: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de datas de vencimento para datetime64
+
+    O Sienge exporta "dd/mm/aaaa"; datas ISO ("aaaa-mm-dd") e objetos
+    date/datetime também são aceitos. Células inválidas viram NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.normalize()
+
+    # Relatórios repetem poucas datas distintas: converte só os valores únicos
+    codigos, unicos = pd.factorize(serie)
+    texto = pd.Series(unicos, dtype="object").astype(str).str.strip().str.slice(0, 10)
+
+    datas = pd.to_datetime(texto, format="%d/%m/%Y", errors="coerce")
+    faltantes = datas.isna()
+    if faltantes.any():
+        datas.loc[faltantes] = pd.to_datetime(
+            texto[faltantes], format="%Y-%m-%d", errors="coerce"
+        )
+
+    convertidas = np.append(datas.to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+    # Código -1 (célula vazia) aponta para o NaT do final
+    return pd.Series(convertidas[codigos], index=serie.index)
+
+
+def normalizar_titulos(serie: pd.Series) -> pd.Series:
+    """
+    Normaliza números de título para texto ("494.0" -> "494")
+
+    Linhas sem título (ex.: linha de totais do relatório) ficam vazias.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        inteiros = serie.round().astype("Int64").astype(str)
+        return inteiros.where(serie.notna(), "")
+
+    texto = serie.astype(str).str.strip()
+    texto = texto.str.replace(r"\.0+$", "", regex=True)
+    return texto.where(serie.notna() & (texto.str.lower() != "nan"), "")
+
+
+def classificar_tipos(serie: pd.Series) -> np.ndarray:
+    """
+    Classifica a coluna de tipo/documento em CT, REC_FAT ou OUTRA
+
+    A classificação é feita sobre os valores distintos (poucos) e depois
+    expandida para todas as linhas pelos códigos do factorize.
+    """
+    codigos, unicos = pd.factorize(serie.fillna("").astype(str).str.upper())
+    unicos = pd.Series(unicos, dtype="object").astype(str)
+
+    eh_ct = unicos.str.contains("CT|COTA", regex=True).to_numpy()
+    eh_rec_fat = ~eh_ct & unicos.str.contains("REC|FAT", regex=True).to_numpy()
+    classes_unicas = np.select(
+        [eh_ct, eh_rec_fat], [CLASSE_CT, CLASSE_REC_FAT], default=CLASSE_OUTRA
+    ).astype(object)
+
+    if len(classes_unicas) == 0:
+        return np.full(len(serie), CLASSE_OUTRA, dtype=object)
+    return classes_unicas[codigos]
+
+
+def normalizar_relatorio(
+    df: pd.DataFrame,
+    mapeamento: Optional[Dict[str, str]] = None,
+    hoje: Optional[date] = None,
+    titulo_padrao: str = ""
+) -> pd.DataFrame:
+    """
+    Gera a tabela normalizada do relatório com classificação PDD
+
+    Args:
+        df: DataFrame bruto do relatório Saldo Devedor Presente
+        mapeamento: Mapeamento de colunas (calculado se não informado)
+        hoje: Data de referência para vencimento (padrão: hoje)
+        titulo_padrao: Título usado quando o relatório não tem coluna de título
+
+    Returns:
+        DataFrame com as colunas de COLUNAS_NORMALIZADAS
+    """
+    mapeamento = mapeamento or mapear_colunas(df.columns)
+    hoje = pd.Timestamp(hoje or date.today())
+    total = len(df)
+
+    def coluna(campo: str) -> Optional[pd.Series]:
+        nome = mapeamento.get(campo)
+        return df[nome] if nome in df.columns else None
+
+    titulos = coluna("numero_titulo")
+    titulos = (
+        normalizar_titulos(titulos) if titulos is not None
+        else pd.Series(str(titulo_padrao), index=df.index)
+    )
+
+    tipos = coluna("tipo_parcela")
+    tipos = tipos.fillna("").astype(str).str.strip() if tipos is not None else pd.Series("", index=df.index)
+
+    status = coluna("status")
+    status = status.fillna("").astype(str).str.strip() if status is not None else pd.Series("", index=df.index)
+
+    datas = coluna("data_vencimento")
+    datas = converter_serie_datas(datas) if datas is not None else pd.Series(pd.NaT, index=df.index)
+
+    valores = coluna("valor")
+    valores = converter_serie_monetaria(valores) if valores is not None else pd.Series(0.0, index=df.index)
+
+    clientes = coluna("cliente")
+    clientes = clientes.fillna("").astype(str).str.strip() if clientes is not None else pd.Series("", index=df.index)
+
+    parcelas = coluna("numero_parcela")
+    parcelas = parcelas.fillna("").astype(str).str.strip() if parcelas is not None else pd.Series("", index=df.index)
+
+    quitada = (status == STATUS_QUITADA).to_numpy()
+    # NaT < hoje resulta False: datas inválidas nunca contam como vencidas
+    vencida = (datas < hoje).to_numpy() & ~quitada
+
+    tabela = pd.DataFrame({
+        "numero_titulo": titulos.to_numpy(),
+        "cliente": clientes.to_numpy(),
+        "numero_parcela": parcelas.to_numpy(),
+        "tipo_parcela": tipos.to_numpy(),
+        "status_parcela": status.to_numpy(),
+        "data_vencimento": datas.to_numpy(),
+        "valor": valores.to_numpy(),
+        "classe": classificar_tipos(tipos) if total else np.array([], dtype=object),
+        "quitada": quitada,
+        "vencida": vencida,
+    })
+
+    # Remove linha de totais / linhas sem título
+    if mapeamento.get("numero_titulo") in df.columns:
+        tabela = tabela[tabela["numero_titulo"] != ""]
+
+    return tabela.reset_index(drop=True)
+
+
+def resumir_por_titulo(tabela: pd.DataFrame) -> pd.DataFrame:
+    """
+    Consolida a tabela normalizada por título (um contrato por linha)
+
+    Returns:
+        DataFrame indexado por numero_titulo com contagens e saldo
+    """
+    if tabela.empty:
+        return pd.DataFrame(columns=[
+            "cliente", "total_parcelas", "parcelas_pendentes", "qtd_ct",
+            "qtd_ct_vencidas", "qtd_rec_fat", "qtd_vencidas", "saldo_total",
+            "status_cliente"
+        ]).rename_axis("numero_titulo")
+
+    codigos, titulos = pd.factorize(tabela["numero_titulo"])
+    n = len(titulos)
+
+    eh_ct = (tabela["classe"] == CLASSE_CT).to_numpy()
+    eh_rec_fat = (tabela["classe"] == CLASSE_REC_FAT).to_numpy()
+    vencida = tabela["vencida"].to_numpy()
+    pendente = ~tabela["quitada"].to_numpy()
+
+    def contar(mascara: np.ndarray) -> np.ndarray:
+        return np.bincount(codigos[mascara], minlength=n)
+
+    qtd_ct_vencidas = contar(eh_ct & vencida)
+    qtd_rec_fat = contar(eh_rec_fat)
+    qtd_vencidas = contar(vencida)
+
+    primeiro = tabela.drop_duplicates("numero_titulo")
+
+    resumo = pd.DataFrame({
+        "cliente": primeiro["cliente"].to_numpy(),
+        "total_parcelas": np.bincount(codigos, minlength=n),
+        "parcelas_pendentes": contar(pendente),
+        "qtd_ct": contar(eh_ct),
+        "qtd_ct_vencidas": qtd_ct_vencidas,
+        "qtd_rec_fat": qtd_rec_fat,
+        "qtd_vencidas": qtd_vencidas,
+        "saldo_total": np.bincount(codigos, weights=tabela["valor"].to_numpy(), minlength=n).round(2),
+    }, index=pd.Index(titulos, name="numero_titulo"))
+
+    resumo["status_cliente"] = np.select(
+        [qtd_ct_vencidas >= LIMITE_CT_VENCIDAS, (qtd_ct_vencidas > 0) | (qtd_rec_fat > 0)],
+        ["inadimplente", "pendencias"],
+        default="adimplente"
+    )
+
+    return resumo
+
+
+def parcelas_para_registros(tabela: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Converte parcelas normalizadas na estrutura esperada pela validação
+
+    Datas saem em ISO (aaaa-mm-dd); datas inválidas saem vazias e são
+    ignoradas por _validar_contrato_reparcelamento.
+    """
+    if tabela.empty:
+        return []
+
+    datas = tabela["data_vencimento"]
+    datas_iso = datas.dt.strftime("%Y-%m-%d").where(datas.notna(), "")
+
+    registros = pd.DataFrame({
+        "numero_titulo": tabela["numero_titulo"].to_numpy(),
+        "cliente": tabela["cliente"].to_numpy(),
+        "numero_parcela": tabela["numero_parcela"].to_numpy(),
+        "tipo_parcela": tabela["tipo_parcela"].to_numpy(),
+        "tipo_documento": tabela["tipo_parcela"].to_numpy(),
+        "status_parcela": tabela["status_parcela"].to_numpy(),
+        "data_vencimento": datas_iso.to_numpy(),
+        "valor": tabela["valor"].astype(float).round(2).to_numpy(),
+        "vencida": tabela["vencida"].astype(bool).to_numpy(),
+    })
+    return registros.to_dict("records")
+
+
+def processar_relatorio(
+    df: pd.DataFrame,
+    contrato: Dict[str, Any],
+    hoje: Optional[date] = None,
+    mapeamento: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Processa o relatório Saldo Devedor Presente para um contrato
+
+    Quando o relatório cobre vários títulos, o detalhamento de parcelas é
+    montado apenas para o título do contrato e os demais ficam resumidos
+    em "resumo_por_titulo".
+
+    Args:
+        df: DataFrame bruto do relatório
+        contrato: Dados do contrato (numero_titulo, cliente)
+        hoje: Data de referência para vencimento
+        mapeamento: Mapeamento de colunas já calculado
+
+    Returns:
+        Dados financeiros no formato esperado pela validação do PDD
+    """
+    mapeamento = mapeamento or mapear_colunas(df.columns)
+    numero_titulo = str(contrato.get("numero_titulo", "") or "").strip()
+
+    tabela = normalizar_relatorio(df, mapeamento, hoje, titulo_padrao=numero_titulo)
+    resumo = resumir_por_titulo(tabela)
+
+    # Seleciona parcelas do contrato (ou todo o relatório se o título não consta)
+    if numero_titulo and numero_titulo in resumo.index:
+        parcelas_contrato = tabela[tabela["numero_titulo"] == numero_titulo]
+    else:
+        parcelas_contrato = tabela
+
+    classes = parcelas_contrato["classe"]
+    parcelas_ct = parcelas_contrato[classes == CLASSE_CT]
+    parcelas_rec_fat = parcelas_contrato[classes == CLASSE_REC_FAT]
+    parcelas_vencidas = parcelas_contrato[parcelas_contrato["vencida"]]
+    parcelas_ct_vencidas = parcelas_ct[parcelas_ct["vencida"]]
+
+    qtd_ct_vencidas = len(parcelas_ct_vencidas)
+    if qtd_ct_vencidas >= LIMITE_CT_VENCIDAS:
+        status_cliente = "inadimplente"
+    elif qtd_ct_vencidas > 0 or len(parcelas_rec_fat) > 0:
+        status_cliente = "pendencias"
+    else:
+        status_cliente = "adimplente"
+
+    clientes = parcelas_contrato["cliente"]
+    cliente = next((c for c in clientes.head(1) if c), "") or contrato.get("cliente", "")
+
+    return {
+        "sucesso": True,
+        "cliente": cliente,
+        "numero_titulo": numero_titulo,
+        "saldo_total": round(float(parcelas_contrato["valor"].sum()), 2),
+        "total_parcelas": int(len(parcelas_contrato)),
+        "parcelas_pendentes": int((~parcelas_contrato["quitada"]).sum()),
+        "parcelas_ct": parcelas_para_registros(parcelas_ct),
+        "parcelas_rec_fat": parcelas_para_registros(parcelas_rec_fat),
+        "qtd_parcelas_outras": int((classes == CLASSE_OUTRA).sum()),
+        "parcelas_vencidas": parcelas_para_registros(parcelas_vencidas),
+        "parcelas_ct_vencidas": parcelas_para_registros(parcelas_ct_vencidas),
+        "status_cliente": status_cliente,
+        "mapeamento_colunas": mapeamento,
+        "total_titulos_relatorio": int(len(resumo)),
+        "resumo_por_titulo": resumo.reset_index().to_dict("records"),
+        "total_linhas_relatorio": int(len(tabela)),
+    }
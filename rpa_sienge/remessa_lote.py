@@ -0,0 +1,99 @@
+"""
+Remessa em Lote - Geração de carnês por ciclo (PDD seção 7.3.4)
+Agrupa os títulos reparcelados no ciclo e descreve as remessas geradas
+
+Desenvolvido em Português Brasileiro
+
+Em vez de gerar uma remessa por contrato, o RPA Sienge gera, ao final do
+ciclo, uma remessa por CNPJ/convênio cobrindo todos os títulos
+reparcelados. O manifesto resultante é a entrada do RPA Sicredi
+(um upload por remessa).
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# Grupo usado quando o contrato não informa convênio nem CNPJ
+GRUPO_PADRAO = "padrao"
+
+PASTA_MANIFESTOS = "dados_processamento/remessas"
+
+
+def chave_grupo_remessa(contrato: Dict[str, Any]) -> str:
+    """Convênio de cobrança do contrato (ou CNPJ da unidade)"""
+    return str(
+        contrato.get("convenio")
+        or contrato.get("cnpj_unidade")
+        or GRUPO_PADRAO
+    ).strip()
+
+
+def agrupar_para_remessa(processamentos: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Agrupa contratos reparcelados por convênio/CNPJ
+
+    Args:
+        processamentos: Dados dos contratos processados no Sienge (ResultadoRPA.dados)
+
+    Returns:
+        Dict chave_grupo -> lista de títulos no formato
+        {numero_titulo, cliente, novo_titulo, valor_total}
+    """
+    grupos: Dict[str, List[Dict[str, Any]]] = {}
+    vistos = set()
+
+    for processamento in processamentos:
+        contrato = processamento.get("contrato_processado", {})
+        numero_titulo = str(contrato.get("numero_titulo", ""))
+        if not numero_titulo or numero_titulo in vistos:
+            continue
+        vistos.add(numero_titulo)
+
+        reparcelamento = processamento.get("reparcelamento", {})
+        detalhes = reparcelamento.get("detalhes_reparcelamento", {})
+        grupos.setdefault(chave_grupo_remessa(contrato), []).append({
+            "numero_titulo": numero_titulo,
+            "cliente": contrato.get("cliente", ""),
+            "novo_titulo": reparcelamento.get("novo_titulo_gerado", ""),
+            "valor_total": detalhes.get("valor_total", 0.0)
+        })
+
+    return grupos
+
+
+def montar_manifesto(ciclo: str, remessas: List[Dict[str, Any]], falhas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Manifesto do ciclo entregue ao RPA Sicredi"""
+    return {
+        "ciclo": ciclo,
+        "remessas": remessas,
+        "total_remessas": len(remessas),
+        "total_titulos": sum(r["quantidade_titulos"] for r in remessas),
+        "valor_total": round(sum(r["valor_total"] for r in remessas), 2),
+        "grupos_com_falha": falhas,
+        "gerado_em": datetime.now().isoformat()
+    }
+
+
+def descrever_remessa(chave: str, arquivo_remessa: str, titulos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Entrada do manifesto para uma remessa gerada"""
+    return {
+        "chave_grupo": chave,
+        "arquivo_remessa": arquivo_remessa,
+        "titulos": titulos,
+        "quantidade_titulos": len(titulos),
+        "valor_total": round(sum(float(t.get("valor_total") or 0) for t in titulos), 2)
+    }
+
+
+def salvar_manifesto(manifesto: Dict[str, Any], pasta: Optional[str] = None) -> str:
+    """Salva manifesto em JSON e retorna o caminho"""
+    pasta = pasta or PASTA_MANIFESTOS
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(
+        pasta, f"manifesto_{manifesto['ciclo']}_{datetime.now().strftime('%H%M%S_%f')}.json"
+    )
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False, default=str)
+    return caminho
@@ -12,13 +12,36 @@ VERSÃO PRODUÇÃO - Apenas código para ambiente real
 from platformdirs import user_downloads_dir
 from core.base_rpa import BaseRPA, ResultadoRPA
 from core.notificacoes_simples import notificar_sucesso, notificar_erro
+
+# Import funciona tanto quando executado da raiz quanto da pasta rpa_sienge
+try:
+    from rpa_sienge.processamento_relatorio import processar_relatorio, mapear_colunas, converter_valor_monetario
+    from rpa_sienge.ingestao_excel import ler_relatorio_sienge, localizar_relatorio_baixado
+    from rpa_sienge.calculo_reparcelamento import calcular_detalhes_reparcelamento
+    from rpa_sienge.remessa_lote import (
+        agrupar_para_remessa, descrever_remessa, montar_manifesto, salvar_manifesto
+    )
+    from rpa_sienge.checkpoints_sienge import (
+        checkpoints_sienge, ciclo_atual, STATUS_CONCLUIDO, STATUS_NAO_ELEGIVEL
+    )
+except ImportError:
+    from processamento_relatorio import processar_relatorio, mapear_colunas, converter_valor_monetario
+    from ingestao_excel import ler_relatorio_sienge, localizar_relatorio_baixado
+    from calculo_reparcelamento import calcular_detalhes_reparcelamento
+    from remessa_lote import (
+        agrupar_para_remessa, descrever_remessa, montar_manifesto, salvar_manifesto
+    )
+    from checkpoints_sienge import (
+        checkpoints_sienge, ciclo_atual, STATUS_CONCLUIDO, STATUS_NAO_ELEGIVEL
+    )
+
 from trio import sleep
 from selenium.webdriver.common.keys import Keys
 import os
 import json
 import time
 import shutil
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime, date, timedelta
 from pathlib import Path
 import asyncio
@@ -44,6 +67,7 @@ class RPASienge(BaseRPA):
         self.credenciais_sienge = {}
         self.pasta_planilhas = Path("dados_extraidos/planilhas_sienge")
         self.pasta_planilhas.mkdir(parents=True, exist_ok=True)
+        self.checkpoints = checkpoints_sienge
 
     def _configurar_credenciais(self, credenciais: Dict[str, str]):
         """Configura credenciais do Sienge"""
@@ -58,7 +82,8 @@ class RPASienge(BaseRPA):
         self,
         contrato: Dict[str, Any],
         credenciais_sienge: Dict[str, str],
-        indices: Dict[str, Any] = None
+        indices: Dict[str, Any] = None,
+        gerar_carne: bool = True
     ) -> ResultadoRPA:
         """
         Executa processamento completo do RPA Sienge
@@ -67,6 +92,13 @@ class RPASienge(BaseRPA):
             contrato: Dados do contrato (número_titulo, cliente, etc.)
             credenciais_sienge: Credenciais de acesso ao Sienge
             indices: Índices econômicos (IPCA/IGPM)
+            gerar_carne: Se False, o carnê fica para a remessa em lote do
+                ciclo (gerar_remessas_lote) e o contrato retorna com
+                carne_gerado["pendente_lote"] = True
+
+        Cada etapa (consulta, validação, reparcelamento, carnê) é registrada
+        em checkpoint; uma nova tentativa retoma da etapa que falhou e o
+        login só é feito se alguma etapa pendente precisar do navegador.
         """
         try:
             self.log_progresso("🚀 INICIANDO RPA SIENGE")
@@ -83,38 +115,113 @@ class RPASienge(BaseRPA):
             # Configura credenciais
             self._configurar_credenciais(credenciais_sienge)
 
-            # Faz login no Sienge
-            await self._fazer_login_sienge()
-
-            # Consulta relatórios financeiros do cliente
-            self.log_progresso(f"Consultando relatórios do cliente: {contrato.get('cliente', '')}")
-            dados_financeiros = await self._consultar_relatorios_financeiros(contrato)
+            # Carrega checkpoint do contrato no ciclo (retomada após falha)
+            ciclo = contrato.get("ciclo") or ciclo_atual()
+            checkpoint = await self.checkpoints.carregar(ciclo, contrato)
+
+            if self.checkpoints.esta_finalizado(checkpoint):
+                self.log_progresso(f"⏭️ Contrato já finalizado no ciclo {ciclo} ({checkpoint['status']})")
+                return self._resultado_checkpoint(checkpoint)
+
+            etapas_concluidas = list(checkpoint.get("etapas", {}))
+            if etapas_concluidas:
+                self.log_progresso(f"🔁 Retomando contrato - etapas concluídas: {', '.join(etapas_concluidas)}")
+
+            # ETAPA: consulta de relatórios financeiros do cliente
+            dados_financeiros = None
+            if self.checkpoints.etapa_concluida(checkpoint, "consulta"):
+                dados_financeiros = self._recarregar_consulta(checkpoint, contrato)
+            if dados_financeiros is None:
+                await self._garantir_login_sienge()
+                self.log_progresso(f"Consultando relatórios do cliente: {contrato.get('cliente', '')}")
+                dados_financeiros = await self._consultar_relatorios_financeiros(contrato)
+
+                if not dados_financeiros.get("sucesso", False):
+                    erro = dados_financeiros.get("erro", "Falha na consulta de relatórios")
+                    await self.checkpoints.registrar_falha(checkpoint, "consulta", erro)
+                    return ResultadoRPA(
+                        sucesso=False,
+                        mensagem="Falha na consulta de relatórios do Sienge",
+                        erro=erro,
+                        dados={"contrato": contrato, "checkpoint": checkpoint}
+                    )
+
+                await self.checkpoints.concluir_etapa(checkpoint, "consulta", {
+                    "arquivo_relatorio": dados_financeiros.get("arquivo_relatorio"),
+                    "saldo_total": dados_financeiros.get("saldo_total", 0),
+                    "total_parcelas": dados_financeiros.get("total_parcelas", 0),
+                    "status_cliente": dados_financeiros.get("status_cliente")
+                })
+
+            # ETAPA: validação (regra das 3 parcelas CT vencidas)
+            if self.checkpoints.etapa_concluida(checkpoint, "validacao"):
+                pode_reparcelar = self.checkpoints.saida_etapa(checkpoint, "validacao")
+            else:
+                pode_reparcelar = await self._validar_contrato_reparcelamento(dados_financeiros)
 
-            # Valida se contrato pode ser reparcelado
-            pode_reparcelar = await self._validar_contrato_reparcelamento(dados_financeiros)
+                if pode_reparcelar.get("status") == "erro":
+                    await self.checkpoints.registrar_falha(checkpoint, "validacao", pode_reparcelar["motivo"])
+                else:
+                    await self.checkpoints.concluir_etapa(checkpoint, "validacao", pode_reparcelar)
 
             if not pode_reparcelar["pode_reparcelar"]:
+                resultado_dados = {
+                    "contrato": contrato,
+                    "validacao": pode_reparcelar,
+                    "dados_financeiros": dados_financeiros
+                }
+                if pode_reparcelar.get("status") != "erro":
+                    await self.checkpoints.finalizar(checkpoint, STATUS_NAO_ELEGIVEL, {
+                        "mensagem": f"Contrato não pode ser reparcelado: {pode_reparcelar['motivo']}",
+                        "validacao": pode_reparcelar
+                    })
                 return ResultadoRPA(
                     sucesso=False,
                     mensagem=f"Contrato não pode ser reparcelado: {pode_reparcelar['motivo']}",
-                    dados={
-                        "contrato": contrato,
-                        "validacao": pode_reparcelar,
-                        "dados_financeiros": dados_financeiros
-                    }
+                    dados=resultado_dados
                 )
 
-            # Processa reparcelamento
-            self.log_progresso("Processando reparcelamento no Sienge")
-            indices = indices or {}
-            resultado_reparcelamento = await self._processar_reparcelamento(contrato, indices, dados_financeiros)
-
-            # Gera carnê se processamento foi bem-sucedido
-            carne_gerado = None
-            if resultado_reparcelamento["sucesso"]:
+            # ETAPA: reparcelamento
+            if self.checkpoints.etapa_concluida(checkpoint, "reparcelamento"):
+                resultado_reparcelamento = self.checkpoints.saida_etapa(checkpoint, "reparcelamento")
+            else:
+                await self._garantir_login_sienge()
+                self.log_progresso("Processando reparcelamento no Sienge")
+                indices = indices or {}
+                resultado_reparcelamento = await self._processar_reparcelamento(contrato, indices, dados_financeiros)
+
+                if not resultado_reparcelamento["sucesso"]:
+                    await self.checkpoints.registrar_falha(
+                        checkpoint, "reparcelamento", resultado_reparcelamento.get("erro", ""))
+                    return ResultadoRPA(
+                        sucesso=False,
+                        mensagem=f"Falha no reparcelamento - Cliente: {contrato.get('cliente', '')}",
+                        erro=resultado_reparcelamento.get("erro"),
+                        dados={
+                            "contrato_processado": contrato,
+                            "dados_financeiros": dados_financeiros,
+                            "reparcelamento": resultado_reparcelamento
+                        }
+                    )
+
+                await self.checkpoints.concluir_etapa(checkpoint, "reparcelamento", resultado_reparcelamento)
+
+            # ETAPA: geração do carnê
+            if self.checkpoints.etapa_concluida(checkpoint, "carne"):
+                carne_gerado = self.checkpoints.saida_etapa(checkpoint, "carne")
+            elif not gerar_carne:
+                # Carnê será gerado na remessa em lote do ciclo
+                carne_gerado = {"sucesso": False, "pendente_lote": True}
+            else:
+                await self._garantir_login_sienge()
                 self.log_progresso("Gerando carnê atualizado")
                 carne_gerado = await self._gerar_carne_sienge(contrato)
 
+                if carne_gerado.get("sucesso"):
+                    await self.checkpoints.concluir_etapa(checkpoint, "carne", carne_gerado)
+                else:
+                    await self.checkpoints.registrar_falha(checkpoint, "carne", carne_gerado.get("erro", ""))
+
             # Monta resultado final
             resultado_dados = {
                 "contrato_processado": contrato,
@@ -124,10 +231,27 @@ class RPASienge(BaseRPA):
                 "timestamp_processamento": datetime.now().isoformat()
             }
 
+            carne_ok = carne_gerado.get("sucesso", False)
+            sucesso = carne_ok or carne_gerado.get("pendente_lote", False)
+            if carne_ok:
+                mensagem = f"Reparcelamento processado - Cliente: {contrato.get('cliente', '')}"
+            elif sucesso:
+                mensagem = f"Reparcelamento processado, carnê na remessa do ciclo - Cliente: {contrato.get('cliente', '')}"
+            else:
+                mensagem = f"Reparcelamento salvo, carnê pendente - Cliente: {contrato.get('cliente', '')}"
+
+            if carne_ok:
+                await self.checkpoints.finalizar(checkpoint, STATUS_CONCLUIDO, {
+                    "mensagem": mensagem,
+                    "reparcelamento": resultado_reparcelamento,
+                    "carne_gerado": carne_gerado
+                })
+
             return ResultadoRPA(
-                sucesso=resultado_reparcelamento["sucesso"],
-                mensagem=f"Reparcelamento processado - Cliente: {contrato.get('cliente', '')}",
-                dados=resultado_dados
+                sucesso=sucesso,
+                mensagem=mensagem,
+                dados=resultado_dados,
+                erro=None if sucesso else carne_gerado.get("erro")
             )
 
         except Exception as e:
@@ -139,6 +263,59 @@ class RPASienge(BaseRPA):
                 erro=erro_msg
             )
 
+    async def _garantir_login_sienge(self):
+        """Faz login apenas quando uma etapa pendente precisa do navegador"""
+        if not self.logado_sienge:
+            await self._fazer_login_sienge()
+
+    def _recarregar_consulta(self, checkpoint: Dict[str, Any], contrato: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Reconstrói dados financeiros a partir do relatório salvo no checkpoint
+
+        Returns:
+            Dados financeiros, ou None se a consulta precisa ser refeita
+            (relatório removido e validação/reparcelamento ainda pendentes)
+        """
+        saida = self.checkpoints.saida_etapa(checkpoint, "consulta")
+        arquivo = saida.get("arquivo_relatorio")
+
+        if arquivo and Path(arquivo).exists():
+            self.log_progresso(f"📁 Reaproveitando relatório da consulta: {arquivo}")
+            df = ler_relatorio_sienge(arquivo)
+            dados_financeiros = self._processar_dados_relatorio_sienge(
+                {"sucesso": True, "dados_brutos": df}, contrato
+            )
+            dados_financeiros["arquivo_relatorio"] = arquivo
+            return dados_financeiros
+
+        if not (self.checkpoints.etapa_concluida(checkpoint, "validacao")
+                and self.checkpoints.etapa_concluida(checkpoint, "reparcelamento")):
+            # Etapas pendentes dependem das parcelas: refaz a consulta
+            self.log_progresso(f"⚠️ Relatório da consulta não encontrado ({arquivo}) - refazendo consulta")
+            return None
+
+        # Validação e reparcelamento já concluídos: basta o resumo gravado
+        # (status_cliente, saldo e total de parcelas), sem listas de parcelas
+        return {**saida, "sucesso": True, "cliente": contrato.get("cliente", ""),
+                "numero_titulo": contrato.get("numero_titulo", "")}
+
+    def _resultado_checkpoint(self, checkpoint: Dict[str, Any]) -> ResultadoRPA:
+        """Monta ResultadoRPA de contrato já finalizado no ciclo"""
+        resultado = checkpoint.get("resultado", {})
+        return ResultadoRPA(
+            sucesso=checkpoint["status"] == STATUS_CONCLUIDO,
+            mensagem=resultado.get("mensagem", f"Contrato já processado no ciclo {checkpoint['ciclo']}"),
+            dados={
+                "contrato_processado": {
+                    "numero_titulo": checkpoint["numero_titulo"],
+                    "cliente": checkpoint.get("cliente", "")
+                },
+                **resultado,
+                "retomado_de_checkpoint": True,
+                "ciclo": checkpoint["ciclo"]
+            }
+        )
+
     async def finalizar(self):
         """Finaliza RPA e limpa recursos"""
         try:
@@ -225,7 +402,7 @@ class RPASienge(BaseRPA):
         2. Pesquisa por cliente específico  
         3. Executa consulta e gera relatório
         4. Exporta em formato Excel
-        5. TODO: Processar planilha baixada (próxima etapa)
+        5. Lê a planilha baixada e aplica as regras do PDD
 
         Args:
             contrato: Dados do contrato
@@ -288,44 +465,23 @@ class RPASienge(BaseRPA):
 
                 # WEBSCRAPING REAL - Exporta relatório
                 self.log_progresso("💾 Exportando relatório...")
+                inicio_exportacao = datetime.now()
                 self.browser.click(
                     xpath="//button[@type='button' and normalize-space()='Exportar']")
                 time.sleep(5)
+            else:
+                raise Exception("Campo de pesquisa de cliente não encontrado")
 
-                # TODO PRÓXIMA ETAPA: Processar planilha baixada
-                # 1. Localizar arquivo baixado mais recente
-                # 2. Ler Excel com pandas
-                # 3. Processar dados conforme regras PDD
-                # 4. Classificar parcelas CT vs REC/FAT
-                # 5. Identificar parcelas vencidas
-                self.log_progresso("📋 TODO: Processar planilha baixada (próxima implementação)")
-
-            # DADOS ESTRUTURADOS PARA REGRAS DE NEGÓCIO
-            # Estrutura obrigatória que meus métodos de validação esperam
-            dados_financeiros = {
-                "cliente": cliente,
-                "numero_titulo": numero_titulo,
-                "saldo_total": 150000.00,  # TODO: Extrair da planilha real
-                "parcelas_pendentes": 48,   # TODO: Contar da planilha real
-                "parcelas_ct": [            # TODO: Filtrar da planilha real - CRÍTICO PDD
-                    # Exemplo estrutura esperada:
-                    # {
-                    #     "tipo_parcela": "CT-001",
-                    #     "status_parcela": "Pendente", 
-                    #     "data_vencimento": "2024-12-15",
-                    #     "valor": 3125.00
-                    # }
-                ],
-                "parcelas_rec_fat": [       # TODO: Filtrar da planilha real
-                    # Parcelas REC/FAT (custas/honorários)
-                ],
-                "status_cliente": "adimplente",  # TODO: Calcular baseado em parcelas CT vencidas
-                "relatorio_exportado": True,
-                "dados_brutos": None,       # TODO: DataFrame da planilha
-                "sucesso": True
-            }
+            # Processa planilha baixada (leitura em streaming + cache)
+            arquivo_relatorio = await self._aguardar_relatorio_baixado(inicio_exportacao, numero_titulo)
+            df = ler_relatorio_sienge(arquivo_relatorio)
+
+            dados_financeiros = self._processar_dados_relatorio_sienge(
+                {"sucesso": True, "dados_brutos": df}, contrato
+            )
+            dados_financeiros["arquivo_relatorio"] = str(arquivo_relatorio)
 
-            self.log_progresso("✅ Webscraping concluído - Aguardando processamento da planilha")
+            self.log_progresso("✅ Relatório consultado e processado")
             return dados_financeiros
 
         except Exception as e:
@@ -516,6 +672,79 @@ class RPASienge(BaseRPA):
             self.log_erro("Erro na geração de carnê", e)
             return {"sucesso": False, "erro": str(e)}
 
+    async def gerar_remessas_lote(
+        self,
+        processamentos: List[Dict[str, Any]],
+        ciclo: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Gera as remessas do ciclo de uma vez (uma por CNPJ/convênio)
+
+        Substitui a geração de um arquivo por contrato: navega uma única vez
+        até Geração de Arquivos de remessa e gera um arquivo por grupo
+        cobrindo todos os títulos reparcelados. Conclui a etapa "carne" do
+        checkpoint de cada título coberto.
+
+        Args:
+            processamentos: Dados dos contratos processados (executar com gerar_carne=False)
+            ciclo: Ciclo de processamento (padrão: ciclo atual)
+
+        Returns:
+            Manifesto do ciclo (ver remessa_lote.montar_manifesto)
+        """
+        ciclo = ciclo or ciclo_atual()
+        grupos = agrupar_para_remessa(processamentos)
+        remessas = []
+        falhas = []
+
+        if not grupos:
+            return montar_manifesto(ciclo, remessas, falhas)
+
+        self.log_progresso(f"🎯 Gerando remessas do ciclo: {len(grupos)} grupo(s), "
+                           f"{sum(len(t) for t in grupos.values())} título(s)")
+
+        await self._garantir_login_sienge()
+        await self._navegar_geracao_carne()
+
+        for chave, titulos in grupos.items():
+            try:
+                await self._configurar_parametros_remessa_lote(chave, titulos)
+                arquivo_remessa = await self._executar_geracao_remessa_lote(chave)
+                remessas.append(descrever_remessa(chave, arquivo_remessa, titulos))
+                erro = None
+                self.log_progresso(f"✅ Remessa {chave}: {len(titulos)} título(s) - {arquivo_remessa}")
+            except Exception as e:
+                erro = str(e)
+                falhas.append({
+                    "chave_grupo": chave,
+                    "erro": erro,
+                    "titulos": [t["numero_titulo"] for t in titulos]
+                })
+                self.log_erro(f"Erro ao gerar remessa do grupo {chave}", e)
+
+            # Atualiza checkpoints dos títulos do grupo
+            for titulo in titulos:
+                checkpoint = await self.checkpoints.carregar(ciclo, titulo)
+                if erro:
+                    await self.checkpoints.registrar_falha(checkpoint, "carne", erro)
+                    continue
+
+                carne_gerado = {
+                    "sucesso": True,
+                    "arquivo_gerado": arquivo_remessa,
+                    "chave_grupo": chave,
+                    "tipo": "remessa_lote",
+                    "timestamp": datetime.now().isoformat()
+                }
+                await self.checkpoints.concluir_etapa(checkpoint, "carne", carne_gerado)
+                await self.checkpoints.finalizar(checkpoint, STATUS_CONCLUIDO, {
+                    "mensagem": f"Reparcelamento processado - Cliente: {titulo.get('cliente', '')}",
+                    "reparcelamento": self.checkpoints.saida_etapa(checkpoint, "reparcelamento"),
+                    "carne_gerado": carne_gerado
+                })
+
+        return montar_manifesto(ciclo, remessas, falhas)
+
     # ========================
     # MÉTODOS AUXILIARES SIENGE
     # ========================
@@ -722,8 +951,48 @@ class RPASienge(BaseRPA):
                 "total_linhas": 0
             }
 
+
+    async def _aguardar_relatorio_baixado(
+        self,
+        inicio_exportacao: datetime,
+        numero_titulo: str,
+        timeout: int = 60
+    ) -> Path:
+        """
+        Aguarda o download do relatório exportado e move para pasta_planilhas
+
+        Args:
+            inicio_exportacao: Instante do clique em Exportar
+            numero_titulo: Título consultado (compõe o nome do arquivo salvo)
+            timeout: Tempo máximo de espera em segundos
+
+        Returns:
+            Caminho do relatório em dados_extraidos/planilhas_sienge
+        """
+        pasta_downloads = Path(user_downloads_dir()) / "RPA_DOWNLOADS"
+        limite = time.time() + timeout
+
+        while time.time() < limite:
+            arquivo = localizar_relatorio_baixado(pasta_downloads, desde=inicio_exportacao)
+            # Firefox mantém .part enquanto o download não termina
+            if arquivo and not arquivo.with_name(arquivo.name + ".part").exists():
+                destino = self.pasta_planilhas / f"{numero_titulo or 'relatorio'}_{arquivo.name}"
+                shutil.move(str(arquivo), destino)
+                self.log_progresso(f"📥 Relatório baixado: {destino}")
+                return destino
+            await asyncio.sleep(1)
+
+        raise TimeoutError(f"Relatório exportado não encontrado em {pasta_downloads} após {timeout}s")
+
     def _processar_dados_relatorio_sienge(self, dados_relatorio: Dict[str, Any], contrato: Dict[str, Any]) -> Dict[str, Any]:
-        """Processa dados do relatório do Sienge conforme regras do PDD"""
+        """
+        Processa dados do relatório do Sienge conforme regras do PDD
+
+        Pipeline vetorizado (ver processamento_relatorio.py): mapeamento de
+        colunas uma única vez, classificação CT/REC/FAT por máscaras,
+        conversão monetária e de datas por coluna e contagem de vencidas
+        agrupada por título.
+        """
         try:
             if not dados_relatorio.get("sucesso", False):
                 return {
@@ -731,8 +1000,8 @@ class RPASienge(BaseRPA):
                     "erro": "Falha na extração de dados do Sienge"
                 }
 
-            df = dados_relatorio.get("dados_brutos", pd.DataFrame())
-            if df.empty:
+            df = dados_relatorio.get("dados_brutos")
+            if df is None or df.empty:
                 return {
                     "sucesso": False,
                     "erro": "Nenhum dado encontrado no relatório"
@@ -743,30 +1012,362 @@ class RPASienge(BaseRPA):
             # Identifica colunas importantes (mapping flexível)
             mapeamento_colunas = self._mapear_colunas_sienge(df.columns.tolist())
 
-            # Filtra parcelas CT (Cota de Terreno) - REGRA PRINCIPAL PDD
-            parcelas_ct = []
-            parcelas_rec_fat = []
-            parcelas_outras = []
+            resultado = processar_relatorio(df, contrato, mapeamento=mapeamento_colunas)
+            resultado["relatorio_exportado"] = True
 
-            for _, row in df.iterrows():
-                tipo_parcela = str(row.get(mapeamento_colunas.get("tipo_parcela", ""), "")).upper()
-                status_parcela = str(row.get(mapeamento_colunas.get("status", ""), ""))
+            self.log_progresso(
+                f"📊 {resultado['total_parcelas']} parcelas | "
+                f"CT: {len(resultado['parcelas_ct'])} | "
+                f"REC/FAT: {len(resultado['parcelas_rec_fat'])} | "
+                f"CT vencidas: {len(resultado['parcelas_ct_vencidas'])} | "
+                f"Saldo: R$ {resultado['saldo_total']:,.2f}"
+            )
+            if resultado["total_titulos_relatorio"] > 1:
+                self.log_progresso(f"📋 Relatório com {resultado['total_titulos_relatorio']} títulos")
 
-                # Classifica por tipo
-                if "CT" in tipo_parcela or "COTA" in tipo_parcela:
-                    parcelas_ct.append(row.to_dict())
-                elif any(x in tipo_parcela for x in ["REC", "FAT", "RECEITA", "FATURAMENTO"]):
-                    parcelas_rec_fat.append(row.to_dict())
-                else:
-                    parcelas_outras.append(row.to_dict())
-
-            # Calcula saldo total
-            coluna_valor = mapeamento_colunas.get("valor", "")
-            saldo_total = 0
-            if coluna_valor:
-                try:
-                    saldo_total = df[coluna_valor].apply(self._converter_valor_monetario).sum()
-                except:
-                    saldo_total = 0
-
-            resultado =
\ No newline at end of file
+            return resultado
+
+        except Exception as e:
+            self.log_erro("Erro no processamento dos dados do relatório", e)
+            return {"sucesso": False, "erro": str(e)}
+
+    def _mapear_colunas_sienge(self, colunas: List[str]) -> Dict[str, str]:
+        """Mapeia cabeçalhos do relatório Sienge para os campos das regras PDD"""
+        mapeamento = mapear_colunas(colunas)
+
+        faltantes = [campo for campo in ("tipo_parcela", "status", "data_vencimento", "valor")
+                     if campo not in mapeamento]
+        if faltantes:
+            self.log_progresso(f"⚠️ Colunas não encontradas no relatório: {', '.join(faltantes)}")
+
+        return mapeamento
+
+    def _converter_valor_monetario(self, valor: Any) -> float:
+        """Converte valor monetário brasileiro (ex: 'R$ 1.234,56') para float"""
+        try:
+            return converter_valor_monetario(valor)
+        except Exception:
+            return 0.0
+
+    async def _processar_relatorio_excel(self, caminho_arquivo: str, contrato: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Processa arquivo Excel do relatório Saldo Devedor Presente exportado
+
+        Args:
+            caminho_arquivo: Caminho do .xlsx exportado pelo Sienge
+            contrato: Dados do contrato
+
+        Returns:
+            Dados financeiros processados + resultado da validação PDD
+        """
+        try:
+            self.log_progresso(f"📁 Lendo relatório: {caminho_arquivo}")
+            df = ler_relatorio_sienge(caminho_arquivo)
+
+            dados_financeiros = self._processar_dados_relatorio_sienge(
+                {"sucesso": True, "dados_brutos": df}, contrato
+            )
+            if not dados_financeiros.get("sucesso", False):
+                return dados_financeiros
+
+            dados_financeiros["arquivo_relatorio"] = str(caminho_arquivo)
+
+            validacao = await self._validar_contrato_reparcelamento(dados_financeiros)
+            dados_financeiros["pode_reparcelar"] = validacao["pode_reparcelar"]
+            dados_financeiros["motivo_validacao"] = validacao["motivo"]
+            dados_financeiros["validacao"] = validacao
+
+            return dados_financeiros
+
+        except Exception as e:
+            self.log_erro(f"Erro ao processar relatório Excel {caminho_arquivo}", e)
+            return {"sucesso": False, "erro": str(e)}
+
+    # ========================
+    # REPARCELAMENTO E CARNÊ
+    # ========================
+
+    async def _navegar_reparcelamento_inclusao(self):
+        """
+        WEBSCRAPING - Financeiro > Contas a receber > Reparcelamento > Inclusão
+        """
+        # TODO: IMPLEMENTAR NAVEGAÇÃO REAL
+        try:
+            self.log_progresso("🧭 TODO: Navegando para Reparcelamento > Inclusão...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            pass
+
+        except Exception as e:
+            self.log_erro("Erro ao navegar para reparcelamento", e)
+            raise
+
+    async def _consultar_titulo_reparcelamento(self, numero_titulo: str):
+        """
+        WEBSCRAPING - Informa o título na tela de reparcelamento e consulta
+        """
+        # TODO: IMPLEMENTAR PREENCHIMENTO REAL
+        try:
+            self.log_progresso(f"🔍 TODO: Consultando título {numero_titulo} no reparcelamento...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            pass
+
+        except Exception as e:
+            self.log_erro("Erro ao consultar título no reparcelamento", e)
+            raise
+
+    async def _selecionar_documentos_reparcelamento(self, dados_financeiros: Dict[str, Any]):
+        """
+        WEBSCRAPING - Seleciona todos os documentos e desmarca as parcelas
+        vencidas até o mês atual (PDD 7.3.3)
+        """
+        # TODO: IMPLEMENTAR SELEÇÃO REAL
+        try:
+            qtd_vencidas = len(dados_financeiros.get("parcelas_vencidas", []))
+            self.log_progresso(f"📋 TODO: Selecionando documentos ({qtd_vencidas} vencidas a desmarcar)...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            pass
+
+        except Exception as e:
+            self.log_erro("Erro ao selecionar documentos", e)
+            raise
+
+    async def _configurar_detalhes_reparcelamento(
+        self,
+        contrato: Dict[str, Any],
+        indices: Dict[str, Any],
+        dados_financeiros: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        WEBSCRAPING - Preenche detalhes do reparcelamento conforme PDD:
+        condição PM, indexador IGP-M, juros fixo 8%, 1º vencimento dia 15 do mês seguinte
+        """
+        # TODO: IMPLEMENTAR PREENCHIMENTO REAL
+        try:
+            # Valores a preencher (saldo corrigido IGP-M, parcela Price 8% a.a., cronograma)
+            detalhes = calcular_detalhes_reparcelamento(dados_financeiros, indices)
+
+            self.log_progresso("⚙️ TODO: Preenchendo detalhes (PM / IGP-M / Fixo 8%)...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            return detalhes
+
+        except Exception as e:
+            self.log_erro("Erro ao configurar detalhes do reparcelamento", e)
+            raise
+
+    async def _confirmar_salvar_reparcelamento(self) -> str:
+        """
+        WEBSCRAPING - Confirma e salva o reparcelamento
+
+        OUTPUT: Número do novo título gerado pelo Sienge
+        """
+        # TODO: IMPLEMENTAR CONFIRMAÇÃO REAL
+        try:
+            self.log_progresso("💾 TODO: Confirmando reparcelamento...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            return ""
+
+        except Exception as e:
+            self.log_erro("Erro ao confirmar reparcelamento", e)
+            raise
+
+    async def _navegar_geracao_carne(self):
+        """
+        WEBSCRAPING - Financeiro > Contas a Receber > Cobrança Escritural >
+        Geração de Arquivos de remessa
+        """
+        # TODO: IMPLEMENTAR NAVEGAÇÃO REAL
+        try:
+            self.log_progresso("🧭 TODO: Navegando para geração de remessa...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            pass
+
+        except Exception as e:
+            self.log_erro("Erro ao navegar para geração de carnê", e)
+            raise
+
+    async def _configurar_parametros_carne(self, contrato: Dict[str, Any]):
+        """
+        WEBSCRAPING - Preenche parâmetros da remessa (empresa, convênio, título)
+        """
+        # TODO: IMPLEMENTAR PREENCHIMENTO REAL
+        try:
+            self.log_progresso(f"⚙️ TODO: Configurando carnê do título {contrato.get('numero_titulo', '')}...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            pass
+
+        except Exception as e:
+            self.log_erro("Erro ao configurar parâmetros do carnê", e)
+            raise
+
+    async def _executar_geracao_carne(self, contrato: Dict[str, Any]) -> str:
+        """
+        WEBSCRAPING - Gera o arquivo de remessa e retorna o nome do arquivo
+        """
+        # TODO: IMPLEMENTAR GERAÇÃO REAL
+        try:
+            self.log_progresso("📄 TODO: Gerando arquivo de remessa...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            return ""
+
+        except Exception as e:
+            self.log_erro("Erro ao gerar arquivo de carnê", e)
+            raise
+
+    async def _configurar_parametros_remessa_lote(self, chave_grupo: str, titulos: List[Dict[str, Any]]):
+        """
+        WEBSCRAPING - Preenche parâmetros da remessa do grupo (empresa/convênio)
+        e seleciona todos os títulos reparcelados do ciclo
+        """
+        # TODO: IMPLEMENTAR PREENCHIMENTO REAL
+        try:
+            self.log_progresso(f"⚙️ TODO: Configurando remessa {chave_grupo} com {len(titulos)} título(s)...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            pass
+
+        except Exception as e:
+            self.log_erro("Erro ao configurar parâmetros da remessa em lote", e)
+            raise
+
+    async def _executar_geracao_remessa_lote(self, chave_grupo: str) -> str:
+        """
+        WEBSCRAPING - Gera o arquivo de remessa do grupo e retorna o nome do arquivo
+        """
+        # TODO: IMPLEMENTAR GERAÇÃO REAL
+        try:
+            self.log_progresso(f"📄 TODO: Gerando arquivo de remessa do grupo {chave_grupo}...")
+            # IMPLEMENTAR WEBSCRAPING AQUI
+            return ""
+
+        except Exception as e:
+            self.log_erro("Erro ao gerar arquivo de remessa em lote", e)
+            raise
+
+
+async def executar_processamento_sienge(
+    contrato: Dict[str, Any],
+    indices_economicos: Dict[str, Any],
+    credenciais_sienge: Dict[str, Any],
+    gerar_carne: bool = True
+) -> ResultadoRPA:
+    """
+    Função auxiliar para executar processamento Sienge diretamente
+
+    Args:
+        contrato: Dados do contrato (numero_titulo, cliente, etc.)
+        indices_economicos: Índices IPCA/IGP-M coletados pelo RPA 1
+        credenciais_sienge: Credenciais de acesso ao Sienge
+        gerar_carne: Se False, deixa o carnê para executar_geracao_carnes_lote
+
+    Returns:
+        ResultadoRPA com resultado do processamento
+    """
+    rpa = RPASienge()
+    inicio = datetime.now()
+
+    # Contrato já finalizado no ciclo: não abre navegador nem refaz etapas
+    checkpoint = await rpa.checkpoints.carregar(contrato.get("ciclo") or ciclo_atual(), contrato)
+    if rpa.checkpoints.esta_finalizado(checkpoint):
+        rpa.log_progresso(f"⏭️ Contrato {contrato.get('numero_titulo', '')} já finalizado no ciclo")
+        return rpa._resultado_checkpoint(checkpoint)
+
+    # Credenciais não são persistidas no histórico de execuções
+    parametros = {
+        "contrato": contrato,
+        "indices_economicos": indices_economicos or {}
+    }
+
+    try:
+        if not await rpa.inicializar():
+            return ResultadoRPA(
+                sucesso=False,
+                mensagem="Falha na inicialização dos recursos",
+                erro="Erro na inicialização"
+            )
+
+        resultado = await rpa.executar(contrato, credenciais_sienge, indices_economicos, gerar_carne)
+        resultado.tempo_execucao = (datetime.now() - inicio).total_seconds()
+
+        await rpa._salvar_execucao(parametros, resultado)
+
+    finally:
+        await rpa.finalizar()
+
+    # Enviar notificação
+    try:
+        if resultado.sucesso:
+            notificar_sucesso(
+                nome_rpa="RPA Sienge",
+                tempo_execucao=f"{resultado.tempo_execucao:.1f}s" if resultado.tempo_execucao else "N/A",
+                resultados={
+                    "contrato": contrato.get("numero_titulo", ""),
+                    "cliente": contrato.get("cliente", ""),
+                    "reparcelamento": "Concluído"
+                }
+            )
+        else:
+            notificar_erro(
+                nome_rpa="RPA Sienge",
+                erro=resultado.erro or "Erro desconhecido",
+                detalhes=resultado.mensagem
+            )
+    except Exception as e:
+        print(f"Aviso: Falha ao enviar notificação: {e}")
+
+    return resultado
+
+
+async def executar_geracao_carnes_lote(
+    processamentos: List[Dict[str, Any]],
+    credenciais_sienge: Dict[str, Any],
+    ciclo: Optional[str] = None
+) -> ResultadoRPA:
+    """
+    Gera as remessas do ciclo após todos os reparcelamentos
+
+    Args:
+        processamentos: Dados dos contratos reparcelados (gerar_carne=False)
+        credenciais_sienge: Credenciais de acesso ao Sienge
+        ciclo: Ciclo de processamento (padrão: ciclo atual)
+
+    Returns:
+        ResultadoRPA com o manifesto das remessas em dados
+    """
+    rpa = RPASienge()
+    inicio = datetime.now()
+    rpa._configurar_credenciais(credenciais_sienge)
+
+    try:
+        if not await rpa.inicializar():
+            return ResultadoRPA(
+                sucesso=False,
+                mensagem="Falha na inicialização dos recursos",
+                erro="Erro na inicialização"
+            )
+
+        manifesto = await rpa.gerar_remessas_lote(processamentos, ciclo)
+        manifesto["arquivo_manifesto"] = salvar_manifesto(manifesto)
+
+        sucesso = not manifesto["grupos_com_falha"]
+        resultado = ResultadoRPA(
+            sucesso=sucesso,
+            mensagem=f"Remessas do ciclo geradas - {manifesto['total_remessas']} arquivo(s), "
+                     f"{manifesto['total_titulos']} título(s)",
+            dados=manifesto,
+            erro=None if sucesso else f"{len(manifesto['grupos_com_falha'])} grupo(s) com falha"
+        )
+        resultado.tempo_execucao = (datetime.now() - inicio).total_seconds()
+
+        await rpa._salvar_execucao({"ciclo": manifesto["ciclo"], "total_processamentos": len(processamentos)}, resultado)
+
+    except Exception as e:
+        rpa.log_erro("Erro na geração de remessas em lote", e)
+        resultado = ResultadoRPA(
+            sucesso=False,
+            mensagem="Falha na geração de remessas em lote",
+            erro=str(e)
+        )
+
+    finally:
+        await rpa.finalizar()
+
+    return resultado
@@ -8,33 +8,175 @@ Separado do código de produção para evitar confusão
 """
 
 import asyncio
+from collections import OrderedDict
+from functools import lru_cache
 import pandas as pd
 from pathlib import Path
 from datetime import datetime, date
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from core.base_rpa import ResultadoRPA
+from core.latencia_simulada import AmostradorLatencia
+
+# Import funciona tanto quando executado da raiz quanto da pasta rpa_sienge
+try:
+    from rpa_sienge.processamento_relatorio import processar_relatorio, mapear_colunas
+    from rpa_sienge.ingestao_excel import ler_relatorio_sienge
+    from rpa_sienge.calculo_reparcelamento import calcular_detalhes_reparcelamento
+    from rpa_sienge.remessa_lote import agrupar_para_remessa, descrever_remessa, montar_manifesto
+except ImportError:
+    from processamento_relatorio import processar_relatorio, mapear_colunas
+    from ingestao_excel import ler_relatorio_sienge
+    from calculo_reparcelamento import calcular_detalhes_reparcelamento
+    from remessa_lote import agrupar_para_remessa, descrever_remessa, montar_manifesto
+
+
+PASTA_EXEMPLOS = Path(__file__).parent / "planilhas_exemplo"
+
+# Títulos de teste -> planilha exemplo (primeira chave contida no título vence)
+MAPEAMENTO_ARQUIVOS = (
+    ("PDDADIMPLENTE", "saldo_devedor_adimplente.xlsx"),
+    ("PDDINADIMPLENTE", "saldo_devedor_inadimplente.xlsx"),
+    ("PDDLIMITE", "saldo_devedor_limite_inadimplencia.xlsx"),
+    ("PDDCUSTAS", "saldo_devedor_custas_honorarios.xlsx"),
+    ("PDD001", "saldo_devedor_adimplente.xlsx"),
+    ("PDD002", "saldo_devedor_inadimplente.xlsx"),
+    ("PDD003", "saldo_devedor_limite_inadimplencia.xlsx"),
+    ("PDD004", "saldo_devedor_custas_honorarios.xlsx"),
+    ("PDD005", "saldo_devedor_situacao_mista.xlsx"),
+)
+ARQUIVO_PADRAO = "saldo_devedor_adimplente.xlsx"
+
+# Planilhas exemplo mantidas já processadas em memória
+TAMANHO_CACHE_PLANILHAS = 16
+
+
+@lru_cache(maxsize=4096)
+def arquivo_exemplo_para_titulo(numero_titulo: str) -> str:
+    """Nome da planilha exemplo correspondente ao título (memoizado)"""
+    for titulo_key, arquivo_nome in MAPEAMENTO_ARQUIVOS:
+        if titulo_key in numero_titulo:
+            return arquivo_nome
+    return ARQUIVO_PADRAO
+
+
+class CachePlanilhas:
+    """
+    Cache LRU de planilhas exemplo já lidas
+
+    A entrada é invalidada quando o arquivo muda (mtime/tamanho), então
+    regenerar as planilhas com criar_planilhas_exemplo.py não exige
+    reiniciar o simulador. Os DataFrames são compartilhados entre
+    consultas e não devem ser alterados pelo chamador.
+    """
+
+    def __init__(self, tamanho_maximo: int = TAMANHO_CACHE_PLANILHAS):
+        self.tamanho_maximo = tamanho_maximo
+        self._entradas: "OrderedDict[Path, Tuple[Tuple[int, int], pd.DataFrame]]" = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, caminho: Path) -> pd.DataFrame:
+        estado = caminho.stat()
+        assinatura = (estado.st_mtime_ns, estado.st_size)
+
+        entrada = self._entradas.get(caminho)
+        if entrada is not None and entrada[0] == assinatura:
+            self._entradas.move_to_end(caminho)
+            self.acertos += 1
+            return entrada[1]
+
+        self.falhas += 1
+        df = ler_relatorio_sienge(caminho)
+        self._entradas[caminho] = (assinatura, df)
+        self._entradas.move_to_end(caminho)
+        while len(self._entradas) > self.tamanho_maximo:
+            self._entradas.popitem(last=False)
+        return df
+
+    def limpar(self):
+        self._entradas.clear()
+
+
+# Instância global (compartilhada entre simuladores do processo)
+cache_planilhas = CachePlanilhas()
+
+
+# Latências das etapas (segundos) - valores fixos históricos do simulador
+LATENCIAS_PADRAO = {
+    "login": {"distribuicao": "fixa", "media": 0.5},
+    "consulta": {"distribuicao": "fixa", "media": 1.0},
+    "navegacao": {"distribuicao": "fixa", "media": 0.5},
+    "consulta_titulo": {"distribuicao": "fixa", "media": 1.0},
+    "selecao_documentos": {"distribuicao": "fixa", "media": 0.8},
+    "configuracao": {"distribuicao": "fixa", "media": 1.2},
+    "confirmacao": {"distribuicao": "fixa", "media": 0.8},
+    "carne": {"distribuicao": "fixa", "media": 1.0},
+}
+
+# Latências para teste de carga - cauda longa típica de telas do ERP
+LATENCIAS_CARGA = {
+    "login": {"distribuicao": "lognormal", "media": 4.0, "desvio": 2.0, "maximo": 30.0},
+    "consulta": {"distribuicao": "lognormal", "media": 12.0, "desvio": 6.0, "maximo": 90.0},
+    "navegacao": {"distribuicao": "lognormal", "media": 2.0, "desvio": 1.0, "maximo": 15.0},
+    "consulta_titulo": {"distribuicao": "lognormal", "media": 3.0, "desvio": 1.5, "maximo": 20.0},
+    "selecao_documentos": {"distribuicao": "lognormal", "media": 2.5, "desvio": 1.5, "maximo": 20.0},
+    "configuracao": {"distribuicao": "lognormal", "media": 4.0, "desvio": 2.0, "maximo": 30.0},
+    "confirmacao": {"distribuicao": "lognormal", "media": 3.0, "desvio": 2.0, "maximo": 30.0},
+    "carne": {"distribuicao": "lognormal", "media": 8.0, "desvio": 4.0, "maximo": 60.0},
+}
 
 
 class SimuladorSienge:
     """
     Simulador do RPA Sienge para testes e desenvolvimento
     Replica exatamente as regras do PDD sem acessar o sistema real
+
+    Modo carga: recebendo uma carteira (ver criar_planilhas_exemplo.
+    gerar_carteira_sintetica) os títulos são consultados nela em vez das
+    planilhas exemplo, e as latências seguem as distribuições informadas.
     """
 
-    def __init__(self):
-        self.pasta_exemplos = Path(__file__).parent / "planilhas_exemplo"
+    def __init__(
+        self,
+        carteira: Optional[pd.DataFrame] = None,
+        latencias: Optional[Dict[str, Dict[str, Any]]] = None,
+        escala_tempo: float = 1.0,
+        semente: Optional[int] = None,
+        verbose: bool = True
+    ):
+        self.pasta_exemplos = PASTA_EXEMPLOS
+        self.latencia = AmostradorLatencia(latencias or LATENCIAS_PADRAO, escala_tempo, semente)
+        self.verbose = verbose
+
+        # Índice título -> linhas da carteira (consulta O(1) por contrato).
+        # Mantém só as colunas usadas pelo PDD, como ler_relatorio_sienge.
+        self.carteira = None
+        self._linhas_por_titulo = {}
+        if carteira is not None:
+            colunas = list(dict.fromkeys(mapear_colunas(carteira.columns).values()))
+            self.carteira = carteira[colunas]
+            titulos = self.carteira["Título"].astype(str)
+            self._linhas_por_titulo = titulos.groupby(titulos, sort=False).indices
+
+    def _log(self, mensagem: str):
+        if self.verbose:
+            print(mensagem)
 
     async def executar_simulacao(
         self,
         contrato: Dict[str, Any],
         credenciais_sienge: Dict[str, str],
-        indices: Dict[str, Any] = None
+        indices: Dict[str, Any] = None,
+        gerar_carne: bool = True
     ) -> ResultadoRPA:
         """
         Executa simulação completa do processamento Sienge
+
+        Com gerar_carne=False o carnê fica para simular_remessas_lote
+        (mesmo contrato de RPASienge.executar).
         """
         try:
-            print(f"🧪 SIMULAÇÃO SIENGE - Contrato: {contrato.get('numero_titulo', '')}")
+            self._log(f"🧪 SIMULAÇÃO SIENGE - Contrato: {contrato.get('numero_titulo', '')}")
 
             # Simula login
             await self._simular_login(credenciais_sienge)
@@ -59,8 +201,11 @@ class SimuladorSienge:
             # Simula processamento
             resultado_reparcelamento = await self._simular_processamento(contrato, indices, dados_financeiros)
 
-            # Simula geração de carnê
-            carne_gerado = await self._simular_geracao_carne(contrato)
+            # Simula geração de carnê (ou deixa para a remessa do ciclo)
+            if gerar_carne:
+                carne_gerado = await self._simular_geracao_carne(contrato)
+            else:
+                carne_gerado = {"sucesso": False, "pendente_lote": True}
 
             # Monta resultado
             resultado_dados = {
@@ -87,123 +232,58 @@ class SimuladorSienge:
 
     async def _simular_login(self, credenciais: Dict[str, str]):
         """Simula login no Sienge"""
-        print(f"🔐 SIMULAÇÃO - Login Sienge: {credenciais.get('url', '')}")
-        await asyncio.sleep(0.5)
-        print("✅ Login simulado realizado")
+        self._log(f"🔐 SIMULAÇÃO - Login Sienge: {credenciais.get('url', '')}")
+        await self.latencia.aguardar("login")
+        self._log("✅ Login simulado realizado")
 
     async def _simular_consulta_relatorios(self, contrato: Dict[str, Any]) -> Dict[str, Any]:
         """Simula consulta de relatórios usando planilhas exemplo"""
         try:
             numero_titulo = contrato.get("numero_titulo", "")
-            print(f"📊 SIMULAÇÃO - Consultando relatórios para: {numero_titulo}")
-
-            # Mapeia títulos para arquivos
-            mapeamento_arquivos = {
-                "PDDADIMPLENTE": "saldo_devedor_adimplente.xlsx",
-                "PDDINADIMPLENTE": "saldo_devedor_inadimplente.xlsx",
-                "PDDLIMITE": "saldo_devedor_limite_inadimplencia.xlsx",
-                "PDDCUSTAS": "saldo_devedor_custas_honorarios.xlsx",
-                "PDD001": "saldo_devedor_adimplente.xlsx",
-                "PDD002": "saldo_devedor_inadimplente.xlsx",
-                "PDD003": "saldo_devedor_limite_inadimplencia.xlsx",
-                "PDD004": "saldo_devedor_custas_honorarios.xlsx",
-                "PDD005": "saldo_devedor_situacao_mista.xlsx"
-            }
-
-            # Determina arquivo baseado no título
-            arquivo = None
-            for titulo_key, arquivo_nome in mapeamento_arquivos.items():
-                if titulo_key in numero_titulo:
-                    arquivo = self.pasta_exemplos / arquivo_nome
-                    break
+            self._log(f"📊 SIMULAÇÃO - Consultando relatórios para: {numero_titulo}")
 
-            # Se não encontrou correspondência, usa arquivo adimplente como padrão
-            if not arquivo or not arquivo.exists():
-                arquivo = self.pasta_exemplos / "saldo_devedor_adimplente.xlsx"
-
-            if not arquivo.exists():
-                raise FileNotFoundError(f"Arquivo não encontrado: {arquivo}")
-
-            # Lê planilha Excel
-            df = pd.read_excel(arquivo)
+            if self.carteira is not None:
+                linhas = self._linhas_por_titulo.get(str(numero_titulo))
+                if linhas is None:
+                    raise ValueError(f"Título {numero_titulo} não encontrado na carteira simulada")
+                df = self.carteira.iloc[linhas]
+            else:
+                df = self._ler_planilha_exemplo(numero_titulo)
 
             # Processa dados conforme estrutura esperada
             dados_processados = self._processar_dados_planilha_simulado(df, contrato)
 
-            print(f"✅ SIMULAÇÃO - Relatório consultado - {len(df)} registros")
-            await asyncio.sleep(1.0)
+            await self.latencia.aguardar("consulta")
+            self._log(f"✅ SIMULAÇÃO - Relatório consultado - {len(df)} registros")
 
             return dados_processados
 
         except Exception as e:
-            print(f"❌ SIMULAÇÃO - Erro na consulta: {str(e)}")
+            self._log(f"❌ SIMULAÇÃO - Erro na consulta: {str(e)}")
             return {"erro": str(e), "sucesso": False}
 
-    def _processar_dados_planilha_simulado(self, df: pd.DataFrame, contrato: Dict[str, Any]) -> Dict[str, Any]:
-        """Processa dados da planilha conforme regras do PDD"""
-        try:
-            # Calcula saldo total
-            saldo_total = df['Saldo'].sum() if 'Saldo' in df.columns else 0.0
-
-            # Identifica parcelas vencidas
-            data_atual = date.today()
-            parcelas_vencidas = []
-            parcelas_ct_vencidas = []
-            parcelas_rec_fat = []
-
-            for _, row in df.iterrows():
-                data_venc_str = str(row.get('Data de vencimento', ''))
-                tipo_documento = str(row.get('Tipo documento', ''))
-
-                try:
-                    if '/' in data_venc_str:
-                        data_venc = datetime.strptime(data_venc_str, '%d/%m/%Y').date()
-                    else:
-                        continue
-                except:
-                    continue
-
-                if data_venc < data_atual:
-                    parcela_info = {
-                        "numero_parcela": str(row.get('Número da parcela', '')),
-                        "data_vencimento": data_venc,
-                        "valor": float(row.get('Saldo', 0)),
-                        "tipo_documento": tipo_documento
-                    }
-
-                    parcelas_vencidas.append(parcela_info)
+    def _ler_planilha_exemplo(self, numero_titulo: str) -> pd.DataFrame:
+        """Lê a planilha exemplo correspondente ao título (PDD001..PDD005)"""
+        arquivo = self.pasta_exemplos / arquivo_exemplo_para_titulo(numero_titulo)
 
-                    if tipo_documento == "CT":
-                        parcelas_ct_vencidas.append(parcela_info)
-                    elif tipo_documento in ["REC", "FAT"]:
-                        parcelas_rec_fat.append(parcela_info)
+        # Se não encontrou o arquivo, usa adimplente como padrão
+        if not arquivo.exists():
+            arquivo = self.pasta_exemplos / ARQUIVO_PADRAO
 
-            # Determina status do cliente
-            qtd_ct_vencidas = len(parcelas_ct_vencidas)
+        if not arquivo.exists():
+            raise FileNotFoundError(f"Arquivo não encontrado: {arquivo}")
 
-            if qtd_ct_vencidas >= 3:
-                status_cliente = "inadimplente"
-            elif qtd_ct_vencidas > 0 or len(parcelas_rec_fat) > 0:
-                status_cliente = "pendencias"
-            else:
-                status_cliente = "adimplente"
+        # Planilha já processada em memória (relida só se o arquivo mudar)
+        return cache_planilhas.obter(arquivo)
 
-            total_parcelas = len(df)
-            parcelas_pendentes = total_parcelas - len(parcelas_vencidas)
-
-            return {
-                "sucesso": True,
-                "cliente": contrato.get("cliente", ""),
-                "numero_titulo": contrato.get("numero_titulo", ""),
-                "saldo_total": saldo_total,
-                "total_parcelas": total_parcelas,
-                "parcelas_pendentes": parcelas_pendentes,
-                "parcelas_vencidas": parcelas_vencidas,
-                "parcelas_ct_vencidas": parcelas_ct_vencidas,
-                "parcelas_rec_fat": parcelas_rec_fat,
-                "status_cliente": status_cliente,
-                "data_consulta": data_atual.isoformat()
-            }
+    def _processar_dados_planilha_simulado(self, df: pd.DataFrame, contrato: Dict[str, Any]) -> Dict[str, Any]:
+        """Processa dados da planilha conforme regras do PDD (mesmo pipeline do RPA real)"""
+        try:
+            dados = processar_relatorio(df, contrato)
+            dados["cliente"] = contrato.get("cliente", "") or dados["cliente"]
+            dados["numero_titulo"] = contrato.get("numero_titulo", "")
+            dados["data_consulta"] = date.today().isoformat()
+            return dados
 
         except Exception as e:
             return {"erro": str(e), "sucesso": False}
@@ -263,25 +343,25 @@ class SimuladorSienge:
         """Simula processamento de reparcelamento"""
         try:
             numero_titulo = contrato.get("numero_titulo", "")
-            print(f"🔄 SIMULAÇÃO - Processando reparcelamento: {numero_titulo}")
+            self._log(f"🔄 SIMULAÇÃO - Processando reparcelamento: {numero_titulo}")
 
             # Simula as 5 etapas do PDD
-            print("🧭 Etapa 1: Navegação (SIMULADO)")
-            await asyncio.sleep(0.5)
+            self._log("🧭 Etapa 1: Navegação (SIMULADO)")
+            await self.latencia.aguardar("navegacao")
 
-            print(f"🔍 Etapa 2: Consulta título {numero_titulo} (SIMULADO)")
-            await asyncio.sleep(1.0)
+            self._log(f"🔍 Etapa 2: Consulta título {numero_titulo} (SIMULADO)")
+            await self.latencia.aguardar("consulta_titulo")
 
-            print("📋 Etapa 3: Seleção documentos (SIMULADO)")
-            await asyncio.sleep(0.8)
+            self._log("📋 Etapa 3: Seleção documentos (SIMULADO)")
+            await self.latencia.aguardar("selecao_documentos")
 
-            print("⚙️ Etapa 4: Configuração detalhes (SIMULADO)")
+            self._log("⚙️ Etapa 4: Configuração detalhes (SIMULADO)")
             detalhes = self._calcular_detalhes_simulado(contrato, indices, dados_financeiros)
-            await asyncio.sleep(1.2)
+            await self.latencia.aguardar("configuracao")
 
-            print("💾 Etapa 5: Confirmação (SIMULADO)")
-            novo_titulo = f"NOVO_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            await asyncio.sleep(0.8)
+            self._log("💾 Etapa 5: Confirmação (SIMULADO)")
+            novo_titulo = f"NOVO_{numero_titulo}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            await self.latencia.aguardar("confirmacao")
 
             return {
                 "sucesso": True,
@@ -306,39 +386,10 @@ class SimuladorSienge:
         indices: Dict[str, Any],
         dados_financeiros: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Calcula detalhes conforme PDD"""
+        """Calcula detalhes conforme PDD (mesmo motor de cálculo do RPA real)"""
         try:
-            saldo_atual = dados_financeiros.get("saldo_total", 0.0)
-            parcelas_pendentes = dados_financeiros.get("parcelas_pendentes", 1)
-
             # SEMPRE usar IGP-M conforme PDD
-            indices = indices or {}
-            indice_igpm = indices.get("igpm", {}).get("valor", 3.89)
-
-            # Cálculo
-            fator_correcao = (1 + indice_igpm / 100)
-            novo_saldo = saldo_atual * fator_correcao
-
-            # Data primeiro vencimento (próximo mês, dia 15)
-            hoje = date.today()
-            if hoje.month == 12:
-                data_primeiro_vencimento = date(hoje.year + 1, 1, 15)
-            else:
-                data_primeiro_vencimento = date(hoje.year, hoje.month + 1, 15)
-
-            return {
-                "detalhamento": f"CORREÇÃO {datetime.now().strftime('%m/%y')}",
-                "tipo_condicao": "PM",
-                "valor_total": novo_saldo,
-                "quantidade_parcelas": parcelas_pendentes,
-                "data_primeiro_vencimento": data_primeiro_vencimento.strftime("%d/%m/%Y"),
-                "indexador": "IGP-M",
-                "tipo_juros": "Fixo",
-                "percentual_juros": 8.0,
-                "indice_aplicado": indice_igpm,
-                "fator_correcao": fator_correcao,
-                "saldo_anterior": saldo_atual
-            }
+            return calcular_detalhes_reparcelamento(dados_financeiros, indices)
 
         except Exception as e:
             return {
@@ -351,12 +402,12 @@ class SimuladorSienge:
 
     async def _simular_geracao_carne(self, contrato: Dict[str, Any]) -> Dict[str, Any]:
         """Simula geração de carnê"""
-        print("🎯 SIMULAÇÃO - Gerando carnê...")
-        await asyncio.sleep(1.0)
+        self._log("🎯 SIMULAÇÃO - Gerando carnê...")
+        await self.latencia.aguardar("carne")
 
         nome_arquivo = f"carne_{contrato.get('numero_titulo', 'TITULO')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
 
-        print(f"✅ SIMULAÇÃO - Carnê gerado: {nome_arquivo}")
+        self._log(f"✅ SIMULAÇÃO - Carnê gerado: {nome_arquivo}")
 
         return {
             "sucesso": True,
@@ -366,6 +417,24 @@ class SimuladorSienge:
         }
 
 
+    async def simular_remessas_lote(
+        self,
+        processamentos: list,
+        ciclo: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Simula a geração das remessas do ciclo (uma por CNPJ/convênio)"""
+        ciclo = ciclo or date.today().isoformat()
+        remessas = []
+
+        for chave, titulos in agrupar_para_remessa(processamentos).items():
+            self._log(f"🎯 SIMULAÇÃO - Remessa {chave}: {len(titulos)} título(s)")
+            await self.latencia.aguardar("carne")
+            arquivo = f"remessa_{chave.replace('/', '').replace('.', '').replace('-', '')}_" \
+                      f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.rem"
+            remessas.append(descrever_remessa(chave, arquivo, titulos))
+
+        return montar_manifesto(ciclo, remessas, [])
+
 # ========================
 # FUNÇÃO DE EXECUÇÃO SIMULADA
 # ========================
@@ -0,0 +1,155 @@
+"""
+Benchmark - Processamento do Relatório Saldo Devedor Presente
+
+Compara o processamento linha a linha (iterrows, implementação anterior)
+com o pipeline vetorizado de processamento_relatorio.py em um relatório
+sintético com várias centenas de milhares de linhas.
+
+Uso:
+    python rpa_sienge/teste_benchmark_relatorio.py --linhas 500000
+"""
+
+import sys
+import time
+import argparse
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Import funciona tanto quando executado da raiz quanto da pasta rpa_sienge
+try:
+    from rpa_sienge.processamento_relatorio import (
+        processar_relatorio, normalizar_relatorio, resumir_por_titulo, mapear_colunas
+    )
+except ImportError:
+    from processamento_relatorio import (
+        processar_relatorio, normalizar_relatorio, resumir_por_titulo, mapear_colunas
+    )
+
+
+def gerar_relatorio_sintetico(linhas: int, parcelas_por_titulo: int = 50, semente: int = 42) -> pd.DataFrame:
+    """Gera relatório no layout do Sienge (valores e datas em texto, como na exportação)"""
+    rng = np.random.default_rng(semente)
+
+    titulos = (np.arange(linhas) // parcelas_por_titulo + 1000).astype(str)
+    documentos = rng.choice(["PM", "CT", "REC", "FAT"], size=linhas, p=[0.6, 0.3, 0.05, 0.05])
+    status = rng.choice(["Aberto", "Quitada", "Paga"], size=linhas, p=[0.5, 0.4, 0.1])
+
+    base = date.today() - timedelta(days=365)
+    dias = rng.integers(0, 730, size=linhas)
+    datas = (pd.Timestamp(base) + pd.to_timedelta(dias, unit="D")).strftime("%d/%m/%Y")
+
+    centavos = rng.integers(10_000, 1_000_000, size=linhas)
+    valores = [f"{c // 100:,}".replace(",", ".") + f",{c % 100:02d}" for c in centavos]
+
+    return pd.DataFrame({
+        "Título": titulos,
+        "Cliente": np.char.add("CLIENTE ", titulos),
+        "Parcela/Sequencial": (np.arange(linhas) % parcelas_por_titulo + 1).astype(str),
+        "Documento": documentos,
+        "Status da parcela": status,
+        "Data vencimento": datas,
+        "Valor a receber": valores,
+    })
+
+
+def processar_linha_a_linha(df: pd.DataFrame) -> dict:
+    """Implementação anterior (iterrows + conversão por célula) para comparação"""
+    mapeamento = mapear_colunas(df.columns)
+    hoje = date.today()
+    por_titulo = {}
+
+    def converter(valor):
+        texto = str(valor).replace("R$", "").strip()
+        if "," in texto:
+            texto = texto.replace(".", "").replace(",", ".")
+        try:
+            return float(texto)
+        except ValueError:
+            return 0.0
+
+    for _, row in df.iterrows():
+        linha = row.to_dict()
+        titulo = str(linha[mapeamento["numero_titulo"]])
+        tipo = str(linha[mapeamento["tipo_parcela"]]).upper()
+        status = str(linha[mapeamento["status"]])
+        resumo = por_titulo.setdefault(titulo, {"qtd_ct_vencidas": 0, "qtd_rec_fat": 0, "saldo_total": 0.0})
+
+        try:
+            vencimento = pd.to_datetime(linha[mapeamento["data_vencimento"]], format="%d/%m/%Y").date()
+        except Exception:
+            vencimento = None
+
+        if "CT" in tipo or "COTA" in tipo:
+            if vencimento and vencimento < hoje and status != "Quitada":
+                resumo["qtd_ct_vencidas"] += 1
+        elif any(x in tipo for x in ["REC", "FAT", "RECEITA", "FATURAMENTO"]):
+            resumo["qtd_rec_fat"] += 1
+
+        resumo["saldo_total"] += converter(linha[mapeamento["valor"]])
+
+    return por_titulo
+
+
+def executar_benchmark(linhas: int, amostra_iterrows: int):
+    print("🧪 BENCHMARK - RELATÓRIO SALDO DEVEDOR PRESENTE")
+    print("=" * 60)
+
+    inicio = time.perf_counter()
+    df = gerar_relatorio_sintetico(linhas)
+    print(f"📄 Relatório sintético: {len(df):,} linhas gerado em {time.perf_counter() - inicio:.2f}s")
+
+    # Pipeline vetorizado no relatório completo
+    inicio = time.perf_counter()
+    tabela = normalizar_relatorio(df)
+    resumo = resumir_por_titulo(tabela)
+    tempo_vetorizado = time.perf_counter() - inicio
+    print(f"⚡ Vetorizado: {tempo_vetorizado:.2f}s para {len(resumo):,} títulos "
+          f"({len(df) / tempo_vetorizado:,.0f} linhas/s)")
+
+    inicio = time.perf_counter()
+    dados = processar_relatorio(df, {"numero_titulo": resumo.index[0]})
+    print(f"📋 processar_relatorio (1 contrato + resumo geral): {time.perf_counter() - inicio:.2f}s "
+          f"- status {dados['status_cliente']}")
+
+    # Linha a linha em amostra (extrapolado para o total)
+    amostra = df.head(amostra_iterrows)
+    inicio = time.perf_counter()
+    resumo_antigo = processar_linha_a_linha(amostra)
+    tempo_amostra = time.perf_counter() - inicio
+    estimado = tempo_amostra * len(df) / len(amostra)
+    print(f"🐢 iterrows: {tempo_amostra:.2f}s para {len(amostra):,} linhas "
+          f"(estimado {estimado:.1f}s para {len(df):,})")
+    print(f"🚀 Ganho estimado: {estimado / tempo_vetorizado:.0f}x")
+
+    # Conferência de resultados na amostra
+    resumo_amostra = resumir_por_titulo(normalizar_relatorio(amostra))
+    divergencias = 0
+    for titulo, esperado in resumo_antigo.items():
+        obtido = resumo_amostra.loc[titulo]
+        if (int(obtido["qtd_ct_vencidas"]) != esperado["qtd_ct_vencidas"]
+                or int(obtido["qtd_rec_fat"]) != esperado["qtd_rec_fat"]
+                or abs(float(obtido["saldo_total"]) - esperado["saldo_total"]) > 0.01):
+            divergencias += 1
+
+    if divergencias:
+        print(f"❌ {divergencias} títulos divergentes entre as implementações")
+        return False
+
+    print(f"✅ Resultados idênticos em {len(resumo_antigo):,} títulos da amostra")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do processamento do relatório Sienge")
+    parser.add_argument("--linhas", type=int, default=500_000, help="Linhas do relatório sintético")
+    parser.add_argument("--amostra", type=int, default=20_000, help="Linhas processadas via iterrows")
+    args = parser.parse_args()
+
+    sucesso = executar_benchmark(args.linhas, args.amostra)
+    print("\n🎉 BENCHMARK CONCLUÍDO!" if sucesso else "\n💥 BENCHMARK FALHOU!")
@@ -0,0 +1,78 @@
+"""
+Teste do Cálculo de Reparcelamento - IGP-M no formato gravado pela coleta
+
+O RPA Coleta de Índices grava o IGP-M como texto com vírgula decimal
+("3,89"), e é esse o dict que chega ao Sienge. Verifica que o cálculo
+aceita "3,89", "3.89" e 3.89 com resultado idêntico, e que índice ausente
+ou vazio usa o IGP-M padrão.
+
+Uso:
+    python rpa_sienge/teste_calculo_reparcelamento.py
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Import funciona tanto quando executado da raiz quanto da pasta rpa_sienge
+try:
+    from rpa_sienge.calculo_reparcelamento import (
+        calcular_detalhes_reparcelamento, calcular_carteira, INDICE_IGPM_PADRAO
+    )
+except ImportError:
+    from calculo_reparcelamento import calcular_detalhes_reparcelamento, calcular_carteira, INDICE_IGPM_PADRAO
+
+HOJE = date(2024, 6, 10)
+DADOS_FINANCEIROS = {"numero_titulo": "494", "saldo_total": 100000.00, "parcelas_pendentes": 48}
+
+
+def indices_coletados(valor_igpm) -> dict:
+    """Mesmo formato do resultado do RPA Coleta de Índices"""
+    return {
+        "ipca": {"tipo": "IPCA", "valor": "4,62"},
+        "igpm": {"tipo": "IGPM", "valor": valor_igpm, "periodo": "acumulado_12_meses"}
+    }
+
+
+def executar_teste() -> bool:
+    print("🧪 TESTE DO CÁLCULO DE REPARCELAMENTO - FORMATO DO IGP-M")
+    print("=" * 50)
+    sucesso = True
+
+    # 1. Mesmo índice em texto com vírgula, texto com ponto e número
+    referencia = calcular_detalhes_reparcelamento(DADOS_FINANCEIROS, indices_coletados(3.89), HOJE)
+    for valor in ("3,89", "3.89", " 3,89 "):
+        try:
+            detalhes = calcular_detalhes_reparcelamento(DADOS_FINANCEIROS, indices_coletados(valor), HOJE)
+        except ValueError as e:
+            print(f"   ❌ IGP-M {valor!r}: {str(e)}")
+            sucesso = False
+            continue
+        status = "✅" if detalhes == referencia else "❌"
+        print(f"   {status} IGP-M {valor!r}: parcela R$ {detalhes['valor_parcela']:,.2f}")
+        if detalhes != referencia:
+            sucesso = False
+
+    # 2. Carteira inteira com o índice em texto
+    carteira = calcular_carteira([DADOS_FINANCEIROS], indices_coletados("3,89"), HOJE)
+    if carteira.get("494") != referencia:
+        print("   ❌ calcular_carteira com IGP-M em texto difere do cálculo individual")
+        sucesso = False
+
+    # 3. Índice ausente ou vazio: IGP-M padrão
+    padrao = calcular_detalhes_reparcelamento(DADOS_FINANCEIROS, indices_coletados(INDICE_IGPM_PADRAO), HOJE)
+    for indices in (None, {}, indices_coletados(None), indices_coletados("")):
+        if calcular_detalhes_reparcelamento(DADOS_FINANCEIROS, indices, HOJE) != padrao:
+            print(f"   ❌ Índice ausente não usou o padrão: {indices}")
+            sucesso = False
+
+    return sucesso
+
+
+if __name__ == "__main__":
+    sucesso = executar_teste()
+    print("\n🎉 TESTE DO CÁLCULO CONCLUÍDO!" if sucesso else "\n💥 TESTE DO CÁLCULO FALHOU!")
+    sys.exit(0 if sucesso else 1)
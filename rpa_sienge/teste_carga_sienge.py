@@ -0,0 +1,279 @@
+"""
+Teste de Carga - Pipeline Sienge -> Sicredi Simulado
+
+Gera uma carteira sintética de N contratos (criar_planilhas_exemplo.
+gerar_carteira_sintetica) e executa o pipeline completo contra os
+simuladores Sienge e Sicredi com latências sorteadas por etapa.
+
+Relata vazão, percentis de latência por estágio, tempo de CPU do
+processo (separado da espera nas latências simuladas) e pico de RSS.
+
+Uso:
+    python rpa_sienge/teste_carga_sienge.py --contratos 5000 --concorrencia 50 --escala-tempo 0.001
+    python rpa_sienge/teste_carga_sienge.py --contratos 5000 --pipeline --tamanho-lote 100
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import resource
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List
+
+import numpy as np
+
+# Adiciona o diretório pai ao path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from rpa_sicredi.simulador_sicredi import SimuladorSicredi, LATENCIAS_CARGA as LATENCIAS_CARGA_SICREDI
+from workflows.execucao_paralela import executar_pipeline, TAMANHO_LOTE_PADRAO, CONSUMIDORES_PADRAO
+
+# Import funciona tanto quando executado da raiz quanto da pasta rpa_sienge
+try:
+    from rpa_sienge.simulador_sienge import SimuladorSienge, LATENCIAS_PADRAO, LATENCIAS_CARGA
+    from rpa_sienge.criar_planilhas_exemplo import gerar_carteira_sintetica
+except ImportError:
+    from simulador_sienge import SimuladorSienge, LATENCIAS_PADRAO, LATENCIAS_CARGA
+    from criar_planilhas_exemplo import gerar_carteira_sintetica
+
+
+# Mesmo formato gravado pelo RPA Coleta de Índices (texto com vírgula)
+INDICES_TESTE = {"igpm": {"valor": "0,5"}, "ipca": {"valor": "0,4"}}
+CREDENCIAIS_TESTE = {"url": "https://simulado.local", "usuario": "carga", "senha": "carga"}
+
+
+async def processar_contrato(
+    contrato: Dict[str, Any],
+    sienge: SimuladorSienge,
+    sicredi: SimuladorSicredi,
+    semaforo: asyncio.Semaphore
+) -> Dict[str, Any]:
+    """Executa Sienge -> Sicredi para um contrato, medindo cada estágio"""
+    async with semaforo:
+        inicio = time.perf_counter()
+        resultado_sienge = await sienge.executar_simulacao(contrato, CREDENCIAIS_TESTE, INDICES_TESTE)
+        tempo_sienge = time.perf_counter() - inicio
+
+        if not resultado_sienge.sucesso:
+            status = "nao_elegivel" if resultado_sienge.dados.get("validacao") else "erro_sienge"
+            return {"status": status, "sienge": tempo_sienge, "total": tempo_sienge}
+
+        inicio_sicredi = time.perf_counter()
+        arquivo_remessa = f"remessa_{contrato['numero_titulo']}.txt"
+        resultado_sicredi = await sicredi.executar_simulacao(
+            arquivo_remessa, CREDENCIAIS_TESTE, resultado_sienge.dados
+        )
+        tempo_sicredi = time.perf_counter() - inicio_sicredi
+
+        return {
+            "status": "concluido" if resultado_sicredi.sucesso else "erro_sicredi",
+            "sienge": tempo_sienge,
+            "sicredi": tempo_sicredi,
+            "total": time.perf_counter() - inicio
+        }
+
+
+async def executar_remessa_lote(
+    contratos: List[Dict[str, Any]],
+    sienge: SimuladorSienge,
+    sicredi: SimuladorSicredi,
+    semaforo: asyncio.Semaphore
+) -> List[Dict[str, Any]]:
+    """Sienge sem carnê por contrato -> remessas do ciclo -> um upload Sicredi por remessa"""
+    async def reparcelar(contrato):
+        async with semaforo:
+            inicio = time.perf_counter()
+            resultado = await sienge.executar_simulacao(contrato, CREDENCIAIS_TESTE, INDICES_TESTE, gerar_carne=False)
+            tempo = time.perf_counter() - inicio
+            if resultado.sucesso:
+                status = "concluido"
+            else:
+                status = "nao_elegivel" if resultado.dados.get("validacao") else "erro_sienge"
+            return {"status": status, "sienge": tempo, "total": tempo, "dados": resultado.dados}
+
+    resultados = await asyncio.gather(*[reparcelar(c) for c in contratos])
+
+    processados = [r["dados"] for r in resultados if r["status"] == "concluido"]
+    manifesto = await sienge.simular_remessas_lote(processados)
+    print(f"📦 Remessas do ciclo: {manifesto['total_remessas']} arquivo(s) para {manifesto['total_titulos']:,} títulos")
+
+    async def enviar(remessa):
+        async with semaforo:
+            inicio = time.perf_counter()
+            resultado = await sicredi.executar_simulacao(remessa["arquivo_remessa"], CREDENCIAIS_TESTE, remessa)
+            return resultado.sucesso, time.perf_counter() - inicio
+
+    envios = await asyncio.gather(*[enviar(r) for r in manifesto["remessas"]])
+    for sucesso, tempo in envios:
+        resultados.append({"status": "remessa_enviada" if sucesso else "erro_sicredi", "sicredi": tempo, "total": tempo})
+
+    for resultado in resultados:
+        resultado.pop("dados", None)
+    return resultados
+
+
+async def executar_pipeline_remessas(
+    contratos: List[Dict[str, Any]],
+    sienge: SimuladorSienge,
+    sicredi: SimuladorSicredi,
+    concorrencia: int,
+    tamanho_lote: int,
+    consumidores: int
+) -> List[Dict[str, Any]]:
+    """Sienge e Sicredi em pipeline: cada lote pronto vira remessa e um upload enquanto o Sienge segue"""
+    resultados = []
+
+    async def reparcelar(contrato):
+        inicio = time.perf_counter()
+        resultado = await sienge.executar_simulacao(contrato, CREDENCIAIS_TESTE, INDICES_TESTE, gerar_carne=False)
+        tempo = time.perf_counter() - inicio
+        if resultado.sucesso:
+            status = "concluido"
+        else:
+            status = "nao_elegivel" if resultado.dados.get("validacao") else "erro_sienge"
+        resultados.append({"status": status, "sienge": tempo, "total": tempo})
+        return resultado.dados if resultado.sucesso else None
+
+    async def enviar_lote(processados):
+        inicio = time.perf_counter()
+        manifesto = await sienge.simular_remessas_lote(processados)
+        # Remessas do lote mescladas em um único upload
+        resultado = await sicredi.executar_simulacao(
+            f"remessa_mesclada_{len(resultados)}.rem", CREDENCIAIS_TESTE, manifesto
+        )
+        resultados.append({
+            "status": "remessa_enviada" if resultado.sucesso else "erro_sicredi",
+            "sicredi": time.perf_counter() - inicio,
+            "total": time.perf_counter() - inicio
+        })
+        return resultado.sucesso
+
+    pipeline = await executar_pipeline(
+        contratos, reparcelar, enviar_lote,
+        limite_produtores=concorrencia, limite_consumidores=consumidores, tamanho_lote=tamanho_lote
+    )
+    tamanhos = [len(lote["itens"]) for lote in pipeline["lotes"]]
+    if tamanhos:
+        print(f"📦 Pipeline: {len(tamanhos)} lote(s) enviados ao Sicredi, "
+              f"{sum(tamanhos) / len(tamanhos):.1f} contratos/lote em média")
+    return resultados
+
+
+def _percentis(tempos: List[float]) -> str:
+    if not tempos:
+        return "sem amostras"
+    p50, p95, p99 = np.percentile(np.array(tempos), [50, 95, 99])
+    return f"p50 {p50 * 1000:8.1f}ms | p95 {p95 * 1000:8.1f}ms | p99 {p99 * 1000:8.1f}ms"
+
+
+async def executar_teste_carga(
+    quantidade_contratos: int,
+    concorrencia: int,
+    escala_tempo: float,
+    perfil: str,
+    semente: int,
+    remessa_lote: bool = False,
+    pipeline: bool = False,
+    tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+    consumidores: int = CONSUMIDORES_PADRAO
+) -> bool:
+    print("🧪 TESTE DE CARGA - PIPELINE SIENGE -> SICREDI (SIMULADO)")
+    print("=" * 60)
+
+    inicio = time.perf_counter()
+    carteira, contratos = gerar_carteira_sintetica(quantidade_contratos, semente=semente)
+    print(f"📄 Carteira sintética: {len(contratos):,} contratos, {len(carteira):,} parcelas "
+          f"gerada em {time.perf_counter() - inicio:.2f}s")
+
+    latencias_sienge = LATENCIAS_CARGA if perfil == "carga" else LATENCIAS_PADRAO
+    latencias_sicredi = LATENCIAS_CARGA_SICREDI if perfil == "carga" else None
+
+    sienge = SimuladorSienge(
+        carteira=carteira, latencias=latencias_sienge,
+        escala_tempo=escala_tempo, semente=semente, verbose=False
+    )
+    sicredi = SimuladorSicredi(
+        latencias=latencias_sicredi, escala_tempo=escala_tempo, semente=semente, verbose=False
+    )
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    print(f"⚙️ Perfil '{perfil}', concorrência {concorrencia}, escala de tempo {escala_tempo}")
+
+    inicio = time.perf_counter()
+    inicio_cpu = time.process_time()
+    if pipeline:
+        resultados = await executar_pipeline_remessas(
+            contratos, sienge, sicredi, concorrencia, tamanho_lote, consumidores
+        )
+    elif remessa_lote:
+        resultados = await executar_remessa_lote(contratos, sienge, sicredi, semaforo)
+    else:
+        resultados = await asyncio.gather(*[
+            processar_contrato(contrato, sienge, sicredi, semaforo) for contrato in contratos
+        ])
+    tempo_total = time.perf_counter() - inicio
+    # Latências simuladas são asyncio.sleep: não contam como CPU
+    tempo_cpu = time.process_time() - inicio_cpu
+
+    # ru_maxrss é em KB no Linux
+    pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    status = Counter(r["status"] for r in resultados)
+    vazao = len(contratos) / tempo_total if tempo_total else 0.0
+
+    print("\n📊 RESULTADOS")
+    print(f"⏱️ Tempo total: {tempo_total:.2f}s")
+    print(f"🧮 CPU do processo: {tempo_cpu:.2f}s "
+          f"({tempo_cpu / max(len(contratos), 1) * 1000:.2f}ms/contrato); "
+          f"restante é espera nas latências simuladas ({max(tempo_total - tempo_cpu, 0.0):.2f}s)")
+    print(f"🚀 Vazão: {vazao:,.1f} contratos/s ({vazao * 3600:,.0f} contratos/h)")
+    print(f"🔎 Sienge:  {_percentis([r['sienge'] for r in resultados if 'sienge' in r])}")
+    print(f"🏦 Sicredi: {_percentis([r['sicredi'] for r in resultados if 'sicredi' in r])}")
+    print(f"🔗 Total:   {_percentis([r['total'] for r in resultados if 'sienge' in r])}")
+    if escala_tempo and escala_tempo != 1.0:
+        print(f"   (percentis incluem as latências simuladas na escala {escala_tempo}; "
+              f"o tempo de CPU não escala)")
+
+    print("\n📋 Status dos contratos:")
+    for nome, quantidade in status.most_common():
+        print(f"   {nome}: {quantidade:,}")
+
+    print(f"\n💾 Pico RSS do processo: {pico_rss:.1f} MB")
+
+    # Conferência: cenários inadimplentes devem ser barrados na validação
+    esperado_inadimplentes = sum(1 for c in contratos if c["cenario"] == "inadimplente")
+    erros = status.get("erro_sienge", 0) + status.get("erro_sicredi", 0)
+    if erros or status.get("nao_elegivel", 0) != esperado_inadimplentes:
+        print(f"\n❌ Divergência: {erros} erros, {status.get('nao_elegivel', 0)} não elegíveis "
+              f"(esperados {esperado_inadimplentes})")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do pipeline Sienge -> Sicredi simulado")
+    parser.add_argument("--contratos", type=int, default=1000, help="Contratos da carteira sintética")
+    parser.add_argument("--concorrencia", type=int, default=20, help="Contratos processados em paralelo")
+    parser.add_argument("--escala-tempo", type=float, default=0.01,
+                        help="Multiplicador das latências (0.01 = 100x mais rápido)")
+    parser.add_argument("--perfil", choices=["carga", "padrao"], default="carga",
+                        help="Distribuições de latência das etapas")
+    parser.add_argument("--semente", type=int, default=42, help="Semente da carteira e das latências")
+    parser.add_argument("--remessa-lote", action="store_true",
+                        help="Gera uma remessa por CNPJ/convênio no fim do ciclo em vez de uma por contrato")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Sienge e Sicredi em pipeline com fila limitada (remessa + upload por lote)")
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE_PADRAO,
+                        help="Máximo de contratos por remessa/upload no pipeline")
+    parser.add_argument("--consumidores", type=int, default=CONSUMIDORES_PADRAO,
+                        help="Uploads Sicredi simultâneos no pipeline")
+    args = parser.parse_args()
+
+    sucesso = asyncio.run(executar_teste_carga(
+        args.contratos, args.concorrencia, args.escala_tempo, args.perfil, args.semente,
+        args.remessa_lote, args.pipeline, args.tamanho_lote, args.consumidores
+    ))
+    print("\n🎉 TESTE DE CARGA CONCLUÍDO!" if sucesso else "\n💥 TESTE DE CARGA FALHOU!")
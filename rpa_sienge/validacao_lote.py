@@ -0,0 +1,164 @@
+"""
+Validação em Lote - Regras de Reparcelamento PDD seção 7.3.2
+Valida todos os contratos da fila de uma vez sobre a tabela colunar de parcelas
+
+Desenvolvido em Português Brasileiro
+
+A saída por contrato é idêntica à de RPASienge._validar_contrato_reparcelamento,
+permitindo descartar inadimplentes antes de gastar tempo de navegador.
+"""
+
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+import numpy as np
+import pandas as pd
+
+# Import funciona tanto quando executado da raiz quanto da pasta rpa_sienge
+try:
+    from rpa_sienge.processamento_relatorio import (
+        normalizar_relatorio, resumir_por_titulo, LIMITE_CT_VENCIDAS
+    )
+    from rpa_sienge.ingestao_excel import ler_relatorio_sienge
+except ImportError:
+    from processamento_relatorio import (
+        normalizar_relatorio, resumir_por_titulo, LIMITE_CT_VENCIDAS
+    )
+    from ingestao_excel import ler_relatorio_sienge
+
+
+def montar_tabela_parcelas(
+    relatorios: Iterable[Any],
+    hoje: Optional[date] = None
+) -> pd.DataFrame:
+    """
+    Monta a tabela colunar de parcelas de um ou mais relatórios
+
+    Args:
+        relatorios: Caminhos de .xlsx exportados e/ou DataFrames brutos
+        hoje: Data de referência para vencimento
+
+    Returns:
+        Tabela normalizada (ver processamento_relatorio.normalizar_relatorio)
+    """
+    tabelas = []
+    for relatorio in relatorios:
+        df = relatorio if isinstance(relatorio, pd.DataFrame) else ler_relatorio_sienge(Path(relatorio))
+        tabelas.append(normalizar_relatorio(df, hoje=hoje))
+
+    if not tabelas:
+        return normalizar_relatorio(pd.DataFrame(), hoje=hoje)
+
+    return pd.concat(tabelas, ignore_index=True) if len(tabelas) > 1 else tabelas[0]
+
+
+def validar_contratos_lote(
+    tabela: pd.DataFrame,
+    contratos: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Aplica a regra das 3 parcelas CT vencidas para todos os títulos da tabela
+
+    Args:
+        tabela: Tabela normalizada de parcelas (vários títulos)
+        contratos: Contratos da fila; se omitido valida todos os títulos da tabela
+
+    Returns:
+        Dict numero_titulo -> resultado no formato de _validar_contrato_reparcelamento.
+        Títulos da fila ausentes da tabela recebem status "erro" (sem dados).
+    """
+    resumo = resumir_por_titulo(tabela)
+    validacoes = _validar_resumo(resumo) if not resumo.empty else {}
+
+    if contratos is None:
+        return validacoes
+
+    resultado = {}
+    for contrato in contratos:
+        titulo = str(contrato.get("numero_titulo", "")).strip()
+        validacao = validacoes.get(titulo)
+        if validacao is None:
+            validacao = {
+                "pode_reparcelar": False,
+                "motivo": "Título não encontrado nos dados financeiros do lote",
+                "status": "erro"
+            }
+        elif not validacao["detalhes"]["cliente"]:
+            validacao["detalhes"]["cliente"] = contrato.get("cliente", "")
+        resultado[titulo] = validacao
+
+    return resultado
+
+
+def _validar_resumo(resumo: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Gera as validações a partir do resumo por título"""
+    qtd_ct_vencidas = resumo["qtd_ct_vencidas"].astype("int64")
+    qtd_rec_fat = resumo["qtd_rec_fat"].astype("int64")
+    inadimplente = (qtd_ct_vencidas >= LIMITE_CT_VENCIDAS).to_numpy()
+
+    # Monta motivos por coluna (mesmo texto do validador individual)
+    ct_texto = qtd_ct_vencidas.astype(str)
+    motivos = pd.Series(
+        np.where(
+            inadimplente,
+            "Cliente inadimplente - " + ct_texto + " parcelas CT vencidas (>= 3)",
+            "Cliente apto para reparcelamento - " + ct_texto + " parcelas CT vencidas (< 3)"
+        ),
+        index=resumo.index
+    )
+    com_rec_fat = ~inadimplente & (qtd_rec_fat > 0).to_numpy()
+    motivos[com_rec_fat] = (
+        motivos[com_rec_fat]
+        + " + " + qtd_rec_fat[com_rec_fat].astype(str) + " pendências REC/FAT (não impedem)"
+    )
+
+    clientes = resumo["cliente"]
+    saldos = resumo["saldo_total"].astype(float)
+
+    validacoes = {}
+    for titulo, inad, motivo, ct, rec_fat, cliente, saldo in zip(
+        resumo.index, inadimplente, motivos, qtd_ct_vencidas, qtd_rec_fat, clientes, saldos
+    ):
+        validacoes[titulo] = {
+            "pode_reparcelar": not inad,
+            "motivo": motivo,
+            "status": "inadimplente" if inad else "apto",
+            "detalhes": {
+                "qtd_ct_vencidas": int(ct),
+                "qtd_rec_fat": int(rec_fat),
+                "cliente": cliente,
+                "saldo_total": round(float(saldo), 2)
+            }
+        }
+
+    return validacoes
+
+
+def pre_filtrar_contratos(
+    contratos: List[Dict[str, Any]],
+    relatorios: Iterable[Any],
+    hoje: Optional[date] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Separa a fila em contratos a processar e inadimplentes
+
+    Contratos sem dados no lote continuam na fila: a validação individual
+    do RPA Sienge decide após a consulta.
+
+    Returns:
+        (contratos_a_processar, contratos_inadimplentes, validacoes)
+    """
+    tabela = montar_tabela_parcelas(relatorios, hoje=hoje)
+    validacoes = validar_contratos_lote(tabela, contratos)
+
+    a_processar = []
+    inadimplentes = []
+    for contrato in contratos:
+        validacao = validacoes[str(contrato.get("numero_titulo", "")).strip()]
+        if validacao["status"] == "inadimplente":
+            inadimplentes.append({**contrato, "validacao_lote": validacao})
+        else:
+            a_processar.append(contrato)
+
+    return a_processar, inadimplentes, validacoes
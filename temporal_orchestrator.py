@@ -6,6 +6,7 @@ Desenvolvido em Português Brasileiro
 """
 
 import asyncio
+import os
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
 from temporalio import activity, workflow
@@ -13,6 +14,8 @@ from temporalio.client import Client
 from temporalio.worker import Worker
 import structlog
 
+from workflows.execucao_paralela import executar_em_paralelo, vazao_por_hora, CONCORRENCIA_PADRAO
+
 logger = structlog.get_logger()
 
 # ============================================================================
@@ -70,6 +73,27 @@ async def activity_rpa_sienge(parametros: Dict[str, Any]) -> Dict[str, Any]:
         resultado = await executar_processamento_sienge(
             contrato=parametros.get("contrato"),
             indices_economicos=parametros.get("indices_economicos"),
+            credenciais_sienge=parametros.get("credenciais_sienge"),
+            gerar_carne=parametros.get("gerar_carne", True)
+        )
+        
+        return {
+            "sucesso": resultado.sucesso,
+            "dados": resultado.dados if hasattr(resultado, 'dados') else {},
+            "tempo_execucao": getattr(resultado, 'tempo_execucao', 0)
+        }
+        
+    except Exception as e:
+        return {"sucesso": False, "erro": str(e)}
+
+@activity.defn
+async def activity_rpa_sienge_remessa_lote(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Activity para RPA 3 - Remessas do ciclo (uma por CNPJ/convênio)"""
+    try:
+        from rpa_sienge.rpa_sienge import executar_geracao_carnes_lote
+        
+        resultado = await executar_geracao_carnes_lote(
+            processamentos=parametros.get("processamentos", []),
             credenciais_sienge=parametros.get("credenciais_sienge")
         )
         
@@ -103,6 +127,27 @@ async def activity_rpa_sicredi(parametros: Dict[str, Any]) -> Dict[str, Any]:
     except Exception as e:
         return {"sucesso": False, "erro": str(e)}
 
+@activity.defn
+async def activity_rpa_sicredi_lote(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Activity para RPA 4 - Sicredi com as remessas do ciclo em um único upload"""
+    try:
+        from rpa_sicredi.rpa_sicredi import executar_processamento_sicredi_lote
+        
+        resultado = await executar_processamento_sicredi_lote(
+            arquivos_remessa=parametros.get("arquivos_remessa", []),
+            credenciais_sicredi=parametros.get("credenciais_sicredi"),
+            dados_por_arquivo=parametros.get("dados_por_arquivo")
+        )
+        
+        return {
+            "sucesso": resultado.sucesso,
+            "dados": resultado.dados if hasattr(resultado, 'dados') else {},
+            "tempo_execucao": getattr(resultado, 'tempo_execucao', 0)
+        }
+        
+    except Exception as e:
+        return {"sucesso": False, "erro": str(e)}
+
 # ============================================================================
 # WORKFLOWS
 # ============================================================================
@@ -172,7 +217,8 @@ class WorkflowReparcelamentoDiario:
                         "contratos": contratos,
                         "indices_economicos": resultado_rpa1.get("dados", {}),
                         "credenciais_sienge": parametros.get("credenciais_sienge", {}),
-                        "credenciais_sicredi": parametros.get("credenciais_sicredi", {})
+                        "credenciais_sicredi": parametros.get("credenciais_sicredi", {}),
+                        "concorrencia_sienge": parametros.get("concorrencia_sienge")
                     }
                 )
                 
@@ -203,53 +249,99 @@ class WorkflowProcessamentoContratos:
         indices = parametros.get("indices_economicos", {})
         cred_sienge = parametros.get("credenciais_sienge", {})
         cred_sicredi = parametros.get("credenciais_sicredi", {})
+        concorrencia = parametros.get("concorrencia_sienge") or CONCORRENCIA_PADRAO
         
         resultado = {
             "contratos_processados": 0,
+            "contratos_com_erro": [],
             "arquivos_sicredi": []
         }
         
-        # Processa cada contrato no Sienge
-        for contrato in contratos[:3]:  # Máximo 3 por execução
-            try:
-                workflow.logger.info(f"🏢 Processando {contrato.get('numero_titulo')} no Sienge")
-                
-                resultado_sienge = await workflow.execute_activity(
-                    activity_rpa_sienge,
-                    {
-                        "contrato": contrato,
-                        "indices_economicos": indices,
-                        "credenciais_sienge": cred_sienge
-                    },
-                    start_to_close_timeout=timedelta(minutes=20)
-                )
-                
-                if resultado_sienge["sucesso"]:
-                    resultado["contratos_processados"] += 1
-                    
-                    # Processa no Sicredi se arquivo foi gerado
-                    dados_sienge = resultado_sienge.get("dados", {})
-                    arquivo_remessa = dados_sienge.get("carne_gerado", {}).get("nome_arquivo")
-                    
-                    if arquivo_remessa:
-                        workflow.logger.info(f"🏦 Processando {arquivo_remessa} no Sicredi")
-                        
-                        resultado_sicredi = await workflow.execute_activity(
-                            activity_rpa_sicredi,
-                            {
-                                "arquivo_remessa": arquivo_remessa,
-                                "credenciais_sicredi": cred_sicredi,
-                                "dados_processamento": dados_sienge
-                            },
-                            start_to_close_timeout=timedelta(minutes=15)
-                        )
-                        
-                        if resultado_sicredi["sucesso"]:
-                            resultado["arquivos_sicredi"].append(arquivo_remessa)
-                
-            except Exception as e:
-                workflow.logger.error(f"Erro ao processar contrato: {str(e)}")
-                continue
+        # Processa todos os contratos no Sienge em paralelo (carnê fica para a remessa do ciclo)
+        workflow.logger.info(f"🏢 Processando {len(contratos)} contratos no Sienge ({concorrencia} em paralelo)")
+        inicio = workflow.now()
+        
+        async def processar_contrato(contrato: Dict[str, Any]) -> Dict[str, Any]:
+            return await workflow.execute_activity(
+                activity_rpa_sienge,
+                {
+                    "contrato": contrato,
+                    "indices_economicos": indices,
+                    "credenciais_sienge": cred_sienge,
+                    "gerar_carne": False
+                },
+                start_to_close_timeout=timedelta(minutes=20)
+            )
+        
+        concluidos = await executar_em_paralelo(contratos, processar_contrato, concorrencia)
+        
+        processamentos = []
+        for concluido in concluidos:
+            resultado_sienge = concluido["resultado"] or {}
+            if resultado_sienge.get("sucesso"):
+                processamentos.append(resultado_sienge.get("dados", {}))
+            else:
+                erro = concluido["erro"] or resultado_sienge.get("erro", "")
+                workflow.logger.error(f"Erro ao processar contrato {concluido['item'].get('numero_titulo')}: {erro}")
+                resultado["contratos_com_erro"].append({
+                    "numero_titulo": concluido["item"].get("numero_titulo"),
+                    "erro": erro
+                })
+        
+        duracao = (workflow.now() - inicio).total_seconds()
+        resultado["contratos_processados"] = len(processamentos)
+        resultado["duracao_sienge_segundos"] = duracao
+        resultado["contratos_por_hora"] = vazao_por_hora(len(contratos), duracao)
+        workflow.logger.info(
+            f"📈 Sienge: {len(processamentos)}/{len(contratos)} contratos em {duracao:.0f}s "
+            f"({resultado['contratos_por_hora']} contratos/h)"
+        )
+        
+        # Só contratos com carnê pendente: os retomados de checkpoint já finalizados
+        # no ciclo não voltam para a remessa
+        pendentes_lote = [p for p in processamentos if p.get("carne_gerado", {}).get("pendente_lote")]
+        if not pendentes_lote:
+            return resultado
+        
+        # Uma remessa por CNPJ/convênio cobrindo todos os títulos do ciclo
+        workflow.logger.info(f"🎯 Gerando remessas do ciclo para {len(pendentes_lote)} contratos")
+        resultado_remessas = await workflow.execute_activity(
+            activity_rpa_sienge_remessa_lote,
+            {
+                "processamentos": pendentes_lote,
+                "credenciais_sienge": cred_sienge
+            },
+            start_to_close_timeout=timedelta(minutes=30)
+        )
+        
+        remessas = [
+            r for r in resultado_remessas.get("dados", {}).get("remessas", [])
+            if r.get("arquivo_remessa")
+        ]
+        if not remessas:
+            return resultado
+        
+        try:
+            # Remessas mescladas: um login/upload no Sicredi para o ciclo todo
+            workflow.logger.info(f"🏦 Enviando {len(remessas)} remessa(s) ao Sicredi em lote")
+            
+            resultado_sicredi = await workflow.execute_activity(
+                activity_rpa_sicredi_lote,
+                {
+                    "arquivos_remessa": [r["arquivo_remessa"] for r in remessas],
+                    "credenciais_sicredi": cred_sicredi,
+                    "dados_por_arquivo": {r["arquivo_remessa"]: r for r in remessas}
+                },
+                start_to_close_timeout=timedelta(minutes=30)
+            )
+            
+            protocolos = resultado_sicredi.get("dados", {}).get("protocolos_por_arquivo", {})
+            resultado["arquivos_sicredi"].extend(
+                r["arquivo_remessa"] for r in remessas if r["arquivo_remessa"] in protocolos
+            )
+            
+        except Exception as e:
+            workflow.logger.error(f"Erro ao processar remessas em lote: {str(e)}")
         
         return resultado
 
@@ -292,7 +384,9 @@ class TemporalOrchestrator:
                     activity_rpa_coleta_indices,
                     activity_rpa_analise_planilhas, 
                     activity_rpa_sienge,
-                    activity_rpa_sicredi
+                    activity_rpa_sienge_remessa_lote,
+                    activity_rpa_sicredi,
+                    activity_rpa_sicredi_lote
                 ]
             )
             
@@ -316,6 +410,13 @@ class TemporalOrchestrator:
         try:
             workflow_id = f"reparcelamento-diario-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
+            # Concorrência lida aqui: o código do workflow não acessa o ambiente
+            parametros = {
+                **parametros,
+                "concorrencia_sienge": parametros.get("concorrencia_sienge")
+                or int(os.getenv("RPA_CONCORRENCIA_SIENGE", CONCORRENCIA_PADRAO))
+            }
+            
             handle = await self.client.start_workflow(
                 WorkflowReparcelamentoDiario.executar,
                 parametros,
@@ -0,0 +1,147 @@
+"""
+Execução Paralela Limitada
+Fan-out de activities por contrato com limite de concorrência e pipeline
+produtor/consumidor entre estágios (Sienge -> Sicredi)
+
+Desenvolvido em Português Brasileiro
+
+As tarefas são criadas na ordem da lista e os resultados consumidos à
+medida que terminam (fila), sem asyncio.as_completed - que agenda a
+partir de um set e quebraria o determinismo do replay no Temporal.
+Falha de um contrato não interrompe os demais.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+# Activities Sienge simultâneas por padrão (sessões no Sienge por worker)
+CONCORRENCIA_PADRAO = 5
+
+# Pipeline: consumidores (uploads Sicredi) simultâneos e itens por lote
+CONSUMIDORES_PADRAO = 2
+TAMANHO_LOTE_PADRAO = 50
+
+# Marca de fim da fila do pipeline (uma por consumidor)
+_FIM = object()
+
+
+async def executar_em_paralelo(
+    itens: Sequence[Any],
+    executar_item: Callable[[Any], Awaitable[Any]],
+    limite: int = CONCORRENCIA_PADRAO,
+    ao_concluir: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Executa executar_item para cada item com no máximo `limite` em andamento
+
+    Args:
+        itens: Itens a processar (ex.: contratos)
+        executar_item: Corrotina que processa um item
+        limite: Quantidade máxima de itens em execução ao mesmo tempo
+        ao_concluir: Chamado a cada item concluído (progresso/log)
+
+    Returns:
+        Lista na ordem de conclusão com {posicao, item, resultado, erro};
+        erro é a mensagem da exceção (resultado None) quando o item falhou
+    """
+    semaforo = asyncio.Semaphore(max(1, int(limite or 1)))
+    concluidos: asyncio.Queue = asyncio.Queue()
+
+    async def executar(posicao: int, item: Any):
+        async with semaforo:
+            try:
+                concluido = {"posicao": posicao, "item": item, "resultado": await executar_item(item), "erro": None}
+            except Exception as e:
+                concluido = {"posicao": posicao, "item": item, "resultado": None, "erro": str(e)}
+        concluidos.put_nowait(concluido)
+
+    tarefas = [asyncio.create_task(executar(posicao, item)) for posicao, item in enumerate(itens)]
+
+    resultados = []
+    for _ in tarefas:
+        concluido = await concluidos.get()
+        if ao_concluir:
+            ao_concluir(concluido)
+        resultados.append(concluido)
+
+    return resultados
+
+
+def vazao_por_hora(quantidade: int, segundos: float) -> float:
+    """Itens processados por hora"""
+    return round(quantidade * 3600 / segundos, 1) if segundos > 0 else 0.0
+
+
+async def executar_pipeline(
+    itens: Sequence[Any],
+    produzir: Callable[[Any], Awaitable[Any]],
+    consumir_lote: Callable[[List[Any]], Awaitable[Any]],
+    limite_produtores: int = CONCORRENCIA_PADRAO,
+    limite_consumidores: int = CONSUMIDORES_PADRAO,
+    tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+    tamanho_fila: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Pipeline produtor/consumidor com fila limitada entre os estágios
+
+    Cada item produzido (ex.: contrato reparcelado no Sienge) entra na fila
+    assim que fica pronto; os consumidores (ex.: remessa + upload Sicredi)
+    retiram o que estiver disponível, até tamanho_lote itens, e processam
+    em paralelo. Com a fila cheia os produtores aguardam (backpressure), de
+    modo que o tempo total tende ao do estágio mais lento, não à soma.
+
+    Args:
+        itens: Entradas do primeiro estágio
+        produzir: Corrotina do primeiro estágio; retorno None não segue adiante
+        consumir_lote: Corrotina do segundo estágio, recebe a lista do lote
+        limite_produtores: Itens em produção ao mesmo tempo
+        limite_consumidores: Lotes em consumo ao mesmo tempo
+        tamanho_lote: Máximo de itens por lote consumido
+        tamanho_fila: Capacidade da fila (padrão: um lote por consumidor)
+
+    Returns:
+        {"producao": saída de executar_em_paralelo,
+         "lotes": [{itens, resultado, erro}] na ordem de conclusão}
+    """
+    tamanho_lote = max(1, int(tamanho_lote or 1))
+    limite_consumidores = max(1, int(limite_consumidores or 1))
+    fila: asyncio.Queue = asyncio.Queue(maxsize=max(1, tamanho_fila or tamanho_lote * limite_consumidores))
+    lotes: List[Dict[str, Any]] = []
+
+    async def produzir_e_entregar(item: Any) -> Any:
+        resultado = await produzir(item)
+        if resultado is not None:
+            await fila.put(resultado)
+        return resultado
+
+    async def consumidor():
+        while True:
+            item = await fila.get()
+            if item is _FIM:
+                return
+
+            # Lote = o que já está pronto na fila (cresce quando o consumo atrasa)
+            lote, encerrar = [item], False
+            while len(lote) < tamanho_lote and not fila.empty():
+                item = fila.get_nowait()
+                if item is _FIM:
+                    encerrar = True
+                    break
+                lote.append(item)
+
+            try:
+                lotes.append({"itens": lote, "resultado": await consumir_lote(lote), "erro": None})
+            except Exception as e:
+                lotes.append({"itens": lote, "resultado": None, "erro": str(e)})
+
+            if encerrar:
+                return
+
+    consumidores = [asyncio.create_task(consumidor()) for _ in range(limite_consumidores)]
+
+    producao = await executar_em_paralelo(itens, produzir_e_entregar, limite_produtores)
+    for _ in consumidores:
+        await fila.put(_FIM)
+    await asyncio.gather(*consumidores)
+
+    return {"producao": producao, "lotes": lotes}
@@ -15,6 +15,7 @@ from rpa_coleta_indices.rpa_coleta_indices import executar_coleta_indices
 from rpa_analise_planilhas.rpa_analise_planilhas import executar_analise_planilhas
 from rpa_sienge.rpa_sienge import executar_processamento_sienge
 from rpa_sicredi.rpa_sicredi import executar_processamento_sicredi
+from workflows.execucao_paralela import executar_em_paralelo, vazao_por_hora, CONCORRENCIA_PADRAO
 
 logger = structlog.get_logger()
 
@@ -42,7 +43,8 @@ class WorkflowReparcelamento:
                 - credenciais_google: Caminho credenciais Google Sheets
                 - credenciais_sienge: Dados acesso Sienge (url, usuario, senha)
                 - credenciais_sicredi: Dados acesso Sicredi (url, usuario, senha)
-                - processar_todos: Se True, processa todos os contratos identificados
+                - limite_contratos: Máximo de contratos na execução (padrão: toda a fila)
+                - concorrencia_sienge: Contratos processados em paralelo no Sienge
         
         Returns:
             Resultado completo do workflow
@@ -104,40 +106,49 @@ class WorkflowReparcelamento:
             contratos_processados_sienge = []
             contratos_com_erro_sienge = []
             
-            # Decide quantos contratos processar
-            processar_todos = parametros.get("processar_todos", False)
-            limite_processamento = len(contratos_reajuste) if processar_todos else min(3, len(contratos_reajuste))
+            # Fila inteira por padrão; limite apenas se informado
+            limite_contratos = parametros.get("limite_contratos") or len(contratos_reajuste)
+            contratos_execucao = contratos_reajuste[:limite_contratos]
+            concorrencia = parametros.get("concorrencia_sienge") or CONCORRENCIA_PADRAO
+            inicio_sienge = workflow.now()
             
-            for i, contrato in enumerate(contratos_reajuste[:limite_processamento]):
-                workflow.logger.info(f"Processando contrato {i+1}/{limite_processamento}: {contrato.get('numero_titulo', '')}")
-                
-                try:
-                    resultado_sienge = await workflow.execute_activity(
-                        executar_atividade_processamento_sienge,
-                        contrato,
-                        resultado_indices.dados,
-                        parametros.get("credenciais_sienge"),
-                        start_to_close_timeout=timedelta(minutes=20)
-                    )
-                    
-                    if resultado_sienge.sucesso:
-                        contratos_processados_sienge.append(resultado_sienge.dados)
-                    else:
-                        contratos_com_erro_sienge.append({
-                            "contrato": contrato,
-                            "erro": resultado_sienge.erro
-                        })
-                        
-                except Exception as e:
+            async def processar_contrato(contrato: Dict[str, Any]):
+                return await workflow.execute_activity(
+                    executar_atividade_processamento_sienge,
+                    args=[contrato, resultado_indices.dados, parametros.get("credenciais_sienge")],
+                    start_to_close_timeout=timedelta(minutes=20)
+                )
+            
+            def registrar_conclusao(concluido: Dict[str, Any]):
+                resultado_sienge = concluido["resultado"]
+                if resultado_sienge is not None and resultado_sienge.sucesso:
+                    contratos_processados_sienge.append(resultado_sienge.dados)
+                else:
                     contratos_com_erro_sienge.append({
-                        "contrato": contrato,
-                        "erro": str(e)
+                        "contrato": concluido["item"],
+                        "erro": concluido["erro"] or resultado_sienge.erro
                     })
+                
+                feitos = len(contratos_processados_sienge) + len(contratos_com_erro_sienge)
+                workflow.logger.info(
+                    f"Contrato {concluido['item'].get('numero_titulo', '')} concluído ({feitos}/{len(contratos_execucao)})"
+                )
+            
+            await executar_em_paralelo(contratos_execucao, processar_contrato, concorrencia, registrar_conclusao)
+            
+            duracao_sienge = (workflow.now() - inicio_sienge).total_seconds()
+            workflow.logger.info(
+                f"📈 Sienge: {len(contratos_execucao)} contratos em {duracao_sienge:.0f}s "
+                f"({vazao_por_hora(len(contratos_execucao), duracao_sienge)} contratos/h)"
+            )
             
             resultado_workflow["etapas_concluidas"].append("processamento_sienge")
             resultado_workflow["resumo_processamento"]["sienge"] = {
                 "processados_com_sucesso": len(contratos_processados_sienge),
                 "com_erro": len(contratos_com_erro_sienge),
+                "concorrencia": concorrencia,
+                "duracao_segundos": duracao_sienge,
+                "contratos_por_hora": vazao_por_hora(len(contratos_execucao), duracao_sienge),
                 "detalhes_processados": contratos_processados_sienge,
                 "detalhes_erros": contratos_com_erro_sienge
             }